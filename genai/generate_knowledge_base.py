@@ -8,67 +8,85 @@ Generate the AI knowledge base for the project.
     pip install "docpack>=0.1.2,<1.0.0"
 """
 
-import shutil
+import os
 from pathlib import Path
 
-from learn_strands_agents.paths import dir_project_root, PACKAGE_NAME
+from learn_strands_agents.paths import path_enum, PACKAGE_NAME
 from docpack.api import GitHubPipeline
 
 dir_here = Path(__file__).absolute().parent
 dir_tmp = dir_here / "tmp"
-dir_tmp_docs = dir_tmp / "docs"
-shutil.rmtree(dir_tmp, ignore_errors=True)
-dir_tmp.mkdir()
+filename = "all_in_one_knowledge_base.txt"
+path_out = dir_tmp / filename
 
-gh_pipeline = GitHubPipeline(
-    domain="github.com",
-    account="MacHu-GWU",
-    repo=f"{PACKAGE_NAME}-project",
-    branch="main",
-    dir_repo=dir_project_root,
-    include=[
-        f"{PACKAGE_NAME}/**/*.py",
-        "tests/**/*.py",
-        "docs/source/**/index.rst",
-        "docs/source/**/*.py",
-        "bin/**/*.py",
-        ".github/workflows/*.yml",
-        "README.rst",
-        "Makefile",
-        "poetry.toml",
-        "pyproject.toml",
-        ".coveragerc",
-        "codecov.yml",
-        ".readthedocs.yml",
-        "release-history.rst",
-    ],
-    exclude=[
-        f"{PACKAGE_NAME}/tests/**",
-        f"{PACKAGE_NAME}/tests/**/*.*",
-        f"{PACKAGE_NAME}/vendor/**",
-        f"{PACKAGE_NAME}/vendor/**/*.*",
-        f"tests/all.py",
-        f"tests/**/all.py",
-        f"docs/source/index.rst",
-        f"docs/source/release-history.rst",
-        f"docs/source/conf.py",
-        ".venv/**/*.*",
-        ".poetry/**/*.*",
-        "build/**/*.*",
-        "dist/**/*.*",
-        "htmlcov/**/*.*",
-        "tmp/**/*.*",
-        ".pytest_cache/**/*.*",
-        ".cache/**/*.*",
-        ".coverage",
-    ],
-    dir_out=dir_tmp_docs,
-)
-gh_pipeline.fetch()
+include = [
+    f"{PACKAGE_NAME}/**/*.py",
+    "tests/**/*.py",
+    "docs/source/**/index.rst",
+    "docs/source/**/*.py",
+    "bin/**/*.py",
+    ".github/workflows/*.yml",
+    "README.rst",
+    "Makefile",
+    "poetry.toml",
+    "pyproject.toml",
+    ".coveragerc",
+    "codecov.yml",
+    ".readthedocs.yml",
+    "release-history.rst",
+]
 
-filename = "all_in_one_knowledge_base.txt"
-lines = [
-    path.read_text()
-    for path in dir_tmp_docs.glob("*.xml")
+exclude = [
+    f"{PACKAGE_NAME}/tests/**",
+    f"{PACKAGE_NAME}/tests/**/*.*",
+    f"{PACKAGE_NAME}/vendor/**",
+    f"{PACKAGE_NAME}/vendor/**/*.*",
+    f"tests/all.py",
+    f"tests/**/all.py",
+    f"docs/source/index.rst",
+    f"docs/source/release-history.rst",
+    f"docs/source/conf.py",
+    ".venv/**/*.*",
+    ".poetry/**/*.*",
+    "build/**/*.*",
+    "dist/**/*.*",
+    "htmlcov/**/*.*",
+    "tmp/**/*.*",
+    ".pytest_cache/**/*.*",
+    ".cache/**/*.*",
+    ".coverage",
 ]
-dir_tmp.joinpath(filename).write_text("\n".join(lines), encoding="utf-8")
+
+# skip the fetch when no file of the knowledge base changed since the last run
+files = path_enum.glob(*include, exclude=exclude)
+stat_out = path_enum.stat(path_out)
+if stat_out is not None and all(
+    path_enum.stat(path).st_mtime <= stat_out.st_mtime for path in files
+):
+    print(f"{path_out} is up to date with {len(files)} files")
+    raise SystemExit(0)
+
+# each run works in its own directory, concurrent runs don't clobber each
+# other, and the directory is removed even if the pipeline fails
+with path_enum.temp_dir(prefix="knowledge-base-", parent=dir_tmp) as dir_job:
+    dir_tmp_docs = dir_job / "docs"
+
+    gh_pipeline = GitHubPipeline(
+        domain="github.com",
+        account="MacHu-GWU",
+        repo=f"{PACKAGE_NAME}-project",
+        branch="main",
+        dir_repo=path_enum.dir_project_root,
+        include=include,
+        exclude=exclude,
+        dir_out=dir_tmp_docs,
+    )
+    gh_pipeline.fetch()
+
+    lines = [
+        path.read_text()
+        for path in dir_tmp_docs.glob("*.xml")
+    ]
+    path_job_out = dir_job / filename
+    path_job_out.write_text("\n".join(lines), encoding="utf-8")
+    os.replace(path_job_out, path_out)
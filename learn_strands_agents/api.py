@@ -1,2 +1,173 @@
 # -*- coding: utf-8 -*-
 
+from .local_model import ScriptedToolUse
+from .local_model import ScriptedTurn
+from .local_model import ScriptedModel
+from .token_budget import ModelProfile
+from .token_budget import get_profile
+from .token_budget import fit_profile
+from .token_budget import TokenEstimator
+from .token_budget import PromptBudgetExceededError
+from .token_budget import PreflightReport
+from .token_budget import PromptBudgetHook
+from .streaming import AgentStreamEvent
+from .streaming import TextDelta
+from .streaming import ThinkingDelta
+from .streaming import ToolStart
+from .streaming import ToolEnd
+from .streaming import CycleEnd
+from .streaming import StreamTimings
+from .streaming import StreamEnd
+from .streaming import stream_agent
+from .message_hygiene import RetentionRules
+from .message_hygiene import TurnSavings
+from .message_hygiene import HygieneStats
+from .message_hygiene import MessageHygieneHook
+from .http_shaping import ShapingConfig
+from .http_shaping import ShapedBody
+from .http_shaping import ShapedResponse
+from .http_shaping import HtmlTextExtractor
+from .http_shaping import json_path_select
+from .http_shaping import shape_body
+from .http_shaping import shape_text
+from .http_shaping import fetch_shaped
+from .http_shaping import http_get
+from .http_shaping import HttpResultShapingHook
+from .checkpoint import hash_inputs
+from .checkpoint import Checkpoint
+from .checkpoint import StageRun
+from .checkpoint import CheckpointStore
+from .research import ResearchAgents
+from .research import ResearchReport
+from .research import run_agent_stage
+from .research import run_research_workflow
+from .research import new_research_workflow
+from .batch import BatchItem
+from .batch import BatchResult
+from .batch import BatchReport
+from .batch import read_queries
+from .batch import run_batch_async
+from .batch import run_batch
+from .rate_limit import INTERACTIVE
+from .rate_limit import BATCH
+from .rate_limit import TokenBucket
+from .rate_limit import AimdLimiter
+from .rate_limit import ModelLimits
+from .rate_limit import RetryPolicy
+from .rate_limit import ThrottlingRetriesExhaustedError
+from .rate_limit import RateLimitScheduler
+from .rate_limit import ScheduledModel
+from .rate_limit import get_scheduler
+from .tool_cache import SqliteCache
+from .tool_cache import StaticResultTool
+from .tool_cache import ToolResultCacheHook
+from .tool_cache import SessionStore
+from .server import WorkerMetrics
+from .server import AgentServer
+from .server import invoke as invoke_server
+from .message_store import TextArena
+from .message_store import get_default_arena
+from .message_store import MessageStore
+from .message_store import MessageStoreHook
+from .message_store import use_message_store
+from .trace_view import TraceView
+from .trace_view import iter_traces
+from .trace_view import walk_traces
+from .trace_view import model_calls
+from .trace_view import tool_calls
+from .trace_view import slowest
+from .trace_view import latency_breakdown
+from .tool_latency import LatencyHistogram
+from .tool_latency import LatencySLO
+from .tool_latency import LatencyRecorder
+from .tool_latency import ToolLatencyHook
+from .tool_latency import get_recorder
+from .profiler import SamplingProfiler
+from .prefetch import PrefetchRule
+from .prefetch import PrefetchStats
+from .prefetch import PrefetchHook
+from .prefetch import PrefetchedTool
+from .weather import WEATHER_SYSTEM_PROMPT
+from .weather import WEATHER_PREFETCH_RULES
+from .weather import new_weather_agent
+from .weather import FORECAST_SYSTEM_PROMPT
+from .weather import GetWeatherInput
+from .weather import GetForecastInput
+from .weather import ForecastPeriod
+from .weather import WeatherAlert
+from .weather import GetForecastOutput
+from .weather import NwsClient
+from .weather import get_nws_client
+from .weather import get_forecast
+from .geocode import normalize_place
+from .geocode import Place
+from .geocode import build_gazetteer
+from .geocode import Gazetteer
+from .geocode import get_gazetteer
+from .geocode import geocode
+from .prompt_cache import CacheSupport
+from .prompt_cache import get_cache_support
+from .prompt_cache import PromptCacheHook
+from .prompt_cache import CacheReport
+from .prompt_cache import cache_report
+from .research_cache import Document
+from .research_cache import Finding
+from .research_cache import SearchHit
+from .research_cache import ResearchMemory
+from .research_cache import ResearchMemoryHook
+from .research_cache import new_research_memory_tool
+from .workflow import Stage
+from .workflow import agent_stage
+from .workflow import StageResult
+from .workflow import WorkflowResult
+from .workflow import Workflow
+from .cancellation import AgentCancelledError
+from .cancellation import CancelToken
+from .cancellation import current_cancel_token
+from .cancellation import CancellableModel
+from .cancellation import CancellationHook
+from .cancellation import CancellableRun
+from .cancellation import invoke_cancellable
+from .cancellation import run_cancellable
+from .single_flight import SingleFlightOverflowError
+from .single_flight import SingleFlightStats
+from .single_flight import SingleFlight
+from .single_flight import CoalescingInvoker
+from .single_flight import CoalescedTool
+from .single_flight import SingleFlightHook
+from .structured import StructuredOutputError
+from .structured import IncrementalJsonParser
+from .structured import StructuredParser
+from .structured import FieldEvent
+from .structured import StructuredResult
+from .structured import stream_structured
+from .structured import structured_output_async
+from .structured import StructuredOutputTool
+from .structured import invoke_structured
+from .structured import run_structured
+from .replay import ReplayDivergenceError
+from .replay import ModelCall
+from .replay import ToolCall
+from .replay import ReplayReport
+from .replay import dump_reports
+from .replay import load_reports
+from .replay import Recording
+from .replay import Recorder
+from .replay import ReplayModel
+from .replay import ReplayToolHook
+from .replay import replay
+from .replay import benchmark
+from .replay import TimingDiff
+from .replay import compare_reports
+from .replay import format_diffs
+from .tool_schema import ValidationStats
+from .tool_schema import ValidationCache
+from .tool_schema import get_validation_cache
+from .tool_schema import compile_validator
+from .tool_schema import SpecCacheStats
+from .tool_schema import ToolSchemaCache
+from .tool_schema import ToolOverhead
+from .tool_schema import measure_tool_overhead
+from .result_store import ResultSummary
+from .result_store import summarize
+from .result_store import ResultStore
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+
+"""
+Offline bulk processing of independent prompts.
+
+Nightly jobs push thousands of prompts through agents like the get_weather
+one. :func:`run_batch` is optimized for throughput instead of latency:
+
+- queries are streamed from a JSONL or CSV file, reading pauses while the
+  workers are busy, and identical prompts are processed only once;
+- prompts that don't need tools skip the agent loop and are sent straight
+  to the model, up to ``batch_size`` of them concurrently. These are
+  single ``model.stream`` calls, not a provider batch API, so they get
+  the latency and not the price of a batch job;
+- prompts that need tools go through a bounded pool of async workers, each
+  query with a fresh agent;
+- results are appended to a JSONL file as they complete, and a rerun skips
+  everything that already succeeded.
+"""
+
+import typing as T
+import re
+import csv
+import json
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass, field
+
+from strands.event_loop.streaming import stream_messages
+
+from .paths import path_enum
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.models.model import Model
+
+
+@dataclass
+class BatchItem:
+    """
+    One query of a batch.
+
+    :param id: the id from the input file, or the line number.
+    :param prompt: the prompt text.
+    """
+
+    id: str
+    prompt: str
+
+    @property
+    def key(self) -> str:
+        return prompt_key(self.prompt)
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def prompt_key(prompt: str) -> str:
+    """
+    Deduplication key of a prompt, whitespace differences don't matter.
+    """
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()[:32]
+
+
+PROMPT_FIELDS = ("prompt", "query")
+
+
+def _get_prompt(record: dict[str, T.Any]) -> str:
+    for name in PROMPT_FIELDS:
+        if record.get(name):
+            return str(record[name])
+    raise ValueError(f"record has none of the fields {PROMPT_FIELDS}: {record!r}")
+
+
+def read_queries(
+    path: T.Union[str, Path],
+) -> T.Iterator[BatchItem]:
+    """
+    Stream queries from a ``.jsonl`` or ``.csv`` file.
+
+    Each JSON line / CSV row needs a ``prompt`` (or ``query``) field and may
+    have an ``id`` field, the line number is used as id otherwise.
+    """
+    path = Path(path)
+    with path.open("r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            for i, row in enumerate(csv.DictReader(f), start=1):
+                yield BatchItem(id=row.get("id") or str(i), prompt=_get_prompt(row))
+        else:
+            for i, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                yield BatchItem(id=str(record.get("id", i)), prompt=_get_prompt(record))
+
+
+SINGLE_CYCLE = "single_cycle"
+AGENT = "agent"
+
+
+@dataclass
+class BatchResult:
+    """
+    One line of the output file.
+
+    :param path: ``single_cycle`` or ``agent``.
+    :param status: ``ok`` or ``error``.
+    """
+
+    id: str
+    key: str
+    prompt: str
+    path: str
+    status: str
+    output: T.Optional[str] = None
+    error: T.Optional[str] = None
+    usage: dict[str, int] = field(default_factory=dict)
+    duration: float = 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(self.__dict__, ensure_ascii=False)
+
+
+@dataclass
+class BatchReport:
+    """
+    Summary of a :func:`run_batch` run.
+
+    :param total: number of queries read.
+    :param unique: number of distinct prompts.
+    :param resumed: distinct prompts skipped because they already succeeded.
+    """
+
+    total: int = 0
+    unique: int = 0
+    resumed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    single_cycle: int = 0
+    agent: int = 0
+    duration: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Processed distinct prompts per second.
+        """
+        done = self.succeeded + self.failed
+        return done / self.duration if self.duration else 0.0
+
+
+def load_completed(
+    path: Path,
+) -> set[str]:
+    """
+    Keys of the prompts that already succeeded in a previous run.
+    """
+    completed = set()
+    if not path.exists():
+        return completed
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # a partially written last line of an interrupted run
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["key"])
+    return completed
+
+
+async def invoke_model_once(
+    model: "Model",
+    prompt: str,
+    system_prompt: T.Optional[str] = None,
+) -> tuple[str, dict[str, int]]:
+    """
+    Send a single prompt straight to the model, without agent loop and
+    without tools.
+
+    :returns: the answer text and the token usage.
+    """
+    messages = [{"role": "user", "content": [{"text": prompt}]}]
+    event = None
+    async for event in stream_messages(model, system_prompt, messages, []):
+        pass
+    _, message, usage, _ = event["stop"]
+    text = "".join(block.get("text", "") for block in message["content"])
+    return text, dict(usage)
+
+
+class _Writer:
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = path_enum.in_dir(self.path.parent, lambda: self.path.open("ab"))
+        self._reader: T.Optional[T.BinaryIO] = None
+
+    def write(self, result: BatchResult, items: list[BatchItem]) -> int:
+        """
+        :returns: the offset of the first written line.
+        """
+        # one line per input query, duplicates share the result
+        offset = self.file.tell()
+        for item in items:
+            line = BatchResult(**{**result.__dict__, "id": item.id, "prompt": item.prompt}).to_json()
+            self.file.write(line.encode("utf-8") + b"\n")
+        self.file.flush()
+        return offset
+
+    def read(self, offset: int) -> BatchResult:
+        if self._reader is None:
+            self._reader = self.path.open("rb")
+        self._reader.seek(offset)
+        return BatchResult(**json.loads(self._reader.readline()))
+
+    def close(self) -> None:
+        self.file.close()
+        if self._reader is not None:
+            self._reader.close()
+
+
+async def run_batch_async(
+    queries: T.Iterable[BatchItem],
+    output_path: T.Union[str, Path],
+    agent_factory: T.Callable[[], "Agent"],
+    needs_tools: T.Callable[[str], bool] = lambda prompt: True,
+    model: T.Optional["Model"] = None,
+    system_prompt: T.Optional[str] = None,
+    batch_size: int = 16,
+    max_workers: int = 8,
+) -> BatchReport:
+    """
+    Async version of :func:`run_batch`.
+
+    Queries are consumed lazily: reading pauses while ``batch_size`` direct
+    model calls and ``max_workers`` agent runs (plus as many queued) are in
+    flight, so memory doesn't grow with the size of the input. For the
+    distinct prompts of this run, only the offset of their result in the
+    output file is kept, a duplicate that arrives after its prompt
+    completed copies the result from there.
+    """
+    start = time.perf_counter()
+    output_path = Path(output_path)
+    report = BatchReport()
+    completed = load_completed(output_path)
+    writer = _Writer(output_path)
+
+    # key -> input items waiting for the result of a prompt in flight
+    in_flight: dict[str, list[BatchItem]] = {}
+    # key -> offset of the result of a prompt processed by this run
+    done: dict[str, int] = {}
+    resumed: set[str] = set()
+
+    def finish(result: BatchResult) -> None:
+        done[result.key] = writer.write(result, in_flight.pop(result.key))
+        if result.status == "ok":
+            report.succeeded += 1
+        else:
+            report.failed += 1
+
+    async def run_single(key: str, prompt: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            text, usage = await invoke_model_once(model, prompt, system_prompt)
+            result = BatchResult(
+                id="", key=key, prompt=prompt, path=SINGLE_CYCLE,
+                status="ok", output=text, usage=usage,
+            )  # fmt: skip
+        except Exception as e:
+            result = BatchResult(
+                id="", key=key, prompt=prompt, path=SINGLE_CYCLE,
+                status="error", error=repr(e),
+            )  # fmt: skip
+        result.duration = time.perf_counter() - t0
+        finish(result)
+
+    async def run_agent(key: str, prompt: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            agent = agent_factory()
+            agent_result = await agent.invoke_async(prompt)
+            result = BatchResult(
+                id="", key=key, prompt=prompt, path=AGENT, status="ok",
+                output=str(agent_result).strip(),
+                usage=dict(agent_result.metrics.accumulated_usage),
+            )  # fmt: skip
+        except Exception as e:
+            result = BatchResult(
+                id="", key=key, prompt=prompt, path=AGENT,
+                status="error", error=repr(e),
+            )  # fmt: skip
+        result.duration = time.perf_counter() - t0
+        finish(result)
+
+    # direct model calls: a task per prompt, at most batch_size at a time
+    semaphore = asyncio.Semaphore(batch_size)
+    single_tasks: set[asyncio.Task] = set()
+
+    async def single_task(key: str, prompt: str) -> None:
+        try:
+            await run_single(key, prompt)
+        finally:
+            semaphore.release()
+
+    # agent runs: a bounded queue consumed by max_workers workers
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_workers)
+
+    async def agent_worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await run_agent(*item)
+
+    workers = [asyncio.create_task(agent_worker()) for _ in range(max_workers)]
+    try:
+        for item in queries:
+            report.total += 1
+            key = item.key
+            if key in in_flight:
+                in_flight[key].append(item)
+                continue
+            if key in done:
+                writer.write(writer.read(done[key]), [item])
+                continue
+            if key in completed:
+                if key not in resumed:
+                    resumed.add(key)
+                    report.unique += 1
+                    report.resumed += 1
+                continue
+            report.unique += 1
+            in_flight[key] = [item]
+            if model is not None and not needs_tools(item.prompt):
+                report.single_cycle += 1
+                await semaphore.acquire()
+                task = asyncio.create_task(single_task(key, item.prompt))
+                single_tasks.add(task)
+                task.add_done_callback(single_tasks.discard)
+            else:
+                report.agent += 1
+                await queue.put((key, item.prompt))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers, *single_tasks)
+    finally:
+        for task in [*workers, *single_tasks]:
+            task.cancel()
+        writer.close()
+    report.duration = time.perf_counter() - start
+    return report
+
+
+def run_batch(
+    queries: T.Union[str, Path, T.Iterable[BatchItem]],
+    output_path: T.Union[str, Path],
+    agent_factory: T.Callable[[], "Agent"],
+    needs_tools: T.Callable[[str], bool] = lambda prompt: True,
+    model: T.Optional["Model"] = None,
+    system_prompt: T.Optional[str] = None,
+    batch_size: int = 16,
+    max_workers: int = 8,
+) -> BatchReport:
+    """
+    Process a batch of independent prompts for throughput.
+
+    Example::
+
+        report = run_batch(
+            "queries.jsonl",
+            "results.jsonl",
+            agent_factory=lambda: strands.Agent(model=model, tools=[get_weather]),
+            needs_tools=lambda prompt: "weather" in prompt.lower(),
+            model=model,
+        )
+
+    :param queries: path of a ``.jsonl`` / ``.csv`` file, or batch items.
+    :param output_path: JSONL file results are appended to. Prompts that
+        already succeeded in it are skipped, so an interrupted run can simply
+        be started again.
+    :param agent_factory: creates a fresh agent for a query that needs tools.
+        Agents are not safe to share between concurrent queries.
+    :param needs_tools: decides which path a prompt takes.
+    :param model: model for prompts that don't need tools, if not given every
+        prompt goes through an agent.
+    :param system_prompt: system prompt for prompts that don't need tools.
+    :param batch_size: number of concurrent direct model calls.
+    :param max_workers: number of concurrent agent runs.
+    """
+    if isinstance(queries, (str, Path)):
+        queries = read_queries(queries)
+    return asyncio.run(
+        run_batch_async(
+            queries=queries,
+            output_path=output_path,
+            agent_factory=agent_factory,
+            needs_tools=needs_tools,
+            model=model,
+            system_prompt=system_prompt,
+            batch_size=batch_size,
+            max_workers=max_workers,
+        )
+    )
@@ -0,0 +1,525 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cooperative cancellation and deadlines for agent runs.
+
+An ``agent(query)`` call runs every remaining cycle and tool call even after
+the user walked away or a parallel branch already answered. A
+:class:`CancelToken` is cancelled explicitly or by its deadline, and
+:func:`invoke_cancellable` propagates it into the run:
+
+- :class:`CancellableModel` stops the model stream at the next event, even
+  while it is waiting for the first token;
+- :class:`CancellationHook` cancels the tool calls that didn't start yet and
+  ends the event loop after the running ones;
+- :func:`~learn_strands_agents.http_shaping.fetch_shaped` stops downloading
+  and closes the connection;
+- tools can check :func:`current_cancel_token` themselves;
+- after ``grace`` seconds, whatever is still running is cancelled hard.
+
+The run returns a :class:`CancellableRun` with the partial messages, the text
+streamed so far and the metrics, instead of raising.
+
+Example::
+
+    token = CancelToken(timeout=20)
+    run = await invoke_cancellable(agent, "What's the weather in Seattle?", token)
+    # from another task or thread: token.cancel("user left")
+    print(run.cancelled, run.text, run.metrics.accumulated_usage)
+"""
+
+import typing as T
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+import dataclasses
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel
+from strands.models.model import Model
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+from strands.telemetry.metrics import EventLoopMetrics
+
+from .result_store import _MetricsMark, metrics_since
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.agent.agent_result import AgentResult
+    from strands.types.content import Message, Messages
+    from strands.types.streaming import StreamEvent
+    from strands.types.tools import ToolSpec
+
+logger = logging.getLogger(__name__)
+
+CANCELLED = "cancelled"
+DEADLINE_EXCEEDED = "deadline exceeded"
+
+
+class AgentCancelledError(Exception):
+    """
+    Raised inside a run when its :class:`CancelToken` is cancelled.
+    """
+
+    def __init__(self, reason: str = CANCELLED):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    """
+    A thread-safe cancellation signal with an optional deadline.
+
+    :param timeout: seconds from now until the token cancels itself.
+    :param parent: a token whose cancellation also cancels this one.
+    """
+
+    def __init__(
+        self,
+        timeout: T.Optional[float] = None,
+        parent: T.Optional["CancelToken"] = None,
+    ):
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        if parent is not None and parent.deadline is not None:
+            if self.deadline is None or parent.deadline < self.deadline:
+                self.deadline = parent.deadline
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._reason: T.Optional[str] = None
+        self._callbacks: list[T.Callable[[], None]] = []
+        self._timer: T.Optional[threading.Timer] = None
+        if parent is not None:
+            parent.on_cancel(lambda: self.cancel(parent.reason or CANCELLED))
+
+    def child(self, timeout: T.Optional[float] = None) -> "CancelToken":
+        """
+        A token for a sub task, cancelled with this one, or earlier.
+        """
+        return CancelToken(timeout=timeout, parent=self)
+
+    def remaining(self) -> T.Optional[float]:
+        """
+        Seconds until the deadline, ``None`` without deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE_EXCEEDED)
+            return True
+        return False
+
+    @property
+    def reason(self) -> T.Optional[str]:
+        return self._reason
+
+    def cancel(self, reason: str = CANCELLED) -> bool:
+        """
+        Cancel the token and run the callbacks.
+
+        :returns: ``False`` if it was already cancelled.
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:  # pragma: no cover
+                logger.exception("cancel callback failed")
+        return True
+
+    def raise_if_cancelled(self) -> None:
+        """
+        :raises AgentCancelledError: if the token is cancelled.
+        """
+        if self.cancelled:
+            raise AgentCancelledError(self._reason or CANCELLED)
+
+    def on_cancel(
+        self,
+        callback: T.Callable[[], None],
+    ) -> T.Callable[[], None]:
+        """
+        Call ``callback`` once the token is cancelled, right away if it
+        already is. A deadline fires the callbacks on a timer thread.
+
+        :returns: a function that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                if self.deadline is not None and self._timer is None:
+                    self._timer = threading.Timer(
+                        self.remaining(), self.cancel, args=(DEADLINE_EXCEEDED,)
+                    )
+                    self._timer.daemon = True
+                    self._timer.start()
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+            return lambda: None
+
+        def unregister() -> None:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+        return unregister
+
+    async def wait_async(self) -> str:
+        """
+        Wait until the token is cancelled.
+
+        :returns: the reason.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake_up() -> None:
+            def set_result() -> None:
+                if not future.done():
+                    future.set_result(None)
+
+            try:
+                loop.call_soon_threadsafe(set_result)
+            except RuntimeError:  # pragma: no cover
+                pass  # the loop is closed
+
+        unregister = self.on_cancel(wake_up)
+        try:
+            if not self.cancelled:
+                await future
+        finally:
+            unregister()
+        return self._reason or CANCELLED
+
+    def iter_checked(self, iterable: T.Iterable[T.Any]) -> T.Iterator[T.Any]:
+        """
+        Iterate, raising :class:`AgentCancelledError` once cancelled.
+        """
+        for item in iterable:
+            self.raise_if_cancelled()
+            yield item
+
+
+@dataclass
+class _RunState:
+    token: CancelToken
+    partial_text: list[str] = field(default_factory=list)
+
+
+_current_run: contextvars.ContextVar[T.Optional[_RunState]] = contextvars.ContextVar(
+    "learn_strands_agents_cancellable_run", default=None
+)
+
+
+def current_cancel_token() -> T.Optional[CancelToken]:
+    """
+    The token of the :func:`invoke_cancellable` run the caller is part of,
+    also inside of tools.
+    """
+    state = _current_run.get()
+    return state.token if state is not None else None
+
+
+class CancellableModel(Model):
+    """
+    Stop the stream of a model as soon as the current run is cancelled.
+
+    Outside of :func:`invoke_cancellable` it passes the stream through
+    unchanged.
+
+    :param model: the wrapped model.
+    """
+
+    def __init__(self, model: Model):
+        self.model = model
+
+    @property
+    def config(self) -> T.Any:
+        return getattr(self.model, "config", None)
+
+    def update_config(self, **model_config: T.Any) -> None:
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> T.Any:
+        return self.model.get_config()
+
+    async def stream(
+        self,
+        messages: "Messages",
+        tool_specs: T.Optional[list["ToolSpec"]] = None,
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator["StreamEvent", None]:
+        state = _current_run.get()
+        stream = self.model.stream(messages, tool_specs, system_prompt, **kwargs)
+        if state is None:
+            async for event in stream:
+                yield event
+            return
+        token = state.token
+        token.raise_if_cancelled()
+        cancelled = asyncio.ensure_future(token.wait_async())
+        try:
+            while True:
+                next_event = asyncio.ensure_future(stream.__anext__())
+                await asyncio.wait(
+                    {next_event, cancelled},
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not next_event.done():
+                    next_event.cancel()
+                    await asyncio.gather(next_event, return_exceptions=True)
+                    raise AgentCancelledError(token.reason or CANCELLED)
+                try:
+                    event = next_event.result()
+                except StopAsyncIteration:
+                    return
+                if "messageStart" in event:
+                    state.partial_text.clear()
+                delta = event.get("contentBlockDelta", {}).get("delta", {})
+                if "text" in delta:
+                    state.partial_text.append(delta["text"])
+                yield event
+        finally:
+            cancelled.cancel()
+            await stream.aclose()
+
+    async def structured_output(
+        self,
+        output_model: T.Type[BaseModel],
+        prompt: "Messages",
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[dict[str, T.Any], None]:
+        state = _current_run.get()
+        if state is not None:
+            state.token.raise_if_cancelled()
+        async for event in self.model.structured_output(
+            output_model, prompt, system_prompt, **kwargs
+        ):
+            yield event
+
+
+class CancellationHook(HookProvider):
+    """
+    Cancel the tool calls of a cancelled run that didn't start yet, and end
+    the event loop once the running ones are done, instead of asking the
+    model for another cycle.
+    """
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.cancel_tool)
+        registry.add_callback(AfterToolCallEvent, self.stop_event_loop)
+
+    def cancel_tool(self, event: BeforeToolCallEvent) -> None:
+        token = current_cancel_token()
+        if token is not None and token.cancelled:
+            event.cancel_tool = f"Tool call cancelled: {token.reason}"
+
+    def stop_event_loop(self, event: AfterToolCallEvent) -> None:
+        token = current_cancel_token()
+        if token is not None and token.cancelled:
+            event.invocation_state.setdefault("request_state", {})["stop_event_loop"] = True
+
+
+def make_cancellable(agent: "Agent") -> "Agent":
+    """
+    Wrap the model of an agent with :class:`CancellableModel` and add the
+    :class:`CancellationHook`, once. Runs that are not started with
+    :func:`invoke_cancellable` are not affected.
+    """
+    if not isinstance(agent.model, CancellableModel):
+        agent.model = CancellableModel(agent.model)
+    if not getattr(agent, "_cancellation_hook", False):
+        agent.hooks.add_hook(CancellationHook())
+        agent._cancellation_hook = True
+    return agent
+
+
+def close_conversation(
+    messages: "Messages",
+    reason: str,
+    partial_text: str = "",
+) -> None:
+    """
+    Make a conversation cancelled mid-run valid to continue: tool uses of
+    a trailing assistant message get error results, and a trailing user
+    message gets an assistant answer with the partial text, so that roles
+    keep alternating.
+    """
+    if not messages:
+        return
+    if messages[-1]["role"] == "assistant":
+        tool_uses = [
+            block["toolUse"] for block in messages[-1]["content"] if "toolUse" in block
+        ]
+        if not tool_uses:
+            return
+        messages.append(
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "toolResult": {
+                            "toolUseId": tool_use["toolUseId"],
+                            "status": "error",
+                            "content": [{"text": f"Tool call cancelled: {reason}"}],
+                        }
+                    }
+                    for tool_use in tool_uses
+                ],
+            }
+        )
+    text = partial_text or f"(cancelled: {reason})"
+    messages.append({"role": "assistant", "content": [{"text": text}]})
+
+
+@dataclass
+class CancellableRun:
+    """
+    The outcome of :func:`invoke_cancellable`.
+
+    :param result: the agent result, ``None`` if the run didn't finish.
+    :param cancelled: whether the token was cancelled during the run.
+    :param reason: why it was cancelled.
+    :param messages: the messages added to the conversation by the run.
+    :param partial_text: text of the model response that was interrupted.
+    :param metrics: the metrics of this run, including the cancelled cycles,
+        not those of earlier runs of the agent.
+    :param duration: seconds until the run returned.
+    """
+
+    result: T.Optional["AgentResult"]
+    cancelled: bool
+    reason: T.Optional[str]
+    messages: list["Message"]
+    partial_text: str
+    metrics: EventLoopMetrics
+    duration: float
+
+    @property
+    def text(self) -> str:
+        """
+        The answer, or what the model said before the run was cancelled.
+        """
+        if self.result is not None:
+            return str(self.result)
+        texts = [
+            block["text"]
+            for message in self.messages
+            if message["role"] == "assistant"
+            for block in message["content"]
+            if "text" in block
+        ]
+        if self.partial_text:
+            texts.append(self.partial_text)
+        return "\n".join(texts)
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return {
+            "cancelled": self.cancelled,
+            "reason": self.reason,
+            "text": self.text,
+            "cycle_count": self.metrics.cycle_count,
+            "usage": dict(self.metrics.accumulated_usage),
+            "duration": self.duration,
+        }
+
+
+async def invoke_cancellable(
+    agent: "Agent",
+    prompt: T.Any,
+    token: CancelToken,
+    grace: float = 1.0,
+    **kwargs: T.Any,
+) -> CancellableRun:
+    """
+    Invoke an agent until it finishes or the token is cancelled.
+
+    On cancellation the model stream stops and pending tool calls are
+    cancelled right away, running tools get ``grace`` seconds to finish
+    before the run is cancelled hard.
+
+    :param kwargs: more arguments for ``agent.invoke_async``.
+    :raises Exception: errors of the run that are not due to cancellation.
+    """
+    make_cancellable(agent)
+    n_messages = len(agent.messages)
+    mark = _MetricsMark.of(agent.event_loop_metrics)
+    state = _RunState(token)
+    start = time.perf_counter()
+
+    async def invoke() -> "AgentResult":
+        _current_run.set(state)
+        return await agent.invoke_async(prompt, **kwargs)
+
+    task = asyncio.create_task(invoke())
+    cancelled = asyncio.ensure_future(token.wait_async())
+    try:
+        await asyncio.wait({task, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            await asyncio.wait({task}, timeout=grace)
+            if not task.done():
+                task.cancel()
+                await asyncio.wait({task})
+    finally:
+        cancelled.cancel()
+    was_cancelled = token.cancelled
+    result = None
+    if not task.cancelled():
+        error = task.exception()
+        if error is None:
+            result = task.result()
+        elif not was_cancelled:
+            raise error
+    messages = agent.messages[n_messages:]
+    partial_text = "".join(state.partial_text) if result is None else ""
+    if was_cancelled:
+        close_conversation(agent.messages, token.reason, partial_text)
+    metrics = metrics_since(agent.event_loop_metrics, mark)
+    if result is not None:
+        result = dataclasses.replace(result, metrics=metrics)
+    return CancellableRun(
+        result=result,
+        cancelled=was_cancelled,
+        reason=token.reason,
+        messages=messages,
+        partial_text=partial_text,
+        metrics=metrics,
+        duration=time.perf_counter() - start,
+    )
+
+
+def run_cancellable(
+    agent: "Agent",
+    prompt: T.Any,
+    token: CancelToken,
+    grace: float = 1.0,
+    **kwargs: T.Any,
+) -> CancellableRun:
+    """
+    Sync version of :func:`invoke_cancellable`.
+    """
+    return asyncio.run(invoke_cancellable(agent, prompt, token, grace=grace, **kwargs))
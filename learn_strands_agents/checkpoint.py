@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+Stage level checkpointing for multi-agent workflows.
+
+Each stage output is persisted together with a content hash of everything
+that went into it. When a workflow is rerun, a stage whose inputs hash to a
+stored checkpoint is skipped and its output is loaded from disk, so a
+failure in the last stage doesn't force the slow earlier stages to run
+again.
+"""
+
+import typing as T
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+
+from .paths import path_enum
+
+
+def hash_inputs(
+    stage: str,
+    inputs: T.Any,
+) -> str:
+    """
+    Content hash of a stage name and its JSON serializable inputs.
+    """
+    payload = json.dumps(
+        {"stage": stage, "inputs": inputs},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Checkpoint:
+    """
+    The persisted output of a stage.
+
+    :param stage: name of the stage.
+    :param key: content hash of the stage inputs, see :func:`hash_inputs`.
+    :param output: JSON serializable output of the stage.
+    :param created_at: unix timestamp of when the stage finished.
+    :param metadata: additional information, e.g. duration and token usage.
+    """
+
+    stage: str
+    key: str
+    output: T.Any
+    created_at: float = field(default_factory=time.time)
+    metadata: dict[str, T.Any] = field(default_factory=dict)
+
+
+@dataclass
+class StageRun:
+    """
+    Result of :meth:`CheckpointStore.run`.
+
+    :param cached: whether the output was loaded from a checkpoint.
+    :param duration: seconds spent, loading a checkpoint included.
+    """
+
+    checkpoint: Checkpoint
+    cached: bool
+    duration: float
+
+    @property
+    def output(self) -> T.Any:
+        return self.checkpoint.output
+
+
+class CheckpointStore:
+    """
+    A local, file based checkpoint store.
+
+    Checkpoints are stored as ``${dir_root}/${stage}/${key}.json`` and are
+    written atomically, so a crash never leaves a half written checkpoint
+    behind.
+
+    :param dir_root: where checkpoints are stored, by default
+        ``${dir_tmp}/checkpoints``.
+    """
+
+    def __init__(
+        self,
+        dir_root: T.Optional[Path] = None,
+    ):
+        self.dir_root = Path(dir_root) if dir_root else path_enum.dir_tmp / "checkpoints"
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.dir_root / stage / f"{key}.json"
+
+    def get(
+        self,
+        stage: str,
+        inputs: T.Any,
+    ) -> T.Optional[Checkpoint]:
+        """
+        Load the checkpoint of a stage, ``None`` if the stage never ran with
+        these inputs.
+        """
+        path = self._path(stage, hash_inputs(stage, inputs))
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except ValueError:  # pragma: no cover
+            # a corrupted checkpoint is as good as a missing one
+            return None
+        return Checkpoint(**data)
+
+    def put(
+        self,
+        stage: str,
+        inputs: T.Any,
+        output: T.Any,
+        metadata: T.Optional[dict[str, T.Any]] = None,
+    ) -> Checkpoint:
+        """
+        Persist the output of a stage.
+        """
+        checkpoint = Checkpoint(
+            stage=stage,
+            key=hash_inputs(stage, inputs),
+            output=output,
+            metadata=metadata or {},
+        )
+        path = self._path(stage, checkpoint.key)
+        fd, tmp = path_enum.in_dir(
+            path.parent, lambda: tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(checkpoint), f, ensure_ascii=False, default=str)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return checkpoint
+
+    def run(
+        self,
+        stage: str,
+        inputs: T.Any,
+        func: T.Callable[[], T.Any],
+        metadata: T.Optional[T.Callable[[T.Any], dict[str, T.Any]]] = None,
+        serialize: T.Callable[[T.Any], T.Any] = lambda output: output,
+    ) -> StageRun:
+        """
+        Run a stage unless a checkpoint for the same inputs exists.
+
+        :param stage: name of the stage.
+        :param inputs: everything the stage output depends on, e.g. the
+            prompt, the system prompt and the model id.
+        :param func: computes the stage output.
+        :param metadata: extracts metadata to store from the raw output.
+        :param serialize: converts the raw output to JSON serializable data.
+        """
+        start = time.perf_counter()
+        checkpoint = self.get(stage, inputs)
+        if checkpoint is not None:
+            return StageRun(
+                checkpoint=checkpoint,
+                cached=True,
+                duration=time.perf_counter() - start,
+            )
+        raw = func()
+        duration = time.perf_counter() - start
+        meta = {"duration": duration}
+        if metadata is not None:
+            meta.update(metadata(raw))
+        checkpoint = self.put(stage, inputs, serialize(raw), meta)
+        return StageRun(checkpoint=checkpoint, cached=False, duration=duration)
+
+    def delete(
+        self,
+        stage: str,
+        inputs: T.Any,
+    ) -> bool:
+        try:
+            self._path(stage, hash_inputs(stage, inputs)).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def clear(self) -> None:
+        """
+        Delete all checkpoints, other files of ``dir_root`` are kept.
+        """
+        for path in self.dir_root.glob("*/*.json"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local geocoding of US place names.
+
+"What's the weather like in Seattle?" used to cost the model a cycle and an
+HTTP call to find the coordinates. :class:`Gazetteer` answers it from a
+gazetteer shipped with the package: one ``key, city, state, lat, lng,
+population`` line per place, sorted by the normalized key. The file is
+memory-mapped, so only the lines touched by the binary search are read, and
+prefix lookups are a binary search plus a scan. Typos fall back to a fuzzy
+match over the keys.
+
+Example::
+
+    place = get_gazetteer().resolve("Seattle")
+    place.label, place.lat, place.lng  # ('Seattle, WA', 47.6062, -122.3321)
+"""
+
+import typing as T
+import re
+import json
+import mmap
+import array
+import difflib
+import threading
+import unicodedata
+from pathlib import Path
+from dataclasses import dataclass
+
+import strands
+
+from .paths import path_enum
+
+US_STATES = {
+    "alabama": "al",
+    "alaska": "ak",
+    "arizona": "az",
+    "arkansas": "ar",
+    "california": "ca",
+    "colorado": "co",
+    "connecticut": "ct",
+    "delaware": "de",
+    "district of columbia": "dc",
+    "florida": "fl",
+    "georgia": "ga",
+    "hawaii": "hi",
+    "idaho": "id",
+    "illinois": "il",
+    "indiana": "in",
+    "iowa": "ia",
+    "kansas": "ks",
+    "kentucky": "ky",
+    "louisiana": "la",
+    "maine": "me",
+    "maryland": "md",
+    "massachusetts": "ma",
+    "michigan": "mi",
+    "minnesota": "mn",
+    "mississippi": "ms",
+    "missouri": "mo",
+    "montana": "mt",
+    "nebraska": "ne",
+    "nevada": "nv",
+    "new hampshire": "nh",
+    "new jersey": "nj",
+    "new mexico": "nm",
+    "new york": "ny",
+    "north carolina": "nc",
+    "north dakota": "nd",
+    "ohio": "oh",
+    "oklahoma": "ok",
+    "oregon": "or",
+    "pennsylvania": "pa",
+    "rhode island": "ri",
+    "south carolina": "sc",
+    "south dakota": "sd",
+    "tennessee": "tn",
+    "texas": "tx",
+    "utah": "ut",
+    "vermont": "vt",
+    "virginia": "va",
+    "washington": "wa",
+    "west virginia": "wv",
+    "wisconsin": "wi",
+    "wyoming": "wy",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# longest names first, so "west virginia" wins over "virginia"
+_STATE_SUFFIX = re.compile(
+    r" (%s)$" % "|".join(sorted(map(re.escape, US_STATES), key=len, reverse=True))
+)
+_ABBREVIATIONS = {"saint": "st", "fort": "ft", "mount": "mt"}
+
+
+def normalize_place(name: str) -> str:
+    """
+    The lookup key of a place name: lower case ASCII words, common
+    abbreviations, state names replaced by their code.
+
+    ``"Saint Louis, Missouri"`` -> ``"st louis mo"``.
+    """
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    name = _NON_ALNUM.sub(" ", name.lower()).strip()
+    name = " ".join(_ABBREVIATIONS.get(word, word) for word in name.split())
+    return _STATE_SUFFIX.sub(lambda match: " " + US_STATES[match.group(1)], name)
+
+
+@dataclass(frozen=True)
+class Place:
+    key: str
+    city: str
+    state: str
+    lat: float
+    lng: float
+    population: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.city}, {self.state}"
+
+    @property
+    def city_key(self) -> str:
+        """
+        The key without the state code.
+        """
+        return self.key[: -len(self.state) - 1]
+
+    def to_line(self) -> str:
+        return "\t".join(
+            [
+                self.key,
+                self.city,
+                self.state,
+                f"{self.lat:.4f}",
+                f"{self.lng:.4f}",
+                str(self.population),
+            ]
+        )
+
+    @classmethod
+    def from_line(cls, line: str) -> "Place":
+        key, city, state, lat, lng, population = line.split("\t")
+        return cls(
+            key=key,
+            city=city,
+            state=state,
+            lat=float(lat),
+            lng=float(lng),
+            population=int(population),
+        )
+
+    @classmethod
+    def new(
+        cls,
+        city: str,
+        state: str,
+        lat: float,
+        lng: float,
+        population: int = 0,
+    ) -> "Place":
+        return cls(
+            key=normalize_place(f"{city} {state}"),
+            city=city,
+            state=state.upper(),
+            lat=lat,
+            lng=lng,
+            population=population,
+        )
+
+
+def build_gazetteer(
+    places: T.Iterable[Place],
+    path: Path,
+) -> Path:
+    """
+    Write places in the sorted format read by :class:`Gazetteer`.
+    """
+    lines = sorted({place.key: place.to_line() for place in places}.items())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes("".join(line + "\n" for _, line in lines).encode("utf-8"))
+    return path
+
+
+class Gazetteer:
+    """
+    Sorted, memory-mapped place name index.
+
+    :param path: a file written by :func:`build_gazetteer`, by default the
+        US cities shipped with the package.
+    """
+
+    def __init__(
+        self,
+        path: T.Optional[Path] = None,
+    ):
+        self.path = Path(path) if path else path_enum.path_us_cities_tsv
+        self._mm: T.Optional[mmap.mmap] = None
+        self._offsets = array.array("Q")
+        self._keys: T.Optional[list[str]] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> mmap.mmap:
+        if self._mm is not None:
+            return self._mm
+        with self._lock:
+            if self._mm is None:
+                with self.path.open("rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                offsets = array.array("Q")
+                start, size = 0, len(mm)
+                while start < size:
+                    offsets.append(start)
+                    end = mm.find(b"\n", start)
+                    start = size if end == -1 else end + 1
+                self._offsets = offsets
+                self._mm = mm
+        return self._mm
+
+    def __len__(self) -> int:
+        self._open()
+        return len(self._offsets)
+
+    def _key(self, i: int) -> bytes:
+        mm = self._open()
+        start = self._offsets[i]
+        return mm[start : mm.find(b"\t", start)]
+
+    def _place(self, i: int) -> Place:
+        mm = self._open()
+        start = self._offsets[i]
+        end = mm.find(b"\n", start)
+        return Place.from_line(mm[start : end if end != -1 else len(mm)].decode("utf-8"))
+
+    def _bisect(self, key: bytes) -> int:
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __iter__(self) -> T.Iterator[Place]:
+        for i in range(len(self)):
+            yield self._place(i)
+
+    def prefix(
+        self,
+        query: str,
+        limit: int = 10,
+    ) -> list[Place]:
+        """
+        Places whose key starts with the normalized query, most populous
+        first.
+        """
+        key = normalize_place(query).encode("utf-8")
+        matches = []
+        for i in range(self._bisect(key), len(self)):
+            if not self._key(i).startswith(key):
+                break
+            matches.append(self._place(i))
+        matches.sort(key=lambda place: -place.population)
+        return matches[:limit]
+
+    def get(self, query: str) -> T.Optional[Place]:
+        """
+        The place with exactly this name, with or without the state. The
+        most populous one if the state is missing and the name is
+        ambiguous, e.g. Portland, OR over Portland, ME.
+        """
+        key = normalize_place(query)
+        matches = [
+            place
+            for place in self.prefix(key, limit=len(self))
+            if key in (place.key, place.city_key)
+        ]
+        return matches[0] if matches else None
+
+    def fuzzy(
+        self,
+        query: str,
+        n: int = 5,
+        cutoff: float = 0.75,
+    ) -> list[Place]:
+        """
+        The closest places by edit similarity of the name, e.g. for typos.
+        """
+        key = normalize_place(query)
+        if self._keys is None:
+            self._keys = [self._key(i).decode("utf-8") for i in range(len(self))]
+        scored = []
+        matcher = difflib.SequenceMatcher(b=key)
+        for i, candidate in enumerate(self._keys):
+            best = 0.0
+            for text in {candidate, candidate.rsplit(" ", 1)[0]}:
+                matcher.set_seq1(text)
+                if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                    best = max(best, matcher.ratio())
+            if best >= cutoff:
+                scored.append((best, i))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self._place(i) for _, i in scored[:n]]
+
+    def resolve(self, query: str) -> T.Optional[Place]:
+        """
+        The best match for a place name: exact, then the closest fuzzy match.
+        """
+        place = self.get(query)
+        if place is not None:
+            return place
+        matches = self.fuzzy(query, n=1)
+        return matches[0] if matches else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+                self._offsets = array.array("Q")
+
+
+_gazetteer: T.Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """
+    The process wide :class:`Gazetteer` of the shipped US cities.
+    """
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
+
+
+@strands.tool(
+    name="geocode",
+)
+def geocode(
+    place: str,
+) -> str:
+    """
+    Get the latitude and longitude of a US city, e.g. "Seattle" or
+    "Portland, ME". Returns the best matches as JSON.
+    """
+    gazetteer = get_gazetteer()
+    exact = gazetteer.get(place)
+    matches = [exact] if exact is not None else gazetteer.fuzzy(place, n=3)
+    if not matches:
+        return f"No US city found for {place!r}."
+    return json.dumps(
+        [{"place": p.label, "lat": p.lat, "lng": p.lng} for p in matches]
+    )
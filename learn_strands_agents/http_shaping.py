@@ -0,0 +1,531 @@
+# -*- coding: utf-8 -*-
+
+"""
+Result shaping for HTTP tools.
+
+A single ``http_request`` to ``https://aws.amazon.com/bedrock/`` put the
+whole page into a ``toolResult`` and pushed the researcher agent to 119k
+input tokens. This module bounds the size of HTTP tool output:
+
+- :func:`fetch_shaped` / the :func:`http_get` tool stream the response body,
+  convert HTML to text on the fly and stop reading once the cap is reached.
+- :class:`HttpResultShapingHook` shapes the results of the existing
+  ``strands_tools.http_request`` tool after the fact.
+
+HTML is reduced to the text of its main content (``<main>`` / ``<article>``
+if present) without scripts, styles or navigation. JSON can be narrowed down
+with a simple JSON path, e.g. ``properties.periods[*].detailedForecast`` for
+``api.weather.gov`` forecasts.
+"""
+
+import typing as T
+import re
+import json
+import codecs
+from html.parser import HTMLParser
+from dataclasses import dataclass
+
+import requests
+import strands
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    AfterToolCallEvent,
+)
+
+from .token_budget import TokenEstimator
+from .cancellation import current_cancel_token
+
+
+@dataclass
+class ShapingConfig:
+    """
+    Size limits and extraction options for HTTP tool output.
+
+    :param max_bytes: stop reading the response body after this many bytes.
+    :param max_chars: maximum characters of text returned to the model.
+    :param max_tokens: alternatively, maximum estimated tokens returned to
+        the model, converted to characters with a :class:`TokenEstimator`.
+    :param main_content: for HTML, prefer ``<main>`` / ``<article>`` text
+        and drop navigation, headers, footers and forms.
+    :param json_path: for JSON, only return the value at this path.
+    :param chunk_size: bytes read from the network at a time.
+    """
+
+    max_bytes: int = 1_000_000
+    max_chars: int = 8_000
+    max_tokens: T.Optional[int] = None
+    main_content: bool = True
+    json_path: T.Optional[str] = None
+    chunk_size: int = 16_384
+
+    @property
+    def char_limit(self) -> int:
+        if self.max_tokens is None:
+            return self.max_chars
+        chars = int(self.max_tokens * TokenEstimator().profile.chars_per_token)
+        return min(self.max_chars, chars)
+
+
+@dataclass
+class ShapedBody:
+    """
+    The shaped body of an HTTP response.
+
+    :param text: text to hand to the model.
+    :param bytes_read: bytes read from the body.
+    :param truncated: whether the body or the text was cut at a limit.
+    """
+
+    text: str
+    bytes_read: int
+    truncated: bool
+
+
+# elements whose text is never useful to the model
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "head", "iframe", "canvas"}
+# page chrome, dropped when main content extraction is on
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form", "menu"}
+MAIN_TAGS = {"main", "article"}
+BLOCK_TAGS = {
+    "p", "div", "section", "br", "li", "ul", "ol", "tr", "table",
+    "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "dd", "dt",
+    "main", "article",
+}  # fmt: skip
+VOID_TAGS = {"br", "img", "hr", "meta", "link", "input", "source", "wbr", "col", "area", "base", "embed", "track"}
+
+_WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+class HtmlTextExtractor(HTMLParser):
+    """
+    Incremental HTML to text converter.
+
+    Feed it the body chunk by chunk and check :attr:`is_full` to know when
+    to stop reading.
+
+    :param max_chars: stop collecting text after this many characters.
+    :param main_content: drop boilerplate elements and prefer the text inside
+        ``<main>`` / ``<article>``.
+    """
+
+    def __init__(
+        self,
+        max_chars: int,
+        main_content: bool = True,
+    ):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.main_content = main_content
+        self._skip_depth = 0
+        self._boilerplate_depth = 0
+        self._main_depth = 0
+        self._parts: list[str] = []
+        self._main_parts: list[str] = []
+        self._chars = 0
+        self._main_chars = 0
+        self._seen_chars = 0
+        self.truncated = False
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Whether enough text was collected to stop reading.
+        """
+        if not self.main_content:
+            return self._chars >= self.max_chars
+        if self._main_chars >= self.max_chars:
+            return True
+        # a page without main element, don't wait for one forever
+        return self._main_depth == 0 and self._seen_chars >= 4 * self.max_chars
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._append("\n")
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif self.main_content and tag in BOILERPLATE_TAGS:
+            self._boilerplate_depth += 1
+        elif tag in MAIN_TAGS:
+            self._main_depth += 1
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif self.main_content and tag in BOILERPLATE_TAGS:
+            self._boilerplate_depth = max(0, self._boilerplate_depth - 1)
+        elif tag in MAIN_TAGS:
+            self._main_depth = max(0, self._main_depth - 1)
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        if self._boilerplate_depth and not self._main_depth:
+            return
+        self._append(_WHITESPACE.sub(" ", data))
+
+    def _append(self, text: str) -> None:
+        self._seen_chars += len(text)
+        if self._chars < self.max_chars:
+            self._parts.append(text)
+            self._chars += len(text)
+        else:
+            self.truncated = True
+        if self._main_depth:
+            if self._main_chars < self.max_chars:
+                self._main_parts.append(text)
+                self._main_chars += len(text)
+            else:
+                self.truncated = True
+
+    @property
+    def text(self) -> str:
+        parts = self._main_parts if self.main_content and self._main_chars else self._parts
+        text = "".join(parts)
+        text = "\n".join(line.strip() for line in text.split("\n"))
+        text = _BLANK_LINES.sub("\n\n", text).strip()
+        if len(text) > self.max_chars:
+            self.truncated = True
+            text = text[: self.max_chars]
+        return text
+
+
+_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\*|-?\d+)\]")
+
+
+def parse_json_path(path: str) -> list[T.Union[str, int]]:
+    """
+    Parse ``a.b[0].c[*]`` style paths, a ``$`` prefix is optional.
+    """
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    tokens: list[T.Union[str, int]] = []
+    for name, index in _PATH_TOKEN.findall(path):
+        if name:
+            tokens.append(name)
+        elif index == "*":
+            tokens.append("*")
+        else:
+            tokens.append(int(index))
+    return tokens
+
+
+def json_path_select(
+    data: T.Any,
+    path: str,
+) -> T.Any:
+    """
+    Select a value from parsed JSON.
+
+    Wildcards (``*`` or ``[*]``) fan out over a list or the values of an
+    object and make the result a list. Missing keys select nothing.
+
+    :raises KeyError: when the path doesn't match anything.
+    """
+    tokens = parse_json_path(path)
+    current = [data]
+    fan_out = False
+    for token in tokens:
+        selected = []
+        for value in current:
+            if token == "*":
+                fan_out = True
+                if isinstance(value, list):
+                    selected.extend(value)
+                elif isinstance(value, dict):
+                    selected.extend(value.values())
+            elif isinstance(token, int):
+                if isinstance(value, list) and -len(value) <= token < len(value):
+                    selected.append(value[token])
+            elif isinstance(value, dict) and token in value:
+                selected.append(value[token])
+        current = selected
+    if not current:
+        raise KeyError(f"JSON path {path!r} doesn't match anything")
+    return current if fan_out else current[0]
+
+
+def _truncate(text: str, limit: int) -> tuple[str, bool]:
+    if len(text) <= limit:
+        return text, False
+    return text[:limit] + f"\n... [truncated {len(text) - limit} chars]", True
+
+
+def is_html(
+    content_type: T.Optional[str],
+    head: str,
+) -> bool:
+    if content_type and "html" in content_type.lower():
+        return True
+    head = head.lstrip()[:100].lower()
+    return head.startswith("<!doctype html") or head.startswith("<html")
+
+
+def is_json(
+    content_type: T.Optional[str],
+    head: str,
+) -> bool:
+    if content_type and "json" in content_type.lower():
+        return True
+    return head.lstrip()[:1] in ("{", "[")
+
+
+def _to_text_chunks(
+    chunks: T.Iterable[T.Union[bytes, str]],
+    config: ShapingConfig,
+    encoding: str,
+    counter: list[int],
+) -> T.Iterator[str]:
+    decoder = None
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            data = chunk.encode(encoding, errors="replace")
+        else:
+            data = chunk
+        remaining = config.max_bytes - counter[0]
+        if remaining <= 0:
+            counter[1] = 1
+            return
+        if len(data) > remaining:
+            data = data[:remaining]
+            counter[1] = 1
+        counter[0] += len(data)
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        yield decoder.decode(data)
+        if counter[1]:
+            return
+
+
+def shape_body(
+    chunks: T.Iterable[T.Union[bytes, str]],
+    content_type: T.Optional[str] = None,
+    config: T.Optional[ShapingConfig] = None,
+    encoding: str = "utf-8",
+) -> ShapedBody:
+    """
+    Shape a response body that arrives in chunks.
+
+    Reading stops as soon as the byte cap is hit, or for HTML, as soon as
+    enough text was extracted.
+    """
+    config = config or ShapingConfig()
+    limit = config.char_limit
+    # [bytes read, byte cap hit]
+    counter = [0, 0]
+    text_chunks = _to_text_chunks(chunks, config, encoding, counter)
+    first = ""
+    for first in text_chunks:
+        if first:
+            break
+    if is_html(content_type, first):
+        extractor = HtmlTextExtractor(
+            max_chars=limit,
+            main_content=config.main_content,
+        )
+        extractor.feed(first)
+        for chunk in text_chunks:
+            if extractor.is_full:
+                counter[1] = 1
+                break
+            extractor.feed(chunk)
+        extractor.close()
+        text = extractor.text
+        return ShapedBody(
+            text=text,
+            bytes_read=counter[0],
+            truncated=bool(counter[1]) or extractor.truncated,
+        )
+    raw = first + "".join(text_chunks)
+    if config.json_path and is_json(content_type, raw) and not counter[1]:
+        try:
+            data = json.loads(raw)
+            selected = json_path_select(data, config.json_path)
+            raw = json.dumps(selected, ensure_ascii=False, separators=(",", ":"))
+        except (ValueError, KeyError) as e:
+            raw = f"[json path {config.json_path!r} not applied: {e}]\n{raw}"
+    text, truncated = _truncate(raw, limit)
+    return ShapedBody(
+        text=text,
+        bytes_read=counter[0],
+        truncated=truncated or bool(counter[1]),
+    )
+
+
+def shape_text(
+    text: str,
+    content_type: T.Optional[str] = None,
+    config: T.Optional[ShapingConfig] = None,
+) -> ShapedBody:
+    """
+    Shape a body that was already read completely.
+    """
+    return shape_body([text], content_type=content_type, config=config)
+
+
+@dataclass
+class ShapedResponse:
+    """
+    A shaped HTTP response.
+    """
+
+    url: str
+    status_code: int
+    content_type: T.Optional[str]
+    body: ShapedBody
+
+    def to_text(self) -> str:
+        lines = [
+            f"Status Code: {self.status_code}",
+            f"Content-Type: {self.content_type}",
+        ]
+        if self.body.truncated:
+            lines.append(f"Note: body truncated after {self.body.bytes_read} bytes")
+        lines.append(f"Body: {self.body.text}")
+        return "\n".join(lines)
+
+
+def fetch_shaped(
+    url: str,
+    config: T.Optional[ShapingConfig] = None,
+    method: str = "GET",
+    headers: T.Optional[dict[str, str]] = None,
+    session: T.Optional[requests.Session] = None,
+    timeout: float = 30,
+    **kwargs: T.Any,
+) -> ShapedResponse:
+    """
+    Send an HTTP request and shape the body while it is being downloaded,
+    the connection is closed as soon as the limits are reached, or when
+    the :func:`~learn_strands_agents.cancellation.current_cancel_token` is
+    cancelled.
+    """
+    config = config or ShapingConfig()
+    token = current_cancel_token()
+    if token is not None:
+        token.raise_if_cancelled()
+    http = session or requests
+    response = http.request(
+        method,
+        url,
+        headers=headers,
+        stream=True,
+        timeout=timeout,
+        **kwargs,
+    )
+    # closing the response aborts a read that is blocked on the socket
+    unregister = token.on_cancel(response.close) if token is not None else None
+    try:
+        content_type = response.headers.get("Content-Type")
+        chunks = response.iter_content(chunk_size=config.chunk_size)
+        if token is not None:
+            chunks = token.iter_checked(chunks)
+        body = shape_body(
+            chunks,
+            content_type=content_type,
+            config=config,
+            encoding=response.encoding or "utf-8",
+        )
+    finally:
+        if unregister is not None:
+            unregister()
+        response.close()
+    return ShapedResponse(
+        url=url,
+        status_code=response.status_code,
+        content_type=content_type,
+        body=body,
+    )
+
+
+@strands.tool(name="http_get")
+def http_get(
+    url: str,
+    json_path: T.Optional[str] = None,
+    max_chars: int = 8_000,
+) -> str:
+    """
+    Fetch a URL with an HTTP GET request and return its content as compact text.
+
+    HTML pages are converted to the text of their main content. JSON responses
+    can be narrowed down with a path like ``properties.periods[*].name``.
+
+    Args:
+        url: The URL to fetch.
+        json_path: Optional path selecting part of a JSON response.
+        max_chars: Maximum characters of content to return.
+    """
+    config = ShapingConfig(max_chars=max_chars, json_path=json_path)
+    response = fetch_shaped(
+        url,
+        config=config,
+        headers={"User-Agent": "learn_strands_agents", "Accept": "application/geo+json, application/json, text/html"},
+    )
+    return response.to_text()
+
+
+BODY_PREFIX = "Body: "
+
+
+class HttpResultShapingHook(HookProvider):
+    """
+    Shape the result of ``http_request`` style tools after they ran.
+
+    The tool still downloads the full body, but only the shaped text is
+    stored in the conversation and resent to the model.
+
+    :param config: the default shaping config.
+    :param json_paths: JSON path per URL prefix, e.g.
+        ``{"https://api.weather.gov/gridpoints/": "properties.periods"}``.
+    :param tool_names: names of the tools whose results are shaped.
+    """
+
+    def __init__(
+        self,
+        config: T.Optional[ShapingConfig] = None,
+        json_paths: T.Optional[dict[str, str]] = None,
+        tool_names: T.Iterable[str] = ("http_request",),
+    ):
+        self.config = config or ShapingConfig()
+        self.json_paths = json_paths or {}
+        self.tool_names = set(tool_names)
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(AfterToolCallEvent, self.shape_result)
+
+    def config_for(self, url: T.Optional[str]) -> ShapingConfig:
+        if url:
+            for prefix, json_path in self.json_paths.items():
+                if url.startswith(prefix):
+                    return ShapingConfig(**{**self.config.__dict__, "json_path": json_path})
+        return self.config
+
+    def shape_result(self, event: AfterToolCallEvent) -> None:
+        if event.tool_use["name"] not in self.tool_names:
+            return
+        result = event.result
+        if result.get("status") != "success":
+            return
+        tool_input = event.tool_use.get("input") or {}
+        config = self.config_for(tool_input.get("url"))
+        content = []
+        changed = False
+        for block in result.get("content", []):
+            text = block.get("text")
+            if text is not None and text.startswith(BODY_PREFIX):
+                body = shape_text(text[len(BODY_PREFIX) :], config=config)
+                new_text = BODY_PREFIX + body.text
+                if new_text != text:
+                    changed = True
+                    block = {**block, "text": new_text}
+            content.append(block)
+        if changed:
+            event.result = {**result, "content": content}
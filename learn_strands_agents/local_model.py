@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+"""
+A deterministic, offline stand-in for :class:`strands.models.BedrockModel`.
+
+:class:`ScriptedModel` replays pre-defined assistant turns as real Strands
+stream events, so agents, hooks and tools can be exercised end to end
+without AWS credentials or network access.
+
+Like Bedrock, it honors prompt cache checkpoints: the ``cache_tools`` and
+``cache_prompt`` config and ``cachePoint`` content blocks. The prefix up to
+each checkpoint is remembered, and the usage reports ``cacheReadInputTokens``
+and ``cacheWriteInputTokens`` accordingly.
+"""
+
+import typing as T
+import copy
+import json
+import hashlib
+import itertools
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel
+from strands.models.model import Model
+from strands.types.content import Messages
+from strands.types.streaming import StreamEvent
+from strands.types.tools import ToolSpec
+
+
+@dataclass
+class ScriptedToolUse:
+    """
+    A tool call the scripted model should request.
+    """
+
+    name: str
+    input: dict[str, T.Any] = field(default_factory=dict)
+    tool_use_id: T.Optional[str] = None
+
+
+@dataclass
+class ScriptedTurn:
+    """
+    One assistant response of the :class:`ScriptedModel`.
+
+    :param text: assistant text, may include ``<thinking>`` blocks like nova does.
+    :param tool_uses: tool calls to request after the text.
+    :param stop_reason: override the stop reason, by default it is
+        ``tool_use`` if there is any tool use, otherwise ``end_turn``.
+    :param input_tokens: reported input token usage, estimated from the
+        request if not given.
+    :param output_tokens: reported output token usage, estimated from the
+        response if not given.
+    :param latency_ms: reported ``latencyMs`` metric.
+    """
+
+    text: str = ""
+    tool_uses: list[ScriptedToolUse] = field(default_factory=list)
+    stop_reason: T.Optional[str] = None
+    input_tokens: T.Optional[int] = None
+    output_tokens: T.Optional[int] = None
+    latency_ms: int = 0
+
+
+T_RESPONDER = T.Callable[
+    [Messages, T.Optional[list[ToolSpec]], T.Optional[str]],
+    ScriptedTurn,
+]
+
+
+def _count_chars(obj: T.Any) -> int:
+    if isinstance(obj, str):
+        return len(obj)
+    return len(json.dumps(obj, ensure_ascii=False, default=str))
+
+
+class ScriptedModel(Model):
+    """
+    Strands model provider that replays scripted turns.
+
+    Example::
+
+        model = ScriptedModel(
+            turns=[
+                ScriptedTurn(
+                    text="<thinking>I need the weather tool.</thinking>",
+                    tool_uses=[ScriptedToolUse("get_weather", {"input": {"lat": 1, "lng": 2}})],
+                ),
+                ScriptedTurn(text="It is 19.2 C."),
+            ],
+        )
+        agent = strands.Agent(model=model, tools=[get_weather])
+
+    :param turns: turns replayed in order, one per model call.
+    :param responder: alternatively, a function that computes the turn from
+        ``(messages, tool_specs, system_prompt)``.
+    :param model_id: the model id reported in :meth:`get_config`.
+    :param chunk_size: number of characters per streamed text and tool
+        input delta.
+    :param chars_per_token: used to estimate usage when the turn doesn't
+        define it.
+    """
+
+    def __init__(
+        self,
+        turns: T.Optional[T.Iterable[ScriptedTurn]] = None,
+        responder: T.Optional[T_RESPONDER] = None,
+        model_id: str = "local.scripted-v1",
+        chunk_size: int = 16,
+        chars_per_token: float = 4.0,
+    ):
+        if (turns is None) == (responder is None):
+            raise ValueError("exactly one of 'turns' or 'responder' must be given")
+        self._turns = iter(turns) if turns is not None else None
+        self._responder = responder
+        self.config: dict[str, T.Any] = {"model_id": model_id}
+        self.chunk_size = chunk_size
+        self.chars_per_token = chars_per_token
+        self.requests: list[dict[str, T.Any]] = []
+        self._tool_use_ids = itertools.count(1)
+        self._cached_prefixes: set[str] = set()
+
+    def update_config(self, **model_config: T.Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> dict[str, T.Any]:
+        return self.config
+
+    def _next_turn(
+        self,
+        messages: Messages,
+        tool_specs: T.Optional[list[ToolSpec]],
+        system_prompt: T.Optional[str],
+    ) -> ScriptedTurn:
+        if self._responder is not None:
+            return self._responder(messages, tool_specs, system_prompt)
+        try:
+            return next(self._turns)
+        except StopIteration:
+            raise RuntimeError("ScriptedModel ran out of scripted turns") from None
+
+    def _estimate_tokens(self, n_chars: int) -> int:
+        return max(1, int(n_chars / self.chars_per_token))
+
+    def _checkpoints(
+        self,
+        request: dict[str, T.Any],
+    ) -> list[tuple[str, int]]:
+        """
+        ``(prefix hash, prefix chars)`` per cache checkpoint of a request,
+        the prefix is in Bedrock order: tools, system prompt, messages.
+        """
+        digest = hashlib.sha256()
+        n_chars = 0
+        checkpoints = []
+
+        def add(obj: T.Any) -> None:
+            nonlocal n_chars
+            text = obj if isinstance(obj, str) else json.dumps(obj, sort_keys=True, default=str)
+            digest.update(text.encode("utf-8"))
+            n_chars += _count_chars(obj)
+
+        def checkpoint() -> None:
+            checkpoints.append((digest.copy().hexdigest(), n_chars))
+
+        if request["tool_specs"]:
+            add(request["tool_specs"])
+            if self.config.get("cache_tools"):
+                checkpoint()
+        if request["system_prompt"]:
+            add(request["system_prompt"])
+            if self.config.get("cache_prompt"):
+                checkpoint()
+        for message in request["messages"]:
+            add(message["role"])
+            for block in message["content"]:
+                if "cachePoint" in block:
+                    checkpoint()
+                else:
+                    add(block)
+        return checkpoints
+
+    def _cache_usage(
+        self,
+        request: dict[str, T.Any],
+    ) -> tuple[int, int]:
+        """
+        Characters read from and written to the simulated prompt cache.
+        """
+        checkpoints = self._checkpoints(request)
+        read = 0
+        for prefix, n_chars in checkpoints:
+            if prefix in self._cached_prefixes:
+                read = max(read, n_chars)
+        written = max((n_chars for _, n_chars in checkpoints), default=0) - read
+        self._cached_prefixes.update(prefix for prefix, _ in checkpoints)
+        return read, max(0, written)
+
+    def _usage(
+        self,
+        turn: ScriptedTurn,
+        request: dict[str, T.Any],
+    ) -> dict[str, int]:
+        if turn.input_tokens is None:
+            input_tokens = self._estimate_tokens(
+                _count_chars(request["messages"])
+                + _count_chars(request["system_prompt"] or "")
+                + _count_chars(request["tool_specs"] or [])
+            )
+        else:
+            input_tokens = turn.input_tokens
+        if turn.output_tokens is None:
+            output_tokens = self._estimate_tokens(
+                len(turn.text)
+                + sum(_count_chars(tool_use.input) for tool_use in turn.tool_uses)
+            )
+        else:
+            output_tokens = turn.output_tokens
+        usage = {
+            "inputTokens": input_tokens,
+            "outputTokens": output_tokens,
+            "totalTokens": input_tokens + output_tokens,
+        }
+        read_chars, written_chars = self._cache_usage(request)
+        if read_chars or written_chars:
+            # like Bedrock, inputTokens only counts the tokens not read
+            # from or written to the cache
+            cache_read = self._estimate_tokens(read_chars) if read_chars else 0
+            cache_write = self._estimate_tokens(written_chars) if written_chars else 0
+            usage["inputTokens"] = max(0, input_tokens - cache_read - cache_write)
+            usage["cacheReadInputTokens"] = cache_read
+            usage["cacheWriteInputTokens"] = cache_write
+        return usage
+
+    def render_events(
+        self,
+        turn: ScriptedTurn,
+        usage: dict[str, int],
+    ) -> list[StreamEvent]:
+        """
+        Convert a scripted turn into the Bedrock-style stream events that
+        :func:`strands.event_loop.streaming.process_stream` understands.
+        """
+        events: list[StreamEvent] = [{"messageStart": {"role": "assistant"}}]
+        index = 0
+        if turn.text:
+            events.append({"contentBlockStart": {"contentBlockIndex": index, "start": {}}})
+            for i in range(0, len(turn.text), self.chunk_size):
+                events.append(
+                    {
+                        "contentBlockDelta": {
+                            "contentBlockIndex": index,
+                            "delta": {"text": turn.text[i : i + self.chunk_size]},
+                        }
+                    }
+                )
+            events.append({"contentBlockStop": {"contentBlockIndex": index}})
+            index += 1
+        for tool_use in turn.tool_uses:
+            tool_use_id = tool_use.tool_use_id or f"tooluse_local_{next(self._tool_use_ids)}"
+            events.append(
+                {
+                    "contentBlockStart": {
+                        "contentBlockIndex": index,
+                        "start": {"toolUse": {"toolUseId": tool_use_id, "name": tool_use.name}},
+                    }
+                }
+            )
+            # like Bedrock, the input JSON is streamed in pieces
+            tool_input = json.dumps(tool_use.input)
+            for i in range(0, len(tool_input), self.chunk_size):
+                events.append(
+                    {
+                        "contentBlockDelta": {
+                            "contentBlockIndex": index,
+                            "delta": {
+                                "toolUse": {"input": tool_input[i : i + self.chunk_size]}
+                            },
+                        }
+                    }
+                )
+            events.append({"contentBlockStop": {"contentBlockIndex": index}})
+            index += 1
+        stop_reason = turn.stop_reason or ("tool_use" if turn.tool_uses else "end_turn")
+        events.append({"messageStop": {"stopReason": stop_reason}})
+        events.append(
+            {
+                "metadata": {
+                    "usage": usage,
+                    "metrics": {"latencyMs": turn.latency_ms},
+                }
+            }
+        )
+        return events
+
+    async def stream(
+        self,
+        messages: Messages,
+        tool_specs: T.Optional[list[ToolSpec]] = None,
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[StreamEvent, None]:
+        request = {
+            "messages": copy.deepcopy(messages),
+            "tool_specs": copy.deepcopy(tool_specs),
+            "system_prompt": system_prompt,
+        }
+        self.requests.append(request)
+        turn = self._next_turn(messages, tool_specs, system_prompt)
+        for event in self.render_events(turn, self._usage(turn, request)):
+            yield event
+
+    async def structured_output(
+        self,
+        output_model: T.Type[BaseModel],
+        prompt: Messages,
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[dict[str, T.Any], None]:
+        """
+        The scripted turn text is parsed as the JSON of ``output_model``.
+        """
+        turn = self._next_turn(prompt, None, system_prompt)
+        yield {"output": output_model.model_validate_json(turn.text)}
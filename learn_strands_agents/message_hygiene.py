@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+"""
+Message hygiene: keep dead weight out of the stored conversation history.
+
+Everything in ``agent.messages`` is resent as input tokens on every later
+turn. Nova models put their reasoning in ``<thinking>...</thinking>`` text
+and tools like ``http_request`` return whole web pages, neither of which is
+useful once the turn that produced it is over. :class:`MessageHygieneHook`
+strips or compresses them after each cycle, following
+:class:`RetentionRules`, and records how much it saved per turn.
+"""
+
+import typing as T
+import re
+import weakref
+from dataclasses import dataclass, field
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    MessageAddedEvent,
+    AfterInvocationEvent,
+)
+from strands.types.content import Message, Messages
+
+from .token_budget import TokenEstimator, get_model_id
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+
+
+THINKING_PATTERN = re.compile(r"<thinking>(.*?)</thinking>\s*", re.DOTALL)
+
+
+@dataclass
+class RetentionRules:
+    """
+    What the hygiene stage keeps in the history.
+
+    Messages of the current turn, from the latest user prompt on, are never
+    changed, so the model always sees its own reasoning and the full tool
+    results while it is still working on them.
+
+    :param keep_recent_messages: additionally leave this many of the latest
+        messages untouched.
+    :param strip_thinking: remove ``<thinking>`` blocks from assistant text.
+    :param thinking_summary_chars: when stripping thinking, keep this many
+        leading characters of it instead of removing it completely.
+    :param strip_reasoning_content: remove native ``reasoningContent`` blocks.
+    :param max_tool_result_chars: truncate tool result texts longer than this,
+        keeping the head and the tail. ``None`` disables truncation.
+    :param tool_result_head_ratio: share of ``max_tool_result_chars`` kept
+        from the head of a truncated tool result.
+    """
+
+    keep_recent_messages: int = 0
+    strip_thinking: bool = True
+    thinking_summary_chars: int = 0
+    strip_reasoning_content: bool = True
+    max_tool_result_chars: T.Optional[int] = 2_000
+    tool_result_head_ratio: float = 0.8
+
+
+@dataclass
+class TurnSavings:
+    """
+    What the hygiene stage removed during one agent invocation.
+
+    :param chars_removed: characters removed from the history.
+    :param tokens_saved: estimated input tokens saved on every later request.
+    :param thinking_blocks: number of thinking / reasoning blocks stripped.
+    :param tool_results_truncated: number of tool result texts truncated.
+    """
+
+    chars_removed: int = 0
+    tokens_saved: int = 0
+    thinking_blocks: int = 0
+    tool_results_truncated: int = 0
+
+
+@dataclass
+class HygieneStats:
+    """
+    Savings of a :class:`MessageHygieneHook`, one entry per turn.
+    """
+
+    turns: list[TurnSavings] = field(default_factory=list)
+
+    @property
+    def chars_removed(self) -> int:
+        return sum(turn.chars_removed for turn in self.turns)
+
+    @property
+    def tokens_saved(self) -> int:
+        return sum(turn.tokens_saved for turn in self.turns)
+
+
+def _current_turn_start(messages: Messages) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        message = messages[i]
+        if message["role"] == "user" and not any(
+            "toolResult" in block for block in message.get("content", [])
+        ):
+            return i
+    return 0
+
+
+class MessageHygieneHook(HookProvider):
+    """
+    Strip thinking blocks and oversized tool results from stored history.
+
+    Example::
+
+        hygiene = MessageHygieneHook(RetentionRules(max_tool_result_chars=1000))
+        agent = strands.Agent(model=model, hooks=[hygiene])
+        agent("What's the weather in Seattle?")
+        print(hygiene.stats.tokens_saved)
+
+    :param rules: the retention rules.
+    :param estimator: used to convert removed characters into saved tokens,
+        by default detected from the agent's model id.
+    """
+
+    def __init__(
+        self,
+        rules: T.Optional[RetentionRules] = None,
+        estimator: T.Optional[TokenEstimator] = None,
+    ):
+        self.rules = rules or RetentionRules()
+        self.estimator = estimator
+        self.stats = HygieneStats()
+        self._current = TurnSavings()
+        # per agent: (number of cleaned messages, id of the last cleaned one),
+        # forgotten with the agent
+        self._cursors: "weakref.WeakKeyDictionary[Agent, tuple[int, int]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(MessageAddedEvent, self.on_message_added)
+        registry.add_callback(AfterInvocationEvent, self.on_invocation_end)
+
+    def on_message_added(self, event: MessageAddedEvent) -> None:
+        self.clean(event.agent)
+
+    def on_invocation_end(self, event: AfterInvocationEvent) -> None:
+        self.clean(event.agent)
+        self.stats.turns.append(self._current)
+        self._current = TurnSavings()
+
+    def _get_estimator(self, agent: "Agent") -> TokenEstimator:
+        if self.estimator is not None:
+            return self.estimator
+        return TokenEstimator.for_model_id(get_model_id(agent.model))
+
+    def clean(self, agent: "Agent") -> TurnSavings:
+        """
+        Clean all messages that are old enough, in place of ``agent.messages``.
+
+        :returns: the savings of the current turn so far.
+        """
+        messages = agent.messages
+        end = min(
+            _current_turn_start(messages),
+            len(messages) - self.rules.keep_recent_messages,
+        )
+        start = 0
+        cursor = self._cursors.get(agent)
+        if cursor is not None:
+            n_cleaned, last_id = cursor
+            # only resume if the history was not rewritten in between,
+            # e.g. by a conversation manager
+            if 0 < n_cleaned <= len(messages) and id(messages[n_cleaned - 1]) == last_id:
+                start = n_cleaned
+        if start >= end:
+            return self._current
+        estimator = self._get_estimator(agent)
+        for i in range(start, end):
+            cleaned = self.clean_message(messages[i])
+            if cleaned is not None:
+                before = estimator.estimate_message(messages[i])
+                after = estimator.estimate_message(cleaned)
+                self._current.tokens_saved += before - after
+                # replace instead of mutating, the original dict may still be
+                # referenced by an AgentResult or a trace
+                messages[i] = cleaned
+        self._cursors[agent] = (end, id(messages[end - 1]))
+        return self._current
+
+    def _strip_thinking(self, text: str) -> str:
+        summary_chars = self.rules.thinking_summary_chars
+
+        def replace(match: re.Match) -> str:
+            self._current.thinking_blocks += 1
+            if summary_chars <= 0:
+                return ""
+            thinking = match.group(1).strip()
+            if len(thinking) > summary_chars:
+                thinking = thinking[:summary_chars].rstrip() + "..."
+            return f"<thinking>{thinking}</thinking>\n"
+
+        return THINKING_PATTERN.sub(replace, text)
+
+    def _truncate(self, text: str) -> str:
+        limit = self.rules.max_tool_result_chars
+        head = int(limit * self.rules.tool_result_head_ratio)
+        tail = limit - head
+        removed = len(text) - head - tail
+        self._current.tool_results_truncated += 1
+        return (
+            text[:head]
+            + f"\n... [{removed} chars removed] ...\n"
+            + (text[-tail:] if tail else "")
+        )
+
+    def clean_message(self, message: Message) -> T.Optional[Message]:
+        """
+        :returns: a cleaned copy of the message, or ``None`` if nothing
+            had to be changed.
+        """
+        rules = self.rules
+        changed = False
+        chars_removed = 0
+        content: list[dict[str, T.Any]] = []
+        for block in message.get("content", []):
+            if message["role"] == "assistant":
+                if (
+                    rules.strip_thinking
+                    and "text" in block
+                    and "<thinking>" in block["text"]
+                ):
+                    text = self._strip_thinking(block["text"])
+                    if text != block["text"]:
+                        changed = True
+                        chars_removed += len(block["text"]) - len(text)
+                        if text.strip():
+                            content.append({**block, "text": text})
+                        continue
+                if rules.strip_reasoning_content and "reasoningContent" in block:
+                    changed = True
+                    self._current.thinking_blocks += 1
+                    chars_removed += len(
+                        block["reasoningContent"]
+                        .get("reasoningText", {})
+                        .get("text", "")
+                    )
+                    continue
+            elif (
+                rules.max_tool_result_chars is not None
+                and "toolResult" in block
+            ):
+                tool_result = block["toolResult"]
+                sub_blocks = []
+                truncated = False
+                for sub_block in tool_result.get("content", []):
+                    text = sub_block.get("text")
+                    if text is not None and len(text) > rules.max_tool_result_chars:
+                        new_text = self._truncate(text)
+                        chars_removed += len(text) - len(new_text)
+                        sub_blocks.append({**sub_block, "text": new_text})
+                        truncated = True
+                    else:
+                        sub_blocks.append(sub_block)
+                if truncated:
+                    changed = True
+                    content.append({"toolResult": {**tool_result, "content": sub_blocks}})
+                    continue
+            content.append(block)
+        if not changed:
+            return None
+        if not content:
+            # Bedrock rejects messages without content
+            content.append({"text": "[thinking removed]"})
+        self._current.chars_removed += chars_removed
+        return {**message, "content": content}
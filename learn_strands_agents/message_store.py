@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compact storage of ``agent.messages`` for long lived sessions.
+
+A conversation history is a list of nested dicts, a few hundred bytes of
+dict and list overhead per message plus every text as its own ``str``. A
+worker holding thousands of long sessions spends most of its memory on
+that. :class:`MessageStore` is a drop-in replacement for the list:
+
+- messages are packed into slotted objects of tuples, roles, tool names and
+  statuses are interned;
+- large texts live UTF-8 encoded in a :class:`TextArena` that is shared by
+  all stores of the process and stores identical texts only once, e.g. the
+  same web page fetched by many sessions;
+- indexing returns plain dicts, so Strands, conversation managers and hooks
+  work unchanged. A message that was accessed stays unpacked ("hot") until
+  the next :meth:`MessageStore.pack`, so in place mutations are never lost.
+
+:func:`use_message_store` converts an agent and packs its history after
+every invocation.
+"""
+
+import typing as T
+import sys
+import copy
+import json
+import hashlib
+import threading
+from collections.abc import MutableSequence
+from dataclasses import dataclass
+
+from strands.hooks import HookProvider, HookRegistry, AfterInvocationEvent
+from strands.types.content import Message
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+
+
+@dataclass
+class ArenaStats:
+    """
+    :param entries: number of distinct texts stored.
+    :param bytes_used: bytes of texts still referenced.
+    :param bytes_wasted: bytes of released texts not yet compacted away.
+    """
+
+    entries: int
+    bytes_used: int
+    bytes_wasted: int
+
+
+class TextArena:
+    """
+    Reference counted, deduplicated storage of large texts in one buffer.
+
+    Texts are referred to by an integer id. Space of released texts is
+    reclaimed by :meth:`compact`, which runs automatically once more than
+    half of the buffer is wasted.
+
+    :param min_size: texts shorter than this many characters are not worth
+        storing in the arena, :class:`MessageStore` keeps them as ``str``.
+    :param compact_threshold: minimum wasted bytes before auto compaction.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 256,
+        compact_threshold: int = 1024 * 1024,
+    ):
+        self.min_size = min_size
+        self.compact_threshold = compact_threshold
+        self._data = bytearray()
+        # id -> [offset, length, refcount, digest]
+        self._entries: dict[int, list] = {}
+        self._by_digest: dict[bytes, int] = {}
+        self._next_id = 0
+        self._wasted = 0
+        self._lock = threading.Lock()
+
+    def add(self, text: str) -> int:
+        """
+        Store a text, or add a reference to an identical one.
+
+        :returns: the id of the text.
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            text_id = self._by_digest.get(digest)
+            if text_id is not None:
+                self._entries[text_id][2] += 1
+                return text_id
+            text_id = self._next_id
+            self._next_id += 1
+            self._entries[text_id] = [len(self._data), len(data), 1, digest]
+            self._by_digest[digest] = text_id
+            self._data += data
+            return text_id
+
+    def get(self, text_id: int) -> str:
+        with self._lock:
+            offset, length, _, _ = self._entries[text_id]
+            return self._data[offset : offset + length].decode("utf-8")
+
+    def release(self, text_id: int) -> None:
+        with self._lock:
+            entry = self._entries[text_id]
+            entry[2] -= 1
+            if entry[2] > 0:
+                return
+            del self._entries[text_id]
+            del self._by_digest[entry[3]]
+            self._wasted += entry[1]
+            if self._wasted > self.compact_threshold and self._wasted * 2 >= len(self._data):
+                self._compact()
+
+    def _compact(self) -> None:
+        data = bytearray()
+        for entry in sorted(self._entries.values(), key=lambda e: e[0]):
+            offset, length = entry[0], entry[1]
+            entry[0] = len(data)
+            data += self._data[offset : offset + length]
+        self._data = data
+        self._wasted = 0
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact()
+
+    def stats(self) -> ArenaStats:
+        with self._lock:
+            return ArenaStats(
+                entries=len(self._entries),
+                bytes_used=len(self._data) - self._wasted,
+                bytes_wasted=self._wasted,
+            )
+
+
+_default_arena: T.Optional[TextArena] = None
+_default_arena_lock = threading.Lock()
+
+
+def get_default_arena() -> TextArena:
+    """
+    The arena shared by all stores of the process, unless given explicitly.
+    """
+    global _default_arena
+    with _default_arena_lock:
+        if _default_arena is None:
+            _default_arena = TextArena()
+        return _default_arena
+
+
+# packed block kinds
+_TEXT = "text"
+_TOOL_USE = "toolUse"
+_TOOL_RESULT = "toolResult"
+_RAW = "raw"
+
+_TOOL_USE_KEYS = {"toolUseId", "name", "input"}
+_TOOL_RESULT_KEYS = {"toolUseId", "status", "content"}
+
+
+class _PackedMessage:
+    __slots__ = ("role", "blocks", "extra")
+
+    def __init__(self, role: str, blocks: tuple, extra: T.Optional[dict]):
+        self.role = role
+        self.blocks = blocks
+        self.extra = extra
+
+
+class _Packer:
+    """
+    Converts between message dicts and their packed form. A text is packed
+    into a ``str`` if short, otherwise into an ``int`` arena id.
+    """
+
+    def __init__(self, arena: TextArena):
+        self.arena = arena
+
+    def pack_text(self, text: str) -> T.Union[str, int]:
+        if len(text) < self.arena.min_size:
+            return text
+        return self.arena.add(text)
+
+    def unpack_text(self, ref: T.Union[str, int]) -> str:
+        if isinstance(ref, int):
+            return self.arena.get(ref)
+        return ref
+
+    def pack_block(self, block: dict[str, T.Any]) -> tuple:
+        if len(block) == 1:
+            if isinstance(block.get("text"), str):
+                return (_TEXT, self.pack_text(block["text"]))
+            tool_use = block.get("toolUse")
+            if isinstance(tool_use, dict) and set(tool_use) == _TOOL_USE_KEYS:
+                try:
+                    input_json = json.dumps(tool_use["input"], ensure_ascii=False)
+                except (TypeError, ValueError):
+                    pass
+                else:
+                    return (
+                        _TOOL_USE,
+                        tool_use["toolUseId"],
+                        sys.intern(tool_use["name"]),
+                        self.pack_text(input_json),
+                    )
+            tool_result = block.get("toolResult")
+            if isinstance(tool_result, dict) and set(tool_result) <= _TOOL_RESULT_KEYS:
+                content = tool_result.get("content", [])
+                return (
+                    _TOOL_RESULT,
+                    tool_result.get("toolUseId"),
+                    sys.intern(tool_result["status"]) if "status" in tool_result else None,
+                    tuple(self.pack_block(sub_block) for sub_block in content),
+                    "content" in tool_result,
+                )
+        # anything else, e.g. images, reasoning content or cache points
+        return (_RAW, copy.deepcopy(block))
+
+    def unpack_block(self, packed: tuple) -> dict[str, T.Any]:
+        kind = packed[0]
+        if kind == _TEXT:
+            return {"text": self.unpack_text(packed[1])}
+        if kind == _TOOL_USE:
+            return {
+                "toolUse": {
+                    "toolUseId": packed[1],
+                    "name": packed[2],
+                    "input": json.loads(self.unpack_text(packed[3])),
+                }
+            }
+        if kind == _TOOL_RESULT:
+            tool_result: dict[str, T.Any] = {}
+            if packed[1] is not None:
+                tool_result["toolUseId"] = packed[1]
+            if packed[2] is not None:
+                tool_result["status"] = packed[2]
+            if packed[4]:
+                tool_result["content"] = [self.unpack_block(sub) for sub in packed[3]]
+            return {"toolResult": tool_result}
+        return copy.deepcopy(packed[1])
+
+    def release_block(self, packed: tuple) -> None:
+        kind = packed[0]
+        if kind == _TEXT:
+            ref = packed[1]
+        elif kind == _TOOL_USE:
+            ref = packed[3]
+        elif kind == _TOOL_RESULT:
+            for sub_block in packed[3]:
+                self.release_block(sub_block)
+            return
+        else:
+            return
+        if isinstance(ref, int):
+            self.arena.release(ref)
+
+    def pack(self, message: Message) -> _PackedMessage:
+        extra = {k: v for k, v in message.items() if k not in ("role", "content")}
+        return _PackedMessage(
+            role=sys.intern(message["role"]),
+            blocks=tuple(self.pack_block(block) for block in message.get("content", [])),
+            extra=copy.deepcopy(extra) if extra else None,
+        )
+
+    def unpack(self, packed: _PackedMessage) -> Message:
+        message = {
+            "role": packed.role,
+            "content": [self.unpack_block(block) for block in packed.blocks],
+        }
+        if packed.extra:
+            message.update(copy.deepcopy(packed.extra))
+        return message
+
+    def release(self, packed: _PackedMessage) -> None:
+        for block in packed.blocks:
+            self.release_block(block)
+
+
+@dataclass
+class StoreStats:
+    """
+    :param packed: number of packed messages.
+    :param hot: number of messages currently held as plain dicts.
+    """
+
+    messages: int
+    packed: int
+    hot: int
+
+
+class MessageStore(MutableSequence):
+    """
+    A list of messages that keeps them packed while they are not in use.
+
+    Example::
+
+        store = MessageStore(agent.messages)
+        agent.messages = store
+        agent("What's the weather in Seattle?")
+        store.pack()
+
+    Indexing and iterating return plain message dicts. Those messages stay
+    unpacked until the next :meth:`pack`, so Strands can mutate them in
+    place. Use :meth:`iter_snapshot` to walk the history, e.g. for printing,
+    without unpacking it.
+
+    ``json.dumps`` doesn't accept the store, use :meth:`to_list`.
+
+    :param messages: initial messages.
+    :param arena: where large texts are stored, by default the arena shared
+        by the process.
+    """
+
+    def __init__(
+        self,
+        messages: T.Optional[T.Iterable[Message]] = None,
+        arena: T.Optional[TextArena] = None,
+    ):
+        self.arena = arena or get_default_arena()
+        self._packer = _Packer(self.arena)
+        self._items: list[T.Union[_PackedMessage, Message]] = []
+        if messages is not None:
+            self._items.extend(self._packer.pack(message) for message in messages)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _hot(self, index: int) -> Message:
+        item = self._items[index]
+        if isinstance(item, _PackedMessage):
+            message = self._packer.unpack(item)
+            self._packer.release(item)
+            self._items[index] = message
+            return message
+        return item
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._hot(i) for i in range(*index.indices(len(self._items)))]
+        return self._hot(index)
+
+    def _release(self, item: T.Union[_PackedMessage, Message]) -> None:
+        if isinstance(item, _PackedMessage):
+            self._packer.release(item)
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            value = list(value)
+            for item in self._items[index]:
+                self._release(item)
+        else:
+            self._release(self._items[index])
+        self._items[index] = value
+
+    def __delitem__(self, index) -> None:
+        items = self._items[index] if isinstance(index, slice) else [self._items[index]]
+        for item in items:
+            self._release(item)
+        del self._items[index]
+
+    def insert(self, index: int, value: Message) -> None:
+        self._items.insert(index, value)
+
+    def __iter__(self) -> T.Iterator[Message]:
+        for i in range(len(self._items)):
+            yield self._hot(i)
+
+    def __add__(self, other: T.Iterable[Message]) -> list[Message]:
+        # Strands builds ``agent.messages + new_messages`` for structured output
+        return self.to_list() + list(other)
+
+    def __radd__(self, other: T.Iterable[Message]) -> list[Message]:
+        return list(other) + self.to_list()
+
+    def __eq__(self, other: T.Any) -> bool:
+        if isinstance(other, (list, MessageStore)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        stats = self.stats()
+        return f"MessageStore(messages={stats.messages}, packed={stats.packed})"
+
+    def __copy__(self) -> list[Message]:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict) -> list[Message]:
+        return self.to_list()
+
+    def __getstate__(self):
+        return {"messages": self.to_list()}
+
+    def __setstate__(self, state) -> None:
+        self.__init__(state["messages"])
+
+    def iter_snapshot(self) -> T.Iterator[Message]:
+        """
+        Iterate over copies of the messages without unpacking them in the
+        store. Changes to the copies are not stored.
+        """
+        for item in self._items:
+            if isinstance(item, _PackedMessage):
+                yield self._packer.unpack(item)
+            else:
+                yield copy.deepcopy(item)
+
+    def to_list(self) -> list[Message]:
+        """
+        A deep copy of the messages as a plain list.
+        """
+        return list(self.iter_snapshot())
+
+    def pack(
+        self,
+        keep_recent: int = 0,
+    ) -> int:
+        """
+        Pack all hot messages except the ``keep_recent`` latest ones. Only
+        call this when no one is holding on to a message dict to mutate it,
+        e.g. between invocations.
+
+        :returns: number of messages packed.
+        """
+        n_packed = 0
+        for i in range(len(self._items) - keep_recent):
+            item = self._items[i]
+            if not isinstance(item, _PackedMessage):
+                self._items[i] = self._packer.pack(item)
+                n_packed += 1
+        return n_packed
+
+    def stats(self) -> StoreStats:
+        packed = sum(1 for item in self._items if isinstance(item, _PackedMessage))
+        return StoreStats(
+            messages=len(self._items),
+            packed=packed,
+            hot=len(self._items) - packed,
+        )
+
+
+class MessageStoreHook(HookProvider):
+    """
+    Pack the agent's :class:`MessageStore` after every invocation.
+    """
+
+    def __init__(
+        self,
+        arena: T.Optional[TextArena] = None,
+        keep_recent: int = 0,
+    ):
+        self.arena = arena
+        self.keep_recent = keep_recent
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(AfterInvocationEvent, self.on_invocation_end)
+
+    def on_invocation_end(self, event: AfterInvocationEvent) -> None:
+        messages = event.agent.messages
+        if not isinstance(messages, MessageStore):
+            # the history was replaced, e.g. by a session manager
+            messages = event.agent.messages = MessageStore(messages, arena=self.arena)
+        messages.pack(self.keep_recent)
+
+
+def use_message_store(
+    agent: "Agent",
+    arena: T.Optional[TextArena] = None,
+    keep_recent: int = 0,
+) -> MessageStore:
+    """
+    Store the history of an agent in a :class:`MessageStore` that is packed
+    after every invocation.
+    """
+    store = MessageStore(agent.messages, arena=arena)
+    agent.messages = store
+    agent.hooks.add_hook(MessageStoreHook(arena=store.arena, keep_recent=keep_recent))
+    return store
@@ -1,11 +1,21 @@
 # -*- coding: utf-8 -*-
 
+import typing as T
+import os
+import time
+import shutil
+import fnmatch
+import tempfile
+import threading
+import contextlib
 from pathlib import Path
 from functools import cached_property
 
 _dir_here = Path(__file__).absolute().parent
 PACKAGE_NAME = _dir_here.name
 
+R = T.TypeVar("R")
+
 
 class PathEnum:
     """
@@ -14,7 +24,24 @@ class PathEnum:
     Provides IDE-autocomplete-friendly access to all project directories and files using
     absolute paths to eliminate current directory dependencies and ensure consistent path
     resolution across different execution contexts and DevOps workflows.
+
+    The paths are plain class attributes: they are only path arithmetic,
+    nothing touches the file system until it is used. ``dir_home`` depends
+    on the environment and is resolved on first access.
+
+    It also manages the workspace for tooling: directories are created lazily and
+    only once per process (:meth:`ensure_dir`, :meth:`in_dir`), parallel jobs get
+    their own temp directories (:meth:`mkdtemp`, :meth:`temp_dir`) instead of
+    sharing ``tmp/``, and file sets are globbed once and cached (:meth:`glob`,
+    :meth:`stat`).
     """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ensured: set[Path] = set()
+        # key -> (monotonic time, value)
+        self._cache: dict[T.Hashable, tuple[float, T.Any]] = {}
+
     @cached_property
     def dir_home(self):
         return Path.home()
@@ -25,6 +52,8 @@ class PathEnum:
     # Source Code
     dir_package = _dir_here
     path_version_py = dir_package / "_version.py"
+    dir_package_data = dir_package / "data"
+    path_us_cities_tsv = dir_package_data / "us_cities.tsv"
     path_pyproject_toml = dir_project_root / "pyproject.toml"
     path_requirements_txt = dir_project_root / "requirements.txt"
     path_authors = dir_project_root / "AUTHORS.txt"
@@ -53,6 +82,166 @@ class PathEnum:
     dir_build = dir_project_root / "build"
     dir_dist = dir_project_root / "dist"
 
+    def dirs(self) -> dict[str, Path]:
+        """
+        All ``dir_*`` paths by attribute name.
+        """
+        return {
+            name: getattr(self, name)
+            for name in dir(type(self))
+            if name.startswith("dir_") and name != "dir_home"
+        }
+
+    def missing_dirs(self) -> list[str]:
+        """
+        Names of the ``dir_*`` paths that don't exist, e.g. ``dir_int_test``
+        in a fresh checkout.
+        """
+        return [name for name, path in self.dirs().items() if not path.is_dir()]
+
+    def ensure_dir(self, path: Path) -> Path:
+        """
+        Create a directory if needed, only checked once per process.
+        """
+        if path in self._ensured:
+            return path
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._ensured.add(path)
+        return path
+
+    def in_dir(
+        self,
+        path: Path,
+        func: T.Callable[[], R],
+        errors: tuple[T.Type[BaseException], ...] = (FileNotFoundError,),
+    ) -> R:
+        """
+        Call ``func``, which creates something in the directory ``path``,
+        after :meth:`ensure_dir`. If the directory was removed since it was
+        ensured, e.g. by ``rm -rf tmp`` or a clean target, and ``func``
+        fails with one of ``errors``, the directory is created again and
+        ``func`` is retried once.
+        """
+        self.ensure_dir(path)
+        try:
+            return func()
+        except errors:
+            if path.is_dir():
+                raise
+        self.invalidate(path)
+        self.ensure_dir(path)
+        return func()
+
+    def mkdtemp(
+        self,
+        prefix: str = "job-",
+        parent: T.Optional[Path] = None,
+    ) -> Path:
+        """
+        Allocate a new, unique directory under ``parent``, by default
+        ``dir_tmp``. The directory is created atomically, concurrent jobs
+        never get the same one.
+        """
+        parent = parent or self.dir_tmp
+        return Path(self.in_dir(parent, lambda: tempfile.mkdtemp(prefix=prefix, dir=parent)))
+
+    @contextlib.contextmanager
+    def temp_dir(
+        self,
+        prefix: str = "job-",
+        parent: T.Optional[Path] = None,
+        keep: bool = False,
+    ) -> T.Iterator[Path]:
+        """
+        A directory of :meth:`mkdtemp`, removed on exit unless ``keep``.
+        """
+        path = self.mkdtemp(prefix=prefix, parent=parent)
+        try:
+            yield path
+        finally:
+            if not keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _cached(
+        self,
+        key: T.Hashable,
+        compute: T.Callable[[], T.Any],
+        max_age: T.Optional[float],
+    ) -> T.Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._cache.get(key)
+        if item is not None and (max_age is None or now - item[0] <= max_age):
+            return item[1]
+        value = compute()
+        with self._lock:
+            self._cache[key] = (now, value)
+        return value
+
+    def glob(
+        self,
+        *patterns: str,
+        root: T.Optional[Path] = None,
+        exclude: T.Iterable[str] = (),
+        max_age: T.Optional[float] = None,
+    ) -> tuple[Path, ...]:
+        """
+        The sorted files under ``root``, by default ``dir_project_root``,
+        matching any of the glob patterns and none of the ``exclude``
+        patterns, relative to ``root``. The result is cached until
+        :meth:`invalidate` or, if given, for ``max_age`` seconds.
+        """
+        root = root or self.dir_project_root
+        exclude = tuple(exclude)
+
+        def compute() -> tuple[Path, ...]:
+            paths = set()
+            for pattern in patterns:
+                for path in root.glob(pattern):
+                    relpath = path.relative_to(root).as_posix()
+                    if path.is_file() and not any(
+                        fnmatch.fnmatch(relpath, ex) for ex in exclude
+                    ):
+                        paths.add(path)
+            return tuple(sorted(paths))
+
+        return self._cached(("glob", root, patterns, exclude), compute, max_age)
+
+    def stat(
+        self,
+        path: Path,
+        max_age: T.Optional[float] = None,
+    ) -> T.Optional[os.stat_result]:
+        """
+        The cached ``os.stat`` of a path, ``None`` if it doesn't exist.
+        """
+
+        def compute() -> T.Optional[os.stat_result]:
+            try:
+                return path.stat()
+            except FileNotFoundError:
+                return None
+
+        return self._cached(("stat", path), compute, max_age)
+
+    def invalidate(
+        self,
+        path: T.Optional[Path] = None,
+    ) -> None:
+        """
+        Forget the cached glob and stat results and which directories exist,
+        or, if given, only that ``path`` and its subdirectories exist.
+        """
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+                self._ensured.clear()
+            else:
+                self._ensured = {
+                    p for p in self._ensured if p != path and path not in p.parents
+                }
+
 
 path_enum = PathEnum()
 """
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+
+"""
+Speculative prefetch of dependent HTTP tool calls.
+
+Some tool chains are fixed: the weather forecaster always calls
+``https://api.weather.gov/points/{lat},{lon}`` first and then the
+``properties.forecast`` URL of that response, with a full model call in
+between. A :class:`PrefetchRule` declares such a chain, and
+:class:`PrefetchHook` starts downloading the follow-up URL in the background
+as soon as the first response arrives. When the model asks for that URL next,
+the call is answered from memory instead of the network.
+
+Example::
+
+    hook = PrefetchHook(rules=[
+        PrefetchRule(
+            name="nws_forecast",
+            url_pattern=r"https://api\\.weather\\.gov/points/",
+            link_path="properties.forecast",
+        ),
+    ])
+    agent = strands.Agent(model=model, tools=[http_request], hooks=[hook])
+
+Only ``GET`` requests are prefetched and served, a prefetched response is
+served at most once and expires after ``ttl`` seconds.
+"""
+
+import typing as T
+import re
+import json
+import time
+import asyncio
+import threading
+import collections
+import concurrent.futures
+from dataclasses import dataclass
+
+import requests
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+from strands.types.tools import AgentTool, ToolResult, ToolSpec, ToolUse
+
+from .http_shaping import BODY_PREFIX, json_path_select
+
+DEFAULT_HEADERS = {
+    "User-Agent": "learn_strands_agents",
+    "Accept": "application/geo+json, application/json;q=0.9, */*;q=0.8",
+}
+
+
+@dataclass(frozen=True)
+class PrefetchRule:
+    """
+    A follow-up request that is worth fetching ahead of time.
+
+    :param name: name of the rule.
+    :param url_pattern: regular expression matched against the start of the
+        URL of a ``GET`` request.
+    :param link_path: JSON path into the response body of that request,
+        selecting the URL(s) to prefetch.
+    """
+
+    name: str
+    url_pattern: str
+    link_path: str
+
+    def matches(self, url: str) -> bool:
+        return re.match(self.url_pattern, url) is not None
+
+    def links(self, body: T.Any) -> list[str]:
+        """
+        The follow-up URLs in a parsed response body.
+        """
+        try:
+            selected = json_path_select(body, self.link_path)
+        except KeyError:
+            return []
+        values = selected if isinstance(selected, list) else [selected]
+        return [
+            value
+            for value in values
+            if isinstance(value, str) and value.startswith(("http://", "https://"))
+        ]
+
+
+def fetch_http_result(
+    url: str,
+    headers: T.Optional[dict[str, str]] = None,
+    timeout: float = 10.0,
+) -> ToolResult:
+    """
+    ``GET`` a URL and format the response like ``strands_tools.http_request``.
+    """
+    response = requests.get(url, headers=headers or DEFAULT_HEADERS, timeout=timeout)
+    important_headers = ["Content-Type", "Content-Length", "Date", "Server"]
+    headers_text = {
+        k: v for k, v in response.headers.items() if k in important_headers
+    }
+    return {
+        "toolUseId": "",
+        "status": "success",
+        "content": [
+            {"text": f"Status Code: {response.status_code}"},
+            {"text": f"Headers: {headers_text}"},
+            {"text": f"{BODY_PREFIX}{response.text}"},
+        ],
+    }
+
+
+def result_body(result: ToolResult) -> T.Optional[str]:
+    """
+    The ``Body: ...`` block of an ``http_request`` style result.
+    """
+    for block in result.get("content", []):
+        text = block.get("text")
+        if text is not None and text.startswith(BODY_PREFIX):
+            return text[len(BODY_PREFIX) :]
+    return None
+
+
+@dataclass
+class PrefetchStats:
+    """
+    :param started: prefetches started.
+    :param hits: tool calls answered from a prefetch.
+    :param failed: prefetches that raised, the real tool ran instead.
+    :param wasted: prefetches that expired or were evicted unused.
+    :param saved: seconds of fetch time taken off the critical path.
+    """
+
+    started: int = 0
+    hits: int = 0
+    failed: int = 0
+    wasted: int = 0
+    saved: float = 0.0
+
+
+@dataclass
+class _Prefetch:
+    rule: PrefetchRule
+    created_at: float
+    future: T.Optional["concurrent.futures.Future[ToolResult]"] = None
+    duration: float = 0.0
+
+
+class PrefetchHook(HookProvider):
+    """
+    Prefetch the follow-up URLs declared by :class:`PrefetchRule` s and
+    answer matching ``GET`` calls of HTTP tools from memory.
+
+    When combined with :class:`~learn_strands_agents.http_shaping.HttpResultShapingHook`,
+    register this hook after it: "after tool call" callbacks run in reverse
+    order, so this one still sees the raw JSON body. Prefetched results are
+    shaped like any other result.
+
+    :param rules: the tool chains to prefetch.
+    :param fetch: ``fetch(url) -> ToolResult``, downloads a URL in the
+        result format of the HTTP tool.
+    :param tool_names: names of the HTTP tools.
+    :param max_workers: concurrent background downloads.
+    :param ttl: seconds a prefetched response can be served.
+    :param wait_timeout: seconds to wait for a prefetch still in flight
+        before falling back to the real tool.
+    :param max_entries: prefetched responses kept, the oldest are evicted.
+    """
+
+    def __init__(
+        self,
+        rules: T.Iterable[PrefetchRule],
+        fetch: T.Callable[[str], ToolResult] = fetch_http_result,
+        tool_names: T.Iterable[str] = ("http_request",),
+        max_workers: int = 4,
+        ttl: float = 60.0,
+        wait_timeout: float = 10.0,
+        max_entries: int = 64,
+    ):
+        self.rules = list(rules)
+        self.fetch = fetch
+        self.tool_names = set(tool_names)
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.max_entries = max_entries
+        self.stats = PrefetchStats()
+        self._entries: collections.OrderedDict[str, _Prefetch] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: T.Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.serve_prefetched)
+        registry.add_callback(AfterToolCallEvent, self.schedule_prefetch)
+
+    def _get_url(self, tool_name: str, tool_input: T.Any) -> T.Optional[str]:
+        if tool_name not in self.tool_names or not isinstance(tool_input, dict):
+            return None
+        if str(tool_input.get("method", "GET")).upper() != "GET":
+            return None
+        if tool_input.get("body"):
+            return None
+        url = tool_input.get("url")
+        return url.strip() if isinstance(url, str) else None
+
+    # --- background fetch
+    def _run_fetch(self, url: str, entry: _Prefetch) -> ToolResult:
+        start = time.perf_counter()
+        try:
+            return self.fetch(url)
+        finally:
+            entry.duration = time.perf_counter() - start
+
+    def prefetch(
+        self,
+        url: str,
+        rule: PrefetchRule,
+    ) -> bool:
+        """
+        Start downloading a URL in the background.
+
+        :returns: ``False`` if it is already prefetched.
+        """
+        with self._lock:
+            self._prune()
+            if url in self._entries:
+                return False
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="PrefetchHook",
+                )
+            entry = _Prefetch(rule=rule, created_at=time.monotonic())
+            entry.future = self._executor.submit(self._run_fetch, url, entry)
+            self._entries[url] = entry
+            while len(self._entries) > self.max_entries:
+                self._discard(self._entries.popitem(last=False)[1])
+            self.stats.started += 1
+        return True
+
+    def _discard(self, entry: _Prefetch) -> None:
+        entry.future.cancel()
+        self.stats.wasted += 1
+
+    def _prune(self) -> None:
+        deadline = time.monotonic() - self.ttl
+        while self._entries:
+            url, entry = next(iter(self._entries.items()))
+            if entry.created_at >= deadline:
+                break
+            del self._entries[url]
+            self._discard(entry)
+
+    def schedule_prefetch(self, event: AfterToolCallEvent) -> None:
+        url = self._get_url(event.tool_use["name"], event.tool_use.get("input"))
+        if url is None or event.exception is not None:
+            return
+        if event.result.get("status") != "success":
+            return
+        rules = [rule for rule in self.rules if rule.matches(url)]
+        if not rules:
+            return
+        body = result_body(event.result)
+        if body is None:
+            return
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return
+        for rule in rules:
+            for link in rule.links(data):
+                self.prefetch(link, rule)
+
+    # --- serving
+    async def wait(self, entry: _Prefetch) -> T.Optional[ToolResult]:
+        """
+        Wait for a prefetch without blocking the event loop.
+
+        :returns: the prefetched result, ``None`` if it failed or did not
+            finish within ``wait_timeout``.
+        """
+        waited = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(entry.future),
+                timeout=self.wait_timeout,
+            )
+        except Exception:
+            self.stats.failed += 1
+            return None
+        waited = time.perf_counter() - waited
+        if result.get("status") != "success":
+            self.stats.failed += 1
+            return None
+        self.stats.hits += 1
+        self.stats.saved += max(0.0, entry.duration - waited)
+        return result
+
+    def serve_prefetched(self, event: BeforeToolCallEvent) -> None:
+        if event.selected_tool is None:
+            return
+        url = self._get_url(event.tool_use["name"], event.tool_use.get("input"))
+        if url is None:
+            return
+        with self._lock:
+            self._prune()
+            entry = self._entries.pop(url, None)
+        if entry is None:
+            return
+        # hook callbacks are synchronous, the wait happens in the tool
+        event.selected_tool = PrefetchedTool(self, entry, event.selected_tool)
+
+    def close(self) -> None:
+        """
+        Drop pending prefetches and stop the background threads.
+        """
+        with self._lock:
+            while self._entries:
+                self._discard(self._entries.popitem(last=False)[1])
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PrefetchedTool(AgentTool):
+    """
+    Stands in for an HTTP tool whose response is being prefetched: awaits
+    the download, and runs the real tool if it fails or takes longer than
+    ``wait_timeout``.
+
+    :param hook: the hook that started the prefetch.
+    :param entry: the prefetch.
+    :param tool: the real tool.
+    """
+
+    def __init__(
+        self,
+        hook: PrefetchHook,
+        entry: _Prefetch,
+        tool: AgentTool,
+    ):
+        super().__init__()
+        self.hook = hook
+        self.entry = entry
+        self.tool = tool
+
+    @property
+    def tool_name(self) -> str:
+        return self.tool.tool_name
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self.tool.tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return self.tool.tool_type
+
+    async def stream(
+        self,
+        tool_use: ToolUse,
+        invocation_state: dict[str, T.Any],
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[T.Any, None]:
+        result = await self.hook.wait(self.entry)
+        if result is None:
+            async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+                yield event
+            return
+        yield {**result, "toolUseId": tool_use["toolUseId"]}
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+
+"""
+A low overhead sampling profiler scoped to agent cycles and tool calls.
+
+:class:`SamplingProfiler` is a hook provider. While a sampled invocation is
+inside an event loop cycle or a tool call, a background thread takes a
+snapshot of the Python stacks of the threads doing that work every
+``interval`` seconds with ``sys._current_frames()``. Each sample is tagged
+with the span it belongs to, the id of the Strands cycle
+:class:`~strands.telemetry.metrics.Trace` or of the tool call trace, so
+Python side overhead like pydantic validation, tool decoration or callback
+printing can be attributed.
+
+Outside of sampled spans the thread sleeps, and ``sample_rate`` profiles
+only a fraction of the invocations, which makes it cheap enough to leave on
+in production. The output is in the folded stack format understood by
+``flamegraph.pl``, speedscope and most flame graph viewers.
+"""
+
+import typing as T
+import os
+import sys
+import time
+import random
+import inspect
+import threading
+import collections
+from pathlib import Path
+from dataclasses import dataclass
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeInvocationEvent,
+    AfterInvocationEvent,
+    BeforeModelCallEvent,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from types import FrameType, CodeType
+    from strands import Agent
+
+# leaf frames of threads that are blocked, not doing work
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("base_events.py", "_run_once"),
+}
+
+
+@dataclass(frozen=True)
+class _Span:
+    tag: str
+    # the thread the span started on, its event loop thread
+    thread: int
+    # code of the tool function, which may run in a worker thread
+    code: T.Optional["CodeType"] = None
+
+
+def _tool_code(tool: T.Any) -> T.Optional["CodeType"]:
+    func = getattr(tool, "_tool_func", None)
+    if func is None:
+        return None
+    return getattr(inspect.unwrap(func), "__code__", None)
+
+
+# the entry of the samples beyond ``max_stacks``
+_OTHER: tuple[str, tuple[str, ...]] = ("<other>", ())
+
+
+class SamplingProfiler(HookProvider):
+    """
+    Sample Python stacks during the cycles and tool calls of agents.
+
+    Example::
+
+        profiler = SamplingProfiler(sample_rate=0.01)
+        agent = strands.Agent(model=model, tools=[get_weather], hooks=[profiler])
+        ...
+        profiler.write_folded("agent.folded")  # flamegraph.pl agent.folded > agent.svg
+
+    Only the threads of active spans are sampled: the thread a span started
+    on, and for tool calls the threads running the tool function, e.g. the
+    worker thread of a synchronous tool. Agents called from different
+    threads are told apart, agents sharing one event loop are not: their
+    samples go to the most recently started span.
+
+    :param interval: seconds between two samples.
+    :param sample_rate: fraction of the invocations that are profiled.
+    :param max_depth: frames per stack, deeper stacks are cut at the root.
+    :param include_idle: also record threads that are blocked waiting.
+    :param max_stacks: distinct ``(span, stack)`` entries kept in
+        :attr:`samples`. Once full, the samples of new stacks are folded
+        into one ``<other>`` entry and counted in :attr:`dropped_samples`,
+        the stacks already recorded, usually the hot ones, keep counting.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        sample_rate: float = 1.0,
+        max_depth: int = 128,
+        include_idle: bool = False,
+        max_stacks: int = 10_000,
+    ):
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.max_depth = max_depth
+        self.include_idle = include_idle
+        self.max_stacks = max_stacks
+        self.samples: collections.Counter[tuple[str, tuple[str, ...]]] = collections.Counter()
+        self.n_samples = 0
+        self.dropped_samples = 0
+        self.sampled_invocations = 0
+        self.skipped_invocations = 0
+        self._sampled: set[int] = set()
+        # span key -> span, in the order the spans started
+        self._spans: dict[tuple[str, T.Any], _Span] = {}
+        # agent id -> tool use id -> tag, tool calls of the running invocation
+        self._tool_tags: dict[int, dict[str, str]] = {}
+        self._labels: dict["CodeType", str] = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._stopped = False
+        self._thread: T.Optional[threading.Thread] = None
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeInvocationEvent, self.on_invocation_start)
+        registry.add_callback(BeforeModelCallEvent, self.on_cycle)
+        registry.add_callback(BeforeToolCallEvent, self.on_tool_start)
+        registry.add_callback(AfterToolCallEvent, self.on_tool_end)
+        registry.add_callback(AfterInvocationEvent, self.on_invocation_end)
+
+    # --- spans
+    def on_invocation_start(self, event: BeforeInvocationEvent) -> None:
+        if random.random() < self.sample_rate:
+            self._sampled.add(id(event.agent))
+            self.sampled_invocations += 1
+        else:
+            self.skipped_invocations += 1
+
+    def _start_span(self, key: tuple[str, T.Any], span: _Span) -> None:
+        with self._lock:
+            self._spans.pop(key, None)
+            self._spans[key] = span
+            self._ensure_thread()
+            self._active.set()
+
+    def _end_span(self, key: tuple[str, T.Any]) -> None:
+        with self._lock:
+            self._spans.pop(key, None)
+            if not self._spans:
+                self._active.clear()
+
+    def on_cycle(self, event: BeforeModelCallEvent) -> None:
+        agent = event.agent
+        if id(agent) not in self._sampled:
+            return
+        traces = agent.event_loop_metrics.traces
+        cycle_id = traces[-1].id if traces else "unknown"
+        self._start_span(
+            ("cycle", id(agent)),
+            _Span(tag=f"cycle:{cycle_id}", thread=threading.get_ident()),
+        )
+
+    def on_tool_start(self, event: BeforeToolCallEvent) -> None:
+        if id(event.agent) not in self._sampled:
+            return
+        tool_use = event.tool_use
+        tag = f"tool:{tool_use['name']}:{tool_use['toolUseId']}"
+        with self._lock:
+            self._tool_tags.setdefault(id(event.agent), {})[tool_use["toolUseId"]] = tag
+        self._start_span(
+            ("tool", tool_use["toolUseId"]),
+            _Span(
+                tag=tag,
+                thread=threading.get_ident(),
+                code=_tool_code(event.selected_tool),
+            ),
+        )
+
+    def on_tool_end(self, event: AfterToolCallEvent) -> None:
+        self._end_span(("tool", event.tool_use["toolUseId"]))
+
+    def on_invocation_end(self, event: AfterInvocationEvent) -> None:
+        agent = event.agent
+        if id(agent) not in self._sampled:
+            return
+        self._sampled.discard(id(agent))
+        self._end_span(("cycle", id(agent)))
+        self._resolve_tool_traces(agent)
+
+    def _resolve_tool_traces(self, agent: "Agent") -> None:
+        # tool call traces are only added to their cycle after the "after
+        # tool call" event, so the samples of the tool calls are retagged
+        # with the trace ids once the invocation ended. Their raw name is
+        # "${tool_name} - ${tool_use_id}"
+        with self._lock:
+            tool_tags = self._tool_tags.pop(id(agent), {})
+        if not tool_tags:
+            return
+        retag = {}
+        for cycle in agent.event_loop_metrics.traces:
+            for child in cycle.children:
+                raw_name = child.raw_name or ""
+                if " - " not in raw_name:
+                    continue
+                tool_use_id = raw_name.rsplit(" - ", 1)[1]
+                tag = tool_tags.get(tool_use_id)
+                if tag is not None:
+                    name = tag.split(":", 2)[1]
+                    retag[tag] = f"tool:{name}:{child.id}"
+        with self._lock:
+            for tag, stack in [key for key in self.samples if key[0] in retag]:
+                n = self.samples.pop((tag, stack))
+                self.samples[(retag[tag], stack)] += n
+
+    # --- sampling
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run,
+                name="SamplingProfiler",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._active.wait()
+            if self._stopped:
+                return
+            time.sleep(self.interval)
+            self.sample()
+
+    def stop(self) -> None:
+        """
+        Stop the sampling thread, it restarts with the next sampled span.
+        """
+        self._stopped = True
+        self._active.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._active.clear()
+
+    def _label(self, frame: "FrameType") -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get("__name__", "?")
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{module}.{name}"
+        return label
+
+    def _stack(self, frame: "FrameType") -> T.Optional[tuple[str, ...]]:
+        if not self.include_idle:
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                return None
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def _span_of(
+        self,
+        frame: "FrameType",
+        codes: dict["CodeType", str],
+    ) -> T.Optional[str]:
+        while frame is not None:
+            tag = codes.get(frame.f_code)
+            if tag is not None:
+                return tag
+            frame = frame.f_back
+        return None
+
+    def sample(self) -> int:
+        """
+        Take one sample of the threads of the active spans.
+
+        :returns: the number of stacks recorded.
+        """
+        with self._lock:
+            if not self._spans:
+                return 0
+            spans = list(self._spans.values())
+        # later spans win, e.g. a tool call over its cycle
+        threads = {span.thread: span.tag for span in spans}
+        codes = {span.code: span.tag for span in spans if span.code is not None}
+        me = threading.get_ident()
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            tag = threads.get(ident)
+            if tag is None and codes:
+                tag = self._span_of(frame, codes)
+            if tag is None:
+                continue
+            stack = self._stack(frame)
+            if stack is None:
+                continue
+            stacks.append((tag, stack))
+        with self._lock:
+            for key in stacks:
+                if key not in self.samples and len(self.samples) >= self.max_stacks:
+                    key = _OTHER
+                    self.dropped_samples += 1
+                self.samples[key] += 1
+            self.n_samples += 1
+        return len(stacks)
+
+    # --- output
+    def _items(self) -> list[tuple[tuple[str, tuple[str, ...]], int]]:
+        with self._lock:
+            return list(self.samples.items())
+
+    def folded(
+        self,
+        by_span: bool = True,
+    ) -> list[str]:
+        """
+        The samples in folded stack format, one ``frame;frame;... count``
+        line per distinct stack.
+
+        :param by_span: put the span tag as the root frame, otherwise the
+            stacks of all spans are merged.
+        """
+        counts: collections.Counter[str] = collections.Counter()
+        for (tag, stack), n in self._items():
+            frames = (tag,) + stack if by_span else stack
+            counts[";".join(frame.replace(";", ":") for frame in frames)] += n
+        return [f"{stack} {n}" for stack, n in sorted(counts.items())]
+
+    def write_folded(
+        self,
+        path: T.Union[str, Path],
+        by_span: bool = True,
+    ) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(self.folded(by_span=by_span)) + "\n", encoding="utf-8")
+        return path
+
+    def top_functions(
+        self,
+        n: int = 20,
+    ) -> list[tuple[str, int]]:
+        """
+        Functions with the most samples on top of the stack.
+        """
+        counts: collections.Counter[str] = collections.Counter()
+        for (_, stack), count in self._items():
+            if stack:
+                counts[stack[-1]] += count
+        return counts.most_common(n)
+
+    def span_samples(self) -> dict[str, int]:
+        """
+        Number of recorded stacks per span tag.
+        """
+        counts: collections.Counter[str] = collections.Counter()
+        for (tag, _), n in self._items():
+            counts[tag] += n
+        return dict(counts)
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""
+Prompt cache aware request layout for Bedrock models.
+
+Every model call re-sends the system prompt, the tool specs and the whole
+conversation so far. Bedrock can cache a request prefix up to a
+``cachePoint``, later requests with the same prefix read it from the cache,
+which is cheaper and lowers the time to first token.
+
+:class:`PromptCacheHook` makes the prefix stable and marks it:
+
+- tools are sent in a deterministic order, sorted by name;
+- the model config gets ``cache_tools`` / ``cache_prompt`` checkpoints
+  after the tool specs and the system prompt;
+- a ``cachePoint`` block is added after the last message of the history
+  for the duration of each model call, the checkpoint of the previous call
+  is kept so its cached prefix is read.
+
+Checkpoints are only set on models that support prompt caching, see
+:data:`CACHE_SUPPORT`, and only once the prefix is long enough to be
+cached. :func:`cache_report` summarizes the cache read vs. write tokens
+Strands accumulates in ``accumulated_usage``.
+
+Example::
+
+    agent = strands.Agent(model=model, tools=[...], hooks=[PromptCacheHook()])
+    result = agent("...")
+    print(cache_report(result))
+"""
+
+import typing as T
+import dataclasses
+from dataclasses import dataclass
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeInvocationEvent,
+    AfterInvocationEvent,
+    BeforeModelCallEvent,
+    AfterModelCallEvent,
+)
+from strands.telemetry.metrics import EventLoopMetrics
+
+from .token_budget import TokenEstimator, get_model_id
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.agent.agent_result import AgentResult
+
+
+@dataclass(frozen=True)
+class CacheSupport:
+    """
+    Prompt caching capabilities of a model family.
+
+    :param model_id_patterns: substrings of the model id that select it.
+    :param min_tokens: minimum tokens of a prefix before it can be cached.
+    :param tools: whether a checkpoint can follow the tool specs.
+    :param max_checkpoints: maximum checkpoints per request.
+    """
+
+    model_id_patterns: tuple[str, ...]
+    min_tokens: int
+    tools: bool = True
+    max_checkpoints: int = 4
+
+
+CACHE_SUPPORT: list[CacheSupport] = [
+    CacheSupport(
+        model_id_patterns=("anthropic.claude-3-5-haiku",),
+        min_tokens=2048,
+    ),
+    CacheSupport(
+        model_id_patterns=(
+            "anthropic.claude-3-7-sonnet",
+            "anthropic.claude-sonnet-4",
+            "anthropic.claude-opus-4",
+        ),
+        min_tokens=1024,
+    ),
+    # nova caches the system prompt and messages, not the tool specs
+    CacheSupport(
+        model_id_patterns=("amazon.nova",),
+        min_tokens=1000,
+        tools=False,
+    ),
+]
+
+
+def get_cache_support(
+    model_id: T.Optional[str],
+) -> T.Optional[CacheSupport]:
+    """
+    The :class:`CacheSupport` of a model id, ``None`` if it doesn't
+    support prompt caching.
+    """
+    if model_id:
+        for support in CACHE_SUPPORT:
+            for pattern in support.model_id_patterns:
+                if pattern in model_id:
+                    return support
+    return None
+
+
+CACHE_POINT_TYPE = "default"
+
+
+class PromptCacheHook(HookProvider):
+    """
+    Lay out model requests for prompt caching and add cache checkpoints.
+
+    :param support: force the caching capabilities, by default looked up
+        from the model id with :func:`get_cache_support`.
+    :param sort_tools: send the tools sorted by name.
+    :param cache_history: add checkpoints to the conversation history, not
+        only after the system prompt and tools.
+    """
+
+    def __init__(
+        self,
+        support: T.Optional[CacheSupport] = None,
+        sort_tools: bool = True,
+        cache_history: bool = True,
+    ):
+        self.support = support
+        self.sort_tools = sort_tools
+        self.cache_history = cache_history
+        # agent id -> (message, cache point block) added for the current call
+        self._added: dict[int, list[tuple[dict, dict]]] = {}
+        # agent id -> index of the message that had the last history checkpoint
+        self._last_index: dict[int, int] = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeInvocationEvent, self.prepare)
+        registry.add_callback(BeforeModelCallEvent, self.add_checkpoints)
+        registry.add_callback(AfterModelCallEvent, self.remove_checkpoints)
+        registry.add_callback(AfterInvocationEvent, self.remove_checkpoints)
+
+    def _support(self, agent: "Agent") -> T.Optional[CacheSupport]:
+        if self.support is not None:
+            return self.support
+        return get_cache_support(get_model_id(agent.model))
+
+    def prepare(self, event: BeforeInvocationEvent) -> None:
+        """
+        Sort the tools and set the system prompt / tools checkpoints.
+        """
+        agent = event.agent
+        registry = agent.tool_registry
+        if self.sort_tools:
+            registry.registry = dict(sorted(registry.registry.items()))
+            registry.dynamic_tools = dict(sorted(registry.dynamic_tools.items()))
+        support = self._support(agent)
+        if support is None or not hasattr(agent.model, "update_config"):
+            return
+        estimator = TokenEstimator.for_model_id(get_model_id(agent.model))
+        prefix_tokens = estimator.estimate_tool_specs(registry.get_all_tool_specs())
+        config = {}
+        if support.tools and prefix_tokens >= support.min_tokens:
+            config["cache_tools"] = CACHE_POINT_TYPE
+        if agent.system_prompt:
+            prefix_tokens += estimator.estimate_text(agent.system_prompt)
+            if prefix_tokens >= support.min_tokens:
+                config["cache_prompt"] = CACHE_POINT_TYPE
+        if config:
+            agent.model.update_config(**config)
+
+    def _n_config_checkpoints(self, agent: "Agent") -> int:
+        config = agent.model.get_config() if hasattr(agent.model, "get_config") else {}
+        return sum(1 for key in ("cache_tools", "cache_prompt") if config.get(key))
+
+    def add_checkpoints(self, event: BeforeModelCallEvent) -> None:
+        """
+        Add a checkpoint after the last message, and keep the one of the
+        previous call.
+        """
+        agent = event.agent
+        self._remove(agent)
+        support = self._support(agent)
+        messages = agent.messages
+        if support is None or not self.cache_history or not messages:
+            return
+        n_free = support.max_checkpoints - self._n_config_checkpoints(agent)
+        if n_free <= 0:
+            return
+        estimator = TokenEstimator.for_model_id(get_model_id(agent.model))
+        prefix_tokens = estimator.estimate_request(
+            messages=messages,
+            system_prompt=agent.system_prompt,
+            tool_specs=agent.tool_registry.get_all_tool_specs(),
+        )
+        if prefix_tokens < support.min_tokens:
+            return
+        last = len(messages) - 1
+        indexes = [last]
+        previous = self._last_index.get(id(agent))
+        if n_free > 1 and previous is not None and previous < last:
+            indexes.insert(0, previous)
+        added = self._added[id(agent)] = []
+        for index in indexes:
+            message = messages[index]
+            block = {"cachePoint": {"type": CACHE_POINT_TYPE}}
+            message["content"].append(block)
+            added.append((message, block))
+        self._last_index[id(agent)] = last
+
+    def _remove(self, agent: "Agent") -> None:
+        for message, block in self._added.pop(id(agent), []):
+            content = message["content"]
+            for i in range(len(content) - 1, -1, -1):
+                if content[i] is block:
+                    del content[i]
+                    break
+
+    def remove_checkpoints(
+        self,
+        event: T.Union[AfterModelCallEvent, AfterInvocationEvent],
+    ) -> None:
+        """
+        Take the history checkpoints out again, they are only for the
+        request and must not end up in the stored conversation. The
+        position of the last one is remembered for the next call, also of
+        the next invocation.
+        """
+        self._remove(event.agent)
+
+
+@dataclass
+class CacheReport:
+    """
+    Prompt cache usage of an agent run.
+
+    :param input_tokens: input tokens neither read from nor written to the
+        cache.
+    :param cache_read_tokens: input tokens read from the cache.
+    :param cache_write_tokens: input tokens written to the cache.
+    """
+
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    @classmethod
+    def from_usage(cls, usage: T.Mapping[str, int]) -> "CacheReport":
+        return cls(
+            input_tokens=usage.get("inputTokens", 0),
+            cache_read_tokens=usage.get("cacheReadInputTokens", 0),
+            cache_write_tokens=usage.get("cacheWriteInputTokens", 0),
+        )
+
+    @property
+    def total_input_tokens(self) -> int:
+        return self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Fraction of all input tokens that were read from the cache.
+        """
+        total = self.total_input_tokens
+        return self.cache_read_tokens / total if total else 0.0
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return {
+            **dataclasses.asdict(self),
+            "total_input_tokens": self.total_input_tokens,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+def cache_report(
+    source: T.Union["AgentResult", EventLoopMetrics, T.Mapping[str, int]],
+) -> CacheReport:
+    """
+    Summarize the prompt cache usage of an ``AgentResult``, its
+    ``EventLoopMetrics`` or an ``accumulated_usage`` dict.
+    """
+    if isinstance(source, EventLoopMetrics):
+        return CacheReport.from_usage(source.accumulated_usage)
+    metrics = getattr(source, "metrics", None)
+    if isinstance(metrics, EventLoopMetrics):
+        return CacheReport.from_usage(metrics.accumulated_usage)
+    return CacheReport.from_usage(source)
@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+
+"""
+Client side rate limiting for Bedrock model calls.
+
+When many agents of one process share a Bedrock quota, letting each of them
+retry ``ThrottlingException`` on its own makes them hammer the endpoint and
+fail together. :class:`RateLimitScheduler` coordinates them instead, per
+model id:
+
+- token buckets for requests per minute and tokens per minute keep the
+  traffic under the known quota;
+- an AIMD concurrency limit grows slowly while calls succeed and halves on
+  every throttle;
+- after a throttle, all callers back off together for a jittered delay;
+- waiting callers are served by priority, so interactive traffic overtakes
+  batch traffic.
+
+Wrap a model with :class:`ScheduledModel` to route its calls through the
+process wide scheduler returned by :func:`get_scheduler`.
+"""
+
+import typing as T
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel
+from strands.models.model import Model
+from strands.types.content import Messages
+from strands.types.exceptions import ModelThrottledException
+from strands.types.streaming import StreamEvent
+from strands.types.tools import ToolSpec
+
+from .token_budget import TokenEstimator, get_model_id
+
+INTERACTIVE = 0
+BATCH = 10
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at ``rate_per_minute``.
+
+    :param rate_per_minute: refill rate, ``None`` means unlimited.
+    :param capacity: maximum burst, by default one minute worth of tokens.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: T.Optional[float],
+        capacity: T.Optional[float] = None,
+        clock: T.Callable[[], float] = time.monotonic,
+    ):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.clock = clock
+        self.tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        if self.rate_per_minute is not None:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self._updated) * self.rate_per_minute / 60,
+            )
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until ``amount`` tokens are available, ``0`` if they are now.
+        Requests larger than the capacity only wait for a full bucket.
+        """
+        if self.rate_per_minute is None:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing * 60 / self.rate_per_minute
+
+    def consume(self, amount: float) -> None:
+        """
+        Take tokens out of the bucket, a negative amount gives them back. The
+        bucket may go into debt, which later callers pay for by waiting.
+        """
+        if self.rate_per_minute is None:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AimdLimiter:
+    """
+    Additive increase, multiplicative decrease concurrency limit.
+
+    The limit grows by ``increase`` per ``limit`` successful calls, i.e.
+    roughly once per round of concurrent calls, and is multiplied by
+    ``decrease`` on every throttle.
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        minimum: float = 1,
+        maximum: float = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.minimum, self.limit * self.decrease)
+
+
+@dataclass
+class ModelLimits:
+    """
+    Known quota and concurrency bounds of a model id.
+
+    :param requests_per_minute: request quota, ``None`` means unlimited.
+    :param tokens_per_minute: token quota, ``None`` means unlimited.
+    """
+
+    requests_per_minute: T.Optional[float] = None
+    tokens_per_minute: T.Optional[float] = None
+    initial_concurrency: int = 4
+    min_concurrency: int = 1
+    max_concurrency: int = 64
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+    """
+
+    max_attempts: int = 6
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class ThrottlingRetriesExhaustedError(Exception):
+    """
+    Raised by :class:`ScheduledModel` when a call is still throttled after
+    ``retry.max_attempts`` attempts.
+
+    It is deliberately not a
+    :class:`~strands.types.exceptions.ModelThrottledException`: the Strands
+    event loop retries those up to 6 times on its own, which on top of the
+    scheduler's retries would multiply the attempts.
+    """
+
+
+@dataclass
+class SchedulerStats:
+    """
+    Counters of one model id.
+
+    :param wait_seconds: total time callers spent waiting for a slot.
+    """
+
+    granted: int = 0
+    throttled: int = 0
+    retries: int = 0
+    wait_seconds: float = 0.0
+
+
+@dataclass
+class Lease:
+    """
+    Permission to send one request, returned by
+    :meth:`RateLimitScheduler.acquire`.
+    """
+
+    model_id: str
+    tokens: int
+    priority: int
+    waited: float
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    loop: asyncio.AbstractEventLoop = field(compare=False)
+    future: T.Optional[asyncio.Future] = field(default=None, compare=False)
+
+    def wake(self) -> None:
+        future = self.future
+        if future is not None:
+            self.loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _ModelState:
+    def __init__(self, limits: ModelLimits, clock: T.Callable[[], float]):
+        self.limits = limits
+        self.rpm = TokenBucket(limits.requests_per_minute, clock=clock)
+        self.tpm = TokenBucket(limits.tokens_per_minute, clock=clock)
+        self.aimd = AimdLimiter(
+            initial=limits.initial_concurrency,
+            minimum=limits.min_concurrency,
+            maximum=limits.max_concurrency,
+        )
+        self.waiters: list[_Waiter] = []
+        self.backoff_until = 0.0
+        self.stats = SchedulerStats()
+
+    def wake_head(self) -> None:
+        if self.waiters:
+            self.waiters[0].wake()
+
+
+class RateLimitScheduler:
+    """
+    Grants model calls by priority, within the rate and concurrency limits
+    of each model id. Thread safe, so agents running on different threads
+    and event loops can share one scheduler.
+
+    :param limits: limits per model id.
+    :param default_limits: limits of model ids not in ``limits``.
+    :param poll_interval: how often a waiter rechecks when it hasn't been
+        woken up, a safety net only.
+    """
+
+    def __init__(
+        self,
+        limits: T.Optional[dict[str, ModelLimits]] = None,
+        default_limits: T.Optional[ModelLimits] = None,
+        poll_interval: float = 1.0,
+        clock: T.Callable[[], float] = time.monotonic,
+    ):
+        self.limits = dict(limits or {})
+        self.default_limits = default_limits or ModelLimits()
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._states: dict[str, _ModelState] = {}
+        self._seq = itertools.count()
+
+    def _state(self, model_id: str) -> _ModelState:
+        state = self._states.get(model_id)
+        if state is None:
+            limits = self.limits.get(model_id, self.default_limits)
+            state = self._states[model_id] = _ModelState(limits, self.clock)
+        return state
+
+    def set_limits(
+        self,
+        model_id: str,
+        limits: ModelLimits,
+    ) -> None:
+        """
+        Change the limits of a model id, resetting its state.
+        """
+        with self._lock:
+            self.limits[model_id] = limits
+            self._states.pop(model_id, None)
+
+    def stats(self, model_id: str) -> SchedulerStats:
+        with self._lock:
+            return self._state(model_id).stats
+
+    def concurrency_limit(self, model_id: str) -> float:
+        with self._lock:
+            return self._state(model_id).aimd.limit
+
+    def _try_grant(
+        self,
+        state: _ModelState,
+        waiter: _Waiter,
+        tokens: int,
+    ) -> T.Optional[float]:
+        """
+        :returns: ``0`` if granted, otherwise the seconds to wait, or ``None``
+            to wait until woken up.
+        """
+        if state.waiters[0] is not waiter:
+            return None
+        now = self.clock()
+        if now < state.backoff_until:
+            return state.backoff_until - now
+        if not state.aimd.has_capacity:
+            return None
+        wait = max(state.rpm.wait_time(1), state.tpm.wait_time(tokens))
+        if wait > 0:
+            return wait
+        state.rpm.consume(1)
+        state.tpm.consume(tokens)
+        state.aimd.in_flight += 1
+        heapq.heappop(state.waiters)
+        state.wake_head()
+        return 0.0
+
+    async def acquire(
+        self,
+        model_id: str,
+        tokens: int = 0,
+        priority: int = INTERACTIVE,
+    ) -> Lease:
+        """
+        Wait until a request of about ``tokens`` input tokens may be sent.
+        Every lease must be given back with :meth:`release`.
+
+        :param priority: lower is served first, see :data:`INTERACTIVE` and
+            :data:`BATCH`.
+        """
+        loop = asyncio.get_running_loop()
+        start = self.clock()
+        waiter = _Waiter(priority=priority, seq=next(self._seq), loop=loop)
+        with self._lock:
+            state = self._state(model_id)
+            heapq.heappush(state.waiters, waiter)
+        granted = False
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_grant(state, waiter, tokens)
+                    if wait == 0:
+                        granted = True
+                        waited = self.clock() - start
+                        state.stats.granted += 1
+                        state.stats.wait_seconds += waited
+                        return Lease(
+                            model_id=model_id,
+                            tokens=tokens,
+                            priority=priority,
+                            waited=waited,
+                        )
+                    waiter.future = loop.create_future()
+                try:
+                    await asyncio.wait_for(
+                        waiter.future,
+                        timeout=self.poll_interval if wait is None else wait,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if not granted:
+                # cancelled while waiting
+                with self._lock:
+                    state.waiters.remove(waiter)
+                    heapq.heapify(state.waiters)
+                    state.wake_head()
+
+    def release(
+        self,
+        lease: Lease,
+        throttled: bool = False,
+        actual_tokens: T.Optional[int] = None,
+    ) -> None:
+        """
+        Give back a lease once the request finished.
+
+        :param throttled: whether the request was throttled, this lowers the
+            concurrency limit.
+        :param actual_tokens: the tokens actually used, corrects the estimate
+            the lease was granted for.
+        """
+        with self._lock:
+            state = self._state(lease.model_id)
+            state.aimd.in_flight -= 1
+            if throttled:
+                state.aimd.on_throttle()
+                state.stats.throttled += 1
+            else:
+                state.aimd.on_success()
+            if actual_tokens is not None:
+                state.tpm.consume(actual_tokens - lease.tokens)
+            state.wake_head()
+
+    def backoff(
+        self,
+        model_id: str,
+        delay: float,
+    ) -> None:
+        """
+        Pause all callers of a model id for ``delay`` seconds.
+        """
+        with self._lock:
+            state = self._state(model_id)
+            state.backoff_until = max(state.backoff_until, self.clock() + delay)
+            state.stats.retries += 1
+            state.wake_head()
+
+
+_scheduler: T.Optional[RateLimitScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """
+    The scheduler shared by all :class:`ScheduledModel` of the process.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler()
+        return _scheduler
+
+
+class ScheduledModel(Model):
+    """
+    Route the calls of a model through a :class:`RateLimitScheduler`, and
+    retry throttled calls with a coordinated, jittered backoff.
+
+    Example::
+
+        get_scheduler().set_limits(
+            "us.amazon.nova-micro-v1:0",
+            ModelLimits(requests_per_minute=200, tokens_per_minute=200_000),
+        )
+        model = ScheduledModel(strands.models.BedrockModel(...), priority=BATCH)
+        agent = strands.Agent(model=model)
+
+    A call that is still throttled after ``retry.max_attempts`` attempts
+    raises :class:`ThrottlingRetriesExhaustedError`, which the Strands event
+    loop doesn't retry again, so there is a single layer of retries. A call
+    is never retried once it started streaming, a throttle in the middle of
+    the stream is raised as is and left to Strands.
+
+    :param model: the wrapped model.
+    :param scheduler: by default the process wide :func:`get_scheduler`.
+    :param priority: priority of all calls of this model.
+    :param retry: the retry policy.
+    :param estimator: estimates request tokens for the tokens per minute
+        bucket, by default detected from the model id.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        scheduler: T.Optional[RateLimitScheduler] = None,
+        priority: int = INTERACTIVE,
+        retry: T.Optional[RetryPolicy] = None,
+        estimator: T.Optional[TokenEstimator] = None,
+    ):
+        self.model = model
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        self.retry = retry or RetryPolicy()
+        self.model_id = get_model_id(model) or type(model).__name__
+        self.estimator = estimator or TokenEstimator.for_model_id(self.model_id)
+
+    @property
+    def config(self) -> T.Any:
+        return getattr(self.model, "config", None)
+
+    def update_config(self, **model_config: T.Any) -> None:
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> T.Any:
+        return self.model.get_config()
+
+    async def stream(
+        self,
+        messages: Messages,
+        tool_specs: T.Optional[list[ToolSpec]] = None,
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[StreamEvent, None]:
+        tokens = self.estimator.estimate_request(messages, system_prompt, tool_specs)
+        for attempt in range(self.retry.max_attempts):
+            lease = await self.scheduler.acquire(self.model_id, tokens, self.priority)
+            started = False
+            usage = None
+            try:
+                async for event in self.model.stream(
+                    messages, tool_specs, system_prompt, **kwargs
+                ):
+                    started = True
+                    if "metadata" in event:
+                        usage = event["metadata"].get("usage")
+                    yield event
+            except ModelThrottledException as e:
+                self.scheduler.release(lease, throttled=True)
+                if started:
+                    raise
+                if attempt + 1 == self.retry.max_attempts:
+                    raise ThrottlingRetriesExhaustedError(
+                        f"{self.model_id} still throttled after "
+                        f"{self.retry.max_attempts} attempts"
+                    ) from e
+                self.scheduler.backoff(self.model_id, self.retry.delay(attempt))
+                continue
+            except BaseException:
+                self.scheduler.release(lease)
+                raise
+            self.scheduler.release(
+                lease,
+                actual_tokens=usage["totalTokens"] if usage else None,
+            )
+            return
+
+    async def structured_output(
+        self,
+        output_model: T.Type[BaseModel],
+        prompt: Messages,
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[dict[str, T.Any], None]:
+        tokens = self.estimator.estimate_request(prompt, system_prompt)
+        lease = await self.scheduler.acquire(self.model_id, tokens, self.priority)
+        throttled = False
+        try:
+            async for event in self.model.structured_output(
+                output_model, prompt, system_prompt, **kwargs
+            ):
+                yield event
+        except ModelThrottledException:
+            throttled = True
+            raise
+        finally:
+            self.scheduler.release(lease, throttled=throttled)
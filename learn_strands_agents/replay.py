@@ -0,0 +1,671 @@
+# -*- coding: utf-8 -*-
+
+"""
+Record agent runs and replay them offline as regression benchmarks.
+
+The examples keep transcripts of real runs in their trailing docstrings,
+but a transcript can't be run again. :class:`Recorder` captures what a run
+needs to be re-driven: the conversation before the prompt, every model
+stream event with its timestamp and every tool call with its input, result
+and duration. :func:`replay` feeds them back to a fresh agent, the model
+events by :class:`ReplayModel` and the tool results by
+:class:`ReplayToolHook`, so the whole Strands event loop runs again,
+deterministically and without network access.
+
+By default nothing waits, the replay duration is the framework overhead
+alone. :func:`benchmark` replays recordings a few times, and
+:func:`compare_reports` shows the timing differences between two
+versions, e.g. reports dumped before and after a Strands upgrade.
+
+Example::
+
+    recorder = Recorder()
+    recorder.attach(agent)
+    agent("What's the weather like in Seattle?")
+    recorder.recordings[-1].dump("seattle.json.gz")
+
+    reports = benchmark([Recording.load("seattle.json.gz")])
+    print(format_diffs(compare_reports(baseline_reports, reports)))
+"""
+
+import typing as T
+import copy
+import gzip
+import json
+import time
+import base64
+import asyncio
+import importlib.metadata
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+
+import strands
+from pydantic import BaseModel
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeInvocationEvent,
+    AfterInvocationEvent,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+from strands.models.model import Model
+from strands.types.exceptions import EventLoopException
+from strands.types.tools import AgentTool, ToolResult, ToolSpec, ToolUse
+
+from ._version import __version__
+from .tool_cache import tool_input_key
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.types.content import ContentBlock, Message, Messages
+    from strands.types.streaming import StreamEvent
+
+
+class ReplayDivergenceError(RuntimeError):
+    """
+    The replayed run asked for a model call or tool result that is not in
+    the recording.
+    """
+
+
+def versions() -> dict[str, str]:
+    """
+    The versions of this package and of Strands, recorded with every run.
+    """
+    return {
+        "strands-agents": importlib.metadata.version("strands-agents"),
+        "learn_strands_agents": __version__,
+    }
+
+
+def _encode(obj: T.Any) -> T.Any:
+    # image and document blocks carry bytes
+    if isinstance(obj, bytes):
+        return {"__bytes__": base64.b64encode(obj).decode("ascii")}
+    if isinstance(obj, dict):
+        return {k: _encode(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_encode(v) for v in obj]
+    return obj
+
+
+def _decode(obj: T.Any) -> T.Any:
+    if isinstance(obj, dict):
+        if len(obj) == 1 and "__bytes__" in obj:
+            return base64.b64decode(obj["__bytes__"])
+        return {k: _decode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v) for v in obj]
+    return obj
+
+
+def _busy_time(intervals: T.Iterable[tuple[float, float]]) -> float:
+    """
+    Total length of the union of ``(start, duration)`` intervals, concurrent
+    tool calls count once.
+    """
+    total = 0.0
+    end = None
+    for start, duration in sorted(intervals):
+        stop = start + duration
+        if end is None or start > end:
+            total += duration
+            end = stop
+        elif stop > end:
+            total += stop - end
+            end = stop
+    return total
+
+
+@dataclass
+class ModelCall:
+    """
+    The stream of one model call.
+
+    :param events: ``(seconds since the call started, stream event)``.
+    :param start: seconds since the run started.
+    :param duration: seconds until the stream ended.
+    """
+
+    events: list[tuple[float, "StreamEvent"]]
+    start: float
+    duration: float
+
+
+@dataclass
+class ToolCall:
+    """
+    One tool call, its result is what the model got back.
+
+    :param start: seconds since the run started.
+    :param duration: seconds until the result was available.
+    """
+
+    tool_use_id: str
+    name: str
+    input: T.Any
+    result: ToolResult
+    start: float
+    duration: float
+
+
+@dataclass
+class ReplayReport:
+    """
+    Timings of a recorded or replayed run.
+
+    :param name: the name of the recording.
+    :param duration: seconds of the whole run.
+    :param model_time: seconds spent in model streams, simulated in replays.
+    :param tool_time: seconds spent in tool calls, concurrent calls count
+        once, simulated in replays.
+    :param overhead: the rest, i.e. the time spent in the framework, hooks
+        and conversation management.
+    :param matches: whether the replay ended with the recorded message.
+    """
+
+    name: str
+    duration: float
+    model_time: float
+    tool_time: float
+    overhead: float
+    cycles: int
+    matches: bool = True
+    versions: dict[str, str] = field(default_factory=versions)
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, T.Any]) -> "ReplayReport":
+        return cls(**data)
+
+
+def dump_reports(reports: T.Iterable[ReplayReport], path: T.Union[str, Path]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = [report.to_dict() for report in reports]
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+def load_reports(path: T.Union[str, Path]) -> list[ReplayReport]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [ReplayReport.from_dict(item) for item in data]
+
+
+@dataclass
+class Recording:
+    """
+    Everything needed to replay one agent invocation.
+
+    :param prompt: the content blocks of the prompt.
+    :param messages: the conversation before the prompt.
+    :param system_prompt: the system prompt of the agent.
+    :param model_calls: the model calls, in order.
+    :param tool_calls: the tool calls, in the order they finished.
+    :param final_message: the last message of the conversation.
+    :param duration: seconds of the whole run.
+    :param name: the name used in reports.
+    :param metadata: model id, versions and creation time.
+    """
+
+    prompt: list["ContentBlock"]
+    messages: "Messages" = field(default_factory=list)
+    system_prompt: T.Optional[str] = None
+    model_calls: list[ModelCall] = field(default_factory=list)
+    tool_calls: list[ToolCall] = field(default_factory=list)
+    final_message: T.Optional["Message"] = None
+    duration: float = 0.0
+    name: str = ""
+    metadata: dict[str, T.Any] = field(default_factory=dict)
+
+    def report(self) -> ReplayReport:
+        """
+        The timings of the recorded run itself.
+        """
+        model_time = sum(call.duration for call in self.model_calls)
+        tool_time = _busy_time((call.start, call.duration) for call in self.tool_calls)
+        return ReplayReport(
+            name=self.name,
+            duration=self.duration,
+            model_time=model_time,
+            tool_time=tool_time,
+            overhead=max(0.0, self.duration - model_time - tool_time),
+            cycles=len(self.model_calls),
+            versions=dict(self.metadata.get("versions", {})),
+        )
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return _encode(asdict(self))
+
+    @classmethod
+    def from_dict(cls, data: dict[str, T.Any]) -> "Recording":
+        data = _decode(data)
+        data["model_calls"] = [
+            ModelCall(
+                events=[(offset, event) for offset, event in call["events"]],
+                start=call["start"],
+                duration=call["duration"],
+            )
+            for call in data["model_calls"]
+        ]
+        data["tool_calls"] = [ToolCall(**call) for call in data["tool_calls"]]
+        return cls(**data)
+
+    def dump(self, path: T.Union[str, Path]) -> None:
+        """
+        Write compact JSON, gzip compressed if the path ends with ``.gz``.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(
+            self.to_dict(),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        if path.suffix == ".gz":
+            data = gzip.compress(data)
+        path.write_bytes(data)
+
+    @classmethod
+    def load(cls, path: T.Union[str, Path]) -> "Recording":
+        path = Path(path)
+        data = path.read_bytes()
+        if path.suffix == ".gz":
+            data = gzip.decompress(data)
+        recording = cls.from_dict(json.loads(data))
+        recording.name = recording.name or path.name.split(".")[0]
+        return recording
+
+
+class _RecordingModel(Model):
+    """
+    Pass the stream of a model through and record it to the recorder's
+    current run.
+    """
+
+    def __init__(self, model: Model, recorder: "Recorder"):
+        self.model = model
+        self.recorder = recorder
+
+    @property
+    def config(self) -> T.Any:
+        return getattr(self.model, "config", None)
+
+    def update_config(self, **model_config: T.Any) -> None:
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> T.Any:
+        return self.model.get_config()
+
+    async def stream(
+        self,
+        messages: "Messages",
+        tool_specs: T.Optional[list[ToolSpec]] = None,
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator["StreamEvent", None]:
+        recording = self.recorder.current
+        start = time.perf_counter()
+        events = []
+        try:
+            async for event in self.model.stream(messages, tool_specs, system_prompt, **kwargs):
+                events.append((round(time.perf_counter() - start, 6), copy.deepcopy(event)))
+                yield event
+        finally:
+            if recording is not None:
+                recording.model_calls.append(
+                    ModelCall(
+                        events=events,
+                        start=round(start - self.recorder.start, 6),
+                        duration=round(time.perf_counter() - start, 6),
+                    )
+                )
+
+    async def structured_output(
+        self,
+        output_model: T.Type[BaseModel],
+        prompt: "Messages",
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[dict[str, T.Any], None]:
+        async for event in self.model.structured_output(
+            output_model, prompt, system_prompt, **kwargs
+        ):
+            yield event
+
+
+class Recorder(HookProvider):
+    """
+    Record the invocations of an agent, one :class:`Recording` each.
+
+    An agent runs one invocation at a time, use one recorder per agent.
+    """
+
+    def __init__(self):
+        self.recordings: list[Recording] = []
+        self.current: T.Optional[Recording] = None
+        self.start = 0.0
+        self._tool_starts: dict[str, float] = {}
+
+    def attach(self, agent: "Agent") -> "Agent":
+        """
+        Wrap the model of the agent and add the recorder's hooks.
+        """
+        if not isinstance(agent.model, _RecordingModel):
+            agent.model = _RecordingModel(agent.model, self)
+        agent.hooks.add_hook(self)
+        return agent
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeInvocationEvent, self.on_invocation_start)
+        registry.add_callback(BeforeToolCallEvent, self.on_tool_start)
+        registry.add_callback(AfterToolCallEvent, self.on_tool_end)
+        registry.add_callback(AfterInvocationEvent, self.on_invocation_end)
+
+    def on_invocation_start(self, event: BeforeInvocationEvent) -> None:
+        agent = event.agent
+        model = agent.model.model if isinstance(agent.model, _RecordingModel) else agent.model
+        self.current = Recording(
+            prompt=[],
+            messages=copy.deepcopy(agent.messages),
+            system_prompt=agent.system_prompt,
+            metadata={
+                "model_id": (model.get_config() or {}).get("model_id"),
+                "versions": versions(),
+                "created_at": time.time(),
+            },
+        )
+        self.start = time.perf_counter()
+        self._tool_starts.clear()
+
+    def on_tool_start(self, event: BeforeToolCallEvent) -> None:
+        self._tool_starts[event.tool_use["toolUseId"]] = time.perf_counter()
+
+    def on_tool_end(self, event: AfterToolCallEvent) -> None:
+        if self.current is None:
+            return
+        tool_use = event.tool_use
+        now = time.perf_counter()
+        start = self._tool_starts.pop(tool_use["toolUseId"], now)
+        self.current.tool_calls.append(
+            ToolCall(
+                tool_use_id=tool_use["toolUseId"],
+                name=tool_use["name"],
+                input=copy.deepcopy(tool_use["input"]),
+                result=copy.deepcopy(event.result),
+                start=round(start - self.start, 6),
+                duration=round(now - start, 6),
+            )
+        )
+
+    def on_invocation_end(self, event: AfterInvocationEvent) -> None:
+        recording = self.current
+        if recording is None:
+            return
+        messages = event.agent.messages
+        n_history = len(recording.messages)
+        if len(messages) > n_history:
+            recording.prompt = copy.deepcopy(messages[n_history]["content"])
+            recording.final_message = copy.deepcopy(messages[-1])
+        recording.duration = round(time.perf_counter() - self.start, 6)
+        self.recordings.append(recording)
+        self.current = None
+
+
+class ReplayModel(Model):
+    """
+    Replay the recorded model calls, one per call, whatever the request is.
+
+    :param recording: the recording to replay.
+    :param speed: ``0`` streams without waiting, ``1`` with the recorded
+        timing, ``0.5`` twice as fast.
+    """
+
+    def __init__(self, recording: Recording, speed: float = 0.0):
+        self.recording = recording
+        self.speed = speed
+        self.config: dict[str, T.Any] = {
+            "model_id": recording.metadata.get("model_id") or "local.replay-v1"
+        }
+        self.calls = 0
+        self.simulated_time = 0.0
+
+    def update_config(self, **model_config: T.Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> dict[str, T.Any]:
+        return self.config
+
+    async def stream(
+        self,
+        messages: "Messages",
+        tool_specs: T.Optional[list[ToolSpec]] = None,
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator["StreamEvent", None]:
+        if self.calls >= len(self.recording.model_calls):
+            raise ReplayDivergenceError(
+                f"the recording has {len(self.recording.model_calls)} model calls"
+            )
+        call = self.recording.model_calls[self.calls]
+        self.calls += 1
+        elapsed = 0.0
+        for offset, event in call.events:
+            if self.speed:
+                await asyncio.sleep((offset - elapsed) * self.speed)
+            elapsed = offset
+            yield copy.deepcopy(event)
+        if self.speed:
+            await asyncio.sleep(max(0.0, call.duration - elapsed) * self.speed)
+        self.simulated_time += call.duration * self.speed
+
+    async def structured_output(
+        self,
+        output_model: T.Type[BaseModel],
+        prompt: "Messages",
+        system_prompt: T.Optional[str] = None,
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[dict[str, T.Any], None]:
+        raise ReplayDivergenceError("recordings only contain streamed model calls")
+        yield  # pragma: no cover
+
+
+class _ReplayedTool(AgentTool):
+    def __init__(self, call: ToolCall, speed: float):
+        super().__init__()
+        self.call = call
+        self.speed = speed
+
+    @property
+    def tool_name(self) -> str:
+        return self.call.name
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return {"name": self.call.name, "description": "", "inputSchema": {"json": {}}}
+
+    @property
+    def tool_type(self) -> str:
+        return "replay"
+
+    async def stream(
+        self,
+        tool_use: ToolUse,
+        invocation_state: dict[str, T.Any],
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[T.Any, None]:
+        if self.speed:
+            await asyncio.sleep(self.call.duration * self.speed)
+        yield {**copy.deepcopy(self.call.result), "toolUseId": tool_use["toolUseId"]}
+
+
+class ReplayToolHook(HookProvider):
+    """
+    Answer tool calls with the recorded results instead of running the
+    tools, matched by tool use id, or by name and input. The tools don't
+    need to be registered on the replaying agent.
+
+    :param recording: the recording to replay.
+    :param speed: see :class:`ReplayModel`.
+    """
+
+    def __init__(self, recording: Recording, speed: float = 0.0):
+        self.speed = speed
+        self.simulated: list[tuple[float, float]] = []
+        self._start = time.perf_counter()
+        self._by_id = {call.tool_use_id: call for call in recording.tool_calls}
+        self._by_input: dict[T.Hashable, list[ToolCall]] = {}
+        for call in recording.tool_calls:
+            self._by_input.setdefault(tool_input_key(call.name, call.input), []).append(call)
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.replay_tool)
+
+    def replay_tool(self, event: BeforeToolCallEvent) -> None:
+        tool_use = event.tool_use
+        call = self._by_id.pop(tool_use["toolUseId"], None)
+        key = tool_input_key(tool_use["name"], tool_use["input"])
+        calls = self._by_input.get(key, [])
+        if call is None:
+            if not calls:
+                raise ReplayDivergenceError(
+                    f"no recorded result for {tool_use['name']} {tool_use['input']!r}"
+                )
+            call = calls[0]
+            self._by_id.pop(call.tool_use_id, None)
+        if call in calls:
+            calls.remove(call)
+        self.simulated.append(
+            (time.perf_counter() - self._start, call.duration * self.speed)
+        )
+        event.selected_tool = _ReplayedTool(call, self.speed)
+
+
+def replay(
+    recording: Recording,
+    speed: float = 0.0,
+    agent_factory: T.Optional[T.Callable[[Model], "Agent"]] = None,
+) -> ReplayReport:
+    """
+    Re-drive the agent loop of a recorded run.
+
+    :param speed: see :class:`ReplayModel`.
+    :param agent_factory: creates the agent from the replay model, to
+        benchmark other hooks or agent settings; its conversation and system
+        prompt are replaced by the recorded ones. By default a plain agent.
+    """
+    model = ReplayModel(recording, speed=speed)
+    if agent_factory is None:
+        agent = strands.Agent(model=model, callback_handler=None)
+    else:
+        agent = agent_factory(model)
+    agent.messages = copy.deepcopy(recording.messages)
+    agent.system_prompt = recording.system_prompt
+    tool_hook = ReplayToolHook(recording, speed=speed)
+    agent.hooks.add_hook(tool_hook)
+    start = time.perf_counter()
+    try:
+        agent(copy.deepcopy(recording.prompt))
+    except EventLoopException as e:
+        if isinstance(e.original_exception, ReplayDivergenceError):
+            raise e.original_exception from None
+        raise
+    duration = time.perf_counter() - start
+    tool_time = _busy_time(tool_hook.simulated)
+    return ReplayReport(
+        name=recording.name,
+        duration=duration,
+        model_time=model.simulated_time,
+        tool_time=tool_time,
+        overhead=max(0.0, duration - model.simulated_time - tool_time),
+        cycles=model.calls,
+        matches=agent.messages[-1] == recording.final_message,
+    )
+
+
+def benchmark(
+    recordings: T.Iterable[Recording],
+    repeat: int = 5,
+    speed: float = 0.0,
+    agent_factory: T.Optional[T.Callable[[Model], "Agent"]] = None,
+) -> list[ReplayReport]:
+    """
+    Replay each recording ``repeat`` times, and report the run with the
+    median duration.
+    """
+    reports = []
+    for i, recording in enumerate(recordings):
+        runs = [
+            replay(recording, speed=speed, agent_factory=agent_factory)
+            for _ in range(repeat)
+        ]
+        runs.sort(key=lambda report: report.duration)
+        report = runs[len(runs) // 2]
+        report.name = recording.name or f"recording-{i}"
+        report.matches = all(run.matches for run in runs)
+        reports.append(report)
+    return reports
+
+
+@dataclass
+class TimingDiff:
+    """
+    The difference of one timing between a baseline and a current report.
+    """
+
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def delta(self) -> float:
+        return self.current - self.baseline
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+TIMING_METRICS = ("duration", "overhead", "model_time", "tool_time")
+
+
+def compare_reports(
+    baseline: T.Iterable[ReplayReport],
+    current: T.Iterable[ReplayReport],
+    metrics: T.Iterable[str] = TIMING_METRICS,
+) -> list[TimingDiff]:
+    """
+    Compare the reports of the same recordings, matched by name.
+    """
+    metrics = list(metrics)
+    current = {report.name: report for report in current}
+    diffs = []
+    for old in baseline:
+        new = current.get(old.name)
+        if new is None:
+            continue
+        for metric in metrics:
+            diffs.append(
+                TimingDiff(old.name, metric, getattr(old, metric), getattr(new, metric))
+            )
+    return diffs
+
+
+def format_diffs(diffs: T.Iterable[TimingDiff]) -> str:
+    """
+    A plain text table of timing differences, in milliseconds.
+    """
+    lines = [
+        f"{'recording':<24} {'metric':<12} {'baseline':>10} {'current':>10} {'delta':>10} {'ratio':>7}"
+    ]
+    for diff in diffs:
+        lines.append(
+            f"{diff.name:<24} {diff.metric:<12} "
+            f"{diff.baseline * 1000:>10.2f} {diff.current * 1000:>10.2f} "
+            f"{diff.delta * 1000:>+10.2f} {diff.ratio:>7.2f}"
+        )
+    return "\n".join(lines)
+
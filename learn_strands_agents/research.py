@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+
+"""
+The researcher -> analyst -> writer workflow from the research assistant
+example, with stage level checkpointing.
+
+Example::
+
+    agents = ResearchAgents.new(model=strands.models.BedrockModel(...))
+    report = run_research_workflow(
+        agents,
+        "Is Amazon Bedrock AgentCore ready for production use?",
+        store=CheckpointStore(),
+    )
+    print(report.report)
+
+If the writer fails, rerunning the same call loads the researcher and
+analyst outputs from their checkpoints instead of redoing every
+``http_request`` and the large researcher model call.
+
+With a :class:`~learn_strands_agents.research_cache.ResearchMemory`, the
+researcher shares fetched pages and findings across questions::
+
+    memory = ResearchMemory()
+    agents = ResearchAgents.new(model=model, memory=memory)
+    report = run_research_workflow(agents, user_input, memory=memory)
+
+:func:`new_research_workflow` declares the same stages as a
+:class:`~learn_strands_agents.workflow.Workflow`, with ``overlap=True`` the
+writer drafts the report while the analyst fact-checks the findings.
+"""
+
+import typing as T
+import time
+import dataclasses
+from dataclasses import dataclass, field
+
+import strands
+from strands_tools import http_request
+
+from .token_budget import get_model_id
+from .checkpoint import hash_inputs, Checkpoint, StageRun, CheckpointStore
+from .result_store import _MetricsMark, metrics_since
+from .workflow import Workflow, agent_stage
+from .research_cache import (
+    ResearchMemory,
+    ResearchMemoryHook,
+    Finding,
+    extract_urls,
+    new_research_memory_tool,
+)
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands.agent.agent_result import AgentResult
+    from strands.models.model import Model
+
+
+RESEARCHER_SYSTEM_PROMPT = (
+    "You are a Researcher Agent that gathers information from the web. "
+    "1. Determine if the input is a research query or factual claim "
+    "2. Use your research tools (http_request, retrieve) to find relevant information "
+    "3. Include source URLs and keep findings under 500 words"
+)
+ANALYST_SYSTEM_PROMPT = (
+    "You are an Analyst Agent that verifies information. "
+    "1. For factual claims: Rate accuracy from 1-5 and correct if needed "
+    "2. For research queries: Identify 3-5 key insights "
+    "3. Evaluate source reliability and keep analysis under 400 words"
+)
+RESEARCHER_MEMORY_PROMPT = (
+    " Before going to the web, check search_research_memory for earlier research, "
+    "fresh results don't need to be fetched again"
+)
+WRITER_SYSTEM_PROMPT = (
+    "You are a Writer Agent that creates clear reports. "
+    "1. For fact-checks: State whether claims are true or false "
+    "2. For research: Present key insights in a logical structure "
+    "3. Keep reports under 500 words with brief source mentions"
+)
+
+
+@dataclass
+class ResearchAgents:
+    """
+    The three agents of the research workflow.
+    """
+
+    researcher: strands.Agent
+    analyst: strands.Agent
+    writer: strands.Agent
+
+    @classmethod
+    def new(
+        cls,
+        model: "Model",
+        researcher_tools: T.Optional[list[T.Any]] = None,
+        hooks: T.Optional[list[T.Any]] = None,
+        memory: T.Optional[ResearchMemory] = None,
+    ) -> "ResearchAgents":
+        """
+        Create the agents as defined in the research assistant example.
+
+        :param model: the model shared by all agents.
+        :param researcher_tools: tools of the researcher, ``http_request`` by
+            default.
+        :param hooks: hook providers added to every agent.
+        :param memory: give the researcher the ``search_research_memory``
+            tool and remember the pages it fetches.
+        """
+        if researcher_tools is None:
+            researcher_tools = [http_request]
+        researcher_system_prompt = RESEARCHER_SYSTEM_PROMPT
+        researcher_hooks = list(hooks or [])
+        if memory is not None:
+            researcher_tools = [*researcher_tools, new_research_memory_tool(memory)]
+            researcher_hooks.append(ResearchMemoryHook(memory))
+            researcher_system_prompt += RESEARCHER_MEMORY_PROMPT
+        return cls(
+            researcher=strands.Agent(
+                model=model,
+                system_prompt=researcher_system_prompt,
+                callback_handler=None,
+                tools=researcher_tools,
+                hooks=researcher_hooks,
+            ),
+            analyst=strands.Agent(
+                model=model,
+                system_prompt=ANALYST_SYSTEM_PROMPT,
+                callback_handler=None,
+                hooks=hooks,
+            ),
+            writer=strands.Agent(
+                model=model,
+                system_prompt=WRITER_SYSTEM_PROMPT,
+                callback_handler=None,
+                hooks=hooks,
+            ),
+        )
+
+
+def researcher_prompt(user_input: str) -> str:
+    return f"Research: '{user_input}'. Use your available tools to gather information from reliable sources."
+
+
+def analyst_prompt(user_input: str, findings: str) -> str:
+    return f"Analyze these findings about '{user_input}':\n\n{findings}"
+
+
+def writer_prompt(user_input: str, analysis: str) -> str:
+    return f"Create a report on '{user_input}' based on this analysis:\n\n{analysis}"
+
+
+def draft_prompt(user_input: str, findings: str) -> str:
+    return f"Draft a report on '{user_input}' based on these findings:\n\n{findings}"
+
+
+def revise_prompt(user_input: str, draft: str, analysis: str) -> str:
+    return (
+        f"Revise this draft report on '{user_input}' so that it agrees with "
+        f"the analysis.\n\nDraft:\n\n{draft}\n\nAnalysis:\n\n{analysis}"
+    )
+
+
+def agent_stage_inputs(
+    agent: strands.Agent,
+    prompt: str,
+) -> dict[str, T.Any]:
+    """
+    Everything an agent's answer to a prompt depends on, the stage runs on
+    a fresh conversation, see :func:`invoke_stage_agent`.
+    """
+    return {
+        "prompt": prompt,
+        "system_prompt": agent.system_prompt,
+        "model_id": get_model_id(agent.model),
+        "tools": sorted(agent.tool_names),
+    }
+
+
+def invoke_stage_agent(
+    agent: strands.Agent,
+    prompt: str,
+) -> "AgentResult":
+    """
+    Invoke an agent on a fresh conversation and restore its messages
+    afterwards, also when it failed, so that the answer only depends on the
+    stage inputs and a retry with the same agent hits the checkpoints.
+
+    The metrics of the returned result only cover this invocation, not the
+    earlier runs of the agent.
+    """
+    messages = agent.messages
+    agent.messages = []
+    mark = _MetricsMark.of(agent.event_loop_metrics)
+    try:
+        result = agent(prompt)
+    finally:
+        agent.messages = messages
+    return dataclasses.replace(result, metrics=metrics_since(result.metrics, mark))
+
+
+def agent_result_metadata(result: "AgentResult") -> dict[str, T.Any]:
+    return {
+        "cycle_count": result.metrics.cycle_count,
+        "usage": dict(result.metrics.accumulated_usage),
+        "latency_ms": result.metrics.accumulated_metrics.get("latencyMs", 0),
+    }
+
+
+def run_agent_stage(
+    store: T.Optional[CheckpointStore],
+    stage: str,
+    agent: strands.Agent,
+    prompt: str,
+) -> StageRun:
+    """
+    Invoke an agent as a checkpointed stage, its output is the answer text.
+    Without a store, the stage always runs and nothing is persisted.
+    """
+    inputs = agent_stage_inputs(agent, prompt)
+    if store is not None:
+        return store.run(
+            stage=stage,
+            inputs=inputs,
+            func=lambda: invoke_stage_agent(agent, prompt),
+            metadata=agent_result_metadata,
+            serialize=str,
+        )
+    start = time.perf_counter()
+    result = invoke_stage_agent(agent, prompt)
+    duration = time.perf_counter() - start
+    checkpoint = Checkpoint(
+        stage=stage,
+        key=hash_inputs(stage, inputs),
+        output=str(result),
+        metadata={"duration": duration, **agent_result_metadata(result)},
+    )
+    return StageRun(checkpoint=checkpoint, cached=False, duration=duration)
+
+
+def load_finding_stage(
+    memory: ResearchMemory,
+    user_input: str,
+) -> T.Optional[StageRun]:
+    """
+    The researcher stage from a fresh finding of the same question.
+    """
+    start = time.perf_counter()
+    finding = memory.get_finding(user_input)
+    if finding is None:
+        return None
+    checkpoint = Checkpoint(
+        stage="researcher",
+        key=hash_inputs("researcher", {"finding": finding.query}),
+        output=finding.answer,
+        created_at=finding.created_at,
+        metadata={"sources": finding.sources, "research_memory": True},
+    )
+    return StageRun(
+        checkpoint=checkpoint,
+        cached=True,
+        duration=time.perf_counter() - start,
+    )
+
+
+@dataclass
+class ResearchReport:
+    """
+    Output of :func:`run_research_workflow`.
+
+    :param stages: the run of each stage, by stage name.
+    """
+
+    user_input: str
+    findings: str
+    analysis: str
+    report: str
+    stages: dict[str, StageRun] = field(default_factory=dict)
+
+    @property
+    def cached_stages(self) -> list[str]:
+        return [name for name, run in self.stages.items() if run.cached]
+
+
+def run_research_workflow(
+    agents: ResearchAgents,
+    user_input: str,
+    store: T.Optional[CheckpointStore] = None,
+    memory: T.Optional[ResearchMemory] = None,
+) -> ResearchReport:
+    """
+    Researcher gathers web information, analyst verifies it, writer creates
+    the report. With a ``store``, completed stages are skipped on rerun as
+    long as their inputs are unchanged. With a ``memory``, a fresh finding
+    of the same question replaces the researcher stage, and new findings
+    are remembered.
+    """
+    research = None
+    if memory is not None:
+        research = load_finding_stage(memory, user_input)
+    if research is None:
+        research = run_agent_stage(
+            store, "researcher", agents.researcher, researcher_prompt(user_input)
+        )
+        if memory is not None:
+            memory.put_finding(
+                Finding(
+                    query=user_input,
+                    answer=research.output,
+                    sources=extract_urls(research.output),
+                )
+            )
+    analysis = run_agent_stage(
+        store, "analyst", agents.analyst, analyst_prompt(user_input, research.output)
+    )
+    report = run_agent_stage(
+        store, "writer", agents.writer, writer_prompt(user_input, analysis.output)
+    )
+    return ResearchReport(
+        user_input=user_input,
+        findings=research.output,
+        analysis=analysis.output,
+        report=report.output,
+        stages={
+            "researcher": research,
+            "analyst": analysis,
+            "writer": report,
+        },
+    )
+
+
+def new_research_workflow(
+    model: "Model",
+    researcher_tools: T.Optional[list[T.Any]] = None,
+    hooks: T.Optional[list[T.Any]] = None,
+    overlap: bool = False,
+    max_concurrency: int = 4,
+) -> Workflow:
+    """
+    The research workflow as a DAG, every run uses fresh agents.
+
+    :param overlap: instead of waiting for the analyst, the writer drafts
+        the report from the findings while the analyst fact-checks them, and
+        then revises the draft with the analysis.
+
+    Example::
+
+        result = new_research_workflow(model, overlap=True).run(user_input)
+        print(result.output, result.usage)
+    """
+    if researcher_tools is None:
+        researcher_tools = [http_request]
+
+    def factory(system_prompt: str, tools: T.Optional[list[T.Any]] = None):
+        return lambda: strands.Agent(
+            model=model,
+            system_prompt=system_prompt,
+            callback_handler=None,
+            tools=tools,
+            hooks=hooks,
+        )
+
+    stages = [
+        agent_stage(
+            "researcher",
+            factory(RESEARCHER_SYSTEM_PROMPT, researcher_tools),
+            lambda x: researcher_prompt(x["input"]),
+        ),
+        agent_stage(
+            "analyst",
+            factory(ANALYST_SYSTEM_PROMPT),
+            lambda x: analyst_prompt(x["input"], x["researcher"]),
+            depends_on=["researcher"],
+        ),
+    ]
+    if overlap:
+        stages.append(
+            agent_stage(
+                "draft",
+                factory(WRITER_SYSTEM_PROMPT),
+                lambda x: draft_prompt(x["input"], x["researcher"]),
+                depends_on=["researcher"],
+            )
+        )
+        stages.append(
+            agent_stage(
+                "writer",
+                factory(WRITER_SYSTEM_PROMPT),
+                lambda x: revise_prompt(x["input"], x["draft"], x["analyst"]),
+                depends_on=["analyst", "draft"],
+            )
+        )
+    else:
+        stages.append(
+            agent_stage(
+                "writer",
+                factory(WRITER_SYSTEM_PROMPT),
+                lambda x: writer_prompt(x["input"], x["analyst"]),
+                depends_on=["analyst"],
+            )
+        )
+    return Workflow(stages, max_concurrency=max_concurrency, name="Research workflow")
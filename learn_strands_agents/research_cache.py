@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+
+"""
+A research memory shared by researcher agent invocations.
+
+The researcher of the research workflow starts from scratch for every
+question, even when a recent question fetched the same pages. Fetching is
+the slowest part of a run, so :class:`ResearchMemory` keeps:
+
+- documents, the bodies of fetched URLs, keyed by URL;
+- findings, the researcher's answers, keyed by the normalized question;
+
+in a SQLite file with an FTS5 full-text index and freshness metadata.
+
+- :class:`ResearchMemoryHook` stores the documents ``http_request`` fetches
+  and answers a repeated ``GET`` of a fresh document from memory;
+- :func:`new_research_memory_tool` is a tool the researcher checks before
+  going to the web;
+- :func:`~learn_strands_agents.research.run_research_workflow` reuses a
+  fresh finding for the same question and skips the researcher.
+"""
+
+import typing as T
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+
+import strands
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+
+from .paths import path_enum
+from .http_shaping import BODY_PREFIX
+from .prefetch import result_body
+from .tool_cache import StaticResultTool
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands.tools.decorator import DecoratedFunctionTool
+
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how in is it of on or "
+    "that the this to was what when where which who why will with".split()
+)
+_WORD = re.compile(r"\w+")
+_URL = re.compile(r"https?://[^\s)\]>\"'`]+")
+
+
+def query_terms(text: str) -> list[str]:
+    """
+    Lower case words of a question without stopwords.
+    """
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def normalize_query(text: str) -> str:
+    """
+    The key of a question: its terms in order, repeated adjacent terms once,
+    so that ``"Is AgentCore GA?"`` and ``"is agentcore ga"`` share findings.
+    The order is kept, ``"Does Java copy Python?"`` and ``"Does Python copy
+    Java?"`` are different questions.
+    """
+    terms = []
+    for term in query_terms(text):
+        if not terms or terms[-1] != term:
+            terms.append(term)
+    return " ".join(terms)
+
+
+def extract_urls(text: str) -> list[str]:
+    urls = []
+    for url in _URL.findall(text):
+        url = url.rstrip(".,;:")
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+@dataclass
+class Document:
+    url: str
+    content: str
+    title: str = ""
+    status_code: int = 200
+    fetched_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+@dataclass
+class Finding:
+    query: str
+    answer: str
+    sources: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+@dataclass
+class SearchHit:
+    """
+    :param kind: ``"document"`` or ``"finding"``.
+    :param ref: the URL of a document, the question of a finding.
+    :param snippet: the matching part of the text.
+    :param score: bm25 rank, lower is better.
+    :param age: seconds since the text was fetched or written.
+    :param fresh: whether it is within its time to live.
+    """
+
+    kind: str
+    ref: str
+    snippet: str
+    score: float
+    age: float
+    fresh: bool
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return {
+            "kind": self.kind,
+            "ref": self.ref,
+            "snippet": self.snippet,
+            "age_seconds": round(self.age),
+            "fresh": self.fresh,
+        }
+
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS documents ("
+    "url TEXT PRIMARY KEY, "
+    "title TEXT NOT NULL, "
+    "content TEXT NOT NULL, "
+    "status_code INTEGER NOT NULL, "
+    "fetched_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS findings ("
+    "key TEXT PRIMARY KEY, "
+    "query TEXT NOT NULL, "
+    "answer TEXT NOT NULL, "
+    "sources TEXT NOT NULL, "
+    "created_at REAL NOT NULL)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+    "url UNINDEXED, title, content, tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5("
+    "key UNINDEXED, query, answer, tokenize='porter unicode61')",
+]
+
+
+class ResearchMemory:
+    """
+    Fetched documents and research findings with full-text search.
+
+    Safe to use from several threads and processes, like
+    :class:`~learn_strands_agents.tool_cache.SqliteCache`.
+
+    :param path: the database file, by default ``${dir_tmp}/research.sqlite``.
+    :param document_ttl: seconds a fetched document is fresh.
+    :param finding_ttl: seconds a finding is fresh.
+    :param timeout: seconds to wait for a lock held by another writer.
+    """
+
+    def __init__(
+        self,
+        path: T.Optional[Path] = None,
+        document_ttl: float = 24 * 3600,
+        finding_ttl: float = 6 * 3600,
+        timeout: float = 30.0,
+    ):
+        self.path = Path(path) if path else path_enum.dir_tmp / "research.sqlite"
+        self.document_ttl = document_ttl
+        self.finding_ttl = finding_ttl
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        def connect() -> sqlite3.Connection:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            return conn
+
+        conn = path_enum.in_dir(self.path.parent, connect, errors=(sqlite3.OperationalError,))
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # --- documents
+    def put_document(self, document: Document) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(url, title, content, status_code, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    document.url,
+                    document.title,
+                    document.content,
+                    document.status_code,
+                    document.fetched_at,
+                ),
+            )
+            conn.execute("DELETE FROM documents_fts WHERE url = ?", (document.url,))
+            conn.execute(
+                "INSERT INTO documents_fts (url, title, content) VALUES (?, ?, ?)",
+                (document.url, document.title, document.content),
+            )
+
+    def get_document(
+        self,
+        url: str,
+        fresh: bool = True,
+    ) -> T.Optional[Document]:
+        """
+        :param fresh: only return the document if it didn't expire.
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT url, content, title, status_code, fetched_at "
+                "FROM documents WHERE url = ?",
+                (url,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        document = Document(*row)
+        if fresh and document.age > self.document_ttl:
+            return None
+        return document
+
+    # --- findings
+    def put_finding(self, finding: Finding) -> None:
+        key = normalize_query(finding.query)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO findings "
+                "(key, query, answer, sources, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    finding.query,
+                    finding.answer,
+                    json.dumps(finding.sources),
+                    finding.created_at,
+                ),
+            )
+            conn.execute("DELETE FROM findings_fts WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO findings_fts (key, query, answer) VALUES (?, ?, ?)",
+                (key, finding.query, finding.answer),
+            )
+
+    def get_finding(
+        self,
+        query: str,
+        fresh: bool = True,
+    ) -> T.Optional[Finding]:
+        """
+        The finding of the same question, after normalization.
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT query, answer, sources, created_at FROM findings WHERE key = ?",
+                (normalize_query(query),),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        finding = Finding(
+            query=row[0],
+            answer=row[1],
+            sources=json.loads(row[2]),
+            created_at=row[3],
+        )
+        if fresh and finding.age > self.finding_ttl:
+            return None
+        return finding
+
+    # --- search
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        include_stale: bool = False,
+        snippet_tokens: int = 32,
+    ) -> list[SearchHit]:
+        """
+        Full-text search over findings and documents, best matches first.
+
+        Any of the query terms may match, bm25 ranks documents matching
+        more and rarer terms higher.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join('"%s"' % term.replace('"', '""') for term in terms)
+        conn = self._connect()
+        now = time.time()
+        hits = []
+        rows = conn.execute(
+            "SELECT f.query, snippet(findings_fts, 2, '[', ']', '...', ?), "
+            "bm25(findings_fts), f.created_at "
+            "FROM findings_fts JOIN findings f ON f.key = findings_fts.key "
+            "WHERE findings_fts MATCH ? ORDER BY bm25(findings_fts) LIMIT ?",
+            (snippet_tokens, match, limit),
+        )
+        for ref, snippet, score, created_at in rows:
+            age = now - created_at
+            hits.append(
+                SearchHit("finding", ref, snippet, score, age, age <= self.finding_ttl)
+            )
+        rows = conn.execute(
+            "SELECT d.url, snippet(documents_fts, 2, '[', ']', '...', ?), "
+            "bm25(documents_fts), d.fetched_at "
+            "FROM documents_fts JOIN documents d ON d.url = documents_fts.url "
+            "WHERE documents_fts MATCH ? ORDER BY bm25(documents_fts) LIMIT ?",
+            (snippet_tokens, match, limit),
+        )
+        for ref, snippet, score, fetched_at in rows:
+            age = now - fetched_at
+            hits.append(
+                SearchHit("document", ref, snippet, score, age, age <= self.document_ttl)
+            )
+        if not include_stale:
+            hits = [hit for hit in hits if hit.fresh]
+        hits.sort(key=lambda hit: hit.score)
+        return hits[:limit]
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired documents and findings.
+
+        :returns: the number of deleted rows.
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            n = conn.execute(
+                "DELETE FROM documents WHERE fetched_at < ?", (now - self.document_ttl,)
+            ).rowcount
+            n += conn.execute(
+                "DELETE FROM findings WHERE created_at < ?", (now - self.finding_ttl,)
+            ).rowcount
+            conn.execute(
+                "DELETE FROM documents_fts WHERE url NOT IN (SELECT url FROM documents)"
+            )
+            conn.execute(
+                "DELETE FROM findings_fts WHERE key NOT IN (SELECT key FROM findings)"
+            )
+        return n
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_STATUS = re.compile(r"^Status Code: (\d+)")
+
+
+class ResearchMemoryHook(HookProvider):
+    """
+    Remember the documents fetched by HTTP tools and serve a repeated
+    ``GET`` of a fresh document from the memory.
+
+    Register it before
+    :class:`~learn_strands_agents.http_shaping.HttpResultShapingHook` to
+    remember the shaped text instead of the raw body.
+
+    :param memory: the shared memory.
+    :param tool_names: names of the HTTP tools.
+    """
+
+    def __init__(
+        self,
+        memory: ResearchMemory,
+        tool_names: T.Iterable[str] = ("http_request",),
+    ):
+        self.memory = memory
+        self.tool_names = set(tool_names)
+        self.hits = 0
+        self.stored = 0
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.serve_document)
+        registry.add_callback(AfterToolCallEvent, self.store_document)
+
+    def _get_url(self, tool_use: dict[str, T.Any]) -> T.Optional[str]:
+        tool_input = tool_use.get("input")
+        if tool_use["name"] not in self.tool_names or not isinstance(tool_input, dict):
+            return None
+        if str(tool_input.get("method", "GET")).upper() != "GET":
+            return None
+        url = tool_input.get("url")
+        return url.strip() if isinstance(url, str) else None
+
+    def serve_document(self, event: BeforeToolCallEvent) -> None:
+        url = self._get_url(event.tool_use)
+        if url is None or event.selected_tool is None:
+            return
+        document = self.memory.get_document(url)
+        if document is None:
+            return
+        self.hits += 1
+        result = {
+            "toolUseId": "",
+            "status": "success",
+            "content": [
+                {"text": f"Status Code: {document.status_code}"},
+                {"text": f"Research memory: fetched {round(document.age)} seconds ago"},
+                {"text": f"{BODY_PREFIX}{document.content}"},
+            ],
+        }
+        event.selected_tool = StaticResultTool(event.selected_tool.tool_spec, result)
+
+    def store_document(self, event: AfterToolCallEvent) -> None:
+        url = self._get_url(event.tool_use)
+        if (
+            url is None
+            or isinstance(event.selected_tool, StaticResultTool)
+            or event.exception is not None
+            or event.result.get("status") != "success"
+        ):
+            return
+        body = result_body(event.result)
+        if body is None:
+            return
+        status_code = 200
+        for block in event.result.get("content", []):
+            match = _STATUS.match(block.get("text") or "")
+            if match:
+                status_code = int(match.group(1))
+        if status_code >= 400:
+            return
+        title = _TITLE.search(body)
+        self.memory.put_document(
+            Document(
+                url=url,
+                content=body,
+                title=title.group(1).strip() if title else "",
+                status_code=status_code,
+            )
+        )
+        self.stored += 1
+
+
+def new_research_memory_tool(
+    memory: ResearchMemory,
+    limit: int = 5,
+) -> "DecoratedFunctionTool":
+    """
+    Create the ``search_research_memory`` tool for a memory.
+    """
+
+    @strands.tool(name="search_research_memory")
+    def search_research_memory(query: str) -> str:
+        """
+        Search earlier research findings and fetched web pages. Check it
+        before going to the web, fresh results don't need to be fetched
+        again.
+
+        Args:
+            query: keywords of what you are looking for.
+        """
+        hits = memory.search(query, limit=limit)
+        if not hits:
+            return "No earlier research found."
+        return json.dumps([hit.to_dict() for hit in hits], ensure_ascii=False)
+
+    return search_research_memory
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+
+"""
+Memory bounded retention of agent results, with the details spilled to disk.
+
+An ``AgentResult`` holds the ``EventLoopMetrics`` of its agent, with every
+trace, message and tool payload of the run. A worker that keeps results
+around for later analysis, like ``analyze_trace_performance`` in the
+weather example, grows steadily. :class:`ResultStore` keeps only a
+:class:`ResultSummary` per result in memory and writes the traces, the
+final message and optionally the conversation to one gzip compressed JSON
+file per result, under ``${dir_tmp}/results``. Full results are loaded on
+demand and the most recently loaded ones are kept in a small LRU cache.
+
+The ``metrics`` of an ``AgentResult`` are the cumulative metrics of its
+agent, every result of a long lived agent refers to all traces so far. The
+store only keeps what was added since the previous result of the same agent
+was put, so each stored result and summary covers one run.
+
+Example::
+
+    store = ResultStore(max_loaded=4)
+    summary = store.put(agent("What's the weather at 38.9072, 77.0369?"))
+    print(summary.cycle_count, summary.usage)
+    analyze_trace_performance(store.load(summary.key))
+"""
+
+import typing as T
+import os
+import gzip
+import json
+import time
+import uuid
+import tempfile
+import threading
+import weakref
+import dataclasses
+from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+
+from strands.agent.agent_result import AgentResult
+from strands.telemetry.metrics import Trace, EventLoopMetrics, ToolMetrics
+
+from .paths import path_enum
+from .replay import _encode, _decode
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands.types.content import Messages
+
+
+@dataclass
+class ResultSummary:
+    """
+    What is kept in memory of a stored result.
+
+    :param key: the key of the result in the store.
+    :param stop_reason: the stop reason of the run.
+    :param text: the text of the final message.
+    :param cycle_count: event loop cycles.
+    :param usage: accumulated token usage.
+    :param latency_ms: accumulated model latency.
+    :param duration: seconds of all cycles.
+    :param tool_calls: ``{tool name: (calls, errors, seconds)}``.
+    :param n_messages: messages of the stored conversation, if any.
+    :param size: bytes of the file on disk.
+    """
+
+    key: str
+    stop_reason: str
+    text: str
+    cycle_count: int
+    usage: dict[str, int]
+    latency_ms: int
+    duration: float
+    tool_calls: dict[str, tuple[int, int, float]] = field(default_factory=dict)
+    n_messages: int = 0
+    size: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return asdict(self)
+
+
+def _trace_to_dict(trace: Trace) -> dict[str, T.Any]:
+    return {
+        "id": trace.id,
+        "name": trace.name,
+        "raw_name": trace.raw_name,
+        "parent_id": trace.parent_id,
+        "start_time": trace.start_time,
+        "end_time": trace.end_time,
+        "metadata": trace.metadata,
+        "message": trace.message,
+        "children": [_trace_to_dict(child) for child in trace.children],
+    }
+
+
+def _trace_from_dict(data: dict[str, T.Any]) -> Trace:
+    trace = Trace(
+        name=data["name"],
+        parent_id=data["parent_id"],
+        start_time=data["start_time"],
+        raw_name=data["raw_name"],
+        metadata=data["metadata"],
+        message=data["message"],
+    )
+    trace.id = data["id"]
+    trace.end_time = data["end_time"]
+    trace.children = [_trace_from_dict(child) for child in data["children"]]
+    return trace
+
+
+def _metrics_to_dict(metrics: EventLoopMetrics) -> dict[str, T.Any]:
+    return {
+        "cycle_count": metrics.cycle_count,
+        "tool_metrics": {
+            name: {
+                "tool": tool.tool,
+                "call_count": tool.call_count,
+                "success_count": tool.success_count,
+                "error_count": tool.error_count,
+                "total_time": tool.total_time,
+            }
+            for name, tool in metrics.tool_metrics.items()
+        },
+        "cycle_durations": list(metrics.cycle_durations),
+        "traces": [_trace_to_dict(trace) for trace in metrics.traces],
+        "accumulated_usage": dict(metrics.accumulated_usage),
+        "accumulated_metrics": dict(metrics.accumulated_metrics),
+    }
+
+
+def _metrics_from_dict(data: dict[str, T.Any]) -> EventLoopMetrics:
+    return EventLoopMetrics(
+        cycle_count=data["cycle_count"],
+        tool_metrics={
+            name: ToolMetrics(**tool) for name, tool in data["tool_metrics"].items()
+        },
+        cycle_durations=data["cycle_durations"],
+        traces=[_trace_from_dict(trace) for trace in data["traces"]],
+        accumulated_usage=data["accumulated_usage"],
+        accumulated_metrics=data["accumulated_metrics"],
+    )
+
+
+@dataclass
+class _MetricsMark:
+    """
+    How far the cumulative metrics of an agent were already stored.
+    """
+
+    cycle_count: int
+    n_traces: int
+    n_cycle_durations: int
+    usage: dict[str, int]
+    metrics: dict[str, int]
+    tool_metrics: dict[str, tuple[int, int, int, float]]
+
+    @classmethod
+    def of(cls, metrics: EventLoopMetrics) -> "_MetricsMark":
+        return cls(
+            cycle_count=metrics.cycle_count,
+            n_traces=len(metrics.traces),
+            n_cycle_durations=len(metrics.cycle_durations),
+            usage=dict(metrics.accumulated_usage),
+            metrics=dict(metrics.accumulated_metrics),
+            tool_metrics={
+                name: (tool.call_count, tool.success_count, tool.error_count, tool.total_time)
+                for name, tool in metrics.tool_metrics.items()
+            },
+        )
+
+
+def _diff(new: T.Mapping[str, T.Any], old: T.Mapping[str, T.Any]) -> dict[str, T.Any]:
+    return {key: value - old.get(key, 0) for key, value in new.items()}
+
+
+def metrics_since(
+    metrics: EventLoopMetrics,
+    mark: T.Optional[_MetricsMark],
+) -> EventLoopMetrics:
+    """
+    The part of cumulative metrics added after ``mark``, all of it if
+    ``mark`` is ``None`` or doesn't fit, e.g. the metrics were reset.
+    """
+    if mark is None or mark.n_traces > len(metrics.traces):
+        mark = _MetricsMark(0, 0, 0, {}, {}, {})
+    tool_metrics = {}
+    for name, tool in metrics.tool_metrics.items():
+        calls, successes, errors, total_time = mark.tool_metrics.get(name, (0, 0, 0, 0.0))
+        if tool.call_count > calls:
+            tool_metrics[name] = ToolMetrics(
+                tool=tool.tool,
+                call_count=tool.call_count - calls,
+                success_count=tool.success_count - successes,
+                error_count=tool.error_count - errors,
+                total_time=tool.total_time - total_time,
+            )
+    return EventLoopMetrics(
+        cycle_count=metrics.cycle_count - mark.cycle_count,
+        tool_metrics=tool_metrics,
+        cycle_durations=metrics.cycle_durations[mark.n_cycle_durations :],
+        traces=metrics.traces[mark.n_traces :],
+        accumulated_usage=_diff(metrics.accumulated_usage, mark.usage),
+        accumulated_metrics=_diff(metrics.accumulated_metrics, mark.metrics),
+    )
+
+
+def summarize(
+    key: str,
+    result: AgentResult,
+    n_messages: int = 0,
+) -> ResultSummary:
+    metrics = result.metrics
+    return ResultSummary(
+        key=key,
+        stop_reason=result.stop_reason,
+        text=str(result).strip(),
+        cycle_count=metrics.cycle_count,
+        usage=dict(metrics.accumulated_usage),
+        latency_ms=metrics.accumulated_metrics.get("latencyMs", 0),
+        duration=sum(metrics.cycle_durations),
+        tool_calls={
+            name: (tool.call_count, tool.error_count, tool.total_time)
+            for name, tool in metrics.tool_metrics.items()
+        },
+        n_messages=n_messages,
+    )
+
+
+class ResultStore:
+    """
+    Keep summaries of agent results in memory and the results on disk.
+
+    :param dir_root: the directory of the result files, by default
+        ``${dir_tmp}/results``.
+    :param max_loaded: number of loaded results kept in memory.
+    """
+
+    def __init__(
+        self,
+        dir_root: T.Optional[T.Union[str, Path]] = None,
+        max_loaded: int = 8,
+    ):
+        self.dir_root = Path(dir_root) if dir_root else path_enum.dir_tmp / "results"
+        self.max_loaded = max_loaded
+        self._summaries: dict[str, ResultSummary] = {}
+        self._loaded: OrderedDict[str, tuple[AgentResult, T.Optional["Messages"]]] = OrderedDict()
+        # id of the cumulative metrics of an agent -> (weak reference, mark)
+        self._marks: dict[int, tuple[weakref.ref, _MetricsMark]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.dir_root / f"{key}.json.gz"
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._summaries
+
+    def put(
+        self,
+        result: AgentResult,
+        messages: T.Optional["Messages"] = None,
+        key: T.Optional[str] = None,
+    ) -> ResultSummary:
+        """
+        Write a result to disk and keep its summary. Drop the reference to
+        the result afterwards to free its memory.
+
+        Only the metrics added since the previous result of the same agent
+        was put are stored, put every result of an agent, in order.
+
+        :param messages: the conversation to store with the result, e.g.
+            ``agent.messages``.
+        :param key: the key of the result, a new uuid by default.
+        """
+        key = key or uuid.uuid4().hex
+        cumulative = result.metrics
+        with self._lock:
+            item = self._marks.get(id(cumulative))
+            mark = item[1] if item is not None and item[0]() is cumulative else None
+            self._marks[id(cumulative)] = (weakref.ref(cumulative), _MetricsMark.of(cumulative))
+            self._marks = {k: v for k, v in self._marks.items() if v[0]() is not None}
+        result = dataclasses.replace(result, metrics=metrics_since(cumulative, mark))
+        summary = summarize(key, result, n_messages=len(messages) if messages else 0)
+        data = {
+            "stop_reason": result.stop_reason,
+            "message": result.message,
+            "metrics": _metrics_to_dict(result.metrics),
+            "state": result.state,
+            "messages": list(messages) if messages is not None else None,
+        }
+        payload = gzip.compress(
+            json.dumps(
+                _encode(data),
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=str,
+            ).encode("utf-8")
+        )
+        path = self._path(key)
+        fd, tmp = path_enum.in_dir(
+            path.parent, lambda: tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        summary.size = len(payload)
+        with self._lock:
+            self._summaries[key] = summary
+            self._loaded.pop(key, None)
+        return summary
+
+    def summary(self, key: str) -> ResultSummary:
+        return self._summaries[key]
+
+    def summaries(self) -> list[ResultSummary]:
+        with self._lock:
+            return list(self._summaries.values())
+
+    def _load(self, key: str) -> tuple[AgentResult, T.Optional["Messages"]]:
+        with self._lock:
+            if key not in self._summaries:
+                raise KeyError(key)
+            item = self._loaded.get(key)
+            if item is not None:
+                self._loaded.move_to_end(key)
+                return item
+        data = _decode(json.loads(gzip.decompress(self._path(key).read_bytes())))
+        result = AgentResult(
+            stop_reason=data["stop_reason"],
+            message=data["message"],
+            metrics=_metrics_from_dict(data["metrics"]),
+            state=data["state"],
+        )
+        item = (result, data["messages"])
+        with self._lock:
+            self._loaded[key] = item
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return item
+
+    def load(self, key: str) -> AgentResult:
+        """
+        The stored result, with its traces, as an ``AgentResult``. Treat it
+        as read-only, it may be shared with other callers.
+        """
+        return self._load(key)[0]
+
+    def load_messages(self, key: str) -> T.Optional["Messages"]:
+        """
+        The conversation stored with the result, if any.
+        """
+        return self._load(key)[1]
+
+    def loaded(self) -> list[str]:
+        """
+        Keys of the results currently held in memory.
+        """
+        with self._lock:
+            return list(self._loaded)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._summaries.pop(key, None)
+            self._loaded.pop(key, None)
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """
+        Delete all results of the store, other files of ``dir_root`` are
+        kept.
+        """
+        with self._lock:
+            self._summaries.clear()
+            self._loaded.clear()
+        for path in self.dir_root.glob("*.json.gz"):
+            path.unlink(missing_ok=True)
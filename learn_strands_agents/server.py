@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+
+"""
+A local, pre-fork agent server.
+
+One Python process runs one agent call at a time on one core. To serve many
+requests on one node, :class:`AgentServer` opens a listening TCP or Unix
+socket and forks a pool of worker processes that all accept from it. The
+workers share a :class:`~learn_strands_agents.tool_cache.SqliteCache` for
+tool results and conversation sessions.
+
+HTTP API of every worker:
+
+- ``POST /invoke`` with ``{"prompt": "...", "session_id": "..."}``, the
+  session id is optional. Returns ``{"output", "session_id", "usage",
+  "duration", "worker"}``.
+- ``GET /health``.
+- ``GET /metrics``, the metrics of the worker that handles the request.
+- ``GET /metrics/all``, the latest metrics of all workers.
+
+On ``SIGTERM`` the server drains: workers stop accepting, finish the request
+they are handling and exit.
+"""
+
+import typing as T
+import os
+import json
+import time
+import signal
+import socket
+import http.client
+import http.server
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+
+from .tool_cache import SqliteCache, ToolResultCacheHook, SessionStore
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+
+T_ADDRESS = T.Union[tuple[str, int], str, Path]
+
+METRICS_NAMESPACE = "worker_metrics"
+
+
+@dataclass
+class WorkerMetrics:
+    """
+    Counters of one worker process.
+    """
+
+    pid: int
+    started_at: float = field(default_factory=time.time)
+    requests: int = 0
+    errors: int = 0
+    total_duration: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_cache_hits: int = 0
+    tool_cache_misses: int = 0
+
+    def to_dict(self) -> dict[str, T.Any]:
+        data = asdict(self)
+        data["avg_duration"] = (
+            self.total_duration / self.requests if self.requests else 0.0
+        )
+        return data
+
+
+class _HTTPServer(http.server.HTTPServer):
+    worker: "_Worker"
+
+    def get_request(self):
+        conn, addr = super().get_request()
+        # the listening socket is non-blocking, the connections are not
+        conn.setblocking(True)
+        return conn, addr or ("unix", 0)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: _HTTPServer
+
+    def log_message(self, format: str, *args: T.Any) -> None:
+        pass
+
+    def _send_json(self, status: int, data: T.Any) -> None:
+        body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        worker = self.server.worker
+        if self.path == "/health":
+            status = "draining" if worker.draining else "ok"
+            self._send_json(200, {"status": status, "pid": worker.metrics.pid})
+        elif self.path == "/metrics":
+            self._send_json(200, worker.metrics.to_dict())
+        elif self.path == "/metrics/all":
+            self._send_json(200, dict(worker.app.cache.items(METRICS_NAMESPACE)))
+        else:
+            self._send_json(404, {"error": f"not found: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != "/invoke":
+            self._send_json(404, {"error": f"not found: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            prompt = request["prompt"]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"invalid request: {e!r}"})
+            return
+        status, response = self.server.worker.invoke(prompt, request.get("session_id"))
+        self._send_json(status, response)
+
+
+class _Worker:
+    """
+    The request loop of one forked worker process.
+    """
+
+    def __init__(self, app: "AgentServer"):
+        self.app = app
+        self.draining = False
+        self.metrics = WorkerMetrics(pid=os.getpid())
+        self.tool_cache_hook = ToolResultCacheHook(
+            app.cache,
+            tool_names=app.cacheable_tools,
+            ttl=app.tool_cache_ttl,
+        )
+        self.sessions = SessionStore(app.cache, ttl=app.session_ttl)
+
+    def _drain(self, signum: int, frame: T.Any) -> None:
+        self.draining = True
+
+    def invoke(
+        self,
+        prompt: str,
+        session_id: T.Optional[str],
+    ) -> tuple[int, dict[str, T.Any]]:
+        start = time.perf_counter()
+        self.metrics.requests += 1
+        try:
+            agent = self.app.agent_factory()
+            agent.hooks.add_hook(self.tool_cache_hook)
+            if session_id:
+                self.sessions.restore(session_id, agent)
+            result = agent(prompt)
+            if session_id:
+                self.sessions.save(session_id, agent.messages)
+            usage = dict(result.metrics.accumulated_usage)
+            self.metrics.input_tokens += usage.get("inputTokens", 0)
+            self.metrics.output_tokens += usage.get("outputTokens", 0)
+            status, response = 200, {
+                "output": str(result).strip(),
+                "session_id": session_id,
+                "usage": usage,
+            }
+        except Exception as e:
+            self.metrics.errors += 1
+            status, response = 500, {"error": repr(e)}
+        duration = time.perf_counter() - start
+        self.metrics.total_duration += duration
+        self.metrics.tool_cache_hits = self.tool_cache_hook.hits
+        self.metrics.tool_cache_misses = self.tool_cache_hook.misses
+        self.publish_metrics()
+        response.update(duration=duration, worker=self.metrics.pid)
+        return status, response
+
+    def publish_metrics(self) -> None:
+        self.app.cache.set(
+            METRICS_NAMESPACE, str(self.metrics.pid), self.metrics.to_dict()
+        )
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._drain)
+        # Ctrl+C reaches the whole process group, the parent decides
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        httpd = _HTTPServer(
+            self.app.server_address,
+            _Handler,
+            bind_and_activate=False,
+        )
+        httpd.socket.close()
+        httpd.socket = self.app.socket
+        httpd.timeout = self.app.poll_interval
+        httpd.worker = self
+        self.publish_metrics()
+        while not self.draining:
+            httpd.handle_request()
+        self.app.cache.close()
+
+
+class AgentServer:
+    """
+    Pre-fork pool of agent worker processes behind one socket.
+
+    Example::
+
+        def agent_factory():
+            return strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+
+        AgentServer(
+            agent_factory,
+            address=("127.0.0.1", 8080),
+            cacheable_tools=["get_weather"],
+        ).serve_forever()
+
+    :param agent_factory: creates the agent for a request, called in the
+        worker process.
+    :param address: ``(host, port)`` for TCP, or a path for a Unix socket.
+        Port ``0`` picks a free port, see :attr:`server_address`.
+    :param workers: number of worker processes, by default one per core.
+    :param cache: cache shared by the workers, by default
+        ``${dir_tmp}/cache.sqlite``.
+    :param cacheable_tools: names of the tools whose results are cached and
+        shared by the workers, none by default. Only list tools without side
+        effects, like ``get_weather``, not ``http_request``, which can also
+        ``POST``.
+    :param tool_cache_ttl: seconds a tool result is cached.
+    :param session_ttl: seconds of inactivity until a session expires.
+    :param drain_timeout: seconds workers get to finish when stopping,
+        before they are killed.
+    :param poll_interval: how often an idle worker checks for draining.
+    """
+
+    def __init__(
+        self,
+        agent_factory: T.Callable[[], "Agent"],
+        address: T_ADDRESS = ("127.0.0.1", 8080),
+        workers: T.Optional[int] = None,
+        cache: T.Optional[SqliteCache] = None,
+        cacheable_tools: T.Iterable[str] = (),
+        tool_cache_ttl: T.Optional[float] = 300.0,
+        session_ttl: T.Optional[float] = 3600.0,
+        drain_timeout: float = 30.0,
+        poll_interval: float = 0.2,
+        backlog: int = 128,
+    ):
+        self.agent_factory = agent_factory
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache or SqliteCache()
+        self.cacheable_tools = tuple(cacheable_tools)
+        self.tool_cache_ttl = tool_cache_ttl
+        self.session_ttl = session_ttl
+        self.drain_timeout = drain_timeout
+        self.poll_interval = poll_interval
+        self.backlog = backlog
+        self.socket: T.Optional[socket.socket] = None
+        self.pids: dict[int, int] = {}  # pid -> worker index
+        self._stopping = False
+
+    @property
+    def is_unix(self) -> bool:
+        return isinstance(self.address, (str, Path))
+
+    @property
+    def server_address(self) -> T.Union[tuple[str, int], str]:
+        """
+        The address the server is bound to.
+        """
+        return self.socket.getsockname()
+
+    def _bind(self) -> socket.socket:
+        if self.is_unix:
+            path = Path(self.address)
+            if path.is_socket():
+                path.unlink()
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(str(path))
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(self.address)
+        sock.listen(self.backlog)
+        # all workers wait on the same socket, only one of them gets a
+        # connection, the others must not block in accept()
+        sock.setblocking(False)
+        return sock
+
+    def _spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = index
+            return
+        code = 0
+        try:
+            _Worker(self).run()
+        except BaseException:  # pragma: no cover
+            code = 1
+        finally:
+            os._exit(code)
+
+    def start(self) -> None:
+        """
+        Bind the socket and fork the workers, then return.
+        """
+        self._stopping = False
+        self.socket = self._bind()
+        self.cache.clear(METRICS_NAMESPACE)
+        # don't let the workers inherit an open connection
+        self.cache.close()
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def reap(self) -> list[int]:
+        """
+        Collect exited workers and replace them, unless stopping.
+
+        :returns: pids of the workers that exited.
+        """
+        exited = []
+        while self.pids:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            index = self.pids.pop(pid, None)
+            if index is None:  # pragma: no cover
+                continue
+            exited.append(pid)
+            if not self._stopping:
+                self._spawn(index)
+        return exited
+
+    def stop(
+        self,
+        timeout: T.Optional[float] = None,
+    ) -> None:
+        """
+        Drain and stop all workers, killing those that don't finish in time.
+        """
+        self._stopping = True
+        timeout = self.drain_timeout if timeout is None else timeout
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:  # pragma: no cover
+                pass
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.pids):  # pragma: no cover
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.pids.pop(pid)
+        if self.socket is not None:
+            if self.is_unix:
+                Path(self.address).unlink(missing_ok=True)
+            self.socket.close()
+            self.socket = None
+
+    def serve_forever(self) -> None:  # pragma: no cover
+        """
+        Start the server and supervise the workers until ``SIGTERM`` or
+        ``SIGINT``, then drain.
+        """
+
+        def handle_stop(signum: int, frame: T.Any) -> None:
+            self._stopping = True
+
+        signal.signal(signal.SIGTERM, handle_stop)
+        signal.signal(signal.SIGINT, handle_stop)
+        self.start()
+        try:
+            while not self._stopping:
+                self.reap()
+                time.sleep(self.poll_interval)
+        finally:
+            self.stop()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def request(
+    address: T_ADDRESS,
+    method: str,
+    path: str,
+    data: T.Optional[dict[str, T.Any]] = None,
+    timeout: float = 300.0,
+) -> tuple[int, T.Any]:
+    """
+    Send a request to an :class:`AgentServer`.
+
+    :returns: the status code and the decoded JSON response.
+    """
+    if isinstance(address, (str, Path)):
+        conn = _UnixHTTPConnection(str(address), timeout=timeout)
+    else:
+        conn = http.client.HTTPConnection(*address, timeout=timeout)
+    try:
+        body = json.dumps(data).encode("utf-8") if data is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def invoke(
+    address: T_ADDRESS,
+    prompt: str,
+    session_id: T.Optional[str] = None,
+    timeout: float = 300.0,
+) -> dict[str, T.Any]:
+    """
+    Invoke the agent of an :class:`AgentServer`.
+    """
+    status, response = request(
+        address,
+        "POST",
+        "/invoke",
+        {"prompt": prompt, "session_id": session_id},
+        timeout=timeout,
+    )
+    if status != 200:
+        raise RuntimeError(f"agent server returned {status}: {response}")
+    return response
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+
+"""
+Request coalescing for identical in-flight agent queries and tool calls.
+
+During a traffic spike many users ask the same question at the same moment,
+e.g. the forecast of the same city, and each one triggers its own
+multi-cycle agent run and its own upstream API calls. :class:`SingleFlight`
+lets the first caller of a key run the work while identical calls that
+arrive before it finished wait for, and share, its result or error:
+
+- :class:`CoalescingInvoker` puts it in front of agent invocations, keyed
+  by the normalized prompt;
+- :class:`SingleFlightHook` puts it in front of tools like ``http_request``
+  or ``get_weather``, keyed by tool name and input, also across agents.
+
+Nothing is cached, a call that starts after the shared one finished runs
+again, combine it with
+:class:`~learn_strands_agents.tool_cache.ToolResultCacheHook` for that.
+Coalescing works between the threads and event loops of one process.
+
+Example::
+
+    flight = SingleFlight(max_waiters=100)
+    ask = CoalescingInvoker(
+        lambda: strands.Agent(
+            model=model,
+            tools=[http_request],
+            hooks=[SingleFlightHook(flight, tool_names=["http_request"])],
+        ),
+    )
+    result = ask("What's the weather like in Seattle?")  # from many threads
+"""
+
+import typing as T
+import asyncio
+import threading
+import concurrent.futures
+from dataclasses import dataclass
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+)
+from strands.types._events import ToolResultEvent
+from strands.types.tools import AgentTool, ToolResult, ToolSpec, ToolUse
+
+from .batch import prompt_key
+from .tool_cache import tool_input_key
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.agent.agent_result import AgentResult
+
+R = T.TypeVar("R")
+
+
+class SingleFlightOverflowError(Exception):
+    """
+    Raised when a call would exceed the waiters of an in-flight key and
+    ``reject_overflow`` is set.
+    """
+
+
+class _LeaderCancelled(Exception):
+    """
+    The leader of a flight was cancelled, its waiters elect a new one.
+    """
+
+
+@dataclass
+class SingleFlightStats:
+    """
+    :param executions: calls that ran the work.
+    :param shared: calls that got the result of another call.
+    :param overflow: calls that found the waiters of their key full.
+    """
+
+    executions: int = 0
+    shared: int = 0
+    overflow: int = 0
+
+    @property
+    def coalesced_ratio(self) -> float:
+        total = self.executions + self.shared
+        return self.shared / total if total else 0.0
+
+
+class _Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Share one execution among identical concurrent calls.
+
+    :param max_waiters: maximum calls waiting for one in-flight key,
+        unbounded if ``None``.
+    :param reject_overflow: raise :class:`SingleFlightOverflowError` for
+        calls beyond ``max_waiters``, by default they run on their own.
+    """
+
+    def __init__(
+        self,
+        max_waiters: T.Optional[int] = None,
+        reject_overflow: bool = False,
+    ):
+        self.max_waiters = max_waiters
+        self.reject_overflow = reject_overflow
+        self.stats = SingleFlightStats()
+        self._flights: dict[T.Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def _join(self, key: T.Hashable) -> tuple[T.Optional[_Flight], bool]:
+        """
+        :returns: the flight and whether the caller leads it, no flight if
+            the caller overflows and runs on its own.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.stats.executions += 1
+                return flight, True
+            if self.max_waiters is not None and flight.waiters >= self.max_waiters:
+                self.stats.overflow += 1
+                if self.reject_overflow:
+                    raise SingleFlightOverflowError(
+                        f"{flight.waiters} calls are already waiting for {key!r}"
+                    )
+                self.stats.executions += 1
+                return None, False
+            flight.waiters += 1
+            self.stats.shared += 1
+            return flight, False
+
+    def _leave(self, flight: _Flight) -> None:
+        # a waiter got its result, timed out or was cancelled
+        with self._lock:
+            flight.waiters -= 1
+
+    def _land(
+        self,
+        key: T.Hashable,
+        flight: _Flight,
+        result: T.Any = None,
+        error: T.Optional[BaseException] = None,
+    ) -> None:
+        # calls arriving from now on start a new flight
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is None:
+            flight.future.set_result(result)
+        else:
+            flight.future.set_exception(error)
+
+    def do(
+        self,
+        key: T.Hashable,
+        func: T.Callable[[], R],
+        timeout: T.Optional[float] = None,
+    ) -> R:
+        """
+        Call ``func``, or wait for the result of the in-flight call with the
+        same key.
+
+        :param timeout: seconds a waiter waits before giving up with
+            ``TimeoutError``.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if flight is None:
+                return func()
+            if not leader:
+                try:
+                    return flight.future.result(timeout)
+                except _LeaderCancelled:
+                    continue
+                finally:
+                    self._leave(flight)
+            try:
+                result = func()
+            except BaseException as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, result=result)
+            return result
+
+    async def do_async(
+        self,
+        key: T.Hashable,
+        func: T.Callable[[], T.Awaitable[R]],
+        timeout: T.Optional[float] = None,
+    ) -> R:
+        """
+        Async version of :meth:`do`, waiters of other threads and event
+        loops share the result too.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if flight is None:
+                return await func()
+            if not leader:
+                try:
+                    return await asyncio.wait_for(
+                        asyncio.shield(asyncio.wrap_future(flight.future)), timeout
+                    )
+                except _LeaderCancelled:
+                    continue
+                finally:
+                    self._leave(flight)
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                self._land(key, flight, error=_LeaderCancelled())
+                raise
+            except BaseException as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, result=result)
+            return result
+
+
+class CoalescingInvoker:
+    """
+    Invoke agents so that identical concurrent prompts share one run.
+
+    The leader of a prompt runs a fresh agent from ``agent_factory``, the
+    waiters get the same ``AgentResult``, don't modify it.
+
+    :param agent_factory: creates the agent of a run.
+    :param key: the key of a prompt, by default the hash of the prompt
+        with normalized whitespace.
+    :param flight: the :class:`SingleFlight`, by default a new one.
+    :param timeout: seconds a waiter waits for the shared run.
+    """
+
+    def __init__(
+        self,
+        agent_factory: T.Callable[[], "Agent"],
+        key: T.Callable[[str], T.Hashable] = prompt_key,
+        flight: T.Optional[SingleFlight] = None,
+        timeout: T.Optional[float] = None,
+    ):
+        self.agent_factory = agent_factory
+        self.key = key
+        self.flight = flight or SingleFlight()
+        self.timeout = timeout
+
+    def __call__(self, prompt: str) -> "AgentResult":
+        return self.flight.do(
+            self.key(prompt),
+            lambda: self.agent_factory()(prompt),
+            timeout=self.timeout,
+        )
+
+    async def invoke_async(self, prompt: str) -> "AgentResult":
+        return await self.flight.do_async(
+            self.key(prompt),
+            lambda: self.agent_factory().invoke_async(prompt),
+            timeout=self.timeout,
+        )
+
+
+class CoalescedTool(AgentTool):
+    """
+    A tool whose identical concurrent calls share one execution.
+
+    The waiters get the leader's result with their own ``toolUseId``. Only
+    the final result is shared: the intermediate stream events of the
+    wrapped tool are dropped, for the leader too, so a coalesced tool
+    doesn't stream progress to callback handlers. A tool that ends without
+    a result gives an error result to all of them.
+
+    :param tool: the wrapped tool.
+    :param flight: the shared :class:`SingleFlight`.
+    :param key: the key of a call from the tool name and input.
+    """
+
+    def __init__(
+        self,
+        tool: AgentTool,
+        flight: SingleFlight,
+        key: T.Callable[[str, T.Any], T.Hashable] = tool_input_key,
+    ):
+        super().__init__()
+        self.tool = tool
+        self.flight = flight
+        self.key = key
+
+    @property
+    def tool_name(self) -> str:
+        return self.tool.tool_name
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self.tool.tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return self.tool.tool_type
+
+    async def stream(
+        self,
+        tool_use: ToolUse,
+        invocation_state: dict[str, T.Any],
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[T.Any, None]:
+        async def run() -> ToolResult:
+            # the last event is the result, the events before are dropped
+            result = None
+            async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+                if isinstance(event, ToolResultEvent):
+                    return event.tool_result
+                result = event
+            if not isinstance(result, dict) or "status" not in result:
+                return {
+                    "toolUseId": tool_use["toolUseId"],
+                    "status": "error",
+                    "content": [{"text": f"Tool {self.tool_name} returned no result."}],
+                }
+            return result
+
+        result = await self.flight.do_async(
+            self.key(tool_use["name"], tool_use["input"]), run
+        )
+        yield {**result, "toolUseId": tool_use["toolUseId"]}
+
+
+class SingleFlightHook(HookProvider):
+    """
+    Coalesce identical concurrent calls of tools, of all agents that share
+    the :class:`SingleFlight`.
+
+    :param flight: the shared :class:`SingleFlight`.
+    :param tool_names: the tools to coalesce. Only list tools without side
+        effects, e.g. ``get_weather``, or ``http_request`` if the agent only
+        makes ``GET`` requests: two callers of a write would silently share
+        one execution.
+    :param key: the key of a call from the tool name and input.
+    """
+
+    def __init__(
+        self,
+        flight: SingleFlight,
+        tool_names: T.Iterable[str],
+        key: T.Callable[[str, T.Any], T.Hashable] = tool_input_key,
+    ):
+        self.flight = flight
+        self.tool_names = set(tool_names)
+        self.key = key
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.coalesce)
+
+    def coalesce(self, event: BeforeToolCallEvent) -> None:
+        tool = event.selected_tool
+        if tool is None or isinstance(tool, CoalescedTool):
+            return
+        if event.tool_use["name"] not in self.tool_names:
+            return
+        event.selected_tool = CoalescedTool(tool, self.flight, key=self.key)
@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+
+"""
+Typed streaming API with time-to-first-token metrics.
+
+``agent(query)`` only returns once every cycle is done, and
+``agent.stream_async`` yields loosely structured dicts. :func:`stream_agent`
+turns a run into an async generator of small typed events, so a frontend
+can start rendering at the first token::
+
+    async for event in stream_agent(agent, "What's the weather in Seattle?"):
+        if isinstance(event, TextDelta):
+            send_to_browser(event.text)
+        elif isinstance(event, StreamEnd):
+            print(event.timings.time_to_first_token)
+"""
+
+import typing as T
+import time
+import weakref
+import statistics
+from dataclasses import dataclass, field
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeModelCallEvent,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.agent.agent_result import AgentResult
+
+
+@dataclass
+class AgentStreamEvent:
+    """
+    Base class of all events yielded by :func:`stream_agent`.
+
+    :param cycle: the 1-based event loop cycle the event belongs to.
+    :param elapsed: seconds since the stream started.
+    """
+
+    cycle: int
+    elapsed: float
+
+
+@dataclass
+class TextDelta(AgentStreamEvent):
+    """
+    A fragment of the assistant's answer.
+    """
+
+    text: str = ""
+
+
+@dataclass
+class ThinkingDelta(AgentStreamEvent):
+    """
+    A fragment of model reasoning, either a native reasoning block or text
+    inside ``<thinking>...</thinking>`` tags as nova models emit it.
+    """
+
+    text: str = ""
+
+
+@dataclass
+class ToolStart(AgentStreamEvent):
+    """
+    A tool is about to be executed.
+    """
+
+    tool_use_id: str = ""
+    name: str = ""
+    input: T.Any = None
+
+
+@dataclass
+class ToolEnd(AgentStreamEvent):
+    """
+    A tool finished.
+
+    :param duration: execution time of the tool in seconds.
+    """
+
+    tool_use_id: str = ""
+    name: str = ""
+    status: str = ""
+    content: list[dict[str, T.Any]] = field(default_factory=list)
+    duration: float = 0.0
+
+
+@dataclass
+class CycleEnd(AgentStreamEvent):
+    """
+    An event loop cycle, one model call plus its tool calls, finished.
+
+    :param latency_ms: the ``latencyMs`` the model reported for this cycle.
+    :param time_to_first_token: seconds from the model call to its first
+        token, ``None`` if the model didn't stream any text.
+    """
+
+    stop_reason: str = ""
+    usage: dict[str, int] = field(default_factory=dict)
+    latency_ms: int = 0
+    time_to_first_token: T.Optional[float] = None
+
+
+@dataclass
+class StreamTimings:
+    """
+    Client side latency of a streamed run.
+
+    :param time_to_first_token: seconds from the start of the run to the
+        first text or thinking token.
+    :param inter_token_latencies: seconds between consecutive tokens of the
+        same model call.
+    :param cycle_time_to_first_token: time to first token of each model call.
+    :param model_latency_ms: the accumulated ``latencyMs`` reported by the model.
+    :param total_duration: seconds from the start to the end of the run.
+    """
+
+    time_to_first_token: T.Optional[float] = None
+    inter_token_latencies: list[float] = field(default_factory=list)
+    cycle_time_to_first_token: list[T.Optional[float]] = field(default_factory=list)
+    model_latency_ms: int = 0
+    total_duration: float = 0.0
+
+    @property
+    def mean_inter_token_latency(self) -> T.Optional[float]:
+        if not self.inter_token_latencies:
+            return None
+        return statistics.fmean(self.inter_token_latencies)
+
+    @property
+    def max_inter_token_latency(self) -> T.Optional[float]:
+        if not self.inter_token_latencies:
+            return None
+        return max(self.inter_token_latencies)
+
+    def inter_token_latency_percentile(self, percentile: float) -> T.Optional[float]:
+        """
+        Nearest-rank percentile of the inter-token latency, e.g. ``95``.
+        """
+        if not self.inter_token_latencies:
+            return None
+        values = sorted(self.inter_token_latencies)
+        index = max(0, min(len(values) - 1, round(percentile / 100 * len(values)) - 1))
+        return values[index]
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return {
+            "timeToFirstTokenMs": (
+                None
+                if self.time_to_first_token is None
+                else round(self.time_to_first_token * 1000, 3)
+            ),
+            "meanInterTokenLatencyMs": (
+                None
+                if self.mean_inter_token_latency is None
+                else round(self.mean_inter_token_latency * 1000, 3)
+            ),
+            "maxInterTokenLatencyMs": (
+                None
+                if self.max_inter_token_latency is None
+                else round(self.max_inter_token_latency * 1000, 3)
+            ),
+            "latencyMs": self.model_latency_ms,
+            "totalDurationMs": round(self.total_duration * 1000, 3),
+        }
+
+
+@dataclass
+class StreamEnd(AgentStreamEvent):
+    """
+    The run finished, this is always the last event.
+    """
+
+    result: T.Optional["AgentResult"] = None
+    timings: StreamTimings = field(default_factory=StreamTimings)
+
+
+THINKING_OPEN = "<thinking>"
+THINKING_CLOSE = "</thinking>"
+
+
+class ThinkingTagSplitter:
+    """
+    Incrementally split streamed text into answer and ``<thinking>`` parts.
+
+    Tags may be split across chunks, so a trailing fragment that could be the
+    beginning of a tag is held back until the next chunk arrives.
+    """
+
+    def __init__(self):
+        self.in_thinking = False
+        self._pending = ""
+
+    def feed(self, text: str) -> list[tuple[bool, str]]:
+        """
+        :returns: list of ``(is_thinking, text)`` pieces that are safe to emit.
+        """
+        buffer = self._pending + text
+        self._pending = ""
+        pieces: list[tuple[bool, str]] = []
+        while buffer:
+            tag = THINKING_CLOSE if self.in_thinking else THINKING_OPEN
+            index = buffer.find(tag)
+            if index >= 0:
+                if index:
+                    pieces.append((self.in_thinking, buffer[:index]))
+                buffer = buffer[index + len(tag) :]
+                self.in_thinking = not self.in_thinking
+                continue
+            keep = 0
+            for size in range(min(len(tag) - 1, len(buffer)), 0, -1):
+                if tag.startswith(buffer[-size:]):
+                    keep = size
+                    break
+            if len(buffer) > keep:
+                pieces.append((self.in_thinking, buffer[: len(buffer) - keep]))
+            self._pending = buffer[len(buffer) - keep :]
+            break
+        return pieces
+
+    def flush(self) -> list[tuple[bool, str]]:
+        """
+        Emit whatever is held back at the end of a content block.
+        """
+        pending, self._pending = self._pending, ""
+        return [(self.in_thinking, pending)] if pending else []
+
+
+class _ToolTimingHooks(HookProvider):
+    """
+    Collects precise model and tool timing while a stream is active.
+    """
+
+    def __init__(self):
+        self.stream: T.Optional["_StreamState"] = None
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeModelCallEvent, self.before_model)
+        registry.add_callback(BeforeToolCallEvent, self.before_tool)
+        registry.add_callback(AfterToolCallEvent, self.after_tool)
+
+    def before_model(self, event: BeforeModelCallEvent) -> None:
+        if self.stream is not None:
+            self.stream.model_call_started = time.perf_counter()
+            self.stream.last_token_at = None
+
+    def before_tool(self, event: BeforeToolCallEvent) -> None:
+        if self.stream is not None:
+            tool_use = event.tool_use
+            self.stream.tool_started[tool_use["toolUseId"]] = time.perf_counter()
+            self.stream.pending.append(
+                ToolStart(
+                    cycle=self.stream.cycle,
+                    elapsed=self.stream.elapsed(),
+                    tool_use_id=tool_use["toolUseId"],
+                    name=tool_use["name"],
+                    input=tool_use.get("input"),
+                )
+            )
+
+    def after_tool(self, event: AfterToolCallEvent) -> None:
+        if self.stream is not None:
+            tool_use = event.tool_use
+            started = self.stream.tool_started.pop(tool_use["toolUseId"], None)
+            now = time.perf_counter()
+            self.stream.pending.append(
+                ToolEnd(
+                    cycle=self.stream.cycle,
+                    elapsed=self.stream.elapsed(),
+                    tool_use_id=tool_use["toolUseId"],
+                    name=tool_use["name"],
+                    status=event.result.get("status", ""),
+                    content=event.result.get("content", []),
+                    duration=0.0 if started is None else now - started,
+                )
+            )
+
+
+class _StreamState:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.cycle = 0
+        self.pending: list[AgentStreamEvent] = []
+        self.tool_started: dict[str, float] = {}
+        self.model_call_started: T.Optional[float] = None
+        self.last_token_at: T.Optional[float] = None
+        self.cycle_ttft: T.Optional[float] = None
+        self.stop_reason = ""
+        self.usage: dict[str, int] = {}
+        self.latency_ms = 0
+        self.timings = StreamTimings()
+        self.splitter = ThinkingTagSplitter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def on_token(self) -> None:
+        now = time.perf_counter()
+        if self.timings.time_to_first_token is None:
+            self.timings.time_to_first_token = now - self.started
+        if self.last_token_at is None:
+            if self.model_call_started is not None:
+                self.cycle_ttft = now - self.model_call_started
+        else:
+            self.timings.inter_token_latencies.append(now - self.last_token_at)
+        self.last_token_at = now
+
+    def end_cycle(self) -> CycleEnd:
+        self.timings.cycle_time_to_first_token.append(self.cycle_ttft)
+        self.timings.model_latency_ms += self.latency_ms
+        return CycleEnd(
+            cycle=self.cycle,
+            elapsed=self.elapsed(),
+            stop_reason=self.stop_reason,
+            usage=self.usage,
+            latency_ms=self.latency_ms,
+            time_to_first_token=self.cycle_ttft,
+        )
+
+
+_timing_hooks: "weakref.WeakKeyDictionary[Agent, _ToolTimingHooks]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_timing_hooks(agent: "Agent") -> _ToolTimingHooks:
+    # hooks can't be removed from an agent, so register them only once
+    hooks = _timing_hooks.get(agent)
+    if hooks is None:
+        hooks = _ToolTimingHooks()
+        agent.hooks.add_hook(hooks)
+        _timing_hooks[agent] = hooks
+    return hooks
+
+
+def _split_text(state: _StreamState, pieces: list[tuple[bool, str]]):
+    for is_thinking, text in pieces:
+        cls = ThinkingDelta if is_thinking else TextDelta
+        yield cls(cycle=state.cycle, elapsed=state.elapsed(), text=text)
+
+
+async def stream_agent(
+    agent: "Agent",
+    prompt: T.Any = None,
+    **kwargs: T.Any,
+) -> T.AsyncGenerator[AgentStreamEvent, None]:
+    """
+    Run the agent and yield typed events as they arrive.
+
+    :param agent: the agent to run. An agent must not run two streams at
+        the same time.
+    :param prompt: anything ``agent.stream_async`` accepts.
+    :param kwargs: passed through to ``agent.stream_async``.
+
+    :returns: an async generator of :class:`TextDelta`,
+        :class:`ThinkingDelta`, :class:`ToolStart`, :class:`ToolEnd`,
+        :class:`CycleEnd` and finally :class:`StreamEnd`.
+    """
+    hooks = _get_timing_hooks(agent)
+    if hooks.stream is not None:
+        raise RuntimeError("the agent is already streaming")
+    state = _StreamState()
+    hooks.stream = state
+    result = None
+    waiting_for_tools = False
+    try:
+        async for event in agent.stream_async(prompt, **kwargs):
+            chunk = event.get("event")
+            if chunk is not None:
+                if "messageStart" in chunk:
+                    state.cycle += 1
+                    state.splitter = ThinkingTagSplitter()
+                    state.cycle_ttft = None
+                    state.usage = {}
+                    state.latency_ms = 0
+                elif "contentBlockStop" in chunk:
+                    for ev in _split_text(state, state.splitter.flush()):
+                        yield ev
+                elif "messageStop" in chunk:
+                    state.stop_reason = chunk["messageStop"].get("stopReason", "")
+                elif "metadata" in chunk:
+                    metadata = chunk["metadata"]
+                    state.usage = dict(metadata.get("usage", {}))
+                    state.latency_ms = metadata.get("metrics", {}).get("latencyMs", 0)
+            elif "data" in event:
+                state.on_token()
+                for ev in _split_text(state, state.splitter.feed(event["data"])):
+                    yield ev
+            elif "reasoningText" in event:
+                if event["reasoningText"]:
+                    state.on_token()
+                    yield ThinkingDelta(
+                        cycle=state.cycle,
+                        elapsed=state.elapsed(),
+                        text=event["reasoningText"],
+                    )
+            elif "message" in event:
+                message = event["message"]
+                if message["role"] == "assistant":
+                    waiting_for_tools = any(
+                        "toolUse" in block for block in message.get("content", [])
+                    )
+                    if not waiting_for_tools:
+                        yield state.end_cycle()
+                elif waiting_for_tools:
+                    for ev in state.pending:
+                        yield ev
+                    state.pending.clear()
+                    waiting_for_tools = False
+                    yield state.end_cycle()
+            elif "result" in event:
+                result = event["result"]
+            for ev in state.pending:
+                yield ev
+            state.pending.clear()
+    finally:
+        hooks.stream = None
+    state.timings.total_duration = state.elapsed()
+    yield StreamEnd(
+        cycle=state.cycle,
+        elapsed=state.elapsed(),
+        result=result,
+        timings=state.timings,
+    )
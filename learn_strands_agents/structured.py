@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+
+"""
+Structured responses straight into pydantic models, without a prose cycle.
+
+The weather example defines pydantic input and output models, but the agent
+still ends with a free text answer, and ``agent.structured_output`` then
+costs yet another model call to turn it into data. Machine-to-machine callers
+don't need the prose:
+
+- :func:`invoke_structured` offers the output model to the agent as one more
+  tool. The model calls its regular tools and then the output tool, instead
+  of writing a final text answer, and the event loop stops right there;
+- :func:`stream_structured` asks a model directly, in a single call, with
+  the output tool forced;
+- :class:`IncrementalJsonParser` parses the tool input while it streams,
+  every top level field is validated against the model as soon as its value
+  is complete, and the typed result is available as soon as the object
+  closes.
+
+Example::
+
+    result = run_structured(agent, GetForecastOutput, "Weather in Seattle?")
+    result.output.periods[0].temperature
+"""
+
+import typing as T
+import json
+import time
+import asyncio
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from strands.types.tools import AgentTool, ToolSpec, ToolUse
+from strands.tools.structured_output import convert_pydantic_to_tool_spec
+
+from .cancellation import close_conversation
+from .result_store import _MetricsMark, metrics_since
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.models.model import Model
+    from strands.types.content import Messages
+
+M = T.TypeVar("M", bound=BaseModel)
+
+
+class StructuredOutputError(ValueError):
+    """
+    The response is not valid for the output model.
+
+    :param field: the top level field that failed, ``None`` for the whole
+        object.
+    """
+
+    def __init__(self, message: str, field: T.Optional[str] = None):
+        super().__init__(message)
+        self.field = field
+
+
+class IncrementalJsonParser:
+    """
+    Parse the JSON text of one object while it arrives in chunks.
+
+    Text before the opening ``{``, like prose or a Markdown fence, is
+    skipped. :meth:`feed` returns the top level fields completed by a chunk,
+    :attr:`value` is the object once it closed.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start: T.Optional[int] = None
+        self._key: T.Optional[str] = None
+        self._value_start: T.Optional[int] = None
+        self.start: T.Optional[int] = None
+        self.end: T.Optional[int] = None
+        self.fields: dict[str, T.Any] = {}
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    @property
+    def value(self) -> T.Optional[dict[str, T.Any]]:
+        return self.fields if self.done else None
+
+    @property
+    def text(self) -> str:
+        """
+        The JSON text of the object, so far.
+        """
+        if self.start is None:
+            return ""
+        return self._text[self.start : self.end]
+
+    def _complete_field(self, end: int) -> tuple[str, T.Any]:
+        raw = self._text[self._value_start : end]
+        try:
+            value = json.loads(raw)
+        except ValueError as e:
+            raise StructuredOutputError(f"invalid JSON of {self._key!r}: {e}", self._key)
+        name = self._key
+        self.fields[name] = value
+        self._key = None
+        self._value_start = None
+        return name, value
+
+    def feed(self, chunk: str) -> list[tuple[str, T.Any]]:
+        """
+        :returns: ``(name, value)`` of the top level fields that completed.
+        """
+        if self.done:
+            return []
+        self._text += chunk
+        text = self._text
+        completed = []
+        i = self._pos
+        while i < len(text):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        self._key = json.loads(text[self._key_start : i + 1])
+                        self._key_start = None
+            elif self.start is None:
+                if char == "{":
+                    self.start = i
+                    self._depth = 1
+            elif char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._value_start is not None:
+                        completed.append(self._complete_field(i))
+                    self.end = i + 1
+                    i += 1
+                    break
+            elif self._depth == 1:
+                if char == ":":
+                    self._value_start = i + 1
+                elif char == "," and self._value_start is not None:
+                    completed.append(self._complete_field(i))
+            i += 1
+        self._pos = i
+        return completed
+
+
+@dataclass
+class FieldEvent:
+    """
+    A validated top level field of the response.
+
+    :param elapsed: seconds since the request started.
+    """
+
+    name: str
+    value: T.Any
+    elapsed: float
+
+
+@dataclass
+class StructuredResult(T.Generic[M]):
+    """
+    :param output: the validated output model.
+    :param elapsed: seconds until the object closed.
+    :param usage: token usage of this call, filled in once the model stream
+        ended.
+    :param cycle_count: event loop cycles of this call.
+    """
+
+    output: M
+    elapsed: float
+    usage: dict[str, int] = field(default_factory=dict)
+    cycle_count: int = 1
+
+
+class StructuredParser(T.Generic[M]):
+    """
+    Validate a streamed response against an output model, field by field.
+
+    :param output_model: the pydantic model to fill.
+    """
+
+    def __init__(self, output_model: T.Type[M]):
+        self.output_model = output_model
+        self.parser = IncrementalJsonParser()
+        self.output: T.Optional[M] = None
+        self._adapters = {
+            name: TypeAdapter(T.Annotated[(info.annotation, *info.metadata)])
+            if info.metadata
+            else TypeAdapter(info.annotation)
+            for name, info in output_model.model_fields.items()
+        }
+        self._aliases = {
+            info.alias: name
+            for name, info in output_model.model_fields.items()
+            if info.alias
+        }
+
+    @property
+    def done(self) -> bool:
+        return self.output is not None
+
+    def feed(self, chunk: str) -> list[tuple[str, T.Any]]:
+        """
+        :returns: ``(name, value)`` of the fields that completed and are
+            valid.
+        :raises StructuredOutputError: as soon as a field or the closed
+            object is invalid.
+        """
+        completed = []
+        for name, value in self.parser.feed(chunk):
+            name = self._aliases.get(name, name)
+            adapter = self._adapters.get(name)
+            if adapter is not None:
+                try:
+                    value = adapter.validate_python(value)
+                except ValidationError as e:
+                    raise StructuredOutputError(f"invalid {name!r}: {e}", name) from e
+            completed.append((name, value))
+        if self.parser.done:
+            self.output = self.validate(self.parser.value)
+        return completed
+
+    def validate(self, value: T.Any) -> M:
+        try:
+            return self.output_model.model_validate(value)
+        except ValidationError as e:
+            raise StructuredOutputError(str(e)) from e
+
+
+def _messages(prompt: T.Union[str, "Messages"]) -> "Messages":
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": [{"text": prompt}]}]
+    return prompt
+
+
+def _tool_input_delta(event: dict[str, T.Any]) -> T.Optional[str]:
+    delta = event.get("contentBlockDelta", {}).get("delta", {})
+    if "toolUse" in delta:
+        return delta["toolUse"].get("input", "")
+    return None
+
+
+async def stream_structured(
+    model: "Model",
+    output_model: T.Type[M],
+    prompt: T.Union[str, "Messages"],
+    system_prompt: T.Optional[str] = None,
+) -> T.AsyncIterator[T.Union[FieldEvent, StructuredResult[M]]]:
+    """
+    Ask a model to fill ``output_model`` in one call, with the output tool
+    forced.
+
+    Yields a :class:`FieldEvent` per validated field and the
+    :class:`StructuredResult` as soon as the object closed. Keep iterating
+    to get ``usage`` filled in, or stop to close the stream early.
+
+    :raises StructuredOutputError: if the response doesn't validate.
+    """
+    tool_spec = convert_pydantic_to_tool_spec(output_model)
+    parser = StructuredParser(output_model)
+    start = time.perf_counter()
+    result = None
+    usage = {}
+    stream = model.stream(
+        _messages(prompt),
+        [tool_spec],
+        system_prompt,
+        tool_choice={"tool": {"name": tool_spec["name"]}},
+    )
+    try:
+        async for event in stream:
+            chunk = _tool_input_delta(event)
+            if chunk is not None and not parser.done:
+                for name, value in parser.feed(chunk):
+                    yield FieldEvent(name, value, time.perf_counter() - start)
+                if parser.done:
+                    result = StructuredResult(
+                        output=parser.output,
+                        elapsed=time.perf_counter() - start,
+                    )
+                    yield result
+            if "metadata" in event:
+                usage = dict(event["metadata"].get("usage", {}))
+                if result is not None:
+                    result.usage = usage
+    finally:
+        await stream.aclose()
+    if result is None:
+        raise StructuredOutputError(f"the model didn't return a {output_model.__name__}")
+
+
+async def structured_output_async(
+    model: "Model",
+    output_model: T.Type[M],
+    prompt: T.Union[str, "Messages"],
+    system_prompt: T.Optional[str] = None,
+) -> StructuredResult[M]:
+    """
+    The :class:`StructuredResult` of :func:`stream_structured`.
+    """
+    result = None
+    async for event in stream_structured(model, output_model, prompt, system_prompt):
+        if isinstance(event, StructuredResult):
+            result = event
+    return result
+
+
+class StructuredOutputTool(AgentTool):
+    """
+    The output model offered to an agent as a tool. Calling it records the
+    validated output and ends the event loop.
+
+    :param output_model: the pydantic model to fill.
+    """
+
+    def __init__(self, output_model: T.Type[BaseModel]):
+        super().__init__()
+        self.output_model = output_model
+        self._tool_spec = convert_pydantic_to_tool_spec(output_model)
+        self.output: T.Optional[BaseModel] = None
+
+    @property
+    def tool_name(self) -> str:
+        return self._tool_spec["name"]
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self._tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return "structured_output"
+
+    async def stream(
+        self,
+        tool_use: ToolUse,
+        invocation_state: dict[str, T.Any],
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[T.Any, None]:
+        try:
+            self.output = self.output_model.model_validate(tool_use["input"])
+        except ValidationError as e:
+            # the model gets the errors and another try
+            yield {
+                "toolUseId": tool_use["toolUseId"],
+                "status": "error",
+                "content": [{"text": f"Invalid {self.tool_name}: {e}"}],
+            }
+            return
+        invocation_state.setdefault("request_state", {})["stop_event_loop"] = True
+        yield {
+            "toolUseId": tool_use["toolUseId"],
+            "status": "success",
+            "content": [{"text": f"{self.tool_name} recorded."}],
+        }
+
+
+STRUCTURED_PROMPT = (
+    "\n\nWhen you have the answer, call the {name} tool with it "
+    "instead of answering in text."
+)
+
+
+async def invoke_structured(
+    agent: "Agent",
+    output_model: T.Type[M],
+    prompt: str,
+    on_field: T.Optional[T.Callable[[FieldEvent], None]] = None,
+) -> StructuredResult[M]:
+    """
+    Run an agent with its tools, and get the answer as ``output_model``
+    instead of text, in the same cycle that would have written the text.
+
+    The output tool is only registered for this call, the instruction to use
+    it is added to the prompt, not the system prompt, so the cached prompt
+    prefix stays the same.
+
+    :param on_field: called with each validated field while the answer
+        streams.
+    :raises StructuredOutputError: if the agent answered without the tool.
+    """
+    tool = StructuredOutputTool(output_model)
+    registry = agent.tool_registry
+    registry.register_tool(tool)
+    parser: T.Optional[StructuredParser] = None
+    # the agent metrics are cumulative, only this call is reported
+    mark = _MetricsMark.of(agent.event_loop_metrics)
+    start = time.perf_counter()
+    elapsed = None
+    try:
+        async for event in agent.stream_async(
+            prompt + STRUCTURED_PROMPT.format(name=tool.tool_name)
+        ):
+            chunk = event.get("event") if isinstance(event, dict) else None
+            if not chunk:
+                continue
+            tool_start = chunk.get("contentBlockStart", {}).get("start", {}).get("toolUse")
+            if tool_start is not None:
+                is_output = tool_start.get("name") == tool.tool_name
+                parser = StructuredParser(output_model) if is_output else None
+                continue
+            delta = _tool_input_delta(chunk)
+            if delta is None or parser is None or parser.done:
+                continue
+            try:
+                fields = parser.feed(delta)
+            except StructuredOutputError:
+                # the tool reports the errors to the model, which retries
+                parser = None
+                continue
+            if on_field is not None:
+                for name, value in fields:
+                    on_field(FieldEvent(name, value, time.perf_counter() - start))
+            if parser.done:
+                elapsed = time.perf_counter() - start
+    finally:
+        registry.registry.pop(tool.tool_name, None)
+        registry.dynamic_tools.pop(tool.tool_name, None)
+    if tool.output is None:
+        raise StructuredOutputError(
+            f"the agent answered without calling {tool.tool_name}"
+        )
+    # the assistant turn ends with the data, so the conversation can go on
+    close_conversation(agent.messages, "", tool.output.model_dump_json())
+    metrics = metrics_since(agent.event_loop_metrics, mark)
+    return StructuredResult(
+        output=tool.output,
+        elapsed=elapsed if elapsed is not None else time.perf_counter() - start,
+        usage=dict(metrics.accumulated_usage),
+        cycle_count=metrics.cycle_count,
+    )
+
+
+def run_structured(
+    agent: "Agent",
+    output_model: T.Type[M],
+    prompt: str,
+    on_field: T.Optional[T.Callable[[FieldEvent], None]] = None,
+) -> StructuredResult[M]:
+    """
+    Sync version of :func:`invoke_structured`.
+    """
+    return asyncio.run(invoke_structured(agent, output_model, prompt, on_field=on_field))
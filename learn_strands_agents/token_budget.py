@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fast local token estimation and a prompt budget pre-flight check.
+
+Bedrock only reports token usage after the fact, via
+``result.metrics.accumulated_usage``, and a context overflow is only found
+out when Bedrock rejects the call. :class:`TokenEstimator` estimates the size
+of a request locally in microseconds. :class:`PromptBudgetHook` runs that
+estimate right before every model call and truncates, compacts or reroutes
+the request, or fails fast with :class:`PromptBudgetExceededError`.
+"""
+
+import typing as T
+import json
+import math
+import dataclasses
+from dataclasses import dataclass
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeModelCallEvent,
+    AfterInvocationEvent,
+)
+from strands.types.content import Message, Messages
+from strands.types.tools import ToolSpec
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.models.model import Model
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """
+    Token calibration and limits of a model family.
+
+    Token count is estimated as ``chars / chars_per_token`` plus fixed
+    overheads, which is accurate enough for a budget check and orders of
+    magnitude cheaper than running a real tokenizer.
+
+    :param family: name of the model family, e.g. ``amazon.nova``.
+    :param model_id_patterns: substrings of the model id that select this profile.
+    :param chars_per_token: average characters per token.
+    :param message_overhead: tokens added per message for role markers.
+    :param request_overhead: tokens added once per request.
+    :param tool_overhead: tokens added once per request when tools are attached,
+        for the tool use instructions the provider injects.
+    :param context_window: maximum input + output tokens.
+    :param max_output_tokens: output tokens reserved out of the context window.
+    """
+
+    family: str
+    model_id_patterns: tuple[str, ...]
+    chars_per_token: float
+    message_overhead: int
+    request_overhead: int
+    tool_overhead: int
+    context_window: int
+    max_output_tokens: int
+
+    @property
+    def input_budget(self) -> int:
+        """
+        Maximum number of input tokens for a single request.
+        """
+        return self.context_window - self.max_output_tokens
+
+
+# Calibrated against the recorded usage in the example transcripts
+# (``docs/source/01-Learn-Strands-Agents``):
+#
+# - research analyst call: 2358 chars -> 466 input tokens
+# - research writer call: 2678 chars -> 509 input tokens
+# - get_weather, two cycles with one tool: 1181 input tokens, ~400 of them
+#   per call are the tool use instructions nova injects.
+NOVA_MICRO = ModelProfile(
+    family="amazon.nova",
+    model_id_patterns=("nova-micro",),
+    chars_per_token=5.0,
+    message_overhead=4,
+    request_overhead=10,
+    tool_overhead=400,
+    context_window=128_000,
+    max_output_tokens=5_000,
+)
+NOVA_LITE = dataclasses.replace(
+    NOVA_MICRO,
+    model_id_patterns=("nova-lite",),
+    context_window=300_000,
+)
+NOVA_PRO = dataclasses.replace(
+    NOVA_MICRO,
+    model_id_patterns=("nova-pro", "nova-premier"),
+    context_window=300_000,
+)
+CLAUDE = ModelProfile(
+    family="anthropic.claude",
+    model_id_patterns=("anthropic.claude",),
+    chars_per_token=3.5,
+    message_overhead=4,
+    request_overhead=10,
+    tool_overhead=300,
+    context_window=200_000,
+    max_output_tokens=8_192,
+)
+DEFAULT = ModelProfile(
+    family="default",
+    model_id_patterns=(),
+    chars_per_token=4.0,
+    message_overhead=4,
+    request_overhead=10,
+    tool_overhead=300,
+    context_window=128_000,
+    max_output_tokens=4_096,
+)
+
+PROFILES: list[ModelProfile] = [
+    NOVA_MICRO,
+    NOVA_LITE,
+    NOVA_PRO,
+    CLAUDE,
+]
+
+
+def get_profile(
+    model_id: T.Optional[str],
+) -> ModelProfile:
+    """
+    Find the :class:`ModelProfile` of a model id, falls back to
+    :data:`DEFAULT`.
+    """
+    if model_id:
+        for profile in PROFILES:
+            for pattern in profile.model_id_patterns:
+                if pattern in model_id:
+                    return profile
+    return DEFAULT
+
+
+def get_model_id(
+    model: "Model",
+) -> T.Optional[str]:
+    """
+    Get the model id of a Strands model provider, if it has one.
+    """
+    config = getattr(model, "config", None)
+    if isinstance(config, dict):
+        return config.get("model_id")
+    return None
+
+
+def fit_profile(
+    profile: ModelProfile,
+    samples: T.Iterable[tuple[int, int]],
+) -> ModelProfile:
+    """
+    Re-calibrate ``chars_per_token`` and ``request_overhead`` from recorded
+    usage with a least squares fit.
+
+    :param profile: the profile to start from.
+    :param samples: ``(n_chars, observed_input_tokens)`` pairs, e.g. the
+        request size and ``accumulated_usage["inputTokens"]`` of past calls.
+    """
+    samples = list(samples)
+    if len(samples) < 2:
+        raise ValueError("at least two samples are required")
+    n = len(samples)
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+    if var_x == 0:
+        raise ValueError("samples must have different sizes")
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x
+    if slope <= 0:
+        raise ValueError("samples don't show token count growing with size")
+    intercept = mean_y - slope * mean_x
+    return dataclasses.replace(
+        profile,
+        chars_per_token=1 / slope,
+        request_overhead=max(0, round(intercept)),
+    )
+
+
+def _block_chars(block: dict[str, T.Any]) -> int:
+    if "text" in block:
+        return len(block["text"])
+    if "toolUse" in block:
+        tool_use = block["toolUse"]
+        return len(tool_use.get("name", "")) + len(
+            json.dumps(tool_use.get("input", {}), ensure_ascii=False, default=str)
+        )
+    if "toolResult" in block:
+        return sum(
+            _block_chars(sub_block)
+            for sub_block in block["toolResult"].get("content", [])
+        )
+    if "json" in block:
+        return len(json.dumps(block["json"], ensure_ascii=False, default=str))
+    if "reasoningContent" in block:
+        return len(
+            block["reasoningContent"].get("reasoningText", {}).get("text", "")
+        )
+    if "image" in block or "document" in block or "video" in block:
+        # binary payloads are billed by the provider in their own way,
+        # count them as a fixed, conservative size
+        return 6_000
+    return 0
+
+
+class TokenEstimator:
+    """
+    Estimate the number of input tokens of a model request.
+
+    :param profile: calibration to use, see :func:`get_profile`.
+    """
+
+    def __init__(
+        self,
+        profile: ModelProfile = DEFAULT,
+    ):
+        self.profile = profile
+
+    @classmethod
+    def for_model_id(
+        cls,
+        model_id: T.Optional[str],
+    ) -> "TokenEstimator":
+        return cls(profile=get_profile(model_id))
+
+    def chars_to_tokens(self, n_chars: int) -> int:
+        return math.ceil(n_chars / self.profile.chars_per_token)
+
+    def estimate_text(self, text: str) -> int:
+        return self.chars_to_tokens(len(text))
+
+    def estimate_block(self, block: dict[str, T.Any]) -> int:
+        return self.chars_to_tokens(_block_chars(block))
+
+    def estimate_message(self, message: Message) -> int:
+        n_chars = sum(_block_chars(block) for block in message.get("content", []))
+        return self.chars_to_tokens(n_chars) + self.profile.message_overhead
+
+    def estimate_tool_specs(self, tool_specs: T.Optional[list[ToolSpec]]) -> int:
+        if not tool_specs:
+            return 0
+        n_chars = len(json.dumps(tool_specs, ensure_ascii=False, default=str))
+        return self.chars_to_tokens(n_chars) + self.profile.tool_overhead
+
+    def estimate_request(
+        self,
+        messages: Messages,
+        system_prompt: T.Optional[str] = None,
+        tool_specs: T.Optional[list[ToolSpec]] = None,
+    ) -> int:
+        """
+        Estimate the input tokens of a full model request.
+        """
+        total = self.profile.request_overhead
+        if system_prompt:
+            total += self.estimate_text(system_prompt)
+        total += self.estimate_tool_specs(tool_specs)
+        total += sum(self.estimate_message(message) for message in messages)
+        return total
+
+
+class PromptBudgetExceededError(Exception):
+    """
+    Raised by :class:`PromptBudgetHook` when a request is still over budget
+    after all strategies were tried.
+    """
+
+    def __init__(
+        self,
+        estimated_tokens: int,
+        budget: int,
+        model_id: T.Optional[str] = None,
+    ):
+        self.estimated_tokens = estimated_tokens
+        self.budget = budget
+        self.model_id = model_id
+        super().__init__(
+            f"estimated {estimated_tokens} input tokens exceeds the budget "
+            f"of {budget} tokens for model {model_id!r}"
+        )
+
+
+@dataclass
+class PreflightReport:
+    """
+    What the pre-flight check did to the last model request.
+
+    :param model_id: the model the request was sent to.
+    :param budget: the input token budget.
+    :param estimated_tokens: estimate before any strategy was applied.
+    :param final_tokens: estimate after the strategies were applied.
+    :param applied: names of the strategies that changed the request.
+    """
+
+    model_id: T.Optional[str]
+    budget: int
+    estimated_tokens: int
+    final_tokens: int
+    applied: list[str] = dataclasses.field(default_factory=list)
+
+
+TRUNCATE = "truncate"
+COMPACT = "compact"
+REROUTE = "reroute"
+
+
+def _is_tool_result_message(message: Message) -> bool:
+    return any("toolResult" in block for block in message.get("content", []))
+
+
+class PromptBudgetHook(HookProvider):
+    """
+    Pre-flight check that keeps every model request under its token budget.
+
+    Before each model call the request is estimated with a
+    :class:`TokenEstimator`. If it is over budget, the strategies are tried
+    in order until it fits:
+
+    - ``truncate``: shorten the largest ``toolResult`` texts in the history
+      to ``max_tool_result_chars``.
+    - ``compact``: drop the oldest turns, keeping the latest user message and
+      never splitting a ``toolUse`` from its ``toolResult``.
+    - ``reroute``: send this invocation to ``fallback_model``, which is
+      expected to have a larger context window. The original model is
+      restored after the invocation.
+
+    If the request still doesn't fit, :class:`PromptBudgetExceededError` is
+    raised before anything is sent to Bedrock.
+
+    Example::
+
+        agent = strands.Agent(
+            model=model,
+            hooks=[PromptBudgetHook(strategies=("truncate", "compact"))],
+        )
+
+    :param budget: input token budget, by default the model profile's
+        :attr:`ModelProfile.input_budget`.
+    :param strategies: names of the strategies to try, in order.
+    :param max_tool_result_chars: size a tool result text is truncated to.
+    :param fallback_model: model to reroute to.
+    :param profile: calibration to use, by default detected from the model id.
+    """
+
+    def __init__(
+        self,
+        budget: T.Optional[int] = None,
+        strategies: T.Sequence[str] = (TRUNCATE, COMPACT),
+        max_tool_result_chars: int = 20_000,
+        fallback_model: T.Optional["Model"] = None,
+        profile: T.Optional[ModelProfile] = None,
+    ):
+        for strategy in strategies:
+            if strategy not in (TRUNCATE, COMPACT, REROUTE):
+                raise ValueError(f"unknown strategy: {strategy!r}")
+        if REROUTE in strategies and fallback_model is None:
+            raise ValueError("'reroute' strategy requires a fallback_model")
+        self.budget = budget
+        self.strategies = tuple(strategies)
+        self.max_tool_result_chars = max_tool_result_chars
+        self.fallback_model = fallback_model
+        self.profile = profile
+        self.last_report: T.Optional[PreflightReport] = None
+        self._original_models: dict[int, "Model"] = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeModelCallEvent, self.check)
+        registry.add_callback(AfterInvocationEvent, self.restore_model)
+
+    def _estimator(self, model: "Model") -> TokenEstimator:
+        if self.profile is not None:
+            return TokenEstimator(self.profile)
+        return TokenEstimator.for_model_id(get_model_id(model))
+
+    def _budget(self, estimator: TokenEstimator) -> int:
+        if self.budget is not None:
+            return self.budget
+        return estimator.profile.input_budget
+
+    def _estimate(self, agent: "Agent", estimator: TokenEstimator) -> int:
+        return estimator.estimate_request(
+            messages=agent.messages,
+            system_prompt=agent.system_prompt,
+            tool_specs=agent.tool_registry.get_all_tool_specs(),
+        )
+
+    def check(self, event: BeforeModelCallEvent) -> None:
+        agent = event.agent
+        estimator = self._estimator(agent.model)
+        budget = self._budget(estimator)
+        estimated = self._estimate(agent, estimator)
+        report = PreflightReport(
+            model_id=get_model_id(agent.model),
+            budget=budget,
+            estimated_tokens=estimated,
+            final_tokens=estimated,
+        )
+        self.last_report = report
+        for strategy in self.strategies:
+            if report.final_tokens <= budget:
+                return
+            if strategy == TRUNCATE:
+                changed = self.truncate(agent.messages)
+            elif strategy == COMPACT:
+                changed = self.compact(agent, estimator, budget)
+            else:
+                changed = self.reroute(agent)
+                if changed:
+                    estimator = self._estimator(agent.model)
+                    budget = self._budget(estimator)
+                    report.model_id = get_model_id(agent.model)
+                    report.budget = budget
+            if changed:
+                report.applied.append(strategy)
+                report.final_tokens = self._estimate(agent, estimator)
+        if report.final_tokens > budget:
+            raise PromptBudgetExceededError(
+                estimated_tokens=report.final_tokens,
+                budget=budget,
+                model_id=report.model_id,
+            )
+
+    def truncate(self, messages: Messages) -> bool:
+        """
+        Truncate oversized tool result texts in place.
+        """
+        changed = False
+        limit = self.max_tool_result_chars
+        for message in messages:
+            for block in message.get("content", []):
+                if "toolResult" not in block:
+                    continue
+                for sub_block in block["toolResult"].get("content", []):
+                    text = sub_block.get("text")
+                    if text is not None and len(text) > limit:
+                        sub_block["text"] = (
+                            text[:limit]
+                            + f"\n... [truncated {len(text) - limit} chars]"
+                        )
+                        changed = True
+        return changed
+
+    def compact(
+        self,
+        agent: "Agent",
+        estimator: TokenEstimator,
+        budget: int,
+    ) -> bool:
+        """
+        Drop the oldest turns until the request fits the budget.
+
+        The history is only cut right before a plain user message, so a
+        ``toolResult`` never loses its ``toolUse``, and the latest turn is
+        never dropped.
+        """
+        messages = agent.messages
+        cut_points = [
+            i
+            for i, message in enumerate(messages)
+            if i > 0
+            and message["role"] == "user"
+            and not _is_tool_result_message(message)
+        ]
+        if not cut_points:
+            return False
+        fixed = (
+            estimator.profile.request_overhead
+            + (estimator.estimate_text(agent.system_prompt) if agent.system_prompt else 0)
+            + estimator.estimate_tool_specs(agent.tool_registry.get_all_tool_specs())
+        )
+        sizes = [estimator.estimate_message(message) for message in messages]
+        cut = cut_points[-1]
+        for i in cut_points:
+            if fixed + sum(sizes[i:]) <= budget:
+                cut = i
+                break
+        del messages[:cut]
+        return True
+
+    def reroute(self, agent: "Agent") -> bool:
+        """
+        Switch the agent to the fallback model for this invocation.
+        """
+        if self.fallback_model is None or agent.model is self.fallback_model:
+            return False
+        self._original_models.setdefault(id(agent), agent.model)
+        agent.model = self.fallback_model
+        return True
+
+    def restore_model(self, event: AfterInvocationEvent) -> None:
+        original = self._original_models.pop(id(event.agent), None)
+        if original is not None:
+            event.agent.model = original
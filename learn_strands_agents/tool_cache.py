@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+"""
+SQLite backed caches that can be shared by several processes.
+
+:class:`SqliteCache` is a small key value store in a single SQLite file in
+WAL mode, so concurrent readers never block and writers only block each
+other briefly. On top of it:
+
+- :class:`ToolResultCacheHook` serves repeated tool calls with the same
+  input from the cache instead of running the tool again;
+- :class:`SessionStore` persists conversation histories, so any worker can
+  continue any session.
+"""
+
+import typing as T
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+from strands.types.content import Messages
+from strands.types.tools import AgentTool, ToolResult, ToolSpec, ToolUse
+
+from .paths import path_enum
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+
+
+class SqliteCache:
+    """
+    A JSON key value store with optional expiry, grouped by namespace.
+
+    Safe to use from several threads and processes, each thread of each
+    process uses its own connection, also after a fork.
+
+    :param path: the database file, by default ``${dir_tmp}/cache.sqlite``.
+    :param timeout: seconds to wait for a lock held by another writer.
+    """
+
+    def __init__(
+        self,
+        path: T.Optional[Path] = None,
+        timeout: float = 30.0,
+    ):
+        self.path = Path(path) if path else path_enum.dir_tmp / "cache.sqlite"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        def connect() -> sqlite3.Connection:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            return conn
+
+        conn = path_enum.in_dir(self.path.parent, connect, errors=(sqlite3.OperationalError,))
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "value TEXT NOT NULL, "
+            "expires_at REAL, "
+            "PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(
+        self,
+        namespace: str,
+        key: str,
+        default: T.Any = None,
+    ) -> T.Any:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            )
+            .fetchone()
+        )
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: T.Any,
+        ttl: T.Optional[float] = None,
+    ) -> None:
+        """
+        :param ttl: seconds until the entry expires, ``None`` means never.
+        """
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                namespace,
+                key,
+                json.dumps(value, ensure_ascii=False, default=str),
+                time.time() + ttl if ttl is not None else None,
+            ),
+        )
+
+    def delete(
+        self,
+        namespace: str,
+        key: str,
+    ) -> bool:
+        cursor = self._connect().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        )
+        return cursor.rowcount > 0
+
+    def items(
+        self,
+        namespace: str,
+    ) -> T.Iterator[tuple[str, T.Any]]:
+        """
+        Iterate over the entries of a namespace that didn't expire.
+        """
+        rows = self._connect().execute(
+            "SELECT key, value FROM cache "
+            "WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, time.time()),
+        )
+        for key, value in rows.fetchall():
+            yield key, json.loads(value)
+
+    def purge_expired(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM cache WHERE expires_at < ?",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    def clear(
+        self,
+        namespace: T.Optional[str] = None,
+    ) -> None:
+        if namespace is None:
+            self._connect().execute("DELETE FROM cache")
+        else:
+            self._connect().execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+class StaticResultTool(AgentTool):
+    """
+    A tool that returns a result known in advance, used by hooks to answer
+    a tool call without running the real tool.
+
+    :param tool_spec: spec of the tool it stands in for.
+    :param result: the result to return, its ``toolUseId`` is replaced by
+        the one of the call.
+    """
+
+    def __init__(
+        self,
+        tool_spec: ToolSpec,
+        result: ToolResult,
+    ):
+        super().__init__()
+        self._tool_spec = tool_spec
+        self.result = result
+
+    @property
+    def tool_name(self) -> str:
+        return self._tool_spec["name"]
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self._tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return "static"
+
+    async def stream(
+        self,
+        tool_use: ToolUse,
+        invocation_state: dict[str, T.Any],
+        **kwargs: T.Any,
+    ) -> T.AsyncGenerator[T.Any, None]:
+        yield {**self.result, "toolUseId": tool_use["toolUseId"]}
+
+
+def tool_input_key(
+    name: str,
+    input: T.Any,
+) -> str:
+    payload = json.dumps(
+        {"name": name, "input": input},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolResultCacheHook(HookProvider):
+    """
+    Cache successful tool results by tool name and input.
+
+    Example::
+
+        cache = SqliteCache()
+        agent = strands.Agent(
+            model=model,
+            tools=[get_weather],
+            hooks=[ToolResultCacheHook(cache, tool_names=["get_weather"], ttl=600)],
+        )
+
+    :param cache: where results are stored, may be shared by processes.
+    :param tool_names: the tools to cache. Only list tools without side
+        effects, e.g. ``get_weather``, not ``http_request``: a cached result
+        is shared by all agents and processes of the cache.
+    :param ttl: seconds until a cached result expires.
+    """
+
+    namespace = "tool_result"
+
+    def __init__(
+        self,
+        cache: SqliteCache,
+        tool_names: T.Iterable[str],
+        ttl: T.Optional[float] = 300.0,
+    ):
+        self.cache = cache
+        self.tool_names = set(tool_names)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.before_tool_call)
+        registry.add_callback(AfterToolCallEvent, self.after_tool_call)
+
+    def _cacheable(self, name: str) -> bool:
+        return name in self.tool_names
+
+    def before_tool_call(self, event: BeforeToolCallEvent) -> None:
+        name = event.tool_use["name"]
+        if event.selected_tool is None or not self._cacheable(name):
+            return
+        result = self.cache.get(
+            self.namespace, tool_input_key(name, event.tool_use["input"])
+        )
+        if result is None:
+            self.misses += 1
+            return
+        self.hits += 1
+        event.selected_tool = StaticResultTool(event.selected_tool.tool_spec, result)
+
+    def after_tool_call(self, event: AfterToolCallEvent) -> None:
+        name = event.tool_use["name"]
+        if (
+            not self._cacheable(name)
+            or isinstance(event.selected_tool, StaticResultTool)
+            or event.exception is not None
+            or event.result.get("status") != "success"
+        ):
+            return
+        self.cache.set(
+            self.namespace,
+            tool_input_key(name, event.tool_use["input"]),
+            event.result,
+            ttl=self.ttl,
+        )
+
+
+class SessionStore:
+    """
+    Conversation histories by session id.
+
+    :param ttl: seconds of inactivity until a session expires.
+    """
+
+    namespace = "session"
+
+    def __init__(
+        self,
+        cache: SqliteCache,
+        ttl: T.Optional[float] = 3600.0,
+    ):
+        self.cache = cache
+        self.ttl = ttl
+
+    def load(self, session_id: str) -> Messages:
+        return self.cache.get(self.namespace, session_id, default=[])
+
+    def save(
+        self,
+        session_id: str,
+        messages: Messages,
+    ) -> None:
+        self.cache.set(self.namespace, session_id, messages, ttl=self.ttl)
+
+    def restore(
+        self,
+        session_id: str,
+        agent: "Agent",
+    ) -> None:
+        """
+        Replace the history of an agent with the stored one.
+        """
+        agent.messages = self.load(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        return self.cache.delete(self.namespace, session_id)
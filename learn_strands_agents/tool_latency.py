@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+
+"""
+Latency histograms per tool and per model, with SLO alarms.
+
+``EventLoopMetrics.tool_metrics`` only keeps a call count and a total time
+per tool, so a slow tail disappears in the average. :class:`ToolLatencyHook`
+records the duration of every tool and model call into a
+:class:`LatencyHistogram`: a fixed size, HDR style histogram with log-linear
+buckets, good to about 1% relative error from microseconds to an hour.
+
+Histograms of a :class:`LatencyRecorder` can be shared by many agents, saved
+to and merged from files to aggregate across processes, and watched by
+:class:`LatencySLO` thresholds that call back when a percentile is breached.
+"""
+
+import typing as T
+import os
+import json
+import time
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+from dataclasses import dataclass, field
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+    BeforeModelCallEvent,
+    AfterModelCallEvent,
+)
+
+from .token_budget import get_model_id
+
+TOOL = "tool"
+MODEL = "model"
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations, recorded in microseconds.
+
+    Values below ``2 ** precision_bits`` microseconds get a bucket each,
+    every further power of two is split into ``2 ** (precision_bits - 1)``
+    buckets, so the relative error stays below ``2 ** -(precision_bits - 1)``.
+
+    :param precision_bits: 7 gives a relative error below 1.6%.
+    :param highest_seconds: larger durations are recorded as this.
+    """
+
+    def __init__(
+        self,
+        precision_bits: int = 7,
+        highest_seconds: float = 3600.0,
+    ):
+        self.precision_bits = precision_bits
+        self.highest_seconds = highest_seconds
+        self._linear = 1 << precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self._highest = int(highest_seconds * 1_000_000)
+        self.counts = array("Q", bytes(8 * (self._index(self._highest) + 1)))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value: int) -> int:
+        if value < self._linear:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return self._linear + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _value(self, index: int) -> int:
+        """
+        Middle of the range of values of a bucket.
+        """
+        if index < self._linear:
+            return index
+        shift, offset = divmod(index - self._linear, self._half)
+        shift += 1
+        lower = (offset + self._half) << shift
+        return lower + (1 << (shift - 1))
+
+    def record(
+        self,
+        seconds: float,
+        count: int = 1,
+    ) -> None:
+        value = min(max(int(seconds * 1_000_000), 0), self._highest)
+        self.counts[self._index(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        """
+        Mean in seconds.
+        """
+        return self.total / self.count / 1_000_000 if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """
+        The ``p`` percentile in seconds, e.g. ``percentile(99)``.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, round(p / 100 * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= rank:
+                    value = min(max(self._value(index), self.min), self.max)
+                    return value / 1_000_000
+        return self.max / 1_000_000  # pragma: no cover
+
+    def percentiles(
+        self,
+        ps: T.Iterable[float] = (50, 95, 99),
+    ) -> dict[str, float]:
+        return {f"p{p:g}": self.percentile(p) for p in ps}
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.precision_bits != self.precision_bits or other._highest != self._highest:
+            raise ValueError("can only merge histograms with the same configuration")
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def summary(self) -> dict[str, float]:
+        """
+        Count, mean, min, max and the usual percentiles, in seconds.
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": (self.min or 0) / 1_000_000,
+            "max": (self.max or 0) / 1_000_000,
+            **self.percentiles(),
+        }
+
+    def to_dict(self) -> dict[str, T.Any]:
+        """
+        Sparse, JSON serializable form.
+        """
+        return {
+            "precision_bits": self.precision_bits,
+            "highest_seconds": self.highest_seconds,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "counts": {str(i): n for i, n in enumerate(self.counts) if n},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, T.Any]) -> "LatencyHistogram":
+        histogram = cls(
+            precision_bits=data["precision_bits"],
+            highest_seconds=data["highest_seconds"],
+        )
+        for index, n in data["counts"].items():
+            histogram.counts[int(index)] = n
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+@dataclass
+class LatencySLO:
+    """
+    Alarm when the ``percentile`` of a tool or model exceeds ``threshold``.
+
+    Checking costs O(1) per call: the percentile is above the threshold
+    exactly when more than ``100 - percentile`` percent of the calls are.
+    The counts are cumulative since the SLO was created, not over a sliding
+    window, so after a long healthy period a slowdown takes a while to
+    breach it. :meth:`reset` starts counting again. ``observe`` is thread
+    safe, the callbacks are called outside of the lock.
+
+    :param kind: ``"tool"`` or ``"model"``.
+    :param name: tool name or model id, ``None`` for all of that kind.
+    :param percentile: e.g. ``99``.
+    :param threshold: seconds.
+    :param on_breach: called with the SLO and the key ``(kind, name)`` when
+        the percentile goes above the threshold.
+    :param on_recover: called when it goes back below.
+    :param min_count: no alarm before this many calls.
+    """
+
+    kind: str
+    name: T.Optional[str]
+    percentile: float
+    threshold: float
+    on_breach: T.Callable[["LatencySLO", tuple[str, str]], None]
+    on_recover: T.Optional[T.Callable[["LatencySLO", tuple[str, str]], None]] = None
+    min_count: int = 20
+    # per key: [calls, calls above the threshold, breached]
+    _state: dict[tuple[str, str], list] = field(
+        init=False, default_factory=dict, repr=False, compare=False
+    )
+    _lock: threading.Lock = field(
+        init=False, default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def matches(self, key: tuple[str, str]) -> bool:
+        return key[0] == self.kind and (self.name is None or key[1] == self.name)
+
+    def is_breached(self, key: tuple[str, str]) -> bool:
+        with self._lock:
+            state = self._state.get(key)
+            return bool(state and state[2])
+
+    def reset(self) -> None:
+        """
+        Forget all counts and breaches.
+        """
+        with self._lock:
+            self._state.clear()
+
+    def observe(self, key: tuple[str, str], seconds: float) -> None:
+        with self._lock:
+            state = self._state.setdefault(key, [0, 0, False])
+            state[0] += 1
+            if seconds > self.threshold:
+                state[1] += 1
+            if state[0] < self.min_count:
+                return
+            breached = state[1] > state[0] * (100 - self.percentile) / 100
+            changed = breached != state[2]
+            state[2] = breached
+        if not changed:
+            return
+        if breached:
+            self.on_breach(self, key)
+        elif self.on_recover is not None:
+            self.on_recover(self, key)
+
+
+class LatencyRecorder:
+    """
+    Histograms by ``(kind, name)``, thread safe.
+
+    :param precision_bits: see :class:`LatencyHistogram`.
+    :param highest_seconds: see :class:`LatencyHistogram`.
+    """
+
+    def __init__(
+        self,
+        precision_bits: int = 7,
+        highest_seconds: float = 3600.0,
+    ):
+        self.precision_bits = precision_bits
+        self.highest_seconds = highest_seconds
+        self.histograms: dict[tuple[str, str], LatencyHistogram] = {}
+        self.errors: dict[tuple[str, str], int] = {}
+        self.slos: list[LatencySLO] = []
+        self._lock = threading.Lock()
+
+    def _histogram(self, key: tuple[str, str]) -> LatencyHistogram:
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram(
+                precision_bits=self.precision_bits,
+                highest_seconds=self.highest_seconds,
+            )
+        return histogram
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        seconds: float,
+        error: bool = False,
+    ) -> None:
+        key = (kind, name)
+        with self._lock:
+            self._histogram(key).record(seconds)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            slos = [slo for slo in self.slos if slo.matches(key)]
+        # callbacks run outside of the lock, they may use the recorder
+        for slo in slos:
+            slo.observe(key, seconds)
+
+    def add_slo(self, slo: LatencySLO) -> LatencySLO:
+        with self._lock:
+            self.slos.append(slo)
+        return slo
+
+    def get(
+        self,
+        kind: str,
+        name: str,
+    ) -> T.Optional[LatencyHistogram]:
+        return self.histograms.get((kind, name))
+
+    def summary(self) -> dict[str, dict[str, dict[str, float]]]:
+        """
+        ``{kind: {name: summary}}``, see :meth:`LatencyHistogram.summary`.
+        """
+        result: dict[str, dict[str, dict[str, float]]] = {}
+        with self._lock:
+            for (kind, name), histogram in sorted(self.histograms.items()):
+                data = histogram.summary()
+                data["errors"] = self.errors.get((kind, name), 0)
+                result.setdefault(kind, {})[name] = data
+        return result
+
+    def to_dict(self) -> dict[str, T.Any]:
+        with self._lock:
+            return {
+                "histograms": [
+                    {
+                        "kind": kind,
+                        "name": name,
+                        "errors": self.errors.get((kind, name), 0),
+                        "histogram": histogram.to_dict(),
+                    }
+                    for (kind, name), histogram in self.histograms.items()
+                ]
+            }
+
+    def merge(self, other: T.Union["LatencyRecorder", dict[str, T.Any]]) -> None:
+        """
+        Add the recordings of another recorder, or of its :meth:`to_dict`.
+        SLOs are not evaluated for merged recordings.
+        """
+        data = other.to_dict() if isinstance(other, LatencyRecorder) else other
+        with self._lock:
+            for item in data["histograms"]:
+                key = (item["kind"], item["name"])
+                self._histogram(key).merge(LatencyHistogram.from_dict(item["histogram"]))
+                if item["errors"]:
+                    self.errors[key] = self.errors.get(key, 0) + item["errors"]
+
+    def dump(self, path: T.Union[str, Path]) -> None:
+        """
+        Write the recordings to a JSON file, atomically, e.g. one file per
+        worker process that an aggregator merges with :meth:`load`.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(
+        cls,
+        *paths: T.Union[str, Path],
+    ) -> "LatencyRecorder":
+        """
+        Merge the recordings of one or more files written by :meth:`dump`.
+        """
+        recorder = None
+        for path in paths:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            if recorder is None:
+                first = data["histograms"][0]["histogram"] if data["histograms"] else {}
+                recorder = cls(
+                    precision_bits=first.get("precision_bits", 7),
+                    highest_seconds=first.get("highest_seconds", 3600.0),
+                )
+            recorder.merge(data)
+        return recorder if recorder is not None else cls()
+
+
+_recorder: T.Optional[LatencyRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> LatencyRecorder:
+    """
+    The recorder shared by all agents of the process.
+    """
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = LatencyRecorder()
+        return _recorder
+
+
+class ToolLatencyHook(HookProvider):
+    """
+    Record the duration of every tool call and model call of an agent.
+
+    Example::
+
+        recorder = get_recorder()
+        recorder.add_slo(LatencySLO(TOOL, "http_request", 99, 2.0, on_breach=alert))
+        agent = strands.Agent(model=model, tools=[http_request], hooks=[ToolLatencyHook()])
+        ...
+        print(recorder.summary()["tool"]["http_request"]["p99"])
+
+    :param recorder: by default the process wide :func:`get_recorder`.
+    """
+
+    def __init__(
+        self,
+        recorder: T.Optional[LatencyRecorder] = None,
+    ):
+        self.recorder = recorder or get_recorder()
+        self._tool_starts: dict[str, float] = {}
+        self._model_starts: dict[int, float] = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.before_tool_call)
+        registry.add_callback(AfterToolCallEvent, self.after_tool_call)
+        registry.add_callback(BeforeModelCallEvent, self.before_model_call)
+        registry.add_callback(AfterModelCallEvent, self.after_model_call)
+
+    def before_tool_call(self, event: BeforeToolCallEvent) -> None:
+        self._tool_starts[event.tool_use["toolUseId"]] = time.perf_counter()
+
+    def after_tool_call(self, event: AfterToolCallEvent) -> None:
+        start = self._tool_starts.pop(event.tool_use["toolUseId"], None)
+        if start is None:
+            return
+        self.recorder.record(
+            TOOL,
+            event.tool_use["name"],
+            time.perf_counter() - start,
+            error=event.exception is not None or event.result.get("status") == "error",
+        )
+
+    def before_model_call(self, event: BeforeModelCallEvent) -> None:
+        self._model_starts[id(event.agent)] = time.perf_counter()
+
+    def after_model_call(self, event: AfterModelCallEvent) -> None:
+        start = self._model_starts.pop(id(event.agent), None)
+        if start is None:
+            return
+        self.recorder.record(
+            MODEL,
+            get_model_id(event.agent.model) or type(event.agent.model).__name__,
+            time.perf_counter() - start,
+            error=event.exception is not None,
+        )
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+"""
+Precompiled tool specs and cached tool input validation.
+
+Strands does the schema work of tools again and again:
+
+- ``ToolRegistry.get_all_tool_specs`` copies, normalizes and validates the
+  spec of every registered tool, before every model call and again before
+  every single tool call;
+- ``@strands.tool`` tools validate their input with the pydantic model
+  generated from the function signature, also when a tool use with the same
+  id and input was already validated, e.g. a retried or replayed call.
+
+:class:`ToolSchemaCache` compiles each tool spec once, when the tool shows
+up in the registry, and serves the tool config from the cache until the
+registered tools change. It also remembers the validated input of each
+tool use id in a shared :class:`ValidationCache`, so identical tool uses
+skip the validation. :func:`measure_tool_overhead` shows the per call
+overhead with and without the caches.
+
+Example::
+
+    agent = strands.Agent(model=model, tools=[get_weather, http_request])
+    ToolSchemaCache().attach(agent)
+"""
+
+import typing as T
+import gc
+import copy
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+from strands.tools.decorator import DecoratedFunctionTool
+from strands.tools.tools import normalize_tool_spec
+from strands.types.tools import AgentTool, ToolSpec, ToolUse
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+    from strands.tools.registry import ToolRegistry
+
+logger = logging.getLogger(__name__)
+
+# the tool use whose input is being validated, set around each tool call
+_current_tool_use: contextvars.ContextVar[T.Optional[ToolUse]] = contextvars.ContextVar(
+    "_current_tool_use", default=None
+)
+
+
+@dataclass
+class ValidationStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _copy_validated(value: T.Any) -> T.Any:
+    # validated input comes from ``model_dump``, copying its containers is
+    # enough and much cheaper than ``copy.deepcopy``
+    if isinstance(value, dict):
+        return {k: _copy_validated(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_validated(v) for v in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+class ValidationCache:
+    """
+    The validated input of tool uses, keyed by tool name and tool use id.
+
+    A hit also requires the same input, a reused id with another input is
+    validated again. The validated input is copied in and out, a tool that
+    modifies its arguments doesn't change what the next hit gets.
+
+    :param maxsize: the number of tool uses to remember, least recently used
+        first out.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.stats = ValidationStats()
+        self._items: OrderedDict[tuple[str, str], tuple[T.Any, dict[str, T.Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(
+        self,
+        name: str,
+        tool_use_id: str,
+        input: T.Any,
+    ) -> T.Optional[dict[str, T.Any]]:
+        key = (name, tool_use_id)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != input:
+                self.stats.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.stats.hits += 1
+        # a copy, the tool may modify its input and the caller adds the
+        # special parameters like ``agent`` to it
+        return _copy_validated(item[1])
+
+    def put(
+        self,
+        name: str,
+        tool_use_id: str,
+        input: T.Any,
+        validated: dict[str, T.Any],
+    ) -> None:
+        with self._lock:
+            self._items[(name, tool_use_id)] = (copy.deepcopy(input), _copy_validated(validated))
+            self._items.move_to_end((name, tool_use_id))
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_validation_cache = ValidationCache()
+
+
+def get_validation_cache() -> ValidationCache:
+    """
+    The validation cache shared by all compiled tools of the process.
+    """
+    return _validation_cache
+
+
+def compile_validator(tool: DecoratedFunctionTool) -> bool:
+    """
+    Let a decorated tool look up its validated input in the shared
+    :class:`ValidationCache` first. The tool object is patched once, for all
+    agents that use it.
+
+    :returns: whether the tool was patched now.
+    """
+    metadata = tool._metadata
+    if getattr(metadata, "_cached_validation", False):
+        return False
+    validate = metadata.validate_input
+    name = tool.tool_name
+
+    def validate_input(input_data: dict[str, T.Any]) -> dict[str, T.Any]:
+        tool_use = _current_tool_use.get()
+        if tool_use is None or tool_use["name"] != name:
+            return validate(input_data)
+        cache = _validation_cache
+        validated = cache.get(name, tool_use["toolUseId"], input_data)
+        if validated is None:
+            validated = validate(input_data)
+            cache.put(name, tool_use["toolUseId"], input_data, validated)
+        return validated
+
+    metadata.validate_input = validate_input
+    metadata._cached_validation = True
+    return True
+
+
+@dataclass
+class SpecCacheStats:
+    """
+    :param hits: tool config requests served from the cache.
+    :param misses: tool config requests after the registered tools changed.
+    :param compiled: tool specs compiled.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    compiled: int = 0
+
+
+class ToolSchemaCache(HookProvider):
+    """
+    Compile the tool specs of an agent once, and cache the validated input
+    of its decorated tools.
+
+    Tools registered after :meth:`attach` are compiled when the next tool
+    config is requested.
+    """
+
+    def __init__(self):
+        self.stats = SpecCacheStats()
+        # id of the tool -> (tool, compiled spec or None if it is invalid)
+        self._specs: dict[int, tuple[AgentTool, T.Optional[ToolSpec]]] = {}
+        self._key: T.Optional[tuple] = None
+        self._config: dict[str, ToolSpec] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, agent: "Agent") -> "Agent":
+        """
+        Serve the tool config of the agent's registry from the cache and add
+        the hooks, once.
+        """
+        registry = agent.tool_registry
+        if getattr(registry, "_tool_schema_cache", None) is None:
+            registry.get_all_tools_config = lambda: self.tools_config(registry)
+            registry._tool_schema_cache = self
+            agent.hooks.add_hook(self)
+        self.tools_config(registry)
+        return agent
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: T.Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.on_tool_start)
+        registry.add_callback(AfterToolCallEvent, self.on_tool_end)
+
+    def on_tool_start(self, event: BeforeToolCallEvent) -> None:
+        _current_tool_use.set(event.tool_use)
+
+    def on_tool_end(self, event: AfterToolCallEvent) -> None:
+        _current_tool_use.set(None)
+
+    def _compile(
+        self,
+        registry: "ToolRegistry",
+        tool: AgentTool,
+    ) -> T.Optional[ToolSpec]:
+        item = self._specs.get(id(tool))
+        if item is not None and item[0] is tool:
+            return item[1]
+        spec = tool.tool_spec.copy()
+        try:
+            spec = normalize_tool_spec(spec)
+            registry.validate_tool_spec(spec)
+        except ValueError as e:
+            logger.warning("tool_name=<%s> | spec validation failed | %s", tool.tool_name, e)
+            spec = None
+        if isinstance(tool, DecoratedFunctionTool):
+            compile_validator(tool)
+        self._specs[id(tool)] = (tool, spec)
+        self.stats.compiled += 1
+        return spec
+
+    def tools_config(self, registry: "ToolRegistry") -> dict[str, ToolSpec]:
+        """
+        Same as ``ToolRegistry.get_all_tools_config``, from the cache.
+
+        The specs are shared, don't modify them.
+        """
+        key = (
+            tuple((name, id(tool)) for name, tool in registry.registry.items()),
+            tuple((name, id(tool)) for name, tool in registry.dynamic_tools.items()),
+        )
+        with self._lock:
+            if key == self._key:
+                self.stats.hits += 1
+                return dict(self._config)
+            self.stats.misses += 1
+            config = {}
+            for name, tool in registry.registry.items():
+                spec = self._compile(registry, tool)
+                if spec is not None:
+                    config[name] = spec
+            for name, tool in registry.dynamic_tools.items():
+                if name not in config:
+                    spec = self._compile(registry, tool)
+                    if spec is not None:
+                        config[name] = spec
+            live = {id(tool) for tool in registry.registry.values()}
+            live.update(id(tool) for tool in registry.dynamic_tools.values())
+            self._specs = {k: v for k, v in self._specs.items() if k in live}
+            self._key = key
+            self._config = config
+            return dict(config)
+
+
+@dataclass
+class ToolOverhead:
+    """
+    Per call overhead of the schema work, in microseconds.
+
+    :param specs: building the tool config of all tools, like Strands does
+        before every model and tool call.
+    :param validation: validating the input of one tool use.
+    """
+
+    specs: float
+    specs_cached: float
+    validation: float
+    validation_cached: float
+
+    @property
+    def saved(self) -> float:
+        """
+        Microseconds saved per tool call, which builds the tool config once
+        and validates once.
+        """
+        return self.specs + self.validation - self.specs_cached - self.validation_cached
+
+
+def _per_call(func: T.Callable[[], T.Any], n: int) -> float:
+    # like ``timeit``, a garbage collection pause would dwarf the few
+    # microseconds measured here
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        func()
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        return (time.perf_counter() - start) / n * 1000000
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def measure_tool_overhead(
+    agent: "Agent",
+    tool_use: ToolUse,
+    n: int = 1000,
+) -> ToolOverhead:
+    """
+    Measure the per call overhead of the tool config and of the input
+    validation of ``tool_use``, with and without the caches. The agent
+    doesn't need to be attached, the tool use must be of a decorated tool.
+    """
+    registry = agent.tool_registry
+    tool = registry.registry[tool_use["name"]]
+    if not isinstance(tool, DecoratedFunctionTool):
+        raise TypeError(f"{tool_use['name']} is not a decorated tool")
+    cache = getattr(registry, "_tool_schema_cache", None) or ToolSchemaCache()
+    uncached = type(registry).get_all_tools_config.__get__(registry)
+    compile_validator(tool)
+    validate = tool._metadata.validate_input
+
+    def validate_uncached():
+        _current_tool_use.set(None)
+        validate(tool_use["input"])
+
+    def validate_cached():
+        _current_tool_use.set(tool_use)
+        validate(tool_use["input"])
+
+    context = contextvars.copy_context()
+    return ToolOverhead(
+        specs=_per_call(uncached, n),
+        specs_cached=_per_call(lambda: cache.tools_config(registry), n),
+        validation=context.run(_per_call, validate_uncached, n),
+        validation_cached=context.run(_per_call, validate_cached, n),
+    )
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+
+"""
+Zero-copy views over the :class:`~strands.telemetry.metrics.Trace` trees of
+an agent run.
+
+``trace.to_dict()`` builds a dict for every node of the subtree, including
+references to the message payloads, even when the caller only needs a name
+and a duration. :class:`TraceView` reads the attributes of the ``Trace``
+objects directly, iterates children lazily and only builds dicts or copies
+messages on request.
+
+Example::
+
+    result = agent("What's the weather at 38.9072, 77.0369?")
+    for call in walk_traces(result, name="stream_messages"):
+        print(call.name, call.duration_ms)
+    print(slowest(result).path)
+"""
+
+import typing as T
+import copy
+import heapq
+import types
+from dataclasses import dataclass, field
+
+from strands.telemetry.metrics import Trace, EventLoopMetrics
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands.agent.agent_result import AgentResult
+    from strands.types.content import Message
+
+MODEL_CALL = "stream_messages"
+TOOL_CALL_PREFIX = "Tool: "
+RECURSIVE_CALL = "Recursive call"
+CYCLE_PREFIX = "Cycle "
+
+T_SOURCE = T.Union[
+    "AgentResult",
+    EventLoopMetrics,
+    Trace,
+    T.Iterable[Trace],
+]
+
+
+class TraceView:
+    """
+    A read-only view of a :class:`~strands.telemetry.metrics.Trace`.
+
+    :param trace: the viewed trace.
+    :param parent: view of the parent, ``None`` for a root.
+    """
+
+    __slots__ = ("trace", "parent", "depth")
+
+    def __init__(
+        self,
+        trace: Trace,
+        parent: T.Optional["TraceView"] = None,
+    ):
+        self.trace = trace
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    def __repr__(self) -> str:
+        return f"TraceView(name={self.name!r}, duration={self.duration!r})"
+
+    @property
+    def id(self) -> str:
+        return self.trace.id
+
+    @property
+    def name(self) -> str:
+        return self.trace.name
+
+    @property
+    def raw_name(self) -> T.Optional[str]:
+        return self.trace.raw_name
+
+    @property
+    def parent_id(self) -> T.Optional[str]:
+        return self.trace.parent_id
+
+    @property
+    def start_time(self) -> float:
+        return self.trace.start_time
+
+    @property
+    def end_time(self) -> T.Optional[float]:
+        return self.trace.end_time
+
+    @property
+    def duration(self) -> T.Optional[float]:
+        """
+        Seconds, ``None`` while the trace is still open.
+        """
+        trace = self.trace
+        return None if trace.end_time is None else trace.end_time - trace.start_time
+
+    @property
+    def duration_ms(self) -> float:
+        duration = self.duration
+        return 0.0 if duration is None else duration * 1000
+
+    @property
+    def metadata(self) -> T.Mapping[str, T.Any]:
+        return types.MappingProxyType(self.trace.metadata)
+
+    @property
+    def is_cycle(self) -> bool:
+        return self.parent_id is None and self.name.startswith(CYCLE_PREFIX)
+
+    @property
+    def is_model_call(self) -> bool:
+        return self.name == MODEL_CALL
+
+    @property
+    def is_tool_call(self) -> bool:
+        return self.name.startswith(TOOL_CALL_PREFIX)
+
+    @property
+    def is_recursive_call(self) -> bool:
+        return self.name == RECURSIVE_CALL
+
+    @property
+    def tool_name(self) -> T.Optional[str]:
+        if not self.is_tool_call:
+            return None
+        return self.name[len(TOOL_CALL_PREFIX) :]
+
+    @property
+    def path(self) -> tuple[str, ...]:
+        """
+        Names from the root down to this trace.
+        """
+        names = []
+        view: T.Optional[TraceView] = self
+        while view is not None:
+            names.append(view.name)
+            view = view.parent
+        return tuple(reversed(names))
+
+    @property
+    def share_of_parent(self) -> T.Optional[float]:
+        """
+        Fraction of the parent's duration spent in this trace.
+        """
+        if self.parent is None:
+            return None
+        duration, parent_duration = self.duration, self.parent.duration
+        if not duration or not parent_duration:
+            return None
+        return duration / parent_duration
+
+    @property
+    def n_children(self) -> int:
+        return len(self.trace.children)
+
+    @property
+    def children(self) -> T.Iterator["TraceView"]:
+        for child in self.trace.children:
+            yield TraceView(child, self)
+
+    def __iter__(self) -> T.Iterator["TraceView"]:
+        return self.children
+
+    # --- message access, nothing is copied unless asked for
+    @property
+    def has_message(self) -> bool:
+        return self.trace.message is not None
+
+    @property
+    def role(self) -> T.Optional[str]:
+        message = self.trace.message
+        return None if message is None else message.get("role")
+
+    def iter_blocks(self, kind: T.Optional[str] = None) -> T.Iterator[dict[str, T.Any]]:
+        """
+        Iterate over the content blocks of the message, by reference.
+
+        :param kind: only blocks with this key, e.g. ``"text"`` or ``"toolUse"``.
+        """
+        message = self.trace.message
+        if message is None:
+            return
+        for block in message.get("content", []):
+            if kind is None or kind in block:
+                yield block
+
+    def text(self) -> str:
+        """
+        The text blocks of the message, joined.
+        """
+        return "".join(block["text"] for block in self.iter_blocks("text"))
+
+    def tool_uses(self) -> T.Iterator[dict[str, T.Any]]:
+        for block in self.iter_blocks("toolUse"):
+            yield block["toolUse"]
+
+    def tool_results(self) -> T.Iterator[dict[str, T.Any]]:
+        for block in self.iter_blocks("toolResult"):
+            yield block["toolResult"]
+
+    def materialize_message(self) -> T.Optional["Message"]:
+        """
+        A deep copy of the message, safe to keep or change.
+        """
+        return copy.deepcopy(self.trace.message)
+
+    def walk(
+        self,
+        predicate: T.Optional[T.Callable[["TraceView"], bool]] = None,
+        name: T.Optional[str] = None,
+        name_contains: T.Optional[str] = None,
+        max_depth: T.Optional[int] = None,
+    ) -> T.Iterator["TraceView"]:
+        """
+        Depth first, pre-order walk over this trace and its descendants,
+        without recursion.
+
+        :param predicate: only yield views it returns true for.
+        :param name: only yield traces with exactly this name.
+        :param name_contains: only yield traces whose name contains this.
+        :param max_depth: don't descend deeper than this, relative to this
+            trace.
+        """
+        stack = [self]
+        while stack:
+            view = stack.pop()
+            if (
+                (name is None or view.name == name)
+                and (name_contains is None or name_contains in view.name)
+                and (predicate is None or predicate(view))
+            ):
+                yield view
+            if max_depth is None or view.depth - self.depth < max_depth:
+                children = view.trace.children
+                for i in range(len(children) - 1, -1, -1):
+                    stack.append(TraceView(children[i], view))
+
+    def find(self, **filters: T.Any) -> T.Optional["TraceView"]:
+        """
+        The first trace of :meth:`walk` matching the filters.
+        """
+        return next(self.walk(**filters), None)
+
+    def to_dict(
+        self,
+        include_message: bool = False,
+        recursive: bool = True,
+    ) -> dict[str, T.Any]:
+        """
+        Materialize the trace like ``Trace.to_dict()``, by default without
+        the message.
+        """
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "raw_name": self.raw_name,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "metadata": dict(self.trace.metadata),
+        }
+        if recursive:
+            data["children"] = [
+                child.to_dict(include_message=include_message)
+                for child in self.children
+            ]
+        if include_message:
+            data["message"] = self.materialize_message()
+        return data
+
+
+def _root_traces(source: T_SOURCE) -> T.Iterable[Trace]:
+    if isinstance(source, Trace):
+        return (source,)
+    if isinstance(source, EventLoopMetrics):
+        return source.traces
+    metrics = getattr(source, "metrics", None)
+    if isinstance(metrics, EventLoopMetrics):
+        return metrics.traces
+    return source
+
+
+def iter_traces(source: T_SOURCE) -> T.Iterator[TraceView]:
+    """
+    Views of the root traces, one per event loop cycle.
+
+    :param source: an ``AgentResult``, its ``EventLoopMetrics``, a trace or
+        traces.
+    """
+    for trace in _root_traces(source):
+        yield TraceView(trace)
+
+
+def walk_traces(
+    source: T_SOURCE,
+    **filters: T.Any,
+) -> T.Iterator[TraceView]:
+    """
+    Walk all traces of a run, see :meth:`TraceView.walk` for the filters.
+    """
+    for root in iter_traces(source):
+        yield from root.walk(**filters)
+
+
+def model_calls(source: T_SOURCE) -> T.Iterator[TraceView]:
+    return walk_traces(source, name=MODEL_CALL)
+
+
+def tool_calls(source: T_SOURCE) -> T.Iterator[TraceView]:
+    return walk_traces(source, predicate=lambda view: view.is_tool_call)
+
+
+def slowest(
+    source: T_SOURCE,
+    n: T.Optional[int] = None,
+    predicate: T.Optional[T.Callable[[TraceView], bool]] = None,
+) -> T.Union[T.Optional[TraceView], list[TraceView]]:
+    """
+    The slowest trace below the cycle level, or the ``n`` slowest ones.
+    """
+    candidates = walk_traces(
+        source,
+        predicate=lambda view: view.depth > 0
+        and view.duration is not None
+        and (predicate is None or predicate(view)),
+    )
+    if n is None:
+        return max(candidates, key=lambda view: view.duration, default=None)
+    return heapq.nlargest(n, candidates, key=lambda view: view.duration)
+
+
+@dataclass
+class CycleBreakdown:
+    """
+    Where the time of one event loop cycle went.
+
+    :param children: ``(name, seconds, share of the cycle)`` per child.
+    """
+
+    name: str
+    duration: T.Optional[float]
+    children: list[tuple[str, float, T.Optional[float]]] = field(default_factory=list)
+
+
+def latency_breakdown(source: T_SOURCE) -> list[CycleBreakdown]:
+    """
+    Time spent in the direct children of each cycle.
+    """
+    breakdowns = []
+    for root in iter_traces(source):
+        breakdown = CycleBreakdown(name=root.name, duration=root.duration)
+        for child in root.children:
+            if child.duration is not None:
+                breakdown.children.append(
+                    (child.name, child.duration, child.share_of_parent)
+                )
+        breakdowns.append(breakdown)
+    return breakdowns
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+
+"""
+A small DAG workflow engine for multi-agent pipelines.
+
+:func:`~learn_strands_agents.research.run_research_workflow` runs its agents
+as straight-line Python, one after the other. A :class:`Workflow` declares
+the stages and their data dependencies instead, and runs every stage as soon
+as the stages it depends on are done, so independent stages overlap on the
+asyncio loop:
+
+- a stage gets the workflow input and the outputs of its dependencies;
+- ``max_concurrency`` bounds the stages running at the same time, across
+  all runs that share the limiter, e.g. in :meth:`Workflow.map_async`;
+- a failed stage doesn't stop independent stages, its dependents are
+  skipped;
+- every stage records its timing, cycle count and token usage, and the
+  stage traces, with the agent traces as children, are combined into one
+  :class:`~strands.telemetry.metrics.Trace`.
+
+Example::
+
+    workflow = Workflow(
+        [
+            agent_stage("research", new_researcher, lambda x: x["input"]),
+            agent_stage("fact_check", new_analyst, lambda x: x["research"], ["research"]),
+            agent_stage("draft", new_writer, lambda x: x["research"], ["research"]),
+            Stage("report", merge, depends_on=("fact_check", "draft")),
+        ]
+    )
+    result = workflow.run("Is Amazon Bedrock AgentCore ready for production use?")
+    print(result.output, result.usage)
+"""
+
+import typing as T
+import time
+import asyncio
+import inspect
+from dataclasses import dataclass, field
+
+from strands.agent.agent_result import AgentResult
+from strands.telemetry.metrics import Trace
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from strands import Agent
+
+INPUT = "input"
+
+OK = "ok"
+ERROR = "error"
+SKIPPED = "skipped"
+
+WORKFLOW_TRACE_NAME = "Workflow"
+STAGE_TRACE_PREFIX = "Stage: "
+
+T_STAGE_FUNC = T.Callable[[dict[str, T.Any]], T.Any]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A node of a :class:`Workflow`.
+
+    :param name: unique name, dependent stages get the output under it.
+    :param func: sync or async function of the stage inputs, a dict of the
+        workflow input under ``"input"`` and the output of each dependency
+        under its stage name. Sync functions run in a worker thread. An
+        ``AgentResult`` return value is recorded with its metrics, the
+        output is its text.
+    :param depends_on: names of the stages whose outputs are needed.
+    """
+
+    name: str
+    func: T_STAGE_FUNC
+    depends_on: tuple[str, ...] = ()
+
+
+def agent_stage(
+    name: str,
+    agent_factory: T.Callable[[], "Agent"],
+    prompt: T.Callable[[dict[str, T.Any]], str],
+    depends_on: T.Iterable[str] = (),
+) -> Stage:
+    """
+    A stage that asks a fresh agent a prompt built from the stage inputs.
+
+    :param agent_factory: creates the agent, agents are not safe to share
+        between concurrent runs.
+    :param prompt: builds the prompt from the stage inputs.
+    """
+
+    async def run(inputs: dict[str, T.Any]) -> AgentResult:
+        agent = agent_factory()
+        return await agent.invoke_async(prompt(inputs))
+
+    return Stage(name=name, func=run, depends_on=tuple(depends_on))
+
+
+@dataclass
+class StageResult:
+    """
+    The outcome of one stage of a workflow run.
+
+    :param status: ``ok``, ``error``, or ``skipped`` when a dependency
+        didn't succeed.
+    :param duration: seconds from acquiring a concurrency slot to the end.
+    :param wait: seconds the ready stage waited for a concurrency slot.
+    :param usage: token usage of an agent stage.
+    """
+
+    name: str
+    status: str
+    output: T.Any = None
+    error: T.Optional[BaseException] = None
+    start_time: float = 0.0
+    duration: float = 0.0
+    wait: float = 0.0
+    cycle_count: int = 0
+    usage: dict[str, int] = field(default_factory=dict)
+    trace: T.Optional[Trace] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+
+@dataclass
+class WorkflowResult:
+    """
+    The outcome of a :class:`Workflow` run.
+
+    :param stages: the result of each stage, in topological order.
+    :param trace: root trace with one child per stage.
+    """
+
+    input: T.Any
+    stages: dict[str, StageResult]
+    trace: Trace
+    duration: float
+    final_stage: str
+
+    @property
+    def output(self) -> T.Any:
+        """
+        The output of the last stage in topological order.
+        """
+        return self.stages[self.final_stage].output
+
+    @property
+    def outputs(self) -> dict[str, T.Any]:
+        return {name: stage.output for name, stage in self.stages.items() if stage.ok}
+
+    @property
+    def ok(self) -> bool:
+        return all(stage.ok for stage in self.stages.values())
+
+    @property
+    def usage(self) -> dict[str, int]:
+        """
+        Token usage summed over all stages.
+        """
+        total: dict[str, int] = {}
+        for stage in self.stages.values():
+            for key, value in stage.usage.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    def raise_for_error(self) -> None:
+        """
+        Re-raise the error of the first failed stage, if any.
+        """
+        for stage in self.stages.values():
+            if stage.error is not None:
+                raise stage.error
+
+
+def _sort_stages(stages: T.Iterable[Stage]) -> list[Stage]:
+    """
+    Stages in topological order, ties in declaration order.
+
+    :raises ValueError: on duplicate names, unknown dependencies or cycles.
+    """
+    by_name: dict[str, Stage] = {}
+    for stage in stages:
+        if stage.name in by_name or stage.name == INPUT:
+            raise ValueError(f"duplicate or reserved stage name {stage.name!r}")
+        by_name[stage.name] = stage
+    for stage in by_name.values():
+        for name in stage.depends_on:
+            if name not in by_name:
+                raise ValueError(f"stage {stage.name!r} depends on unknown stage {name!r}")
+    ordered: list[Stage] = []
+    done: set[str] = set()
+    pending = list(by_name.values())
+    while pending:
+        ready = [s for s in pending if all(name in done for name in s.depends_on)]
+        if not ready:
+            names = ", ".join(s.name for s in pending)
+            raise ValueError(f"dependency cycle between stages: {names}")
+        for stage in ready:
+            ordered.append(stage)
+            done.add(stage.name)
+        pending = [s for s in pending if s.name not in done]
+    return ordered
+
+
+class Workflow:
+    """
+    Stages and their data dependencies, run concurrently where possible.
+
+    :param stages: the stages, in any order.
+    :param max_concurrency: maximum stages running at the same time.
+    :param name: name of the root trace.
+
+    :raises ValueError: if the stages don't form a DAG.
+    """
+
+    def __init__(
+        self,
+        stages: T.Iterable[Stage],
+        max_concurrency: int = 4,
+        name: str = WORKFLOW_TRACE_NAME,
+    ):
+        self.stages = _sort_stages(stages)
+        if not self.stages:
+            raise ValueError("a workflow needs at least one stage")
+        self.max_concurrency = max_concurrency
+        self.name = name
+
+    async def _run_stage(
+        self,
+        stage: Stage,
+        inputs: dict[str, T.Any],
+        limiter: asyncio.Semaphore,
+        root: Trace,
+    ) -> StageResult:
+        ready_at = time.perf_counter()
+        async with limiter:
+            started_at = time.perf_counter()
+            trace = Trace(f"{STAGE_TRACE_PREFIX}{stage.name}", parent_id=root.id)
+            result = StageResult(
+                name=stage.name,
+                status=OK,
+                start_time=trace.start_time,
+                wait=started_at - ready_at,
+                trace=trace,
+            )
+            try:
+                if inspect.iscoroutinefunction(stage.func):
+                    output = await stage.func(inputs)
+                else:
+                    output = await asyncio.to_thread(stage.func, inputs)
+                    if inspect.isawaitable(output):
+                        output = await output
+            except Exception as e:
+                result.status = ERROR
+                result.error = e
+                output = None
+            if isinstance(output, AgentResult):
+                metrics = output.metrics
+                result.cycle_count = metrics.cycle_count
+                result.usage = dict(metrics.accumulated_usage)
+                for child in metrics.traces:
+                    child.parent_id = trace.id
+                    trace.add_child(child)
+                output = str(output)
+            result.output = output
+            result.duration = time.perf_counter() - started_at
+            trace.end()
+        trace.metadata.update(
+            status=result.status,
+            wait=result.wait,
+            cycle_count=result.cycle_count,
+            usage=result.usage,
+        )
+        if result.error is not None:
+            trace.metadata["error"] = repr(result.error)
+        return result
+
+    async def run_async(
+        self,
+        input: T.Any,
+        limiter: T.Optional[asyncio.Semaphore] = None,
+    ) -> WorkflowResult:
+        """
+        Run all stages for an input.
+
+        :param limiter: bounds the running stages, shared by concurrent
+            runs, a semaphore of ``max_concurrency`` by default.
+        """
+        if limiter is None:
+            limiter = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+        root = Trace(self.name)
+        results: dict[str, StageResult] = {}
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def run(stage: Stage) -> None:
+            await asyncio.gather(*(tasks[name] for name in stage.depends_on))
+            failed = [name for name in stage.depends_on if not results[name].ok]
+            if failed:
+                results[stage.name] = StageResult(
+                    name=stage.name,
+                    status=SKIPPED,
+                    trace=Trace(
+                        f"{STAGE_TRACE_PREFIX}{stage.name}",
+                        parent_id=root.id,
+                        metadata={"status": SKIPPED, "failed_dependencies": failed},
+                    ),
+                )
+                return
+            inputs = {INPUT: input}
+            for name in stage.depends_on:
+                inputs[name] = results[name].output
+            results[stage.name] = await self._run_stage(stage, inputs, limiter, root)
+
+        # dependencies come first, so their tasks exist when a dependent starts
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.create_task(run(stage))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        stages = {}
+        for stage in self.stages:
+            stages[stage.name] = results[stage.name]
+            root.add_child(results[stage.name].trace)
+        root.end()
+        workflow_result = WorkflowResult(
+            input=input,
+            stages=stages,
+            trace=root,
+            duration=time.perf_counter() - start,
+            final_stage=self.stages[-1].name,
+        )
+        root.metadata.update(usage=workflow_result.usage, ok=workflow_result.ok)
+        return workflow_result
+
+    def run(self, input: T.Any) -> WorkflowResult:
+        """
+        Sync version of :meth:`run_async`.
+        """
+        return asyncio.run(self.run_async(input))
+
+    async def map_async(
+        self,
+        inputs: T.Iterable[T.Any],
+        max_runs: int = 4,
+    ) -> list[WorkflowResult]:
+        """
+        Run the workflow for many inputs. At most ``max_runs`` runs are in
+        flight and all runs share one limiter of ``max_concurrency`` stages,
+        the next input is only taken once a run finished.
+
+        :returns: the results in input order.
+        """
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        iterator = enumerate(inputs)
+        results: dict[int, WorkflowResult] = {}
+
+        async def worker() -> None:
+            for i, input in iterator:
+                results[i] = await self.run_async(input, limiter=limiter)
+
+        await asyncio.gather(*(worker() for _ in range(max_runs)))
+        return [results[i] for i in range(len(results))]
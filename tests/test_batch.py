@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import strands
+
+from learn_strands_agents.local_model import ScriptedToolUse, ScriptedTurn, ScriptedModel
+from learn_strands_agents.batch import (
+    BatchItem,
+    prompt_key,
+    read_queries,
+    run_batch,
+)
+
+
+@strands.tool
+def get_weather(city: str) -> str:
+    """
+    Get the weather of a city.
+    """
+    return f"sunny in {city}"
+
+
+def _responder(messages, tool_specs, system_prompt):
+    last = messages[-1]["content"][0]
+    if "toolResult" in last:
+        return ScriptedTurn(text=last["toolResult"]["content"][0]["text"])
+    prompt = last["text"]
+    if prompt == "boom":
+        raise RuntimeError("model failed")
+    if tool_specs and "weather" in prompt:
+        city = prompt.rsplit(" ", 1)[-1]
+        return ScriptedTurn(
+            tool_uses=[ScriptedToolUse(name="get_weather", input={"city": city})]
+        )
+    return ScriptedTurn(text=prompt.upper())
+
+
+def test_prompt_key():
+    assert prompt_key("hello  world ") == prompt_key("hello world")
+    assert prompt_key("hello world") != prompt_key("Hello world")
+
+
+def test_read_queries(tmp_path):
+    path = tmp_path / "queries.jsonl"
+    path.write_text('{"id": "a", "prompt": "hi"}\n\n{"query": "yo"}\n')
+    assert list(read_queries(path)) == [BatchItem("a", "hi"), BatchItem("3", "yo")]
+
+    path = tmp_path / "queries.csv"
+    path.write_text("id,prompt\nx,hi\n,yo\n")
+    assert list(read_queries(path)) == [BatchItem("x", "hi"), BatchItem("2", "yo")]
+
+
+def test_run_batch(tmp_path):
+    path_in = tmp_path / "queries.jsonl"
+    path_in.write_text(
+        "\n".join(
+            json.dumps({"id": str(i), "prompt": prompt})
+            for i, prompt in enumerate(
+                [
+                    "weather in Seattle",
+                    "weather in  Seattle",
+                    "weather in Boston",
+                    "hello",
+                    "hello",
+                    "boom",
+                ]
+            )
+        )
+    )
+    path_out = tmp_path / "results.jsonl"
+    model = ScriptedModel(responder=_responder)
+
+    def agent_factory():
+        return strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+
+    def needs_tools(prompt):
+        return "weather" in prompt
+
+    report = run_batch(path_in, path_out, agent_factory, needs_tools, model=model, max_workers=2)
+    assert (report.total, report.unique, report.resumed) == (6, 4, 0)
+    assert (report.single_cycle, report.agent) == (2, 2)
+    assert (report.succeeded, report.failed) == (3, 1)
+    # 2 agent runs with 2 cycles each, 2 direct calls, no duplicates
+    assert len(model.requests) == 6
+
+    results = {r["id"]: r for r in map(json.loads, path_out.read_text().splitlines())}
+    assert len(results) == 6
+    assert results["0"]["output"] == "sunny in Seattle"
+    assert results["1"]["output"] == "sunny in Seattle"
+    assert results["0"]["path"] == "agent"
+    assert results["3"]["output"] == "HELLO"
+    assert results["4"]["path"] == "single_cycle"
+    assert results["3"]["usage"]["inputTokens"] > 0
+    assert results["5"]["status"] == "error"
+
+    # rerun only retries the failure
+    model = ScriptedModel(responder=_responder)
+    report = run_batch(path_in, path_out, agent_factory, needs_tools, model=model)
+    assert (report.resumed, report.failed, report.succeeded) == (3, 1, 0)
+    assert len(model.requests) == 1
+
+
+def test_run_batch_streaming(tmp_path):
+    consumed = []
+    read_ahead = []
+
+    def queries():
+        for i in range(50):
+            consumed.append(i)
+            yield BatchItem(str(i), f"weather in city{i % 20}" if i % 2 else f"hello {i % 20}")
+
+    def responder(messages, tool_specs, system_prompt):
+        read_ahead.append(len(consumed))
+        return _responder(messages, tool_specs, system_prompt)
+
+    model = ScriptedModel(responder=responder)
+
+    def agent_factory():
+        return strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+
+    path_out = tmp_path / "results.jsonl"
+    report = run_batch(
+        queries(),
+        path_out,
+        agent_factory,
+        needs_tools=lambda prompt: "weather" in prompt,
+        model=model,
+        batch_size=2,
+        max_workers=2,
+    )
+    assert (report.total, report.unique) == (50, 20)
+    assert (report.single_cycle, report.agent) == (10, 10)
+    assert report.succeeded == 20
+    # the input was read while the first prompts were processed
+    assert read_ahead[0] < 10
+    # duplicates that arrived after their prompt completed got its result
+    results = {r["id"]: r for r in map(json.loads, path_out.read_text().splitlines())}
+    assert len(results) == 50
+    assert results["40"]["output"] == results["0"]["output"] == "HELLO 0"
+    assert results["41"]["output"] == results["1"]["output"] == "sunny in city1"
+    # they are copied from the output file, with their own id and prompt
+    assert (results["40"]["id"], results["40"]["prompt"]) == ("40", "hello 0")
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.batch", preview=False)
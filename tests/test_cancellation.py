@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import threading
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.http_shaping import fetch_shaped
+from learn_strands_agents import cancellation
+from learn_strands_agents.cancellation import (
+    AgentCancelledError,
+    CancelToken,
+    CancellableModel,
+    current_cancel_token,
+    run_cancellable,
+)
+
+
+class SlowModel(ScriptedModel):
+    """
+    Streams one event every ``delay`` seconds.
+    """
+
+    delay = 0.05
+
+    async def stream(self, *args, **kwargs):
+        async for event in super().stream(*args, **kwargs):
+            await asyncio.sleep(self.delay)
+            yield event
+
+
+def test_cancel_token():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("a"))
+    unregister = token.on_cancel(lambda: calls.append("b"))
+    unregister()
+    child = token.child(timeout=60)
+    assert not token.cancelled and token.remaining() is None
+    assert 0 < child.remaining() <= 60
+    assert token.cancel("user left")
+    assert not token.cancel("again")
+    assert calls == ["a"]
+    assert child.cancelled and child.reason == "user left"
+    with pytest.raises(AgentCancelledError):
+        token.raise_if_cancelled()
+    # callbacks of a cancelled token run right away
+    token.on_cancel(lambda: calls.append("c"))
+    assert calls == ["a", "c"]
+
+    # deadlines fire the callbacks on their own
+    token = CancelToken(timeout=0.05)
+    fired = threading.Event()
+    token.on_cancel(fired.set)
+    assert fired.wait(1)
+    assert token.reason == "deadline exceeded"
+    assert asyncio.run(token.wait_async()) == "deadline exceeded"
+    assert list(CancelToken().iter_checked([1, 2])) == [1, 2]
+
+
+def test_cancel_model_stream():
+    model = SlowModel(
+        turns=[
+            ScriptedTurn(text="It will rain all week in Seattle."),
+            ScriptedTurn(text="Sunny."),
+        ]
+    )
+    agent = strands.Agent(model=model, callback_handler=None)
+    token = CancelToken(timeout=0.25)
+    run = run_cancellable(agent, "What's the weather in Seattle?", token)
+    assert run.cancelled and run.reason == "deadline exceeded"
+    assert run.result is None
+    assert run.duration < 1
+    assert run.text and "It will rain all week in Seattle.".startswith(run.text)
+    assert isinstance(agent.model, CancellableModel)
+    assert run.to_dict()["cancelled"] is True
+    assert agent.messages[-1] == {"role": "assistant", "content": [{"text": run.partial_text}]}
+
+    # the agent works normally afterwards
+    model.delay = 0
+    usage = dict(agent.event_loop_metrics.accumulated_usage)
+    run = run_cancellable(agent, "And tomorrow?", CancelToken())
+    assert not run.cancelled
+    assert run.text.strip() == "Sunny."
+    # the metrics only cover this run
+    assert run.to_dict()["cycle_count"] == 1
+    assert run.to_dict()["usage"] == {
+        k: v - usage.get(k, 0) for k, v in agent.event_loop_metrics.accumulated_usage.items()
+    }
+    assert run.result.metrics is run.metrics
+
+
+def test_cancel_during_tool():
+    token = CancelToken()
+
+    @strands.tool
+    def get_weather(city: str) -> str:
+        """
+        Get the weather of a city.
+        """
+        assert current_cancel_token() is token
+        token.cancel("answered by another branch")
+        return f"Rain in {city}."
+
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                tool_uses=[ScriptedToolUse("get_weather", {"city": "Seattle"})]
+            ),
+            ScriptedTurn(
+                tool_uses=[ScriptedToolUse("get_weather", {"city": "Portland"})]
+            ),
+            ScriptedTurn(text="Rain."),
+        ]
+    )
+    agent = strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+    run = run_cancellable(agent, "What's the weather in Seattle?", token)
+    # the tool finished, but no further cycle was started
+    assert run.cancelled and run.reason == "answered by another branch"
+    assert run.result is not None
+    assert len(model.requests) == 1
+    assert run.metrics.cycle_count == 1
+    assert run.messages[-1]["content"][0]["toolResult"]["content"][0]["text"] == "Rain in Seattle."
+
+
+def test_cancel_hard():
+    @strands.tool
+    async def slow_search(query: str) -> str:
+        """
+        Search the web.
+        """
+        await asyncio.sleep(10)
+        return "found"
+
+    model = ScriptedModel(
+        turns=[ScriptedTurn(tool_uses=[ScriptedToolUse("slow_search", {"query": "x"})])]
+    )
+    agent = strands.Agent(model=model, tools=[slow_search], callback_handler=None)
+    start = time.perf_counter()
+    run = run_cancellable(agent, "Search x", CancelToken(timeout=0.1), grace=0.1)
+    assert time.perf_counter() - start < 2
+    assert run.cancelled and run.result is None
+    # the dangling tool use got an error result, the conversation can go on
+    assert [m["role"] for m in agent.messages] == ["user", "assistant", "user", "assistant"]
+    tool_result = agent.messages[2]["content"][0]["toolResult"]
+    assert tool_result["status"] == "error"
+    assert tool_result["toolUseId"] == agent.messages[1]["content"][0]["toolUse"]["toolUseId"]
+    assert agent.messages[3]["content"][0]["text"] == "(cancelled: deadline exceeded)"
+
+
+def test_cancel_http():
+    token = CancelToken()
+    token.cancel()
+    context_token = cancellation._current_run.set(cancellation._RunState(token))
+    try:
+        with pytest.raises(AgentCancelledError):
+            fetch_shaped("http://127.0.0.1:9/unused")
+    finally:
+        cancellation._current_run.reset(context_token)
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.cancellation", preview=False)
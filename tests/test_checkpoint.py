@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+
+import pytest
+
+from learn_strands_agents.checkpoint import (
+    hash_inputs,
+    CheckpointStore,
+)
+
+
+def test_hash_inputs():
+    assert hash_inputs("a", {"x": 1, "y": 2}) == hash_inputs("a", {"y": 2, "x": 1})
+    assert hash_inputs("a", {"x": 1}) != hash_inputs("b", {"x": 1})
+    assert hash_inputs("a", {"x": 1}) != hash_inputs("a", {"x": 2})
+
+
+def test_checkpoint_store(tmp_path):
+    store = CheckpointStore(dir_root=tmp_path)
+    calls = []
+
+    def func():
+        calls.append(1)
+        return {"answer": 42}
+
+    run = store.run("stage", {"prompt": "q"}, func, metadata=lambda out: {"size": len(out)})
+    assert run.cached is False
+    assert run.output == {"answer": 42}
+    assert run.checkpoint.metadata["size"] == 1
+    assert "duration" in run.checkpoint.metadata
+
+    run = store.run("stage", {"prompt": "q"}, func)
+    assert run.cached is True
+    assert run.output == {"answer": 42}
+    assert len(calls) == 1
+
+    # changed inputs invalidate the checkpoint
+    run = store.run("stage", {"prompt": "other"}, func)
+    assert run.cached is False
+    assert len(calls) == 2
+    assert list((tmp_path / "stage").glob("*.tmp")) == []
+
+    assert store.delete("stage", {"prompt": "q"}) is True
+    assert store.delete("stage", {"prompt": "q"}) is False
+    assert store.get("stage", {"prompt": "q"}) is None
+
+    # other files of the directory are kept
+    tmp_path.joinpath("notes.txt").write_text("keep me")
+    store.clear()
+    assert store.get("stage", {"prompt": "other"}) is None
+    assert [p.name for p in tmp_path.glob("**/*.*")] == ["notes.txt"]
+    # and the store can be written again
+    assert store.run("stage", {"prompt": "q"}, func).cached is False
+    # also when its directory was removed meanwhile
+    shutil.rmtree(tmp_path / "stage")
+    assert store.run("stage", {"prompt": "other"}, func).cached is False
+
+
+def test_checkpoint_store_failed_stage(tmp_path):
+    store = CheckpointStore(dir_root=tmp_path)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        store.run("stage", {}, fail)
+    assert store.get("stage", {}) is None
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "learn_strands_agents.checkpoint",
+        preview=False,
+    )
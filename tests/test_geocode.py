@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import json
+import concurrent.futures
+
+from learn_strands_agents import geocode as geocode_module
+from learn_strands_agents.geocode import (
+    normalize_place,
+    Place,
+    build_gazetteer,
+    Gazetteer,
+    get_gazetteer,
+    geocode,
+)
+
+
+def test_normalize_place():
+    assert normalize_place("Saint Louis, Missouri") == "st louis mo"
+    assert normalize_place("  Charleston, West Virginia ") == "charleston wv"
+    assert normalize_place("San José") == "san jose"
+    assert normalize_place("Fort Worth, TX") == "ft worth tx"
+    assert normalize_place("Washington") == "washington"
+
+
+def test_gazetteer(tmp_path):
+    path = build_gazetteer(
+        [
+            Place.new("Portland", "OR", 45.5152, -122.6784, 652503),
+            Place.new("Portland", "ME", 43.6591, -70.2568, 68408),
+            Place.new("Seattle", "WA", 47.6062, -122.3321, 737015),
+            Place.new("St. Louis", "MO", 38.6270, -90.1994, 301578),
+        ],
+        tmp_path / "cities.tsv",
+    )
+    gazetteer = Gazetteer(path)
+    assert len(gazetteer) == 4
+    assert [p.key for p in gazetteer] == [
+        "portland me",
+        "portland or",
+        "seattle wa",
+        "st louis mo",
+    ]
+
+    assert gazetteer.get("Portland").label == "Portland, OR"
+    assert gazetteer.get("portland, maine").label == "Portland, ME"
+    assert gazetteer.get("Saint Louis").lat == 38.6270
+    assert gazetteer.get("Port") is None
+    assert gazetteer.get("Tacoma") is None
+
+    assert [p.label for p in gazetteer.prefix("port")] == ["Portland, OR", "Portland, ME"]
+    assert [p.label for p in gazetteer.prefix("port", limit=1)] == ["Portland, OR"]
+    assert gazetteer.prefix("zzz") == []
+
+    assert gazetteer.fuzzy("Seatle")[0].label == "Seattle, WA"
+    assert gazetteer.resolve("Portlnd, ME").label == "Portland, ME"
+    assert gazetteer.resolve("Tacoma") is None
+    gazetteer.close()
+    assert gazetteer.get("Seattle").lng == -122.3321
+
+
+def test_shipped_gazetteer():
+    gazetteer = get_gazetteer()
+    assert gazetteer is get_gazetteer()
+    keys = [place.key for place in gazetteer]
+    assert keys == sorted(keys)
+    assert len(keys) == len(set(keys))
+    for place in gazetteer:
+        assert 18 < place.lat < 72 and -180 < place.lng < -65, place
+
+    assert gazetteer.resolve("Seattle").label == "Seattle, WA"
+    assert gazetteer.resolve("Sanfrancisco").label == "San Francisco, CA"
+
+    assert json.loads(geocode("Portland, ME")) == [
+        {"place": "Portland, ME", "lat": 43.6591, "lng": -70.2568}
+    ]
+    assert geocode("Xyzzy") == "No US city found for 'Xyzzy'."
+
+
+def test_get_gazetteer_threads(monkeypatch):
+    monkeypatch.setattr(geocode_module, "_gazetteer", None)
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        gazetteers = set(executor.map(lambda _: id(get_gazetteer()), range(32)))
+    assert len(gazetteers) == 1
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.geocode", preview=False)
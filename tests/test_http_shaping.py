@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.http_shaping import (
+    ShapingConfig,
+    HtmlTextExtractor,
+    parse_json_path,
+    json_path_select,
+    shape_body,
+    shape_text,
+    fetch_shaped,
+    http_get,
+    HttpResultShapingHook,
+)
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Amazon Bedrock</title><style>body { color: red; }</style></head>
+<body>
+<header><nav><a href="/">Home</a> <a href="/products">Products</a></nav></header>
+<script>var tracking = 1;</script>
+<main>
+<h1>Amazon Bedrock AgentCore</h1>
+<p>Amazon Bedrock AgentCore is now &amp; generally available.</p>
+<p>Deploy agents securely at scale.</p>
+</main>
+<footer>Privacy | Terms</footer>
+</body>
+</html>
+"""
+
+FORECAST = {
+    "properties": {
+        "periods": [
+            {"name": "Tonight", "temperature": 54, "detailedForecast": "Rain likely."},
+            {"name": "Friday", "temperature": 60, "detailedForecast": "Rain."},
+        ]
+    }
+}
+
+
+def test_html_text_extractor():
+    extractor = HtmlTextExtractor(max_chars=1000)
+    for i in range(0, len(PAGE), 7):
+        extractor.feed(PAGE[i : i + 7])
+    extractor.close()
+    assert extractor.text == (
+        "Amazon Bedrock AgentCore\n\n"
+        "Amazon Bedrock AgentCore is now & generally available.\n\n"
+        "Deploy agents securely at scale."
+    )
+
+    extractor = HtmlTextExtractor(max_chars=1000, main_content=False)
+    extractor.feed(PAGE)
+    extractor.close()
+    assert "Home" in extractor.text
+    assert "Privacy" in extractor.text
+    assert "tracking" not in extractor.text
+    assert "color" not in extractor.text
+
+    extractor = HtmlTextExtractor(max_chars=20)
+    extractor.feed(PAGE)
+    assert extractor.is_full
+    assert len(extractor.text) == 20
+    assert extractor.truncated
+
+
+def test_json_path():
+    assert parse_json_path("$.properties.periods[0].name") == ["properties", "periods", 0, "name"]
+    assert json_path_select(FORECAST, "properties.periods[0].name") == "Tonight"
+    assert json_path_select(FORECAST, "properties.periods[-1].temperature") == 60
+    assert json_path_select(FORECAST, "properties.periods[*].name") == ["Tonight", "Friday"]
+    assert json_path_select(FORECAST, "properties.*") == [FORECAST["properties"]["periods"]]
+    with pytest.raises(KeyError):
+        json_path_select(FORECAST, "properties.missing")
+
+
+def test_shape_body():
+    # html stops reading once enough text was collected
+    chunks = [PAGE.encode("utf-8")] + [b"<p>" + b"y" * 1000 + b"</p>"] * 100
+    body = shape_body(iter(chunks), "text/html", ShapingConfig(max_chars=30, main_content=False))
+    assert len(body.text) == 30
+    assert body.truncated
+    assert body.bytes_read < 10_000
+
+    # byte cap
+    body = shape_body([b"x" * 100] * 10, "text/plain", ShapingConfig(max_bytes=250))
+    assert body.bytes_read == 250
+    assert body.text == "x" * 250
+    assert body.truncated
+
+    # json path
+    body = shape_text(
+        json.dumps(FORECAST),
+        "application/geo+json",
+        ShapingConfig(json_path="properties.periods[*].detailedForecast"),
+    )
+    assert body.text == '["Rain likely.","Rain."]'
+    assert not body.truncated
+
+    body = shape_text(json.dumps(FORECAST), None, ShapingConfig(json_path="missing"))
+    assert body.text.startswith("[json path 'missing' not applied")
+
+    # token cap
+    body = shape_text("z" * 1000, None, ShapingConfig(max_tokens=10))
+    assert body.text.startswith("z" * 40 + "\n... [truncated 960 chars]")
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/page":
+            body, content_type = PAGE.encode("utf-8"), "text/html; charset=utf-8"
+        else:
+            body, content_type = json.dumps(FORECAST).encode("utf-8"), "application/geo+json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_fetch_shaped(base_url):
+    response = fetch_shaped(f"{base_url}/page")
+    assert response.status_code == 200
+    assert response.body.text.startswith("Amazon Bedrock AgentCore")
+    assert "Home" not in response.body.text
+
+    text = http_get(url=f"{base_url}/forecast", json_path="properties.periods[0].name")
+    assert text.endswith('Body: "Tonight"')
+
+
+def test_http_result_shaping_hook():
+    @strands.tool(name="http_request")
+    def http_request(url: str) -> dict:
+        """
+        Fetch a web page.
+        """
+        body = PAGE if url.endswith("/page") else json.dumps(FORECAST)
+        return {
+            "status": "success",
+            "content": [
+                {"text": "Status Code: 200"},
+                {"text": f"Body: {body}"},
+            ],
+        }
+
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                tool_uses=[
+                    ScriptedToolUse("http_request", {"url": "https://aws.amazon.com/page"}),
+                    ScriptedToolUse("http_request", {"url": "https://api.weather.gov/gridpoints/SEW/124,67/forecast"}),
+                ]
+            ),
+            ScriptedTurn(text="done"),
+        ]
+    )
+    hook = HttpResultShapingHook(
+        json_paths={"https://api.weather.gov/gridpoints/": "properties.periods[*].name"},
+    )
+    agent = strands.Agent(
+        model=model,
+        tools=[http_request],
+        hooks=[hook],
+        callback_handler=None,
+    )
+    agent("fetch")
+    results = {
+        block["toolResult"]["toolUseId"]: block["toolResult"]["content"]
+        for block in agent.messages[2]["content"]
+    }
+    texts = [content[1]["text"] for content in results.values()]
+    assert "Body: Amazon Bedrock AgentCore\n\n" in sorted(texts)[0]
+    assert 'Body: ["Tonight","Friday"]' in texts
+    assert all(content[0]["text"] == "Status Code: 200" for content in results.values())
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "learn_strands_agents.http_shaping",
+        preview=False,
+    )
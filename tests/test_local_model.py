@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+
+
+@strands.tool(name="get_weather")
+def get_weather(lat: float, lng: float) -> str:
+    """
+    Getting the weather in Celsius for a given latitude and longitude.
+    """
+    return "temperature=19.2"
+
+
+def test_scripted_model():
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                text="<thinking>I need the weather tool.</thinking>",
+                tool_uses=[ScriptedToolUse("get_weather", {"lat": 1, "lng": 2})],
+                latency_ms=100,
+            ),
+            ScriptedTurn(
+                text="It is 19.2 C.",
+                input_tokens=50,
+                output_tokens=5,
+                latency_ms=50,
+            ),
+        ],
+    )
+    agent = strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+    result = agent("What's the weather at 38.9072, 77.0369?")
+
+    assert result.stop_reason == "end_turn"
+    assert result.message["content"] == [{"text": "It is 19.2 C."}]
+    assert result.metrics.cycle_count == 2
+    assert result.metrics.accumulated_metrics["latencyMs"] == 150
+    assert len(agent.messages) == 4
+    tool_result = agent.messages[2]["content"][0]["toolResult"]
+    assert tool_result["content"] == [{"text": "temperature=19.2"}]
+
+    assert len(model.requests) == 2
+    assert model.requests[0]["tool_specs"][0]["name"] == "get_weather"
+    assert len(model.requests[1]["messages"]) == 3
+
+    with pytest.raises(RuntimeError):
+        agent("again")
+
+
+def test_scripted_model_responder():
+    def responder(messages, tool_specs, system_prompt):
+        return ScriptedTurn(text=f"{system_prompt}: {len(messages)}")
+
+    agent = strands.Agent(
+        model=ScriptedModel(responder=responder),
+        system_prompt="echo",
+        callback_handler=None,
+    )
+    assert str(agent("hi")).strip() == "echo: 1"
+    assert str(agent("hi")).strip() == "echo: 3"
+
+    with pytest.raises(ValueError):
+        ScriptedModel()
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "learn_strands_agents.local_model",
+        preview=False,
+    )
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import gc
+
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.message_hygiene import (
+    RetentionRules,
+    MessageHygieneHook,
+)
+
+
+@strands.tool(name="http_request")
+def http_request(url: str) -> str:
+    """
+    Fetch a web page.
+    """
+    return "<html>" + "x" * 5000 + "</html>"
+
+
+def _turns():
+    return [
+        ScriptedTurn(
+            text="<thinking>I should fetch the page first.</thinking>",
+            tool_uses=[ScriptedToolUse("http_request", {"url": "https://aws.amazon.com/bedrock/"})],
+        ),
+        ScriptedTurn(text="<thinking>The page says it is GA.</thinking> It is GA."),
+        ScriptedTurn(text="You asked about Bedrock."),
+    ]
+
+
+def test_message_hygiene_hook():
+    hygiene = MessageHygieneHook(RetentionRules(max_tool_result_chars=100))
+    model = ScriptedModel(turns=_turns())
+    agent = strands.Agent(
+        model=model,
+        tools=[http_request],
+        hooks=[hygiene],
+        callback_handler=None,
+    )
+    result = agent("Is Bedrock GA?")
+
+    # the current turn is never changed
+    assert "<thinking>" in agent.messages[1]["content"][0]["text"]
+    assert len(agent.messages[2]["content"][0]["toolResult"]["content"][0]["text"]) > 5000
+    assert len(hygiene.stats.turns) == 1
+    assert hygiene.stats.tokens_saved == 0
+
+    agent("What did I ask?")
+    messages = agent.messages
+    # thinking only block is dropped, the tool use is kept
+    assert [list(block) for block in messages[1]["content"]] == [["toolUse"]]
+    text = messages[2]["content"][0]["toolResult"]["content"][0]["text"]
+    assert text.startswith("<html>")
+    assert text.endswith("</html>")
+    assert "chars removed" in text
+    assert messages[3]["content"][0]["text"] == "It is GA."
+    # the result of the previous turn is not affected
+    assert "<thinking>" in result.message["content"][0]["text"]
+
+    turn = hygiene.stats.turns[1]
+    assert turn.thinking_blocks == 2
+    assert turn.tool_results_truncated == 1
+    assert turn.chars_removed > 4500
+    assert turn.tokens_saved > 1000
+    assert hygiene.stats.chars_removed == turn.chars_removed
+
+    # the model saw the cleaned history on the last request
+    last_request = model.requests[-1]["messages"]
+    assert "<thinking>" not in str(last_request)
+
+    # the hook forgets agents that are gone
+    assert len(hygiene._cursors) == 1
+    del agent, result
+    gc.collect()
+    assert len(hygiene._cursors) == 0
+
+
+def test_clean_message_rules():
+    hygiene = MessageHygieneHook(
+        RetentionRules(
+            thinking_summary_chars=10,
+            max_tool_result_chars=None,
+        )
+    )
+    message = {
+        "role": "assistant",
+        "content": [
+            {"text": "<thinking>a very long chain of thought</thinking>Answer"},
+            {"reasoningContent": {"reasoningText": {"text": "native"}}},
+        ],
+    }
+    cleaned = hygiene.clean_message(message)
+    assert cleaned["content"] == [{"text": "<thinking>a very lon...</thinking>\nAnswer"}]
+    assert len(message["content"]) == 2
+
+    only_thinking = {"role": "assistant", "content": [{"reasoningContent": {}}]}
+    assert hygiene.clean_message(only_thinking)["content"] == [{"text": "[thinking removed]"}]
+
+    tool_result = {
+        "role": "user",
+        "content": [{"toolResult": {"toolUseId": "t", "content": [{"text": "x" * 10000}]}}],
+    }
+    assert hygiene.clean_message(tool_result) is None
+    assert hygiene.clean_message({"role": "user", "content": [{"text": "hi"}]}) is None
+
+
+def test_keep_recent_messages():
+    hygiene = MessageHygieneHook(RetentionRules(keep_recent_messages=10))
+    agent = strands.Agent(
+        model=ScriptedModel(turns=_turns()),
+        tools=[http_request],
+        hooks=[hygiene],
+        callback_handler=None,
+    )
+    agent("Is Bedrock GA?")
+    agent("What did I ask?")
+    assert hygiene.stats.chars_removed == 0
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "learn_strands_agents.message_hygiene",
+        preview=False,
+    )
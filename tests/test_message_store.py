@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import pickle
+import tracemalloc
+
+import strands
+
+from learn_strands_agents.local_model import ScriptedToolUse, ScriptedTurn, ScriptedModel
+from learn_strands_agents.message_store import (
+    TextArena,
+    MessageStore,
+    use_message_store,
+)
+
+PAGE = "<html>" + "weather data " * 500 + "</html>"
+
+
+def _messages(page=PAGE):
+    return [
+        {"role": "user", "content": [{"text": "What's the weather in Seattle?"}]},
+        {
+            "role": "assistant",
+            "content": [
+                {"text": "<thinking>I need the tool.</thinking>"},
+                {
+                    "toolUse": {
+                        "toolUseId": "t1",
+                        "name": "http_request",
+                        "input": {"url": "https://example.com", "n": 1.5},
+                    }
+                },
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "toolResult": {
+                        "toolUseId": "t1",
+                        "status": "success",
+                        "content": [{"text": page}, {"json": {"a": 1}}],
+                    }
+                }
+            ],
+        },
+        {
+            "role": "assistant",
+            "content": [{"reasoningContent": {"reasoningText": {"text": "hmm"}}}, {"text": "Sunny."}],
+        },
+    ]
+
+
+def test_message_store_roundtrip():
+    arena = TextArena()
+    store = MessageStore(_messages(), arena=arena)
+    assert store.stats().packed == 4
+    assert arena.stats().entries == 1
+    assert store.to_list() == _messages()
+    assert store.stats().hot == 0
+
+    # sequence behavior
+    assert store == _messages()
+    assert len(store) == 4
+    assert store[-1]["content"][1]["text"] == "Sunny."
+    assert store[1:3] == _messages()[1:3]
+    assert store + [{"role": "user", "content": []}] == _messages() + [{"role": "user", "content": []}]
+    assert copy.deepcopy(store) == _messages()
+    assert pickle.loads(pickle.dumps(store)) == _messages()
+    assert "MessageStore" in repr(store)
+
+    # in place mutation of an accessed message survives packing
+    store[2]["content"][0]["toolResult"]["status"] = "error"
+    assert store.stats().hot == 3
+    assert store.pack() == 3
+    assert store[2]["content"][0]["toolResult"]["status"] == "error"
+
+    # the page was released when the message got hot, then added again
+    store.pack()
+    assert arena.stats().entries == 1
+    del store[2]
+    store[0] = {"role": "user", "content": [{"text": "hi"}]}
+    store.insert(0, {"role": "user", "content": [{"text": "first"}]})
+    store.pack()
+    assert arena.stats().entries == 0
+    assert [m["role"] for m in store.iter_snapshot()] == ["user", "user", "assistant", "assistant"]
+    store[:] = store[2:]
+    assert len(store) == 2
+
+
+def test_text_arena():
+    arena = TextArena(compact_threshold=0)
+    a = arena.add("a" * 1000)
+    b = arena.add("b" * 1000)
+    assert arena.add("a" * 1000) == a
+    assert arena.stats().bytes_used == 2000
+    arena.release(a)
+    assert arena.get(a) == "a" * 1000
+    arena.release(a)
+    # compacted automatically
+    assert arena.stats().bytes_wasted == 0
+    assert arena.get(b) == "b" * 1000
+
+
+def test_message_store_memory():
+    n_sessions = 50
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    plain = [_messages(PAGE[:-7] + f"{i % 5}</html>") for i in range(n_sessions)]
+    plain_size = tracemalloc.get_traced_memory()[0] - before
+
+    before = tracemalloc.get_traced_memory()[0]
+    arena = TextArena()
+    stores = [MessageStore(messages, arena=arena) for messages in plain]
+    del plain
+    store_size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # 5 distinct pages only
+    assert arena.stats().entries == 5
+    assert store_size < plain_size / 4
+    assert len(stores) == n_sessions
+
+
+def test_use_message_store():
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(tool_uses=[ScriptedToolUse("echo", {"text": "x" * 500})]),
+            ScriptedTurn(text="done"),
+            ScriptedTurn(text="again"),
+        ]
+    )
+
+    @strands.tool
+    def echo(text: str) -> str:
+        """
+        Echo a text.
+        """
+        return text
+
+    agent = strands.Agent(model=model, tools=[echo], callback_handler=None)
+    store = use_message_store(agent, arena=TextArena())
+    agent("echo something long")
+    assert agent.messages is store
+    assert store.stats().hot == 0
+    assert len(store) == 4
+    assert str(agent("and again")).strip() == "again"
+    assert store.stats().packed == 6
+    assert store[2]["content"][0]["toolResult"]["content"][0]["text"] == "x" * 500
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.message_store", preview=False)
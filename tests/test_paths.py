@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import tempfile
+import concurrent.futures
+from pathlib import Path
+
+import pytest
+
+from learn_strands_agents.paths import PathEnum, path_enum
+
+
+def test_dirs():
+    dirs = path_enum.dirs()
+    assert dirs["dir_tmp"] == path_enum.dir_project_root / "tmp"
+    assert "dir_unit_test" not in path_enum.missing_dirs()
+
+
+def test_workspace(tmp_path):
+    paths = PathEnum()
+    target = tmp_path / "a" / "b"
+    assert paths.ensure_dir(target) == target and target.is_dir()
+    assert paths.ensure_dir(target) == target
+
+    # concurrent jobs get their own directories
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        dirs = list(executor.map(lambda _: paths.mkdtemp(parent=tmp_path / "jobs"), range(16)))
+    assert len(set(dirs)) == 16 and all(d.is_dir() for d in dirs)
+
+    with paths.temp_dir(prefix="kb-", parent=tmp_path) as job:
+        assert job.name.startswith("kb-")
+        job.joinpath("out.txt").write_text("hello")
+    assert not job.exists()
+    with paths.temp_dir(parent=tmp_path, keep=True) as job:
+        pass
+    assert job.exists()
+
+
+def test_in_dir(tmp_path):
+    paths = PathEnum()
+    target = paths.ensure_dir(tmp_path / "a" / "b")
+    shutil.rmtree(tmp_path / "a")
+    # the directory is created again when a write finds it missing
+    path = paths.in_dir(target, lambda: tempfile.mkstemp(dir=target)[1])
+    assert Path(path).parent == target
+    assert paths.mkdtemp(parent=target).parent == target
+    with pytest.raises(FileNotFoundError):
+        paths.in_dir(target, lambda: open(target / "missing" / "file"))
+
+
+def test_glob_and_stat(tmp_path):
+    paths = PathEnum()
+    (tmp_path / "pkg" / "vendor").mkdir(parents=True)
+    (tmp_path / "pkg" / "a.py").write_text("")
+    (tmp_path / "pkg" / "vendor" / "b.py").write_text("")
+    files = paths.glob("pkg/**/*.py", root=tmp_path, exclude=["pkg/vendor/*"])
+    assert files == (tmp_path / "pkg" / "a.py",)
+
+    # cached until invalidated
+    (tmp_path / "pkg" / "c.py").write_text("")
+    assert paths.glob("pkg/**/*.py", root=tmp_path, exclude=["pkg/vendor/*"]) == files
+    assert len(paths.glob("pkg/**/*.py", root=tmp_path, exclude=["pkg/vendor/*"], max_age=0)) == 2
+
+    assert paths.stat(tmp_path / "missing") is None
+    (tmp_path / "missing").write_text("now")
+    assert paths.stat(tmp_path / "missing") is None
+    paths.invalidate()
+    assert paths.stat(tmp_path / "missing").st_size == 3
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.paths", preview=False)
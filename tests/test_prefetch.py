@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import collections
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.prefetch import (
+    PrefetchRule,
+    fetch_http_result,
+    result_body,
+    PrefetchHook,
+)
+from learn_strands_agents.weather import WEATHER_PREFETCH_RULES, new_weather_agent
+
+FORECAST = {"properties": {"periods": [{"name": "Tonight", "temperature": 54}]}}
+
+hits = collections.Counter()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        hits[self.path] += 1
+        host = f"http://{self.headers['Host']}"
+        if self.path.startswith("/points/"):
+            data = {
+                "properties": {
+                    "forecast": f"{host}/gridpoints/SEW/125,68/forecast",
+                    "forecastHourly": f"{host}/gridpoints/SEW/125,68/forecast/hourly",
+                }
+            }
+        else:
+            data = FORECAST
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/geo+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+tool_calls = []
+
+
+@strands.tool(name="http_request")
+def http_request(method: str, url: str) -> dict:
+    """
+    Make an HTTP request.
+    """
+    tool_calls.append(url)
+    result = fetch_http_result(url)
+    return {"status": result["status"], "content": result["content"]}
+
+
+def test_prefetch_rule():
+    rule = PrefetchRule(
+        name="hourly",
+        url_pattern=r"https://api\.weather\.gov/points/",
+        link_path="properties.forecast*",
+    )
+    assert rule.matches("https://api.weather.gov/points/47.6,-122.3")
+    assert not rule.matches("https://api.weather.gov/gridpoints/SEW/1,2")
+    assert WEATHER_PREFETCH_RULES[0].links(
+        {"properties": {"forecast": "https://x/forecast", "county": None}}
+    ) == ["https://x/forecast"]
+    assert WEATHER_PREFETCH_RULES[0].links({"properties": {"forecast": None}}) == []
+    assert WEATHER_PREFETCH_RULES[0].links({}) == []
+
+
+def _model(base_url):
+    return ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                tool_uses=[
+                    ScriptedToolUse(
+                        "http_request",
+                        {"method": "GET", "url": f"{base_url}/points/47.6,-122.3"},
+                    )
+                ]
+            ),
+            ScriptedTurn(
+                tool_uses=[
+                    ScriptedToolUse(
+                        "http_request",
+                        {"method": "GET", "url": f"{base_url}/gridpoints/SEW/125,68/forecast"},
+                    )
+                ]
+            ),
+            ScriptedTurn(text="Rain tonight."),
+        ]
+    )
+
+
+def test_prefetch_hook(base_url):
+    hits.clear()
+    tool_calls.clear()
+    hook = PrefetchHook(
+        rules=[PrefetchRule("local", f"{base_url}/points/", "properties.forecast")]
+    )
+    model = _model(base_url)
+    agent = new_weather_agent(
+        model=model,
+        prefetch=False,
+        tools=[http_request],
+        hooks=[hook],
+        callback_handler=None,
+    )
+    result = agent("What's the weather like in Seattle?")
+    assert str(result).strip() == "Rain tonight."
+
+    # the forecast was downloaded once, in the background
+    assert tool_calls == [f"{base_url}/points/47.6,-122.3"]
+    assert hits["/gridpoints/SEW/125,68/forecast"] == 1
+    assert hits["/gridpoints/SEW/125,68/forecast/hourly"] == 0
+    assert hook.stats.started == 1
+    assert hook.stats.hits == 1
+
+    # and handed to the model like a normal tool result
+    tool_result = agent.messages[-2]["content"][0]["toolResult"]
+    assert tool_result["status"] == "success"
+    assert tool_result["toolUseId"] == "tooluse_local_2"
+    assert json.loads(result_body(tool_result)) == FORECAST
+    assert tool_result["content"][0]["text"] == "Status Code: 200"
+
+    # a prefetch is served once
+    assert hook._entries == {}
+    hook.close()
+
+
+def test_prefetch_hook_fallback(base_url):
+    tool_calls.clear()
+
+    def fetch(url):
+        raise ConnectionError("offline")
+
+    hook = PrefetchHook(
+        rules=[PrefetchRule("local", f"{base_url}/points/", "properties.forecast")],
+        fetch=fetch,
+    )
+    agent = strands.Agent(
+        model=_model(base_url),
+        tools=[http_request],
+        hooks=[hook],
+        callback_handler=None,
+    )
+    agent("What's the weather like in Seattle?")
+    # the real tool ran instead
+    assert len(tool_calls) == 2
+    assert hook.stats.failed == 1
+    assert hook.stats.hits == 0
+    hook.close()
+
+
+def test_prefetch_hook_in_flight(base_url):
+    tool_calls.clear()
+    release = threading.Event()
+
+    def fetch(url):
+        release.wait(5)
+        return fetch_http_result(url)
+
+    @strands.tool
+    def release_prefetch() -> str:
+        """
+        Let the prefetch finish.
+        """
+        release.set()
+        return "done"
+
+    hook = PrefetchHook(
+        rules=[PrefetchRule("local", f"{base_url}/points/", "properties.forecast")],
+        fetch=fetch,
+        wait_timeout=2.0,
+    )
+    points, forecast, answer = _model(base_url)._turns
+    # both tools run concurrently, the prefetch is awaited without
+    # blocking the event loop, so the other tool can release it
+    forecast.tool_uses.append(ScriptedToolUse("release_prefetch", {}))
+    agent = strands.Agent(
+        model=ScriptedModel(turns=[points, forecast, answer]),
+        tools=[http_request, release_prefetch],
+        hooks=[hook],
+        callback_handler=None,
+    )
+    agent("What's the weather like in Seattle?")
+    assert tool_calls == [f"{base_url}/points/47.6,-122.3"]
+    assert hook.stats.hits == 1
+
+    # a prefetch that takes too long falls back to the real tool
+    release.clear()
+    hook.wait_timeout = 0.05
+    agent = strands.Agent(
+        model=_model(base_url),
+        tools=[http_request],
+        hooks=[hook],
+        callback_handler=None,
+    )
+    agent("What's the weather like in Seattle?")
+    release.set()
+    assert len(tool_calls) == 3
+    assert hook.stats.failed == 1
+    hook.close()
+
+
+def test_prefetch_expiry():
+    hook = PrefetchHook(rules=[], fetch=lambda url: {}, max_entries=1)
+    rule = PrefetchRule("rule", "", "link")
+    assert hook.prefetch("http://a", rule)
+    assert not hook.prefetch("http://a", rule)
+    # the oldest prefetch is evicted
+    assert hook.prefetch("http://b", rule)
+    assert list(hook._entries) == ["http://b"]
+    assert hook.stats.wasted == 1
+    # expired prefetches are dropped
+    hook.ttl = -1.0
+    assert hook.prefetch("http://b", rule)
+    assert hook.stats.wasted == 2
+    hook.close()
+    assert hook._entries == {}
+    assert hook.stats.wasted == 3
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.prefetch", preview=False)
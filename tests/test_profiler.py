@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+
+import strands
+
+from learn_strands_agents.local_model import ScriptedToolUse, ScriptedTurn, ScriptedModel
+from learn_strands_agents.profiler import SamplingProfiler
+
+
+def burn(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@strands.tool
+def slow_tool(seconds: float) -> str:
+    """
+    Busy wait.
+    """
+    burn(seconds)
+    return "done"
+
+
+def _responder(messages, tool_specs, system_prompt):
+    if len(messages) == 1:
+        return ScriptedTurn(tool_uses=[ScriptedToolUse("slow_tool", {"seconds": 0.2})])
+    # slow model side processing in the second cycle
+    burn(0.1)
+    return ScriptedTurn(text="done")
+
+
+def _agent(profiler):
+    model = ScriptedModel(responder=_responder)
+    return strands.Agent(
+        model=model,
+        tools=[slow_tool],
+        hooks=[profiler],
+        callback_handler=None,
+    )
+
+
+def test_sampling_profiler(tmp_path):
+    profiler = SamplingProfiler(interval=0.002)
+    agent = _agent(profiler)
+    result = agent("go")
+    profiler.stop()
+
+    assert profiler.sampled_invocations == 1
+    assert profiler.n_samples > 10
+    (tool_trace,) = [
+        child
+        for child in result.metrics.traces[0].children
+        if child.name == "Tool: slow_tool"
+    ]
+    spans = profiler.span_samples()
+    assert spans[f"tool:slow_tool:{tool_trace.id}"] > 10
+    assert spans[f"cycle:{result.metrics.traces[1].id}"] > 5
+
+    lines = profiler.folded()
+    assert any(line.startswith(f"tool:slow_tool:{tool_trace.id};") and "test_profiler.burn" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert not any(line.startswith("tool:") for line in profiler.folded(by_span=False))
+    assert profiler.top_functions(1)[0][0] == "test_profiler.burn"
+
+    path = profiler.write_folded(tmp_path / "agent.folded")
+    assert path.read_text().count("\n") == len(lines)
+
+    # no span active, nothing is sampled
+    assert profiler.sample() == 0
+    # the tool use ids of the invocation are not kept
+    assert profiler._tool_tags == {}
+
+
+def test_sampling_profiler_threads():
+    # a busy thread that doesn't belong to the agent
+    stop = threading.Event()
+
+    def background():
+        while not stop.is_set():
+            burn(0.01)
+
+    thread = threading.Thread(target=background, daemon=True)
+    thread.start()
+    try:
+        profiler = SamplingProfiler(interval=0.002)
+        _agent(profiler)("go")
+        profiler.stop()
+    finally:
+        stop.set()
+        thread.join()
+    assert not any("background" in line for line in profiler.folded())
+    # the tool ran in a worker thread and was still sampled
+    assert any(tag.startswith("tool:slow_tool:") for tag in profiler.span_samples())
+
+    # beyond max_stacks, new stacks are folded into <other>
+    profiler = SamplingProfiler(interval=0.002, max_stacks=1)
+    _agent(profiler)("go")
+    profiler.stop()
+    assert len(profiler.samples) == 2
+    (kept,) = [key for key in profiler.samples if key != ("<other>", ())]
+    assert profiler.samples[kept] >= 1
+    assert profiler.samples[("<other>", ())] == profiler.dropped_samples > 0
+    assert f"<other> {profiler.dropped_samples}" in profiler.folded()
+
+
+def test_sampling_profiler_sample_rate():
+    profiler = SamplingProfiler(interval=0.002, sample_rate=0)
+    _agent(profiler)("go")
+    assert profiler.skipped_invocations == 1
+    assert profiler.n_samples == 0
+    assert profiler.folded() == []
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.profiler", preview=False)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.prompt_cache import (
+    CacheSupport,
+    get_cache_support,
+    PromptCacheHook,
+    CacheReport,
+    cache_report,
+)
+
+SYSTEM_PROMPT = "You are a weather assistant. " * 40
+
+
+@strands.tool
+def get_weather(city: str) -> str:
+    """
+    Get the weather of a city.
+    """
+    return f"sunny in {city}"
+
+
+@strands.tool
+def get_alerts(city: str) -> str:
+    """
+    Get the weather alerts of a city.
+    """
+    return "none"
+
+
+def test_get_cache_support():
+    assert get_cache_support("us.amazon.nova-micro-v1:0").tools is False
+    assert get_cache_support("us.anthropic.claude-3-7-sonnet-20250219-v1:0").min_tokens == 1024
+    assert get_cache_support("us.meta.llama3-3-70b-instruct-v1:0") is None
+    assert get_cache_support(None) is None
+
+
+def _agent(hook):
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(tool_uses=[ScriptedToolUse("get_weather", {"city": "Seattle"})]),
+            ScriptedTurn(text="Sunny."),
+            ScriptedTurn(text="Still sunny."),
+        ]
+    )
+    agent = strands.Agent(
+        model=model,
+        system_prompt=SYSTEM_PROMPT,
+        tools=[get_weather, get_alerts],
+        hooks=[hook] if hook else [],
+        callback_handler=None,
+    )
+    return agent, model
+
+
+def test_prompt_cache_hook():
+    hook = PromptCacheHook(support=CacheSupport(model_id_patterns=("local",), min_tokens=100))
+    agent, model = _agent(hook)
+    result = agent("What's the weather in Seattle?")
+
+    # tools are sorted, system prompt and tools are checkpointed
+    assert [spec["name"] for spec in model.requests[0]["tool_specs"]] == [
+        "get_alerts",
+        "get_weather",
+    ]
+    assert model.config["cache_tools"] == "default"
+    assert model.config["cache_prompt"] == "default"
+
+    # the history checkpoint moves with the conversation
+    first, second = model.requests
+    assert first["messages"][-1]["content"][-1] == {"cachePoint": {"type": "default"}}
+    assert [
+        i for i, m in enumerate(second["messages"]) if "cachePoint" in m["content"][-1]
+    ] == [0, 2]
+    # but never stays in the conversation
+    for message in agent.messages:
+        assert all("cachePoint" not in block for block in message["content"])
+
+    report = cache_report(result)
+    assert report.cache_read_tokens > 0
+    assert report.cache_write_tokens > 0
+    assert report.cache_read_tokens == result.metrics.accumulated_usage["cacheReadInputTokens"]
+
+    # the next invocation reads the whole previous request from the cache
+    result = agent("And now?")
+    third = model.requests[2]
+    assert [
+        i for i, m in enumerate(third["messages"]) if "cachePoint" in m["content"][-1]
+    ] == [2, 4]
+    assert cache_report(result).hit_ratio > 0.5
+
+
+def test_prompt_cache_hook_not_supported():
+    hook = PromptCacheHook()
+    agent, model = _agent(hook)
+    result = agent("What's the weather in Seattle?")
+    assert "cache_prompt" not in model.config
+    for request in model.requests:
+        for message in request["messages"]:
+            assert all("cachePoint" not in block for block in message["content"])
+    assert cache_report(result) == CacheReport(
+        input_tokens=result.metrics.accumulated_usage["inputTokens"]
+    )
+
+    # too short to be cached
+    hook = PromptCacheHook(support=CacheSupport(model_id_patterns=("local",), min_tokens=10_000))
+    agent, model = _agent(hook)
+    agent("What's the weather in Seattle?")
+    assert "cache_prompt" not in model.config
+    assert "cacheReadInputTokens" not in agent.event_loop_metrics.accumulated_usage
+
+
+def test_cache_report():
+    report = cache_report(
+        {"inputTokens": 100, "cacheReadInputTokens": 800, "cacheWriteInputTokens": 100}
+    )
+    assert report.total_input_tokens == 1000
+    assert report.hit_ratio == 0.8
+    assert report.to_dict()["hit_ratio"] == 0.8
+    assert CacheReport().hit_ratio == 0.0
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.prompt_cache", preview=False)
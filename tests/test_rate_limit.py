@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+import strands
+from strands.types.exceptions import ModelThrottledException
+
+from learn_strands_agents.local_model import ScriptedTurn, ScriptedModel
+from learn_strands_agents.rate_limit import (
+    INTERACTIVE,
+    BATCH,
+    TokenBucket,
+    AimdLimiter,
+    ModelLimits,
+    RetryPolicy,
+    ThrottlingRetriesExhaustedError,
+    RateLimitScheduler,
+    ScheduledModel,
+    get_scheduler,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_minute=60, capacity=10, clock=clock)
+    assert bucket.wait_time(10) == 0
+    bucket.consume(10)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 5
+    assert bucket.wait_time(5) == 0
+    # larger than the capacity only waits for a full bucket
+    assert bucket.wait_time(100) == pytest.approx(5.0)
+    # debt
+    bucket.consume(25)
+    assert bucket.wait_time(1) == pytest.approx(21.0)
+    assert TokenBucket(rate_per_minute=None).wait_time(10**9) == 0
+
+
+def test_aimd_limiter():
+    aimd = AimdLimiter(initial=4, minimum=1, maximum=5)
+    for _ in range(4):
+        aimd.on_success()
+    assert 4.9 < aimd.limit <= 5
+    aimd.on_throttle()
+    assert aimd.limit < 2.5
+    for _ in range(10):
+        aimd.on_throttle()
+    assert aimd.limit == 1
+    aimd.in_flight = 1
+    assert aimd.has_capacity is False
+
+
+def test_scheduler_priority():
+    scheduler = RateLimitScheduler(default_limits=ModelLimits(initial_concurrency=1))
+    order = []
+
+    async def call(name, priority):
+        lease = await scheduler.acquire("m", tokens=10, priority=priority)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        scheduler.release(lease)
+
+    async def main():
+        first = await scheduler.acquire("m")
+        tasks = [
+            asyncio.create_task(call("batch", BATCH)),
+            asyncio.create_task(call("interactive", INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        assert order == []
+        scheduler.release(first)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["interactive", "batch"]
+    assert scheduler.stats("m").granted == 3
+
+
+def test_scheduled_model():
+    n_throttles = 2
+
+    def responder(messages, tool_specs, system_prompt):
+        nonlocal n_throttles
+        if n_throttles:
+            n_throttles -= 1
+            raise ModelThrottledException("Too many requests")
+        return ScriptedTurn(text="hello")
+
+    scheduler = RateLimitScheduler()
+    model = ScheduledModel(
+        ScriptedModel(responder=responder),
+        scheduler=scheduler,
+        retry=RetryPolicy(base_delay=0.001),
+    )
+    assert model.get_config()["model_id"] == "local.scripted-v1"
+    agent = strands.Agent(model=model, callback_handler=None)
+    assert str(agent("hi")).strip() == "hello"
+
+    stats = scheduler.stats("local.scripted-v1")
+    assert (stats.granted, stats.throttled, stats.retries) == (3, 2, 2)
+    # 4 -> 2 -> 1 on the throttles, then + 1 on the success
+    assert scheduler.concurrency_limit("local.scripted-v1") == 2
+
+    # gives up after max attempts
+    n_throttles = 10
+    model.retry = RetryPolicy(max_attempts=2, base_delay=0.001)
+    with pytest.raises(ThrottlingRetriesExhaustedError):
+        asyncio.run(_consume(model.stream([{"role": "user", "content": [{"text": "hi"}]}])))
+    assert scheduler.stats("local.scripted-v1").throttled == 4
+
+    # and the agent doesn't retry it again
+    with pytest.raises(Exception) as excinfo:
+        agent("hi")
+    assert isinstance(
+        getattr(excinfo.value, "original_exception", excinfo.value),
+        ThrottlingRetriesExhaustedError,
+    )
+    assert scheduler.stats("local.scripted-v1").throttled == 6
+
+
+async def _consume(stream):
+    return [event async for event in stream]
+
+
+def test_get_scheduler():
+    assert get_scheduler() is get_scheduler()
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.rate_limit", preview=False)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.replay import (
+    ReplayDivergenceError,
+    Recording,
+    Recorder,
+    dump_reports,
+    load_reports,
+    replay,
+    benchmark,
+    compare_reports,
+    format_diffs,
+)
+
+
+def _record():
+    calls = []
+
+    @strands.tool
+    def get_weather(city: str) -> str:
+        """
+        Get the weather of a city.
+        """
+        calls.append(city)
+        time.sleep(0.1)
+        return f"Rain in {city}."
+
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(text="Hi."),
+            ScriptedTurn(tool_uses=[ScriptedToolUse("get_weather", {"city": "Seattle"})]),
+            ScriptedTurn(text="It will rain in Seattle."),
+        ]
+    )
+    agent = strands.Agent(
+        model=model,
+        tools=[get_weather],
+        system_prompt="You are a weather assistant.",
+        callback_handler=None,
+    )
+    recorder = Recorder()
+    recorder.attach(agent)
+    agent("Hello")
+    agent("What's the weather in Seattle?")
+    return recorder, calls
+
+
+def test_recorder(tmp_path):
+    recorder, calls = _record()
+    assert len(recorder.recordings) == 2
+    recording = recorder.recordings[1]
+    assert recording.prompt == [{"text": "What's the weather in Seattle?"}]
+    assert len(recording.messages) == 2
+    assert recording.system_prompt == "You are a weather assistant."
+    assert len(recording.model_calls) == 2
+    assert recording.model_calls[0].events[0][1] == {"messageStart": {"role": "assistant"}}
+    [tool_call] = recording.tool_calls
+    assert tool_call.name == "get_weather" and tool_call.input == {"city": "Seattle"}
+    assert tool_call.duration >= 0.1
+    assert recording.final_message["content"][0]["text"] == "It will rain in Seattle."
+    report = recording.report()
+    assert report.cycles == 2
+    assert report.tool_time >= 0.1
+    assert report.duration >= report.model_time + report.tool_time
+    assert recording.metadata["model_id"] == "local.scripted-v1"
+
+    path = tmp_path / "seattle.json.gz"
+    recording.dump(path)
+    loaded = Recording.load(path)
+    assert loaded.name == "seattle"
+    assert loaded.model_calls == recording.model_calls
+    assert loaded.tool_calls == recording.tool_calls
+
+    # bytes of image blocks survive
+    recording.prompt.append({"image": {"format": "png", "source": {"bytes": b"\x89PNG"}}})
+    recording.dump(tmp_path / "image.json")
+    loaded = Recording.load(tmp_path / "image.json")
+    assert loaded.prompt[1]["image"]["source"]["bytes"] == b"\x89PNG"
+
+
+def test_replay(tmp_path):
+    recorder, calls = _record()
+    recording = recorder.recordings[1]
+    recording.name = "seattle"
+
+    report = replay(recording)
+    assert report.matches
+    assert report.cycles == 2
+    # the tool is not run again, nothing waits
+    assert calls == ["Seattle"]
+    assert report.duration < recording.duration
+
+    # replay at recorded speed
+    report = replay(recording, speed=1.0)
+    assert report.matches
+    assert report.tool_time == pytest.approx(recording.report().tool_time)
+    assert report.duration >= 0.1
+
+    # other agent settings
+    report = replay(
+        recording,
+        agent_factory=lambda model: strands.Agent(model=model, callback_handler=None),
+    )
+    assert report.matches
+
+    baseline = [recording.report()]
+    current = benchmark([recording], repeat=3)
+    assert current[0].name == "seattle" and current[0].matches
+    dump_reports(current, tmp_path / "reports.json")
+    assert load_reports(tmp_path / "reports.json") == current
+    diffs = compare_reports(baseline, current)
+    assert [diff.metric for diff in diffs] == ["duration", "overhead", "model_time", "tool_time"]
+    assert diffs[0].delta < 0
+    text = format_diffs(diffs)
+    assert "seattle" in text and "tool_time" in text
+
+
+def test_replay_divergence():
+    recorder, _ = _record()
+    recording = recorder.recordings[1]
+    recording.model_calls.pop()
+    with pytest.raises(ReplayDivergenceError):
+        replay(recording)
+
+    recording = recorder.recordings[1]
+    recording.tool_calls.clear()
+    with pytest.raises(ReplayDivergenceError):
+        replay(recording)
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.replay", preview=False)
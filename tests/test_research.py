@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from learn_strands_agents.local_model import ScriptedTurn, ScriptedModel
+from learn_strands_agents.checkpoint import CheckpointStore
+from learn_strands_agents.research import (
+    ResearchAgents,
+    run_research_workflow,
+)
+
+QUESTION = "Is Amazon Bedrock AgentCore ready for production use?"
+
+
+def _responder(fail_writer):
+    def responder(messages, tool_specs, system_prompt):
+        if system_prompt.startswith("You are a Researcher"):
+            return ScriptedTurn(text="AgentCore is generally available.")
+        if system_prompt.startswith("You are an Analyst"):
+            return ScriptedTurn(text="Accuracy: 5")
+        if fail_writer:
+            raise RuntimeError("writer failed")
+        return ScriptedTurn(text="AgentCore is ready.")
+
+    return responder
+
+
+def test_run_research_workflow(tmp_path):
+    store = CheckpointStore(dir_root=tmp_path)
+
+    model = ScriptedModel(responder=_responder(fail_writer=True))
+    with pytest.raises(Exception):
+        run_research_workflow(ResearchAgents.new(model, researcher_tools=[]), QUESTION, store=store)
+    assert len(model.requests) == 3
+
+    # rerun only redoes the failed stage
+    model = ScriptedModel(responder=_responder(fail_writer=False))
+    report = run_research_workflow(ResearchAgents.new(model, researcher_tools=[]), QUESTION, store=store)
+    assert len(model.requests) == 1
+    assert report.findings.strip() == "AgentCore is generally available."
+    assert report.analysis.strip() == "Accuracy: 5"
+    assert report.report.strip() == "AgentCore is ready."
+    assert report.cached_stages == ["researcher", "analyst"]
+    assert report.stages["writer"].checkpoint.metadata["cycle_count"] == 1
+
+    # everything is cached now
+    model = ScriptedModel(responder=_responder(fail_writer=False))
+    report = run_research_workflow(ResearchAgents.new(model, researcher_tools=[]), QUESTION, store=store)
+    assert model.requests == []
+    assert report.cached_stages == ["researcher", "analyst", "writer"]
+
+
+def test_run_research_workflow_retry_same_agents(tmp_path):
+    store = CheckpointStore(dir_root=tmp_path)
+    fail_writer = [True]
+
+    def responder(messages, tool_specs, system_prompt):
+        return _responder(fail_writer[0])(messages, tool_specs, system_prompt)
+
+    model = ScriptedModel(responder=responder)
+    agents = ResearchAgents.new(model, researcher_tools=[])
+    with pytest.raises(Exception):
+        run_research_workflow(agents, QUESTION, store=store)
+    assert len(model.requests) == 3
+
+    # the retry with the same agents only redoes the failed stage
+    fail_writer[0] = False
+    report = run_research_workflow(agents, QUESTION, store=store)
+    assert len(model.requests) == 4
+    assert report.cached_stages == ["researcher", "analyst"]
+    assert report.report.strip() == "AgentCore is ready."
+    # the writer answered on a fresh conversation
+    assert len(model.requests[-1]["messages"]) == 1
+
+    report = run_research_workflow(agents, QUESTION, store=store)
+    assert len(model.requests) == 4
+    assert report.cached_stages == ["researcher", "analyst", "writer"]
+
+
+def test_run_research_workflow_without_store():
+    model = ScriptedModel(responder=_responder(fail_writer=False))
+    agents = ResearchAgents.new(model)
+    assert agents.researcher.tool_names == ["http_request"]
+    report = run_research_workflow(agents, QUESTION)
+    assert report.cached_stages == []
+    assert len(model.requests) == 3
+    metadata = report.stages["researcher"].checkpoint.metadata
+    assert metadata["usage"]["inputTokens"] > 0
+
+    # the agents are reused, the metadata only covers the new question
+    report = run_research_workflow(agents, "Is Amazon Bedrock ready?")
+    assert len(model.requests) == 6
+    second = report.stages["researcher"].checkpoint.metadata
+    assert second["cycle_count"] == 1
+    assert 0 < second["usage"]["inputTokens"] < metadata["usage"]["inputTokens"]
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "learn_strands_agents.research",
+        preview=False,
+    )
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import threading
+import collections
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.prefetch import fetch_http_result, result_body
+from learn_strands_agents.research import ResearchAgents, run_research_workflow
+from learn_strands_agents.research_cache import (
+    normalize_query,
+    extract_urls,
+    Document,
+    Finding,
+    ResearchMemory,
+    ResearchMemoryHook,
+    new_research_memory_tool,
+)
+
+PAGE = (
+    "<html><head><title>AgentCore GA</title></head>"
+    "<body>Amazon Bedrock AgentCore is generally available.</body></html>"
+)
+
+hits = collections.Counter()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        hits[self.path] += 1
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = ResearchMemory(path=tmp_path / "research.sqlite")
+    yield memory
+    memory.close()
+
+
+tool_calls = []
+
+
+@strands.tool(name="http_request")
+def http_request(method: str, url: str) -> dict:
+    """
+    Make an HTTP request.
+    """
+    tool_calls.append(url)
+    result = fetch_http_result(url)
+    return {"status": result["status"], "content": result["content"]}
+
+
+def test_normalize_query():
+    assert normalize_query("Is AgentCore GA?") == normalize_query("agentcore is GA")
+    assert normalize_query("What is the price of Bedrock?") == "price bedrock"
+    assert normalize_query("Bedrock Bedrock price") == "bedrock price"
+    # word order matters
+    assert normalize_query("Does Java copy Python?") != normalize_query("Does Python copy Java?")
+    assert extract_urls(
+        "See https://a.com/x, and (https://b.com/y). Again https://a.com/x."
+    ) == ["https://a.com/x", "https://b.com/y"]
+
+
+def test_research_memory(memory):
+    memory.put_document(Document(url="https://a.com", content="Bedrock pricing is per token"))
+    memory.put_document(
+        Document(
+            url="https://b.com",
+            content="Lambda pricing is per request",
+            fetched_at=time.time() - 2 * memory.document_ttl,
+        )
+    )
+    memory.put_finding(
+        Finding(
+            query="How is Bedrock priced?",
+            answer="Per token, see https://a.com",
+            sources=["https://a.com"],
+        )
+    )
+
+    assert memory.get_document("https://a.com").content == "Bedrock pricing is per token"
+    assert memory.get_document("https://b.com") is None
+    assert memory.get_document("https://b.com", fresh=False).title == ""
+    assert memory.get_finding("bedrock priced").sources == ["https://a.com"]
+    assert memory.get_finding("How is Lambda priced?") is None
+
+    # replacing a document updates the index
+    memory.put_document(Document(url="https://a.com", content="Bedrock pricing is per token!"))
+
+    hits = memory.search("bedrock prices")
+    assert [(hit.kind, hit.ref) for hit in hits] == [
+        ("finding", "How is Bedrock priced?"),
+        ("document", "https://a.com"),
+    ]
+    assert "[pricing]" in hits[1].snippet
+    assert hits[1].to_dict()["fresh"] is True
+
+    # stale documents are only returned on request
+    assert [hit.ref for hit in memory.search("lambda")] == []
+    hits = memory.search("lambda", include_stale=True)
+    assert [(hit.ref, hit.fresh) for hit in hits] == [("https://b.com", False)]
+    assert memory.search("the of") == []
+
+    assert memory.purge_expired() == 1
+    assert memory.get_document("https://b.com", fresh=False) is None
+    assert memory.search("lambda", include_stale=True) == []
+
+    # questions that only differ in word order don't share findings
+    memory.put_finding(Finding(query="Does Java copy Python?", answer="No."))
+    assert memory.get_finding("Does Python copy Java?") is None
+    assert memory.get_finding("does java copy python").answer == "No."
+
+
+def test_research_memory_hook(base_url, memory):
+    tool_calls.clear()
+    hits.clear()
+    url = f"{base_url}/agentcore"
+
+    def new_agent():
+        model = ScriptedModel(
+            turns=[
+                ScriptedTurn(
+                    tool_uses=[
+                        ScriptedToolUse("http_request", {"method": "GET", "url": url}),
+                        ScriptedToolUse(
+                            "http_request",
+                            {"method": "GET", "url": f"{base_url}/missing"},
+                        ),
+                    ]
+                ),
+                ScriptedTurn(text="It is generally available."),
+            ]
+        )
+        return strands.Agent(
+            model=model,
+            tools=[http_request],
+            hooks=[hook],
+            callback_handler=None,
+        )
+
+    hook = ResearchMemoryHook(memory)
+    new_agent()("Is AgentCore GA?")
+    assert hook.stored == 1
+    assert memory.get_document(url).title == "AgentCore GA"
+    assert memory.get_document(f"{base_url}/missing") is None
+
+    # the second question is answered from memory
+    agent = new_agent()
+    agent("Is AgentCore generally available?")
+    assert hook.hits == 1
+    assert hook.stored == 1
+    assert hits["/agentcore"] == 1
+    assert tool_calls == [url, f"{base_url}/missing", f"{base_url}/missing"]
+    tool_results = [
+        block["toolResult"] for block in agent.messages[-2]["content"]
+    ]
+    assert tool_results[0]["status"] == "success"
+    assert result_body(tool_results[0]) == PAGE
+
+    tool = new_research_memory_tool(memory)
+    assert json.loads(tool(query="AgentCore available"))[0]["ref"] == url
+    assert tool(query="kubernetes") == "No earlier research found."
+
+
+def test_run_research_workflow_memory(memory):
+    def responder(messages, tool_specs, system_prompt):
+        if system_prompt.startswith("You are a Researcher"):
+            return ScriptedTurn(text="GA since October, https://aws.amazon.com/bedrock/")
+        return ScriptedTurn(text="ok")
+
+    model = ScriptedModel(responder=responder)
+    agents = ResearchAgents.new(model, researcher_tools=[], memory=memory)
+    assert agents.researcher.tool_names == ["search_research_memory"]
+    report = run_research_workflow(agents, "Is AgentCore GA?", memory=memory)
+    assert report.cached_stages == []
+    assert len(model.requests) == 3
+    assert memory.get_finding("agentcore ga").sources == ["https://aws.amazon.com/bedrock/"]
+
+    # the same question, asked differently, skips the researcher
+    report = run_research_workflow(agents, "is agentcore GA", memory=memory)
+    assert report.cached_stages == ["researcher"]
+    assert report.findings.strip() == "GA since October, https://aws.amazon.com/bedrock/"
+    assert report.stages["researcher"].checkpoint.metadata["research_memory"] is True
+    assert len(model.requests) == 5
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.research_cache", preview=False)
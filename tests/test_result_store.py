@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.trace_view import model_calls, slowest
+from learn_strands_agents.result_store import ResultStore
+
+
+def _run():
+    @strands.tool
+    def get_weather(city: str) -> str:
+        """
+        Get the weather of a city.
+        """
+        return f"Rain in {city}."
+
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(tool_uses=[ScriptedToolUse("get_weather", {"city": "Seattle"})]),
+            ScriptedTurn(text="It will rain in Seattle."),
+            ScriptedTurn(text="Take an umbrella."),
+        ]
+    )
+    agent = strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+    return agent, agent("What's the weather in Seattle?")
+
+
+def test_result_store(tmp_path):
+    agent, result = _run()
+    store = ResultStore(dir_root=tmp_path, max_loaded=1)
+    summary = store.put(result, messages=agent.messages, key="seattle")
+    assert summary.text == "It will rain in Seattle."
+    assert summary.cycle_count == 2
+    assert summary.usage == result.metrics.accumulated_usage
+    assert summary.tool_calls["get_weather"][:2] == (1, 0)
+    assert summary.n_messages == 4
+    assert summary.size > 0
+    assert (tmp_path / "seattle.json.gz").exists()
+    assert "seattle" in store and len(store) == 1
+    assert store.loaded() == []
+
+    loaded = store.load("seattle")
+    assert loaded.stop_reason == result.stop_reason
+    assert loaded.message == result.message
+    assert str(loaded) == str(result)
+    assert [t.to_dict() for t in loaded.metrics.traces] == [
+        t.to_dict() for t in result.metrics.traces
+    ]
+    assert loaded.metrics.tool_metrics["get_weather"].call_count == 1
+    assert len(list(model_calls(loaded))) == 2
+    assert slowest(loaded) is not None
+    assert store.load_messages("seattle") == agent.messages
+    # loaded once, then served from memory
+    assert store.load("seattle") is loaded
+    assert store.loaded() == ["seattle"]
+
+    usage = dict(result.metrics.accumulated_usage)
+    result = agent("And tomorrow?")
+    summary = store.put(result, key="tomorrow")
+    assert store.load_messages("tomorrow") is None
+    # only the second run is stored, not the cumulative metrics of the agent
+    assert summary.cycle_count == 1
+    assert summary.tool_calls == {}
+    assert summary.usage == {
+        k: v - usage[k] for k, v in result.metrics.accumulated_usage.items()
+    }
+    assert len(store.load("tomorrow").metrics.traces) == 1
+    assert store.load("tomorrow").metrics.cycle_count == 1
+    # the least recently loaded result was evicted
+    assert store.loaded() == ["tomorrow"]
+    assert store.load("seattle") is not loaded
+    assert [s.key for s in store.summaries()] == ["seattle", "tomorrow"]
+
+    store.delete("seattle")
+    assert "seattle" not in store
+    assert not (tmp_path / "seattle.json.gz").exists()
+    with pytest.raises(KeyError):
+        store.load("seattle")
+    # other files of the directory are kept
+    tmp_path.joinpath("notes.txt").write_text("keep me")
+    store.clear()
+    assert len(store) == 0
+    assert [p.name for p in tmp_path.iterdir()] == ["notes.txt"]
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.result_store", preview=False)
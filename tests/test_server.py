@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import signal
+
+import strands
+
+from learn_strands_agents.local_model import ScriptedToolUse, ScriptedTurn, ScriptedModel
+from learn_strands_agents.tool_cache import SqliteCache
+from learn_strands_agents.server import AgentServer, request, invoke
+
+
+@strands.tool
+def get_weather(city: str) -> str:
+    """
+    Get the weather of a city.
+    """
+    return f"sunny in {city}"
+
+
+def _responder(messages, tool_specs, system_prompt):
+    last = messages[-1]["content"][0]
+    if "toolResult" in last:
+        return ScriptedTurn(text=last["toolResult"]["content"][0]["text"])
+    prompt = last["text"]
+    if prompt.startswith("weather"):
+        city = prompt.rsplit(" ", 1)[-1]
+        return ScriptedTurn(
+            tool_uses=[ScriptedToolUse(name="get_weather", input={"city": city})]
+        )
+    if prompt == "boom":
+        raise RuntimeError("model failed")
+    # answers with the number of user prompts in the session
+    n_prompts = sum(
+        1 for m in messages if m["role"] == "user" and "text" in m["content"][0]
+    )
+    return ScriptedTurn(text=f"prompt {n_prompts}")
+
+
+def agent_factory():
+    return strands.Agent(
+        model=ScriptedModel(responder=_responder),
+        tools=[get_weather],
+        callback_handler=None,
+    )
+
+
+def test_agent_server(tmp_path):
+    server = AgentServer(
+        agent_factory,
+        address=("127.0.0.1", 0),
+        workers=2,
+        cache=SqliteCache(tmp_path / "cache.sqlite"),
+        cacheable_tools=["get_weather"],
+        poll_interval=0.05,
+    )
+    server.start()
+    try:
+        address = server.server_address
+        assert request(address, "GET", "/health")[1]["status"] == "ok"
+
+        # tool results are shared by the workers
+        workers = set()
+        for _ in range(4):
+            response = invoke(address, "weather in Seattle")
+            assert response["output"] == "sunny in Seattle"
+            workers.add(response["worker"])
+        assert workers <= set(server.pids)
+
+        # sessions too
+        assert invoke(address, "hi", session_id="s1")["output"] == "prompt 1"
+        assert invoke(address, "hi", session_id="s1")["output"] == "prompt 2"
+        assert invoke(address, "hi")["output"] == "prompt 1"
+
+        assert request(address, "POST", "/invoke", {"prompt": "boom"})[0] == 500
+        assert request(address, "POST", "/invoke", {})[0] == 400
+        assert request(address, "GET", "/nothing")[0] == 404
+
+        status, metrics = request(address, "GET", "/metrics")
+        assert metrics["pid"] in server.pids
+
+        status, all_metrics = request(address, "GET", "/metrics/all")
+        assert len(all_metrics) == 2
+        assert sum(m["requests"] for m in all_metrics.values()) == 8
+        assert sum(m["errors"] for m in all_metrics.values()) == 1
+        assert sum(m["tool_cache_misses"] for m in all_metrics.values()) == 1
+        assert sum(m["tool_cache_hits"] for m in all_metrics.values()) == 3
+    finally:
+        server.stop(timeout=5)
+    assert server.pids == {}
+    assert server.socket is None
+
+
+def test_agent_server_unix_socket(tmp_path):
+    path = tmp_path / "agent.sock"
+    server = AgentServer(
+        agent_factory,
+        address=path,
+        workers=1,
+        cache=SqliteCache(tmp_path / "cache.sqlite"),
+        poll_interval=0.05,
+    )
+    server.start()
+    try:
+        assert invoke(path, "hi")["output"] == "prompt 1"
+        # no tool results are cached by default
+        invoke(path, "weather in Seattle")
+        invoke(path, "weather in Seattle")
+        metrics = request(path, "GET", "/metrics")[1]
+        assert metrics["tool_cache_hits"] == 0
+        # a crashed worker is replaced
+        (pid,) = server.pids
+        os.kill(pid, signal.SIGKILL)
+        time.sleep(0.1)
+        assert server.reap() == [pid]
+        assert len(server.pids) == 1
+        assert invoke(path, "hi")["output"] == "prompt 1"
+    finally:
+        server.stop(timeout=5)
+    assert not path.exists()
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.server", preview=False)
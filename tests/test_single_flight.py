@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import threading
+import concurrent.futures
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.single_flight import (
+    SingleFlightOverflowError,
+    SingleFlight,
+    CoalescingInvoker,
+    CoalescedTool,
+    SingleFlightHook,
+)
+
+
+def _run_threads(n, func):
+    with concurrent.futures.ThreadPoolExecutor(n) as executor:
+        futures = [executor.submit(func) for _ in range(n)]
+        return [f.result() if f.exception() is None else f.exception() for f in futures]
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"forecast": "rain"}
+
+    results = _run_threads(5, lambda: flight.do("seattle", work))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats.executions == 1
+    assert flight.stats.shared == 4
+    assert flight.stats.coalesced_ratio == 0.8
+    assert flight.in_flight() == 0
+
+    # nothing is cached
+    flight.do("seattle", work)
+    assert len(calls) == 2
+
+    # errors are shared too
+    def fail():
+        time.sleep(0.2)
+        raise ConnectionError("upstream down")
+
+    errors = _run_threads(3, lambda: flight.do("portland", fail))
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert flight.stats.executions == 3
+
+
+def test_single_flight_max_waiters():
+    flight = SingleFlight(max_waiters=1)
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    _run_threads(3, lambda: flight.do("seattle", work))
+    assert len(calls) == 2
+    assert flight.stats.overflow == 1
+
+    flight = SingleFlight(max_waiters=1, reject_overflow=True)
+    results = _run_threads(3, lambda: flight.do("seattle", work))
+    assert sum(isinstance(r, SingleFlightOverflowError) for r in results) == 1
+
+    # waiters that gave up don't count anymore
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("boston", lambda: release.wait(5)))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        flight.do("boston", work, timeout=0.01)
+
+    async def wait_async():
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do_async("boston", work, timeout=0.01)
+
+    asyncio.run(wait_async())
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        waiter = executor.submit(flight.do, "boston", work)
+        time.sleep(0.05)
+        release.set()
+        leader.join()
+        assert waiter.result() is True
+
+
+def test_single_flight_leader_cancelled():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("k", work))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(flight.do_async("k", work))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        # the waiter takes over
+        assert await waiter == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+    assert flight.stats.executions == 2
+
+
+class SlowModel(ScriptedModel):
+    async def stream(self, *args, **kwargs):
+        await asyncio.sleep(0.2)
+        async for event in super().stream(*args, **kwargs):
+            yield event
+
+
+def test_coalescing_invoker():
+    def responder(messages, tool_specs, system_prompt):
+        return ScriptedTurn(text="Rain in Seattle.")
+
+    model = SlowModel(responder=responder)
+    ask = CoalescingInvoker(lambda: strands.Agent(model=model, callback_handler=None))
+    prompts = iter(["Weather in  Seattle?", "Weather in Seattle?", "Weather in Seattle? "])
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            prompt = next(prompts)
+        return ask(prompt)
+
+    results = _run_threads(3, call)
+    assert len(model.requests) == 1
+    assert {str(result).strip() for result in results} == {"Rain in Seattle."}
+
+    async def main():
+        return await asyncio.gather(*(ask.invoke_async("Weather in Portland?") for _ in range(3)))
+
+    assert len(asyncio.run(main())) == 3
+    assert len(model.requests) == 2
+
+
+def test_single_flight_hook():
+    calls = []
+
+    @strands.tool
+    def get_weather(city: str) -> str:
+        """
+        Get the weather of a city.
+        """
+        calls.append(city)
+        time.sleep(0.2)
+        return f"Rain in {city}."
+
+    flight = SingleFlight()
+
+    def new_agent():
+        model = ScriptedModel(
+            turns=[
+                ScriptedTurn(tool_uses=[ScriptedToolUse("get_weather", {"city": "Seattle"})]),
+                ScriptedTurn(text="Rain."),
+            ]
+        )
+        return strands.Agent(
+            model=model,
+            tools=[get_weather],
+            hooks=[SingleFlightHook(flight, tool_names=["get_weather"])],
+            callback_handler=None,
+        )
+
+    agents = [new_agent() for _ in range(3)]
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            agent = agents.pop()
+        agent("What's the weather in Seattle?")
+        return agent
+
+    for agent in _run_threads(3, call):
+        tool_use = agent.messages[1]["content"][0]["toolUse"]
+        tool_result = agent.messages[2]["content"][0]["toolResult"]
+        assert tool_result["toolUseId"] == tool_use["toolUseId"]
+        assert tool_result["content"][0]["text"] == "Rain in Seattle."
+    assert calls == ["Seattle"]
+    assert flight.stats.shared == 2
+
+    # a tool without result gives an error result
+    class NoResultTool(CoalescedTool):
+        async def stream(self, tool_use, invocation_state, **kwargs):
+            return
+            yield
+
+    tool = CoalescedTool(NoResultTool(get_weather, flight), flight)
+    tool_use = {"toolUseId": "t1", "name": "get_weather", "input": {"city": "Seattle"}}
+
+    async def consume():
+        return [event async for event in tool.stream(tool_use, {})]
+
+    (result,) = asyncio.run(consume())
+    assert result["status"] == "error"
+    assert result["toolUseId"] == "t1"
+    assert "no result" in result["content"][0]["text"]
+
+    # coalescing is opt-in, tools may have side effects
+    with pytest.raises(TypeError):
+        SingleFlightHook(flight)
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.single_flight", preview=False)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.streaming import (
+    TextDelta,
+    ThinkingDelta,
+    ToolStart,
+    ToolEnd,
+    CycleEnd,
+    StreamEnd,
+    StreamTimings,
+    ThinkingTagSplitter,
+    stream_agent,
+)
+
+
+@strands.tool(name="get_weather")
+def get_weather(lat: float, lng: float) -> str:
+    """
+    Getting the weather in Celsius for a given latitude and longitude.
+    """
+    return "temperature=19.2"
+
+
+def test_thinking_tag_splitter():
+    splitter = ThinkingTagSplitter()
+    pieces = []
+    for chunk in ["<thin", "king> plan </th", "inking>", "Answer <", "b>"]:
+        pieces.extend(splitter.feed(chunk))
+    pieces.extend(splitter.flush())
+    assert pieces == [
+        (True, " plan "),
+        (False, "Answer "),
+        (False, "<b>"),
+    ]
+
+
+def test_stream_timings():
+    timings = StreamTimings()
+    assert timings.mean_inter_token_latency is None
+    assert timings.inter_token_latency_percentile(50) is None
+    assert timings.to_dict()["timeToFirstTokenMs"] is None
+
+    timings = StreamTimings(
+        time_to_first_token=0.5,
+        inter_token_latencies=[0.01, 0.02, 0.03, 0.04],
+        model_latency_ms=1200,
+        total_duration=1.5,
+    )
+    assert timings.mean_inter_token_latency == pytest.approx(0.025)
+    assert timings.max_inter_token_latency == 0.04
+    assert timings.inter_token_latency_percentile(50) == 0.02
+    assert timings.inter_token_latency_percentile(100) == 0.04
+    assert timings.to_dict()["timeToFirstTokenMs"] == 500
+
+
+def test_stream_agent():
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                text="<thinking>I need the weather tool.</thinking>",
+                tool_uses=[ScriptedToolUse("get_weather", {"lat": 1, "lng": 2})],
+                latency_ms=900,
+            ),
+            ScriptedTurn(text="The current weather is 19.2°C.", latency_ms=500),
+        ],
+        chunk_size=5,
+    )
+    agent = strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+
+    async def collect():
+        return [event async for event in stream_agent(agent, "weather?")]
+
+    events = asyncio.run(collect())
+
+    thinking = "".join(e.text for e in events if isinstance(e, ThinkingDelta))
+    text = "".join(e.text for e in events if isinstance(e, TextDelta))
+    assert thinking == "I need the weather tool."
+    assert text == "The current weather is 19.2°C."
+
+    types = [type(e) for e in events if not isinstance(e, (TextDelta, ThinkingDelta))]
+    assert types == [ToolStart, ToolEnd, CycleEnd, CycleEnd, StreamEnd]
+
+    tool_start = next(e for e in events if isinstance(e, ToolStart))
+    tool_end = next(e for e in events if isinstance(e, ToolEnd))
+    assert tool_start.name == "get_weather"
+    assert tool_start.input == {"lat": 1, "lng": 2}
+    assert tool_end.status == "success"
+    assert tool_end.content == [{"text": "temperature=19.2"}]
+    assert tool_end.duration >= 0
+
+    cycle_ends = [e for e in events if isinstance(e, CycleEnd)]
+    assert [e.cycle for e in cycle_ends] == [1, 2]
+    assert [e.stop_reason for e in cycle_ends] == ["tool_use", "end_turn"]
+    assert cycle_ends[0].latency_ms == 900
+
+    end = events[-1]
+    assert str(end.result).strip() == text
+    assert end.timings.time_to_first_token is not None
+    assert end.timings.model_latency_ms == 1400
+    assert len(end.timings.cycle_time_to_first_token) == 2
+    assert len(end.timings.inter_token_latencies) > 0
+
+    # the timing hooks are only registered once per agent
+    model._turns = iter([ScriptedTurn(text="again")])
+    events = asyncio.run(collect())
+    assert isinstance(events[-1], StreamEnd)
+    assert len(agent.hooks._registered_callbacks[strands.hooks.BeforeToolCallEvent]) == 1
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "learn_strands_agents.streaming",
+        preview=False,
+    )
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import json
+import asyncio
+
+import pytest
+import strands
+from pydantic import BaseModel, Field
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.structured import (
+    StructuredOutputError,
+    IncrementalJsonParser,
+    StructuredParser,
+    FieldEvent,
+    StructuredResult,
+    stream_structured,
+    structured_output_async,
+    run_structured,
+)
+
+
+class Period(BaseModel):
+    name: str
+    temperature: int
+
+
+class Forecast(BaseModel):
+    city: str
+    periods: list[Period]
+    rain: bool = Field(description="Whether it will rain.")
+
+
+FORECAST = {
+    "city": "Seattle, \"WA\" {}",
+    "periods": [{"name": "Tonight", "temperature": 50}, {"name": "Monday", "temperature": 60}],
+    "rain": True,
+}
+
+
+def _chunks(text, size=5):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_incremental_json_parser():
+    parser = IncrementalJsonParser()
+    completed = []
+    for chunk in _chunks("Here you go:\n```json\n" + json.dumps(FORECAST) + "\n```", 3):
+        completed.extend(parser.feed(chunk))
+    assert parser.done
+    assert [name for name, _ in completed] == ["city", "periods", "rain"]
+    assert parser.value == FORECAST
+    assert json.loads(parser.text) == FORECAST
+    assert parser.feed("{}") == []
+
+    parser = IncrementalJsonParser()
+    assert parser.feed('{"city": "Seattle", "peri') == [("city", "Seattle")]
+    assert not parser.done and parser.value is None
+    assert parser.feed('ods": []}') == [("periods", [])]
+    assert parser.done
+
+
+def test_structured_parser():
+    parser = StructuredParser(Forecast)
+    assert parser.feed('{"city": "Seattle", "periods": [') == [("city", "Seattle")]
+    fields = parser.feed('{"name": "Tonight", "temperature": 50}], ')
+    assert fields == [("periods", [Period(name="Tonight", temperature=50)])]
+    parser.feed('"rain": false}')
+    assert parser.done and parser.output.rain is False
+
+    # invalid fields fail before the object closes
+    parser = StructuredParser(Forecast)
+    with pytest.raises(StructuredOutputError) as e:
+        parser.feed('{"city": "Seattle", "periods": "cold", "rain": ')
+    assert e.value.field == "periods"
+
+    parser = StructuredParser(Forecast)
+    with pytest.raises(StructuredOutputError):
+        parser.feed('{"city": "Seattle"}')
+
+
+def test_stream_structured():
+    model = ScriptedModel(
+        turns=[ScriptedTurn(tool_uses=[ScriptedToolUse("Forecast", FORECAST)])],
+        chunk_size=4,
+    )
+
+    async def main():
+        return [event async for event in stream_structured(model, Forecast, "Weather in Seattle?")]
+
+    events = asyncio.run(main())
+    assert [e.name for e in events if isinstance(e, FieldEvent)] == ["city", "periods", "rain"]
+    result = events[-1]
+    assert isinstance(result, StructuredResult)
+    assert result.output == Forecast.model_validate(FORECAST)
+    assert result.usage["totalTokens"] > 0
+    # the schema is offered as the only tool
+    assert [spec["name"] for spec in model.requests[0]["tool_specs"]] == ["Forecast"]
+
+    model = ScriptedModel(turns=[ScriptedTurn(text="It will rain.")])
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(structured_output_async(model, Forecast, "Weather in Seattle?"))
+
+
+def test_run_structured():
+    @strands.tool
+    def get_forecast(city: str) -> str:
+        """
+        Get the forecast of a city.
+        """
+        return json.dumps(FORECAST)
+
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(tool_uses=[ScriptedToolUse("get_forecast", {"city": "Seattle"})]),
+            # the first try is invalid, the tool reports it back
+            ScriptedTurn(tool_uses=[ScriptedToolUse("Forecast", {"city": "Seattle"})]),
+            ScriptedTurn(tool_uses=[ScriptedToolUse("Forecast", FORECAST)]),
+            # the second call
+            ScriptedTurn(tool_uses=[ScriptedToolUse("Forecast", FORECAST)]),
+        ]
+    )
+    agent = strands.Agent(model=model, tools=[get_forecast], callback_handler=None)
+    fields = []
+    result = run_structured(agent, Forecast, "Weather in Seattle?", on_field=fields.append)
+    assert result.output == Forecast.model_validate(FORECAST)
+    assert result.cycle_count == 3
+    assert len(model.requests) == 3
+    assert [f.name for f in fields] == ["city", "periods", "rain"]
+    assert "Forecast" in [spec["name"] for spec in model.requests[0]["tool_specs"]]
+    # the output tool is gone, the conversation can go on
+    assert agent.tool_names == ["get_forecast"]
+    assert agent.messages[-1]["role"] == "assistant"
+    assert json.loads(agent.messages[-1]["content"][0]["text"]) == result.output.model_dump()
+
+    # a reused agent reports the usage of the second call only
+    usage = dict(agent.event_loop_metrics.accumulated_usage)
+    second = run_structured(agent, Forecast, "And tomorrow?")
+    assert second.cycle_count == 1
+    assert second.usage == {
+        k: v - usage[k] for k, v in agent.event_loop_metrics.accumulated_usage.items()
+    }
+    assert 0 < second.usage["inputTokens"] < agent.event_loop_metrics.accumulated_usage["inputTokens"]
+
+    model = ScriptedModel(turns=[ScriptedTurn(text="It will rain.")])
+    agent = strands.Agent(model=model, callback_handler=None)
+    with pytest.raises(StructuredOutputError):
+        run_structured(agent, Forecast, "Weather in Seattle?")
+    assert agent.tool_names == []
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.structured", preview=False)
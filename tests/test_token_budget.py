@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import ScriptedTurn, ScriptedModel
+from learn_strands_agents.token_budget import (
+    NOVA_MICRO,
+    NOVA_LITE,
+    DEFAULT,
+    get_profile,
+    fit_profile,
+    TokenEstimator,
+    PromptBudgetExceededError,
+    PromptBudgetHook,
+)
+
+
+def test_get_profile():
+    assert get_profile("us.amazon.nova-micro-v1:0") is NOVA_MICRO
+    assert get_profile("us.amazon.nova-lite-v1:0") is NOVA_LITE
+    assert get_profile("us.anthropic.claude-3-7-sonnet-20250219-v1:0").family == "anthropic.claude"
+    assert get_profile("unknown") is DEFAULT
+    assert get_profile(None) is DEFAULT
+    assert NOVA_MICRO.input_budget == 123_000
+
+
+def test_fit_profile():
+    profile = fit_profile(DEFAULT, [(1000, 260), (3000, 760), (5000, 1260)])
+    assert profile.chars_per_token == pytest.approx(4.0)
+    assert profile.request_overhead == 10
+
+    with pytest.raises(ValueError):
+        fit_profile(DEFAULT, [(1000, 260)])
+    with pytest.raises(ValueError):
+        fit_profile(DEFAULT, [(1000, 260), (1000, 300)])
+
+
+def test_token_estimator():
+    estimator = TokenEstimator(NOVA_MICRO)
+    assert estimator.estimate_text("a" * 50) == 10
+    messages = [
+        {"role": "user", "content": [{"text": "a" * 50}]},
+        {
+            "role": "assistant",
+            "content": [
+                {"toolUse": {"toolUseId": "t1", "name": "get_weather", "input": {}}}
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "toolResult": {
+                        "toolUseId": "t1",
+                        "status": "success",
+                        "content": [{"text": "a" * 100}],
+                    }
+                }
+            ],
+        },
+    ]
+    assert estimator.estimate_message(messages[0]) == 14
+    assert estimator.estimate_message(messages[2]) == 24
+    tool_specs = [{"name": "get_weather", "description": "", "inputSchema": {"json": {}}}]
+    total = estimator.estimate_request(messages, "b" * 100, tool_specs)
+    assert total > estimator.estimate_request(messages)
+    assert estimator.estimate_tool_specs(None) == 0
+
+
+def _agent(hook, turns=None, **kwargs):
+    model = ScriptedModel(turns=turns or [ScriptedTurn(text="ok")] * 3, **kwargs)
+    return strands.Agent(model=model, hooks=[hook], callback_handler=None)
+
+
+def test_prompt_budget_hook_within_budget():
+    hook = PromptBudgetHook()
+    agent = _agent(hook)
+    agent("hello")
+    assert hook.last_report.applied == []
+    assert hook.last_report.estimated_tokens < hook.last_report.budget
+
+
+def test_prompt_budget_hook_truncate():
+    hook = PromptBudgetHook(budget=200, max_tool_result_chars=100)
+    agent = _agent(hook)
+    agent.messages.extend(
+        [
+            {"role": "user", "content": [{"text": "fetch"}]},
+            {
+                "role": "assistant",
+                "content": [
+                    {"toolUse": {"toolUseId": "t1", "name": "http_request", "input": {}}}
+                ],
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "toolResult": {
+                            "toolUseId": "t1",
+                            "status": "success",
+                            "content": [{"text": "x" * 10_000}],
+                        }
+                    }
+                ],
+            },
+            {"role": "assistant", "content": [{"text": "done"}]},
+        ]
+    )
+    agent("summarize")
+    assert hook.last_report.applied == ["truncate"]
+    text = agent.messages[2]["content"][0]["toolResult"]["content"][0]["text"]
+    assert text.startswith("x" * 100)
+    assert "[truncated 9900 chars]" in text
+
+
+def test_prompt_budget_hook_compact():
+    hook = PromptBudgetHook(budget=100, strategies=["compact"])
+    agent = _agent(hook)
+    for _ in range(2):
+        agent("y" * 300)
+    assert hook.last_report.applied == ["compact"]
+    assert agent.messages[0]["content"][0]["text"] == "y" * 300
+    assert len(agent.messages) == 2
+
+
+def test_prompt_budget_hook_reroute():
+    fallback = ScriptedModel(turns=[ScriptedTurn(text="from fallback")])
+    hook = PromptBudgetHook(
+        strategies=["reroute"],
+        fallback_model=fallback,
+    )
+    agent = _agent(hook, model_id="us.amazon.nova-micro-v1:0")
+    original = agent.model
+    fallback.config["model_id"] = "us.amazon.nova-lite-v1:0"
+    result = agent("z" * 700_000)
+    assert str(result).strip() == "from fallback"
+    assert hook.last_report.applied == ["reroute"]
+    assert hook.last_report.budget == NOVA_LITE.input_budget
+    assert agent.model is original
+
+
+def test_prompt_budget_hook_fail_fast():
+    hook = PromptBudgetHook(budget=50)
+    agent = _agent(hook)
+    with pytest.raises(PromptBudgetExceededError) as e:
+        agent("q" * 1000)
+    assert e.value.budget == 50
+    assert agent.model.requests == []
+
+    with pytest.raises(ValueError):
+        PromptBudgetHook(strategies=["unknown"])
+    with pytest.raises(ValueError):
+        PromptBudgetHook(strategies=["reroute"])
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "learn_strands_agents.token_budget",
+        preview=False,
+    )
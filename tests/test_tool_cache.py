@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import ScriptedToolUse, ScriptedTurn, ScriptedModel
+from learn_strands_agents.tool_cache import (
+    SqliteCache,
+    ToolResultCacheHook,
+    SessionStore,
+)
+
+calls = []
+
+
+@strands.tool
+def get_weather(city: str) -> str:
+    """
+    Get the weather of a city.
+    """
+    calls.append(city)
+    if city == "Nowhere":
+        raise ValueError("unknown city")
+    return f"sunny in {city}"
+
+
+def test_sqlite_cache(tmp_path):
+    cache = SqliteCache(tmp_path / "cache.sqlite")
+    assert cache.get("ns", "a") is None
+    cache.set("ns", "a", {"x": 1})
+    cache.set("ns", "b", [1, 2], ttl=-1)
+    cache.set("other", "a", "y")
+    assert cache.get("ns", "a") == {"x": 1}
+    assert cache.get("ns", "b", default="expired") == "expired"
+    assert dict(cache.items("ns")) == {"a": {"x": 1}}
+    assert cache.purge_expired() == 1
+    assert cache.delete("ns", "a") is True
+    assert cache.delete("ns", "a") is False
+    cache.clear("ns")
+    assert cache.get("other", "a") == "y"
+    cache.clear()
+    assert cache.get("other", "a") is None
+    cache.close()
+    # reconnects
+    cache.set("ns", "a", 1)
+    assert SqliteCache(tmp_path / "cache.sqlite").get("ns", "a") == 1
+
+
+def test_tool_result_cache_hook(tmp_path):
+    calls.clear()
+    cache = SqliteCache(tmp_path / "cache.sqlite")
+    hook = ToolResultCacheHook(cache, tool_names=["get_weather"], ttl=60)
+
+    def run(city, tool_use_id="t1"):
+        model = ScriptedModel(
+            turns=[
+                ScriptedTurn(
+                    tool_uses=[ScriptedToolUse("get_weather", {"city": city}, tool_use_id)]
+                ),
+                ScriptedTurn(text="done"),
+            ]
+        )
+        agent = strands.Agent(model=model, tools=[get_weather], hooks=[hook], callback_handler=None)
+        agent("weather?")
+        return agent.messages[2]["content"][0]["toolResult"]
+
+    first = run("Seattle")
+    second = run("Seattle", "t2")
+    assert calls == ["Seattle"]
+    assert second["content"] == first["content"]
+    assert second["toolUseId"] != first["toolUseId"]
+    assert (hook.hits, hook.misses) == (1, 1)
+
+    # errors are not cached
+    run("Nowhere")
+    run("Nowhere")
+    assert calls == ["Seattle", "Nowhere", "Nowhere"]
+
+    # caching is opt-in, tools may have side effects
+    with pytest.raises(TypeError):
+        ToolResultCacheHook(cache)
+    hook = ToolResultCacheHook(cache, tool_names=[])
+    run("Seattle")
+    assert calls[-1] == "Seattle" and hook.hits == 0
+
+
+def test_session_store(tmp_path):
+    sessions = SessionStore(SqliteCache(tmp_path / "cache.sqlite"), ttl=60)
+    agent = strands.Agent(
+        model=ScriptedModel(turns=[ScriptedTurn(text="hello")]),
+        callback_handler=None,
+    )
+    sessions.restore("s1", agent)
+    assert agent.messages == []
+    agent("hi")
+    sessions.save("s1", agent.messages)
+    assert len(sessions.load("s1")) == 2
+    assert sessions.delete("s1") is True
+    assert sessions.load("s1") == []
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.tool_cache", preview=False)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import random
+import concurrent.futures
+
+import pytest
+import strands
+
+from learn_strands_agents.local_model import ScriptedToolUse, ScriptedTurn, ScriptedModel
+from learn_strands_agents.tool_latency import (
+    TOOL,
+    MODEL,
+    LatencyHistogram,
+    LatencySLO,
+    LatencyRecorder,
+    ToolLatencyHook,
+    get_recorder,
+)
+
+
+def test_latency_histogram():
+    random.seed(1)
+    values = [random.lognormvariate(-3, 1) for _ in range(10_000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for p in (50, 95, 99, 99.9):
+        exact = values[round(p / 100 * len(values)) - 1]
+        assert histogram.percentile(p) == pytest.approx(exact, rel=0.02)
+    assert histogram.mean == pytest.approx(sum(values) / len(values), rel=0.001)
+    assert set(histogram.percentiles()) == {"p50", "p95", "p99"}
+    assert histogram.summary()["count"] == 10_000
+
+    # fixed memory
+    size = len(histogram.counts)
+    histogram.record(10**6)
+    assert len(histogram.counts) == size
+    assert histogram.max == 3600 * 10**6
+
+    # small values are exact
+    small = LatencyHistogram()
+    small.record(0.000042)
+    assert small.percentile(50) == 0.000042
+    assert LatencyHistogram().percentile(99) == 0.0
+
+    other = LatencyHistogram.from_dict(histogram.to_dict())
+    other.merge(small)
+    assert other.count == histogram.count + 1
+    assert other.min == 42
+    with pytest.raises(ValueError):
+        other.merge(LatencyHistogram(precision_bits=5))
+
+
+def test_latency_slo():
+    events = []
+    recorder = LatencyRecorder()
+    recorder.add_slo(
+        LatencySLO(
+            kind=TOOL,
+            name="http_request",
+            percentile=90,
+            threshold=1.0,
+            on_breach=lambda slo, key: events.append(("breach", key)),
+            on_recover=lambda slo, key: events.append(("recover", key)),
+            min_count=10,
+        )
+    )
+    for _ in range(9):
+        recorder.record(TOOL, "http_request", 0.1)
+    recorder.record(TOOL, "other", 5)
+    recorder.record(TOOL, "http_request", 2)
+    recorder.record(TOOL, "http_request", 2)
+    assert events == [("breach", (TOOL, "http_request"))]
+    for _ in range(10):
+        recorder.record(TOOL, "http_request", 0.1)
+    assert events[-1] == ("recover", (TOOL, "http_request"))
+    assert recorder.slos[0].is_breached((TOOL, "http_request")) is False
+
+
+def test_latency_slo_threads():
+    breaches = []
+    slo = LatencySLO(
+        kind=TOOL,
+        name=None,
+        percentile=50,
+        threshold=1.0,
+        on_breach=lambda slo, key: breaches.append(key),
+        min_count=1,
+    )
+    with pytest.raises(TypeError):
+        LatencySLO(TOOL, None, 50, 1.0, print, _state={})
+
+    def observe(_):
+        for _ in range(1000):
+            slo.observe((TOOL, "t"), 2.0)
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        list(executor.map(observe, range(4)))
+    # counted exactly, and alarmed once
+    assert slo._state[(TOOL, "t")] == [4000, 4000, True]
+    assert breaches == [(TOOL, "t")]
+    slo.reset()
+    assert slo.is_breached((TOOL, "t")) is False
+
+
+def test_recorder_merge(tmp_path):
+    a, b = LatencyRecorder(), LatencyRecorder()
+    a.record(TOOL, "t", 0.1)
+    b.record(TOOL, "t", 0.3, error=True)
+    b.record(MODEL, "m", 1.0)
+    a.dump(tmp_path / "a.json")
+    b.dump(tmp_path / "b.json")
+    merged = LatencyRecorder.load(tmp_path / "a.json", tmp_path / "b.json")
+    summary = merged.summary()
+    assert summary[TOOL]["t"]["count"] == 2
+    assert summary[TOOL]["t"]["errors"] == 1
+    assert summary[MODEL]["m"]["max"] == 1.0
+    assert LatencyRecorder.load().summary() == {}
+    assert get_recorder() is get_recorder()
+
+
+def test_tool_latency_hook():
+    @strands.tool
+    def get_weather(city: str) -> str:
+        """
+        Get the weather.
+        """
+        if city == "Nowhere":
+            raise ValueError("unknown city")
+        return "sunny"
+
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                tool_uses=[
+                    ScriptedToolUse("get_weather", {"city": "Seattle"}),
+                    ScriptedToolUse("get_weather", {"city": "Nowhere"}),
+                ]
+            ),
+            ScriptedTurn(text="done"),
+        ]
+    )
+    recorder = LatencyRecorder()
+    agent = strands.Agent(
+        model=model,
+        tools=[get_weather],
+        hooks=[ToolLatencyHook(recorder)],
+        callback_handler=None,
+    )
+    agent("weather?")
+    assert recorder.get(TOOL, "get_weather").count == 2
+    assert recorder.summary()[TOOL]["get_weather"]["errors"] == 1
+    assert recorder.get(MODEL, "local.scripted-v1").count == 2
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.tool_latency", preview=False)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import strands
+from pydantic import BaseModel
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents.tool_schema import (
+    ValidationCache,
+    get_validation_cache,
+    ToolSchemaCache,
+    measure_tool_overhead,
+)
+
+
+class Location(BaseModel):
+    lat: float
+    lng: float
+
+
+@strands.tool
+def get_weather(location: Location, days: int = 1) -> str:
+    """
+    Get the weather forecast of a location.
+    """
+    # strands validates the input with pydantic, then passes it as a dict
+    return f"Rain at {location['lat']},{location['lng']} for {days} days."
+
+
+@strands.tool
+def get_time(city: str) -> str:
+    """
+    Get the local time of a city.
+    """
+    return "12:00"
+
+
+def test_validation_cache():
+    cache = ValidationCache(maxsize=2)
+    cache.put("get_time", "t1", {"city": "Seattle"}, {"city": "Seattle"})
+    validated = cache.get("get_time", "t1", {"city": "Seattle"})
+    assert validated == {"city": "Seattle"}
+    # callers may add special parameters to it
+    validated["agent"] = None
+    assert cache.get("get_time", "t1", {"city": "Seattle"}) == {"city": "Seattle"}
+    assert cache.get("get_time", "t1", {"city": "Portland"}) is None
+    cache.put("get_time", "t2", {}, {})
+    cache.put("get_time", "t3", {}, {})
+    assert len(cache) == 2
+    assert cache.get("get_time", "t1", {"city": "Seattle"}) is None
+    assert cache.stats.hits == 2 and cache.stats.misses == 2
+
+    # nested values are not shared with the caller either
+    location = {"lat": 47.6, "lng": -122.3}
+    validated = {"location": location}
+    cache.put("get_weather", "w1", validated, validated)
+    location["lat"] = 0.0
+    hit = cache.get("get_weather", "w1", {"location": {"lat": 47.6, "lng": -122.3}})
+    hit["location"]["lng"] = 0.0
+    assert cache.get("get_weather", "w1", {"location": {"lat": 47.6, "lng": -122.3}}) == {
+        "location": {"lat": 47.6, "lng": -122.3}
+    }
+
+
+def test_tool_schema_cache():
+    tool_input = {"location": {"lat": 47.6, "lng": -122.3}}
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(tool_uses=[ScriptedToolUse("get_weather", tool_input, "tooluse_1")]),
+            # a repeated tool use is not validated again
+            ScriptedTurn(tool_uses=[ScriptedToolUse("get_weather", tool_input, "tooluse_1")]),
+            ScriptedTurn(text="Rain."),
+        ]
+    )
+    agent = strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+    uncached = agent.tool_registry.get_all_tools_config()
+    cache = ToolSchemaCache()
+    cache.attach(agent)
+    cache.attach(agent)
+    assert agent.tool_registry.get_all_tools_config() == uncached
+    assert cache.stats.compiled == 1
+
+    validation = get_validation_cache()
+    hits = validation.stats.hits
+    agent("What's the weather in Seattle?")
+    assert validation.stats.hits == hits + 1
+    results = [
+        message["content"][0]["toolResult"]
+        for message in agent.messages
+        if "toolResult" in message["content"][0]
+    ]
+    assert [r["content"][0]["text"] for r in results] == ["Rain at 47.6,-122.3 for 1 days."] * 2
+    # specs were compiled once, for all model and tool calls
+    assert cache.stats.compiled == 1
+    assert cache.stats.hits >= 5
+
+    # newly registered tools are compiled on the next request
+    agent.tool_registry.register_tool(get_time)
+    specs = agent.tool_registry.get_all_tool_specs()
+    assert sorted(spec["name"] for spec in specs) == ["get_time", "get_weather"]
+    assert cache.stats.compiled == 2
+
+    # tools called directly are validated as usual
+    result = agent.tool.get_weather(location={"lat": 1, "lng": 2}, days=3)
+    assert result["content"][0]["text"] == "Rain at 1.0,2.0 for 3 days."
+
+
+def test_measure_tool_overhead():
+    agent = strands.Agent(
+        model=ScriptedModel(turns=[]),
+        tools=[get_weather, get_time],
+        callback_handler=None,
+    )
+    tool_use = {
+        "toolUseId": "tooluse_1",
+        "name": "get_weather",
+        "input": {"location": {"lat": 47.6, "lng": -122.3}},
+    }
+    overhead = measure_tool_overhead(agent, tool_use, n=200)
+    assert overhead.specs > overhead.specs_cached > 0
+    assert overhead.validation > 0 and overhead.validation_cached > 0
+    assert overhead.saved > 0
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.tool_schema", preview=False)
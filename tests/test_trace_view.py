@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import strands
+from strands.telemetry.metrics import Trace
+
+from learn_strands_agents.local_model import ScriptedToolUse, ScriptedTurn, ScriptedModel
+from learn_strands_agents.trace_view import (
+    TraceView,
+    iter_traces,
+    walk_traces,
+    model_calls,
+    tool_calls,
+    slowest,
+    latency_breakdown,
+)
+
+
+@strands.tool
+def get_weather(lat: float, lng: float) -> str:
+    """
+    Get the weather.
+    """
+    return "temperature=19.2"
+
+
+def _run():
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                text="<thinking>I need the tool.</thinking>",
+                tool_uses=[ScriptedToolUse("get_weather", {"lat": 1, "lng": 2})],
+            ),
+            ScriptedTurn(text="It is 19.2 C."),
+        ]
+    )
+    agent = strands.Agent(model=model, tools=[get_weather], callback_handler=None)
+    return agent("What's the weather?")
+
+
+def test_trace_views_over_agent_result():
+    result = _run()
+    roots = list(iter_traces(result))
+    assert [root.name for root in roots] == ["Cycle 1", "Cycle 2"]
+    assert all(root.is_cycle for root in roots)
+    assert roots[0].n_children == len(result.metrics.traces[0].children)
+
+    calls = list(model_calls(result))
+    assert len(calls) == 2
+    assert calls[0].role == "assistant"
+    assert "<thinking>" in calls[0].text()
+    assert next(calls[0].tool_uses())["name"] == "get_weather"
+    # messages are read by reference, copied only on request
+    assert next(calls[0].iter_blocks()) is result.metrics.traces[0].children[0].message["content"][0]
+    copied = calls[0].materialize_message()
+    assert copied == calls[0].trace.message and copied is not calls[0].trace.message
+
+    (tool,) = tool_calls(result)
+    assert tool.tool_name == "get_weather"
+    assert tool.path == ("Cycle 1", "Tool: get_weather")
+    assert next(tool.tool_results())["status"] == "success"
+
+    assert [view.name for view in walk_traces(result, predicate=lambda v: v.is_recursive_call)] == ["Recursive call"]
+    assert slowest(result).depth == 1
+    assert len(slowest(result, n=2)) == 2
+
+    breakdown = latency_breakdown(result)
+    assert breakdown[0].name == "Cycle 1"
+    assert "stream_messages" in [name for name, _, _ in breakdown[0].children]
+
+    data = roots[0].to_dict()
+    assert "message" not in data["children"][0]
+    reference = result.metrics.traces[0].to_dict()
+    assert data["children"][0]["id"] == reference["children"][0]["id"]
+    assert roots[0].to_dict(include_message=True)["children"][0]["message"] == reference["children"][0]["message"]
+
+
+def test_trace_view_walk():
+    root = Trace("root", start_time=0)
+    a = Trace("a", parent_id=root.id, start_time=0)
+    a1 = Trace("a1", parent_id=a.id, start_time=0)
+    b = Trace("b", parent_id=root.id, start_time=1)
+    root.add_child(a)
+    a.add_child(a1)
+    root.add_child(b)
+    root.end(4)
+    a.end(1)
+    b.end(4)
+
+    view = TraceView(root)
+    assert [v.name for v in view.walk()] == ["root", "a", "a1", "b"]
+    assert [v.name for v in view.walk(max_depth=1)] == ["root", "a", "b"]
+    assert [v.name for v in view.walk(name_contains="a")] == ["a", "a1"]
+    assert view.find(name="a1").path == ("root", "a", "a1")
+    assert view.find(name="a1").share_of_parent is None
+    assert view.find(name="b").share_of_parent == 0.75
+    assert view.share_of_parent is None
+    assert [v.name for v in view] == ["a", "b"]
+    assert view.find(name="nothing") is None
+    assert view.metadata == {}
+    assert view.duration_ms == 4000
+    assert TraceView(a1).duration is None
+    assert [v.name for v in walk_traces([root, b], name="b")] == ["b", "b"]
+    assert "root" in repr(view)
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.trace_view", preview=False)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import collections
+import concurrent.futures
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from learn_strands_agents.local_model import (
+    ScriptedToolUse,
+    ScriptedTurn,
+    ScriptedModel,
+)
+from learn_strands_agents import weather
+from learn_strands_agents.weather import (
+    GetForecastInput,
+    ForecastPeriod,
+    NwsClient,
+    new_weather_agent,
+)
+
+PERIODS = [
+    {
+        "name": "Tonight",
+        "startTime": "2025-10-16T18:00:00-07:00",
+        "temperature": 54,
+        "temperatureUnit": "F",
+        "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": 97},
+        "windSpeed": "6 to 13 mph",
+        "windDirection": "S",
+        "shortForecast": "Rain",
+        "detailedForecast": "Rain. Low around 54.",
+    },
+    {
+        "name": "Friday",
+        "startTime": "2025-10-17T06:00:00-07:00",
+        "temperature": 60,
+        "temperatureUnit": "F",
+        "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": None},
+        "windSpeed": "9 mph",
+        "windDirection": "S",
+        "shortForecast": "Rain",
+        "detailedForecast": "",
+    },
+]
+
+hits = collections.Counter()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        hits[path] += 1
+        host = f"http://{self.headers['Host']}"
+        if path == "/points/47.6062,-122.3321":
+            data = {
+                "properties": {
+                    "gridId": "SEW",
+                    "gridX": 125,
+                    "gridY": 68,
+                    "forecast": f"{host}/gridpoints/SEW/125,68/forecast",
+                    "forecastHourly": f"{host}/gridpoints/SEW/125,68/forecast/hourly",
+                    "relativeLocation": {
+                        "properties": {"city": "Seattle", "state": "WA"}
+                    },
+                }
+            }
+        elif path == "/alerts/active":
+            data = {
+                "features": [
+                    {
+                        "properties": {
+                            "event": "Flood Watch",
+                            "severity": "Moderate",
+                            "headline": "Flood Watch until Saturday",
+                        }
+                    }
+                ]
+            }
+        elif path.startswith("/gridpoints/"):
+            data = {"properties": {"periods": PERIODS}}
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/geo+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def client():
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = NwsClient(base_url=f"http://127.0.0.1:{server.server_port}")
+    yield client
+    client.close()
+    server.shutdown()
+
+
+def test_forecast_period():
+    period = ForecastPeriod.from_nws(PERIODS[0])
+    assert period.to_text() == (
+        "Tonight: 54°F, 97% precipitation, wind S 6 to 13 mph. Rain. Low around 54."
+    )
+    period = ForecastPeriod.from_nws(PERIODS[1], detailed=False)
+    assert period.to_text() == "Friday: 60°F, wind S 9 mph. Rain"
+
+
+def test_get_forecast(client):
+    hits.clear()
+    output = client.get_forecast(
+        GetForecastInput(lat=47.60621, lng=-122.33207, periods=1, hourly=True)
+    )
+    assert output.location == "Seattle, WA"
+    assert output.grid == "SEW/125,68"
+    assert [p.name for p in output.periods] == ["Tonight"]
+    assert len(output.hourly) == 2
+    assert output.alerts[0].event == "Flood Watch"
+    text = str(output)
+    assert text.startswith("Forecast for Seattle, WA (grid SEW/125,68)\nTonight: 54°F")
+    assert "Flood Watch (Moderate): Flood Watch until Saturday" in text
+
+    # the grid lookup is cached, places are resolved locally
+    output = client.get_forecast(GetForecastInput(place="Seattle, Washington"))
+    assert output.location == "Seattle, WA"
+    assert hits["/points/47.6062,-122.3321"] == 1
+    assert hits["/gridpoints/SEW/125,68/forecast"] == 2
+    assert hits["/gridpoints/SEW/125,68/forecast/hourly"] == 1
+
+    with pytest.raises(ValueError):
+        client.get_forecast(GetForecastInput(place="Xyzzy"))
+    with pytest.raises(ValueError):
+        client.get_forecast(GetForecastInput(lat=47.6062))
+    with pytest.raises(ValueError):
+        GetForecastInput(place="Seattle", periods=15)
+
+
+def test_points_lru():
+    client = NwsClient(max_points=1)
+    urls = []
+    client.get_json = lambda url: urls.append(url) or {"properties": {"url": url}}
+    client.points(47.60621, -122.33207)
+    assert client.points(47.60621, -122.33207)["url"].endswith("/points/47.6062,-122.3321")
+    assert len(urls) == 1
+    client.points(45.5152, -122.6784)
+    assert list(client._points) == [(45.5152, -122.6784)]
+    client.points(47.60621, -122.33207)
+    assert len(urls) == 3
+
+
+def test_get_nws_client(monkeypatch):
+    monkeypatch.setattr(weather, "_nws_client", None)
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        clients = set(executor.map(lambda _: id(weather.get_nws_client()), range(32)))
+    assert len(clients) == 1
+
+
+def test_get_forecast_tool(client, monkeypatch):
+    monkeypatch.setattr(weather, "get_nws_client", lambda: client)
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                tool_uses=[
+                    ScriptedToolUse(
+                        "get_forecast", {"input": {"place": "Seattle"}}
+                    )
+                ]
+            ),
+            ScriptedTurn(text="Rain tonight."),
+        ]
+    )
+    agent = new_weather_agent(model=model, composite=True, callback_handler=None)
+    result = agent("What's the weather like in Seattle?")
+    assert result.metrics.cycle_count == 2
+    tool_result = agent.messages[-2]["content"][0]["toolResult"]
+    assert tool_result["status"] == "success"
+    assert tool_result["content"][0]["text"].startswith("Forecast for Seattle, WA")
+
+    # outside of the US
+    model = ScriptedModel(
+        turns=[
+            ScriptedTurn(
+                tool_uses=[
+                    ScriptedToolUse("get_forecast", {"input": {"lat": 48.85, "lng": 2.35}})
+                ]
+            ),
+            ScriptedTurn(text="Sorry."),
+        ]
+    )
+    agent = new_weather_agent(model=model, composite=True, callback_handler=None)
+    agent("What's the weather like in Paris?")
+    assert agent.messages[-2]["content"][0]["toolResult"]["status"] == "error"
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.weather", preview=False)
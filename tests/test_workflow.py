@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+
+import pytest
+
+from learn_strands_agents.local_model import ScriptedTurn, ScriptedModel
+from learn_strands_agents.trace_view import walk_traces
+from learn_strands_agents.research import new_research_workflow
+from learn_strands_agents.workflow import Stage, Workflow
+
+QUESTION = "Is Amazon Bedrock AgentCore ready for production use?"
+
+
+def _sleep_stage(name, depends_on=(), seconds=0.1):
+    async def func(inputs):
+        await asyncio.sleep(seconds)
+        return "+".join([name, *(inputs[dep] for dep in depends_on)])
+
+    return Stage(name, func, depends_on=tuple(depends_on))
+
+
+def test_workflow_validation():
+    with pytest.raises(ValueError):
+        Workflow([Stage("a", str), Stage("a", str)])
+    with pytest.raises(ValueError):
+        Workflow([Stage("input", str)])
+    with pytest.raises(ValueError):
+        Workflow([Stage("a", str, depends_on=("b",))])
+    with pytest.raises(ValueError):
+        Workflow([Stage("a", str, depends_on=("b",)), Stage("b", str, depends_on=("a",))])
+    with pytest.raises(ValueError):
+        Workflow([])
+
+    # declared in any order
+    workflow = Workflow([Stage("b", str, depends_on=("a",)), Stage("a", str)])
+    assert [stage.name for stage in workflow.stages] == ["a", "b"]
+
+
+def test_workflow_concurrency():
+    stages = [
+        _sleep_stage("research"),
+        _sleep_stage("fact_check", ["research"]),
+        _sleep_stage("draft", ["research"]),
+        Stage("report", lambda x: f"{x['fact_check']} | {x['draft']}", ("fact_check", "draft")),
+    ]
+    result = Workflow(stages).run(QUESTION)
+    assert result.ok
+    assert result.output == "fact_check+research | draft+research"
+    # fact_check and draft overlap
+    assert result.duration < 0.29
+    assert [child.name for child in result.trace.children] == [
+        "Stage: research",
+        "Stage: fact_check",
+        "Stage: draft",
+        "Stage: report",
+    ]
+
+    # backpressure, one stage at a time
+    result = Workflow(stages, max_concurrency=1).run(QUESTION)
+    assert result.duration >= 0.3
+    assert max(result.stages["fact_check"].wait, result.stages["draft"].wait) >= 0.09
+
+
+def test_workflow_failure():
+    def fail(inputs):
+        raise RuntimeError("boom")
+
+    workflow = Workflow(
+        [
+            Stage("a", fail),
+            Stage("b", lambda x: "b"),
+            Stage("c", lambda x: "c", depends_on=("a", "b")),
+        ]
+    )
+    result = workflow.run(None)
+    assert not result.ok
+    assert [stage.status for stage in result.stages.values()] == ["error", "ok", "skipped"]
+    assert result.outputs == {"b": "b"}
+    assert result.stages["c"].trace.metadata["failed_dependencies"] == ["a"]
+    with pytest.raises(RuntimeError):
+        result.raise_for_error()
+
+
+def test_map_async():
+    workflow = Workflow([_sleep_stage("a", seconds=0.05)], max_concurrency=2)
+    start = time.perf_counter()
+    results = asyncio.run(workflow.map_async(range(4), max_runs=4))
+    assert len(results) == 4
+    assert [r.input for r in results] == [0, 1, 2, 3]
+    # four runs, two at a time
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_new_research_workflow():
+    def responder(messages, tool_specs, system_prompt):
+        prompt = messages[-1]["content"][0]["text"]
+        if system_prompt.startswith("You are a Researcher"):
+            return ScriptedTurn(text="AgentCore is generally available.")
+        if system_prompt.startswith("You are an Analyst"):
+            return ScriptedTurn(text="Accuracy: 5")
+        if prompt.startswith("Draft"):
+            return ScriptedTurn(text="Draft: AgentCore is ready.")
+        return ScriptedTurn(text="AgentCore is ready.")
+
+    model = ScriptedModel(responder=responder)
+    workflow = new_research_workflow(model, researcher_tools=[], overlap=True)
+    result = workflow.run(QUESTION)
+    assert result.ok
+    assert list(result.stages) == ["researcher", "analyst", "draft", "writer"]
+    assert result.output.strip() == "AgentCore is ready."
+    assert len(model.requests) == 4
+    assert "Draft: AgentCore is ready." in model.requests[-1]["messages"][-1]["content"][0]["text"]
+
+    # per stage and combined token accounting, one trace for the whole run
+    assert all(stage.cycle_count == 1 for stage in result.stages.values())
+    assert result.usage["inputTokens"] == sum(
+        stage.usage["inputTokens"] for stage in result.stages.values()
+    )
+    assert result.trace.metadata["usage"] == result.usage
+    assert len(list(walk_traces(result.trace, name="stream_messages"))) == 4
+
+    workflow = new_research_workflow(model, researcher_tools=[])
+    assert list(workflow.run(QUESTION).stages) == ["researcher", "analyst", "writer"]
+
+
+if __name__ == "__main__":
+    from learn_strands_agents.tests import run_cov_test
+
+    run_cov_test(__file__, "learn_strands_agents.workflow", preview=False)